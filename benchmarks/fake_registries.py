@@ -0,0 +1,460 @@
+"""Local stand-ins for registry APIs, used by the benchmarks.
+
+One HTTP server answers for every registry host. Requests are routed to
+it by RewritingAdapter, which rewrites https://<host>/<path> into
+http://127.0.0.1:<port>/<host>/<path>, so registries run unmodified
+against their default base urls.
+
+Each ecosystem serves packages named pkg0 .. pkg<N-1> (version 1.0.0),
+each with one artifact of FakeRegistries.artifact_size random bytes, and
+digests matching what the registry publishes. Responses are delayed by
+latency (time to first byte), and bodies are paced to bandwidth bytes per
+second per connection.
+
+git is served from a local bare repository (latency and bandwidth do not
+apply to it).
+"""
+
+import base64
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from fetcher_py.ratelimit import RateLimitedAdapter
+
+VERSION = "1.0.0"
+WRITE_CHUNK_SIZE = 64 * 1024
+
+ECOSYSTEMS = [
+    "pip",
+    "npm",
+    "cargo",
+    "gem",
+    "cpan",
+    "composer",
+    "hackage",
+    "nuget",
+    "brew",
+    "oci",
+    "git",
+]
+
+# (content type, body) of metadata, or None for the artifact
+Route = Callable[["FakeRegistries", re.Match], Optional[Tuple[str, bytes]]]
+
+
+def _json(data) -> Tuple[str, bytes]:
+    return "application/json", json.dumps(data).encode()
+
+
+class FakeRegistries:
+    def __init__(
+        self,
+        packages: int = 20,
+        artifact_size: int = 1024 * 1024,
+        latency: float = 0.0,
+        bandwidth: Optional[int] = None,
+    ):
+        """
+        Fake registries, serving packages with artifacts of artifact_size.
+
+        :param packages: Number of packages per ecosystem.
+        :param artifact_size: Size of each artifact in bytes.
+        :param latency: Seconds before each response starts.
+        :param bandwidth: Bytes per second per response (default is unlimited).
+        """
+        self.packages = packages
+        self.artifact_size = artifact_size
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.artifact = os.urandom(artifact_size)
+        self.sha256 = hashlib.sha256(self.artifact).hexdigest()
+        self.sha512 = hashlib.sha512(self.artifact).digest()
+        self.sha1 = hashlib.sha1(self.artifact).hexdigest()
+
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._git_dir: Optional[tempfile.TemporaryDirectory] = None
+        self.git_repo: Optional[str] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def queries(self, ecosystem: str) -> List[str]:
+        """
+        Package queries served for the ecosystem.
+        """
+        if ecosystem == "git":
+            return [f"git://{self.git_repo}@v{VERSION}"] * self.packages
+        if ecosystem == "oci":
+            return [
+                f"oci://ghcr.io/bench/pkg{i}:{VERSION}" for i in range(self.packages)
+            ]
+        if ecosystem == "composer":
+            return [f"composer://bench/pkg{i}@{VERSION}" for i in range(self.packages)]
+        return [f"{ecosystem}://pkg{i}@{VERSION}" for i in range(self.packages)]
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = 0
+            self.bytes_sent = 0
+
+    def _count(self, sent: int):
+        with self._lock:
+            self.bytes_sent += sent
+
+    def start(self) -> "FakeRegistries":
+        registries = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body are separate writes, which would otherwise
+            # wait on delayed ACKs (~40ms per response)
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                registries._handle(self, head=False)
+
+            def do_HEAD(self):
+                registries._handle(self, head=True)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self._init_git()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._git_dir is not None:
+            self._git_dir.cleanup()
+
+    def __enter__(self) -> "FakeRegistries":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _init_git(self):
+        try:
+            from git import Actor, Repo
+        except ImportError:
+            return
+
+        self._git_dir = tempfile.TemporaryDirectory(prefix="fetcher-bench-")
+        work = Repo.init(os.path.join(self._git_dir.name, "work"))
+        with open(os.path.join(work.working_dir, "artifact.bin"), "wb") as file:
+            file.write(self.artifact)
+        work.index.add(["artifact.bin"])
+        author = Actor("bench", "bench@example.com")
+        work.index.commit("artifact", author=author, committer=author)
+        work.create_tag(f"v{VERSION}")
+
+        self.git_repo = os.path.join(self._git_dir.name, "repo.git")
+        work.clone(self.git_repo, bare=True)
+        work.close()
+
+    def _handle(self, handler: BaseHTTPRequestHandler, head: bool):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        host, _, path = handler.path.lstrip("/").partition("/")
+        path = "/" + urlsplit(path).path.lstrip("/")
+        for pattern, route in ROUTES.get(host, []):
+            match = re.fullmatch(pattern, path)
+            if match is None:
+                continue
+
+            response = route(self, match)
+            if response is None:
+                return self._send_artifact(handler, head)
+            return self._send(handler, 200, response[0], response[1], head)
+
+        self._send(handler, 404, "text/plain", b"not found", head)
+
+    def _send(self, handler, status, content_type, body, head, headers=None):
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        if head:
+            return
+
+        view = memoryview(body)
+        for start in range(0, len(body), WRITE_CHUNK_SIZE):
+            chunk = view[start : start + WRITE_CHUNK_SIZE]
+            handler.wfile.write(chunk)
+            self._count(len(chunk))
+            if self.bandwidth:
+                time.sleep(len(chunk) / self.bandwidth)
+
+    def _send_artifact(self, handler, head):
+        body, status = self.artifact, 200
+        headers = {"Accept-Ranges": "bytes"}
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", handler.headers.get("Range", ""))
+        if match is not None:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else len(body) - 1
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+            body, status = body[start : end + 1], 206
+
+        self._send(handler, status, "application/octet-stream", body, head, headers)
+
+
+def _pypi(r: FakeRegistries, m: re.Match):
+    name = m.group(1)
+    url = f"https://files.pythonhosted.org/packages/{name}-{VERSION}.tar.gz"
+    return _json(
+        {
+            "info": {"name": name, "version": VERSION},
+            "urls": [
+                {
+                    "packagetype": "sdist",
+                    "url": url,
+                    "size": r.artifact_size,
+                    "digests": {"sha256": r.sha256},
+                }
+            ],
+        }
+    )
+
+
+def _npm(r: FakeRegistries, m: re.Match):
+    name = m.group(1)
+    integrity = "sha512-" + base64.b64encode(r.sha512).decode()
+    return _json(
+        {
+            "name": name,
+            "version": VERSION,
+            "dist": {
+                "tarball": f"https://registry.npmjs.org/{name}/-/{name}-{VERSION}.tgz",
+                "integrity": integrity,
+                "shasum": r.sha1,
+            },
+        }
+    )
+
+
+def _cargo_index(r: FakeRegistries, m: re.Match):
+    line = {"name": m.group(1), "vers": VERSION, "cksum": r.sha256}
+    return "text/plain", json.dumps(line).encode()
+
+
+def _gem(r: FakeRegistries, m: re.Match):
+    name = m.group(1)
+    return _json(
+        {
+            "name": name,
+            "version": VERSION,
+            "gem_uri": f"https://rubygems.org/gems/{name}-{VERSION}.gem",
+            "sha": r.sha256,
+        }
+    )
+
+
+def _cpan(r: FakeRegistries, m: re.Match):
+    name = m.group(1)
+    return _json(
+        {
+            "version": VERSION,
+            "download_url": f"https://cpan.metacpan.org/authors/id/B/BE/BENCH/{name}-{VERSION}.tar.gz",
+            "checksum_sha256": r.sha256,
+        }
+    )
+
+
+def _composer(r: FakeRegistries, m: re.Match):
+    name = f"{m.group(1)}/{m.group(2)}"
+    url = f"https://api.github.com/repos/{name}/zipball/{VERSION}"
+    return _json(
+        {
+            "packages": {
+                name: [
+                    {
+                        "name": name,
+                        "version": VERSION,
+                        "dist": {"url": url, "shasum": r.sha1},
+                    }
+                ]
+            }
+        }
+    )
+
+
+def _hackage_versions(r: FakeRegistries, m: re.Match):
+    return _json({VERSION: "normal"})
+
+
+def _hackage(r: FakeRegistries, m: re.Match):
+    return _json({"description": m.group(1)})
+
+
+def _nuget_index(r: FakeRegistries, m: re.Match):
+    return _json(
+        {
+            "resources": [
+                {
+                    "@id": "https://api.nuget.org/v3/registration5-semver1/",
+                    "@type": "RegistrationsBaseUrl",
+                },
+                {
+                    "@id": "https://api.nuget.org/v3-flatcontainer/",
+                    "@type": "PackageBaseAddress/3.0.0",
+                },
+            ]
+        }
+    )
+
+
+def _nuget_registration(r: FakeRegistries, m: re.Match):
+    name, version = m.group(1), m.group(2)
+    return _json(
+        {
+            "catalogEntry": f"https://api.nuget.org/v3/catalog0/data/{name}.{version}.json",
+            "packageContent": f"https://api.nuget.org/v3-flatcontainer/{name}/{version}/{name}.{version}.nupkg",
+        }
+    )
+
+
+def _nuget_catalog(r: FakeRegistries, m: re.Match):
+    return _json(
+        {
+            "id": m.group(1),
+            "version": m.group(2),
+            "packageHashAlgorithm": "SHA512",
+            "packageHash": base64.b64encode(r.sha512).decode(),
+        }
+    )
+
+
+def _brew(r: FakeRegistries, m: re.Match):
+    name = m.group(1)
+    return _json(
+        {
+            "name": name,
+            "versions": {"stable": VERSION},
+            "urls": {
+                "stable": {
+                    "url": f"https://github.com/bench/{name}/archive/v{VERSION}.tar.gz",
+                    "checksum": r.sha256,
+                }
+            },
+        }
+    )
+
+
+def _oci_manifest(r: FakeRegistries, m: re.Match):
+    manifest = {
+        "schemaVersion": 2,
+        "mediaType": "application/vnd.oci.image.manifest.v1+json",
+        "config": {
+            "mediaType": "application/vnd.oci.image.config.v1+json",
+            "digest": "sha256:" + hashlib.sha256(b"{}").hexdigest(),
+            "size": 2,
+        },
+        "layers": [
+            {
+                "mediaType": "application/vnd.oci.image.layer.v1.tar",
+                "digest": f"sha256:{r.sha256}",
+                "size": r.artifact_size,
+                "annotations": {"org.opencontainers.image.title": f"{m.group(1)}.tar"},
+            }
+        ],
+    }
+    return manifest["mediaType"], json.dumps(manifest).encode()
+
+
+def _artifact(r: FakeRegistries, m: re.Match):
+    return None
+
+
+NAME = r"([A-Za-z0-9_.-]+)"
+ROUTES: Dict[str, List[Tuple[str, Route]]] = {
+    "pypi.org": [(rf"/pypi/{NAME}/json", _pypi), (rf"/pypi/{NAME}/[^/]+/json", _pypi)],
+    "files.pythonhosted.org": [(r"/packages/.+", _artifact)],
+    "registry.npmjs.org": [
+        (rf"/{NAME}/-/.+", _artifact),
+        (rf"/{NAME}", _npm),
+        (rf"/{NAME}/[^/]+", _npm),
+    ],
+    "index.crates.io": [(rf"/(?:[^/]+/)+{NAME}", _cargo_index)],
+    "static.crates.io": [(r"/crates/.+", _artifact)],
+    "rubygems.org": [
+        (r"/gems/.+", _artifact),
+        (rf"/api/v2/rubygems/{NAME}/versions/[^/]+\.json", _gem),
+        (rf"/api/versions/{NAME}/latest\.json", _gem),
+    ],
+    "fastapi.metacpan.org": [(rf"/v1/download_url/{NAME}", _cpan)],
+    "cpan.metacpan.org": [(r"/authors/.+", _artifact)],
+    "repo.packagist.org": [(rf"/p2/{NAME}/{NAME}\.json", _composer)],
+    "api.github.com": [(r"/repos/.+", _artifact)],
+    "hackage.haskell.org": [
+        (r"/package/[^/]+/[^/]+\.tar\.gz", _artifact),
+        (r"/package/(.+)-[0-9.]+\.json", _hackage),
+        (rf"/package/{NAME}\.json", _hackage_versions),
+    ],
+    "api.nuget.org": [
+        (r"/v3/index\.json", _nuget_index),
+        (r"/v3/registration5-semver1/([^/]+)/([^/]+)\.json", _nuget_registration),
+        (r"/v3/catalog0/data/([^.]+)\.([0-9.]+)\.json", _nuget_catalog),
+        (r"/v3-flatcontainer/.+", _artifact),
+    ],
+    "formulae.brew.sh": [(rf"/api/formula/{NAME}\.json", _brew)],
+    "github.com": [(r"/bench/.+", _artifact)],
+    "ghcr.io": [
+        (rf"/v2/bench/{NAME}/manifests/[^/]+", _oci_manifest),
+        (r"/v2/bench/[^/]+/blobs/sha256:[0-9a-f]+", _artifact),
+        (r"/v2/", lambda r, m: _json({})),
+    ],
+}
+
+
+class RewritingAdapter(RateLimitedAdapter):
+    def __init__(self, port: int, **kwargs):
+        """
+        RateLimitedAdapter, sending every request to the fake registries.
+
+        :param port: Port of the fake registries.
+        :param kwargs: Passed to RateLimitedAdapter.
+        """
+        self.port = port
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = f"http://127.0.0.1:{self.port}/{parts.netloc}{parts.path}" + (
+            f"?{parts.query}" if parts.query else ""
+        )
+        return super().send(request, **kwargs)
+
+
+def mk_session(adapter: RewritingAdapter) -> requests.Session:
+    """
+    Make a session, sending every request through adapter (OCI providers
+    reuse the session of their registry).
+    """
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
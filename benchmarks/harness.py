@@ -0,0 +1,300 @@
+"""Offline benchmarks of fetcher_py, against local fake registries.
+
+Each scenario (ecosystem, mode, concurrency) runs in its own process, so
+peak RSS is measured per scenario. Modes are:
+
+    get        Fetcher.get per package, from a pool of concurrency threads
+    download   Fetcher.download_raw per package, from a pool of concurrency threads
+    bulk       Fetcher.download_many, with concurrency jobs
+
+For get and download, latency is the time of each call. For bulk, it is
+the time from the start of the run until each result (results stream
+back as they finish).
+
+Usage:
+
+    python -m benchmarks --ecosystems pip,npm --modes get,download,bulk \\
+        --concurrency 1,8,32 --packages 50 --latency 20 --bandwidth 50M \\
+        --artifact-size 1M
+"""
+
+import argparse
+import json
+import multiprocessing
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+
+from benchmarks.fake_registries import (
+    ECOSYSTEMS,
+    FakeRegistries,
+    RewritingAdapter,
+    mk_session,
+)
+from fetcher_py.budget import parse_size
+from fetcher_py.fetcher import Fetcher
+from fetcher_py.options import Options
+
+try:
+    import resource
+except ImportError:  # not available on windows
+    resource = None
+
+MODES = ["get", "download", "bulk"]
+
+
+@dataclass
+class Scenario:
+    ecosystem: str
+    mode: str
+    concurrency: int
+    queries: List[str]
+    port: int
+    rate_limits: bool = False
+
+
+@dataclass
+class Measurement:
+    ecosystem: str
+    mode: str
+    concurrency: int
+    packages: int
+    errors: int
+    seconds: float
+    bytes: int
+    p50_ms: float
+    p99_ms: float
+    peak_rss_mb: Optional[float]
+    first_error: Optional[str] = None
+
+    @property
+    def packages_per_sec(self) -> float:
+        return self.packages / self.seconds if self.seconds else 0.0
+
+    @property
+    def mb_per_sec(self) -> float:
+        return self.bytes / 1024**2 / self.seconds if self.seconds else 0.0
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Nearest-rank percentile (q in 0..100) of values, 0 when there are none.
+    """
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macOS
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def _timed(fn, query: str):
+    start = time.perf_counter()
+    try:
+        fn(query)
+        return time.perf_counter() - start, None
+    except Exception as e:
+        return time.perf_counter() - start, e
+
+
+def _download(fetcher: Fetcher, query: str):
+    fetcher.download_raw(query).close()
+
+
+def measure(scenario: Scenario) -> Dict:
+    """
+    Run the scenario in this process, against fake registries at scenario.port.
+
+    :return: Latencies (seconds), errors, and elapsed seconds of the run.
+    """
+    options = Options(max_threads=scenario.concurrency)
+    if not scenario.rate_limits:
+        options.rate_limiter = None
+
+    adapter = RewritingAdapter(
+        scenario.port,
+        limiter=options.rate_limiter,
+        pool_connections=options.pool_connections,
+        pool_maxsize=max(options.pool_maxsize, scenario.concurrency),
+    )
+    latencies, errors = [], []
+    fetcher = Fetcher(mk_session(adapter), options)
+    start = time.perf_counter()
+    if scenario.mode == "bulk":
+        with tempfile.TemporaryDirectory(prefix="fetcher-bench-") as out_dir:
+            results = fetcher.download_many(
+                scenario.queries, out_dir, scenario.concurrency
+            )
+            for result in results:
+                latencies.append(time.perf_counter() - start)
+                if not result.ok:
+                    errors.append(result.error)
+    else:
+        if scenario.mode == "get":
+            fn = fetcher.get
+        else:
+            fn = lambda query: _download(fetcher, query)  # noqa: E731
+
+        with ThreadPoolExecutor(max_workers=scenario.concurrency) as executor:
+            for latency, error in executor.map(
+                lambda query: _timed(fn, query), scenario.queries
+            ):
+                latencies.append(latency)
+                if error is not None:
+                    errors.append(error)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "latencies": latencies,
+        "errors": [f"{type(e).__name__}: {e}" for e in errors],
+        "seconds": elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _measure_in_child(scenario: Scenario, queue):
+    # warnings of failed queries are counted, not logged
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    try:
+        queue.put(measure(scenario))
+    except BaseException as e:
+        queue.put({"crash": f"{type(e).__name__}: {e}"})
+
+
+def run_scenario(
+    registries: FakeRegistries, scenario: Scenario, isolated: bool = True
+) -> Measurement:
+    """
+    Run the scenario, in a new process when isolated (for peak RSS).
+    """
+    registries.reset_counters()
+    if isolated:
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        process = context.Process(target=_measure_in_child, args=(scenario, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+    else:
+        result = measure(scenario)
+
+    if "crash" in result:
+        result = {
+            "latencies": [],
+            "errors": [result["crash"]] * len(scenario.queries),
+            "seconds": 0.0,
+            "peak_rss_mb": None,
+        }
+
+    latencies = result["latencies"]
+    return Measurement(
+        ecosystem=scenario.ecosystem,
+        mode=scenario.mode,
+        concurrency=scenario.concurrency,
+        packages=len(scenario.queries) - len(result["errors"]),
+        errors=len(result["errors"]),
+        seconds=result["seconds"],
+        bytes=registries.bytes_sent,
+        p50_ms=percentile(latencies, 50) * 1000,
+        p99_ms=percentile(latencies, 99) * 1000,
+        peak_rss_mb=result["peak_rss_mb"],
+        first_error=result["errors"][0] if result["errors"] else None,
+    )
+
+
+HEADER = (
+    f"{'ecosystem':<10} {'mode':<9} {'conc':>5} {'pkgs/s':>9} {'MB/s':>9} "
+    f"{'p50 ms':>9} {'p99 ms':>9} {'rss MB':>8} {'errors':>7}"
+)
+
+
+def format_row(m: Measurement) -> str:
+    rss = f"{m.peak_rss_mb:.1f}" if m.peak_rss_mb is not None else "-"
+    return (
+        f"{m.ecosystem:<10} {m.mode:<9} {m.concurrency:>5} "
+        f"{m.packages_per_sec:>9.1f} {m.mb_per_sec:>9.1f} "
+        f"{m.p50_ms:>9.1f} {m.p99_ms:>9.1f} {rss:>8} {m.errors:>7}"
+    )
+
+
+def _csv(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("--ecosystems", type=_csv, default=ECOSYSTEMS)
+    parser.add_argument("--modes", type=_csv, default=MODES)
+    parser.add_argument(
+        "--concurrency", type=lambda v: [int(c) for c in _csv(v)], default=[1, 8, 32]
+    )
+    parser.add_argument("--packages", type=int, default=20, help="per ecosystem")
+    parser.add_argument("--artifact-size", type=parse_size, default=parse_size("1M"))
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="milliseconds per response"
+    )
+    parser.add_argument(
+        "--bandwidth",
+        type=parse_size,
+        default=None,
+        help="bytes per second per response, e.g. 10M (unlimited by default)",
+    )
+    parser.add_argument(
+        "--rate-limits",
+        action="store_true",
+        help="keep published registry rate limits (disabled by default)",
+    )
+    parser.add_argument("--json", action="store_true", help="one json line per row")
+    args = parser.parse_args(argv)
+
+    registries = FakeRegistries(
+        packages=args.packages,
+        artifact_size=args.artifact_size,
+        latency=args.latency / 1000,
+        bandwidth=args.bandwidth,
+    )
+    with registries:
+        if not args.json:
+            print(HEADER)
+        for ecosystem in args.ecosystems:
+            for mode in args.modes:
+                for concurrency in args.concurrency:
+                    scenario = Scenario(
+                        ecosystem,
+                        mode,
+                        concurrency,
+                        registries.queries(ecosystem),
+                        registries.port,
+                        args.rate_limits,
+                    )
+                    measurement = run_scenario(registries, scenario)
+                    if args.json:
+                        row = asdict(measurement)
+                        row["packages_per_sec"] = measurement.packages_per_sec
+                        row["mb_per_sec"] = measurement.mb_per_sec
+                        print(json.dumps(row), flush=True)
+                    else:
+                        print(format_row(measurement), flush=True)
+                        if measurement.first_error:
+                            print(f"  first error: {measurement.first_error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Transport adapters mounted on the Fetcher's session.
+
+One session (and so one set of connection pools) is shared by metadata
+requests and artifact downloads of all packages, so TLS connections stay
+warm across them.
+"""
+
+import socket
+from typing import List, Tuple
+
+from requests.adapters import (
+    DEFAULT_POOLBLOCK,
+    DEFAULT_POOLSIZE,
+    DEFAULT_RETRIES,
+    HTTPAdapter,
+)
+from urllib3.connection import HTTPConnection
+
+
+def keepalive_socket_options() -> List[Tuple[int, int, int]]:
+    """
+    Socket options enabling TCP keep-alive, so idle pooled connections are
+    not silently dropped by middleboxes between packages.
+    """
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    return options
+
+
+def is_default_adapter(adapter) -> bool:
+    """
+    Whether adapter is HTTPAdapter configured as mounted by requests.Session,
+    as opposed to one mounted by the caller (e.g. with retries).
+    """
+    return (
+        type(adapter) is HTTPAdapter
+        and adapter.max_retries.total == DEFAULT_RETRIES
+        and adapter._pool_connections == DEFAULT_POOLSIZE
+        and adapter._pool_maxsize == DEFAULT_POOLSIZE
+        and adapter._pool_block == DEFAULT_POOLBLOCK
+    )
+
+
+class PooledAdapter(HTTPAdapter):
+    __attrs__ = HTTPAdapter.__attrs__ + ["tcp_keepalive"]
+
+    def __init__(self, tcp_keepalive: bool = True, **kwargs):
+        """
+        HTTPAdapter, with optional TCP keep-alive on pooled connections.
+
+        :param tcp_keepalive: Whether to enable TCP keep-alive on connections.
+        :param kwargs: Passed to HTTPAdapter (e.g. pool_connections, pool_maxsize).
+        """
+        self.tcp_keepalive = tcp_keepalive
+        super().__init__(**kwargs)
+
+    def init_poolmanager(
+        self, connections, maxsize, block=DEFAULT_POOLBLOCK, **pool_kwargs
+    ):
+        if getattr(self, "tcp_keepalive", False):
+            pool_kwargs.setdefault("socket_options", keepalive_socket_options())
+
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
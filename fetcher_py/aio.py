@@ -0,0 +1,40 @@
+"""Thread offloading for asyncio callers.
+
+The async API (Fetcher.aget, Registry.araw, Downloader.aget_as_zipped, and
+the like) is a thin layer over the blocking one: it does not have a
+non-blocking transport. HTTP requests are still made with requests, and
+coroutines run them, and any other blocking work (hashing, zipping,
+writing archives), on a thread pool shared by everything using the same
+Options. Callers on an event loop are spared their own run_in_executor,
+and get one bound for the whole process, but each request in flight
+holds a thread, so in-flight requests are bounded by Options.max_threads
+(256 by default), as they would be with run_in_executor.
+
+Keeping thousands of requests in flight from one process would need an
+async HTTP client (e.g. httpx, or aiohttp) underneath the registries, and
+the downloader, which is out of scope: rate limits, the HTTP cache, and
+hooks are applied by adapters of the requests session, which such a
+client would bypass.
+"""
+
+import asyncio
+import functools
+from typing import Callable, TypeVar
+
+from fetcher_py.options import Options
+
+T = TypeVar("T")
+
+
+async def run(options: Options, fn: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run blocking fn on a thread of the executor of options.
+
+    :param options: Options, whose executor is used.
+    :param fn: The blocking function to call.
+    :return: Result of fn.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        options.executor(), functools.partial(fn, *args, **kwargs)
+    )
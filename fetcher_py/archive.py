@@ -0,0 +1,202 @@
+"""Output archive buffer.
+
+Archives are kept in memory until they grow past a memory budget,
+after which they are spilled over to a temporary file on disk. Spilled
+archives can be moved to their destination, without copying any bytes.
+
+Archives are written to their destination atomically (through a temporary
+file in the same directory, renamed over it), so concurrent writers of the
+same path, and readers never see a partially written archive.
+"""
+
+import errno
+import io
+import logging
+import os
+import shutil
+import tempfile
+import weakref
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_MEMORY = 64 * 1024 * 1024
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _mkstemp(prefix: str, dir=None):
+    # like tempfile.mkstemp, but created with 0666 less the umask (applied by
+    # the kernel), as files are renamed to their destination as they are
+    dir = dir or tempfile.gettempdir()
+    flags = os.O_RDWR | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    for _ in range(100):
+        path = os.path.join(dir, f"{prefix}{os.urandom(8).hex()}.zip")
+        try:
+            return os.open(path, flags, 0o666), path
+        except FileExistsError:
+            continue
+    raise FileExistsError(errno.EEXIST, "no unique temporary name found", dir)
+
+
+def _write_atomic(destination, source):
+    # copy source (a binary file object) to destination, through a temporary file
+    fd, tmp_path = _mkstemp(".fetcher-py-", os.path.dirname(destination) or ".")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            shutil.copyfileobj(source, file)
+        os.replace(tmp_path, destination)
+    except BaseException:
+        _remove(tmp_path)
+        raise
+
+
+class SpooledArchive:
+    def __init__(self, max_memory: int = DEFAULT_MAX_MEMORY, dir=None):
+        """
+        File-like buffer holding an output archive.
+
+        :param max_memory: Number of bytes kept in memory, before spilling to disk.
+        :param dir: Directory for the spilled file (default is the system temp directory).
+        """
+        self.max_memory = max_memory
+        self.dir = dir
+        self.path = None
+        self._file = io.BytesIO()
+        self._finalizer = None
+
+    @property
+    def rolled(self) -> bool:
+        return self.path is not None
+
+    def rollover(self):
+        """
+        Spill in-memory content to a temporary file, keeping the position.
+        """
+        if self.rolled:
+            return
+
+        fd, path = _mkstemp("fetcher-py-", self.dir)
+        self._finalizer = weakref.finalize(self, _remove, path)
+        file = os.fdopen(fd, "w+b")
+        position = self._file.tell()
+        file.write(self._file.getbuffer())
+        file.seek(position)
+        self._file.close()
+
+        self._file, self.path = file, path
+        logger.debug(f"spilled archive over {self.max_memory} bytes to {path}")
+
+    def write(self, data) -> int:
+        if not self.rolled and self._file.tell() + len(data) > self.max_memory:
+            self.rollover()
+        return self._file.write(data)
+
+    def getvalue(self) -> bytes:
+        """
+        Read whole archive in memory, prefer copy_to or persist for large archives.
+        """
+        if not self.rolled:
+            return self._file.getvalue()
+
+        position = self._file.tell()
+        self._file.seek(0)
+        try:
+            return self._file.read()
+        finally:
+            self._file.seek(position)
+
+    def open_reader(self):
+        """
+        Open a reader of the archive, independent of other readers, and of
+        this buffer (a spilled archive can be closed while it is read).
+        """
+        self._file.flush()
+        if self.rolled:
+            return open(self.path, "rb")
+        return io.BytesIO(self._file.getvalue())
+
+    def copy_to(self, out):
+        """
+        Stream the archive to a writable file object.
+
+        :param out: The file object to write to.
+        """
+        self._file.seek(0)
+        shutil.copyfileobj(self._file, out)
+
+    def persist(self, destination):
+        """
+        Write the archive to the destination path, and close it.
+
+        Spilled archives are renamed when on the same filesystem, others
+        (and in-memory archives) are copied. Destination is replaced
+        atomically either way.
+
+        :param destination: Path of the file to write.
+        """
+        if not self.rolled:
+            self._file.seek(0)
+            _write_atomic(destination, self._file)
+            self.close()
+            return
+
+        self._file.close()
+        try:
+            os.replace(self.path, destination)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            with open(self.path, "rb") as file:
+                _write_atomic(destination, file)
+            os.remove(self.path)
+        self._finalizer.detach()
+        self.path = None
+
+    def close(self):
+        self._file.close()
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def persist(archive, destination):
+    """
+    Write an archive (or any seekable binary file object) to destination.
+
+    :param archive: SpooledArchive, or a binary file object.
+    :param destination: Path of the file to write.
+    """
+    if isinstance(archive, SpooledArchive):
+        archive.persist(destination)
+        return
+
+    archive.seek(0)
+    _write_atomic(destination, archive)
+
+
+def copy_to(archive, out):
+    """
+    Stream an archive (or any seekable binary file object) to a file object.
+
+    :param archive: SpooledArchive, or a binary file object.
+    :param out: The file object to write to.
+    """
+    if isinstance(archive, SpooledArchive):
+        archive.copy_to(out)
+        return
+
+    archive.seek(0)
+    shutil.copyfileobj(archive, out)
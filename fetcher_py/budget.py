@@ -0,0 +1,93 @@
+"""Byte budgets for downloads.
+
+A budget caps the size of any single artifact, and the total bytes
+downloaded by everything sharing it (e.g. all packages of a bulk job,
+sharing one Options). Artifacts of known size are rejected before they
+are requested, others are cut off as soon as they exceed the budget.
+"""
+
+import threading
+from typing import Optional
+
+
+class BudgetExceededError(ValueError):
+    pass
+
+
+def parse_size(value: str) -> int:
+    """
+    Parse size in bytes, with optional K, M, G, or T suffix (powers of 1024).
+
+    :param value: Size, e.g. '512', '10M', or '1.5G'.
+    :return: Size in bytes.
+    """
+    units = {"K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+    value = value.strip().upper().rstrip("B").rstrip("I")
+    multiplier = units.get(value[-1:], 1)
+    number = value[:-1] if value[-1:] in units else value
+    try:
+        return int(float(number) * multiplier)
+    except ValueError:
+        raise ValueError(f"invalid size: {value}") from None
+
+
+def format_size(size: Optional[int]) -> str:
+    if size is None:
+        return "?"
+
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+class ByteBudget:
+    def __init__(
+        self,
+        max_artifact_size: Optional[int] = None,
+        max_total_size: Optional[int] = None,
+    ):
+        """
+        Initialize the budget, None means unlimited.
+
+        :param max_artifact_size: Maximum size of a single artifact in bytes.
+        :param max_total_size: Maximum bytes downloaded in total.
+        """
+        self.max_artifact_size = max_artifact_size
+        self.max_total_size = max_total_size
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def check(self, url: str, size: int):
+        """
+        Raise BudgetExceededError, if artifact of size is above max_artifact_size.
+        """
+        if self.max_artifact_size is not None and size > self.max_artifact_size:
+            raise BudgetExceededError(
+                f"{url} is {format_size(size)}, above max artifact size of {format_size(self.max_artifact_size)}"
+            )
+
+    def charge(self, url: str, size: int):
+        """
+        Count size bytes of the artifact against the total budget.
+
+        Raises BudgetExceededError (without counting them), if they do not fit.
+        """
+        with self._lock:
+            if (
+                self.max_total_size is not None
+                and self.used + size > self.max_total_size
+            ):
+                raise BudgetExceededError(
+                    f"{url} does not fit in the budget, {format_size(self.max_total_size - self.used)} of {format_size(self.max_total_size)} left"
+                )
+            self.used += size
+
+    def refund(self, url: str, size: int):
+        """
+        Return size bytes charged for the artifact to the total budget
+        (e.g. when its download failed).
+        """
+        with self._lock:
+            self.used = max(0, self.used - size)
@@ -0,0 +1,178 @@
+"""Bulk fetching of many packages.
+
+Each query passes through a sequence of stages (e.g. metadata, and then
+artifacts), run on one thread pool. New queries are admitted only while
+fewer than twice the number of workers are in flight, so later stages of
+earlier queries overlap with the first stage of upcoming ones, instead of
+waiting for metadata of every query to be resolved first.
+
+Queries are deduplicated twice, as in closure. By query string, before
+they are admitted, and by (ecosystem, name, resolved version) once the
+first stage resolved them, so e.g. pip://numpy, and pip://numpy@1.26.0
+are downloaded (and written) once. A query resolved to a package already
+in flight follows it, and is yielded with its outcome.
+"""
+
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from fetcher_py.component import Component
+from fetcher_py.lockfile import LockedPackage
+from fetcher_py.package import Package
+from fetcher_py.plan import Plan
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS = 16
+
+
+@dataclass
+class Result:
+    """
+    Outcome of a single query of a bulk operation.
+
+    Parameters:
+    - query: The package query string, as given.
+    - package: Parsed package (version is filled in once resolved).
+    - component: Component of the package, once resolved.
+    - path: Path of the written archive (download_many only).
+    - error: The error which stopped the query, if any.
+    - locked: The package pinned by a lockfile, if query came from one.
+    - plan: Artifacts which would be downloaded, with their sizes (plan_many only).
+    - depth: Distance from the queries the closure was asked for (closure only).
+    - required_by: Query of the package, which first required this one (closure only).
+    - dependencies: Queries of dependencies of the package (closure only).
+    """
+
+    query: str
+    package: Optional[Package] = None
+    component: Optional[Component] = None
+    path: Optional[str] = None
+    error: Optional[Exception] = None
+    locked: Optional[LockedPackage] = None
+    plan: Optional[Plan] = None
+    depth: Optional[int] = None
+    required_by: Optional[str] = None
+    dependencies: Optional[List[str]] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def unique(queries: Iterable[Union[str, LockedPackage]]) -> Iterator[Result]:
+    """
+    Make results for queries, skipping blank and already seen ones, preserving order.
+    """
+    seen = set()
+    for query in queries:
+        if isinstance(query, LockedPackage):
+            result = Result(query.query, package=query.package, locked=query)
+        else:
+            result = Result(query.strip())
+
+        if result.query and result.query not in seen:
+            seen.add(result.query)
+            yield result
+
+
+def resolved_key(result: Result) -> Optional[Tuple[str, str, str]]:
+    """
+    (ecosystem, name, resolved version) of the result, once it is resolved.
+    """
+    if result.package is None or result.component is None:
+        return None
+    return (result.package.ecosystem, result.package.name, result.component.version)
+
+
+def follow(result: Result, leader: Result):
+    """
+    Fill in outcome of later stages of the result, from the leader resolved
+    to the same package.
+    """
+    result.component = leader.component
+    result.path = leader.path
+    result.plan = leader.plan
+    result.error = leader.error
+
+
+def run(
+    queries: Iterable[Union[str, LockedPackage]],
+    stages: List[Callable[[Result], None]],
+    jobs: int = DEFAULT_JOBS,
+) -> Iterator[Result]:
+    """
+    Run each (unique) query through stages, yielding results as they finish.
+
+    Stages fill in the result, a stage raising an exception ends the query
+    with error, and remaining stages are skipped. Queries are consumed
+    lazily, so queries can be a stream.
+
+    Parameters:
+    - queries: Package query strings, or packages pinned by lockfiles.
+    - stages: Functions applied to the result of each query, in order.
+    - jobs: Number of stage calls run concurrently.
+
+    Returns:
+    - Iterator of Result, in order of completion.
+    """
+    results = unique(queries)
+    window = 2 * jobs
+    # first result of each resolved package, and results following it
+    leaders: Dict[Tuple[str, str, str], Result] = {}
+    followers: Dict[Tuple[str, str, str], List[Result]] = {}
+
+    def finish(result: Result) -> Iterator[Result]:
+        yield result
+        key = resolved_key(result) if leaders else None
+        if key is not None and leaders.get(key) is result:
+            for follower in followers.pop(key, []):
+                follow(follower, result)
+                yield follower
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        in_flight = {}
+
+        def submit(result: Result, stage: int):
+            future = executor.submit(stages[stage], result)
+            in_flight[future] = (result, stage)
+
+        def admit():
+            while len(in_flight) < window:
+                result = next(results, None)
+                if result is None:
+                    return
+                submit(result, 0)
+
+        admit()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                result, stage = in_flight.pop(future)
+                error = future.exception()
+                if error is not None:
+                    logger.debug(f"failed {result.query}: {error}")
+                    result.error = error
+                    yield from finish(result)
+                    continue
+
+                key = resolved_key(result) if stage + 1 < len(stages) else None
+                if stage == 0 and key is not None:
+                    leader = leaders.setdefault(key, result)
+                    if leader is not result:
+                        logger.debug(f"{result.query} resolved to {key}, already seen")
+                        if key in followers:
+                            followers[key].append(result)
+                        else:
+                            follow(result, leader)
+                            yield result
+                        continue
+                    followers[key] = []
+
+                if stage + 1 < len(stages):
+                    submit(result, stage + 1)
+                else:
+                    yield from finish(result)
+            admit()
@@ -0,0 +1,208 @@
+"""Content-addressed, on-disk artifact cache.
+
+Layout of the cache directory:
+
+    <root>/blobs/sha256/<ab>/<abcdef...>   (artifact, named by its sha256)
+    <root>/urls/<sha256 of url>            (sha256 of the artifact for the url)
+    <root>/tmp/                            (staging area for atomic writes)
+
+Blobs are evicted in least recently used order, once the total size of
+the cache grows beyond max_size, down to LOW_WATERMARK of it (so the
+cache is walked once per many stored artifacts, not on every one). Size
+is tracked as artifacts are stored, blobs stored by other processes are
+counted when the cache is walked again.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 10 * 1024 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+# fraction of max_size, the cache is evicted down to
+LOW_WATERMARK = 0.9
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+class ArtifactCache:
+    def __init__(self, root: str, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        Initialize the cache.
+
+        :param root: The directory to store artifacts in.
+        :param max_size: The maximum total size of cached artifacts in bytes.
+        """
+        self.root = os.path.expanduser(root)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # total size of blobs, walked on first put
+        self._size: Optional[int] = None
+
+        for dir in ["blobs", "urls", "tmp"]:
+            os.makedirs(os.path.join(self.root, dir), exist_ok=True)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", "sha256", digest[0:2], digest)
+
+    def _url_path(self, url: str) -> str:
+        return os.path.join(self.root, "urls", _url_key(url))
+
+    def _write_atomic(self, path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
+    def digest_of(self, url: str) -> Optional[str]:
+        """
+        Get sha256 (hex) of the cached artifact for the url, if any.
+        """
+        try:
+            with open(self._url_path(url), "r") as file:
+                return file.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def get_by_digest(self, digest: str) -> Optional[str]:
+        """
+        Get path of the cached artifact by its sha256 (hex), if any.
+
+        Access marks the artifact as recently used.
+        """
+        path = self._blob_path(digest)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+
+        return path
+
+    def get(self, url: str) -> Optional[str]:
+        """
+        Get path of the cached artifact for the url, if any.
+        """
+        digest = self.digest_of(url)
+        if digest is None:
+            return None
+
+        return self.get_by_digest(digest)
+
+    def open(self, url: str):
+        """
+        Open the cached artifact for the url for reading, if any.
+        """
+        path = self.get(url)
+        if path is None:
+            return None
+
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:
+            return None
+
+    def put(self, url: str, file, sha256: Optional[str] = None) -> str:
+        """
+        Store the content of file as the artifact for the url.
+
+        Content is hashed while it is copied to the staging area (unless
+        sha256 is already known), and then atomically renamed to its
+        content address.
+
+        :param url: The URL the artifact was downloaded from.
+        :param file: Binary file object, read from its current position.
+        :param sha256: The sha256 (hex) of the content, if already computed.
+        :return: sha256 (hex) of the artifact.
+        """
+        hasher = hashlib.sha256() if sha256 is None else None
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+                    if hasher is not None:
+                        hasher.update(chunk)
+                    tmp_file.write(chunk)
+
+            digest = sha256 or hasher.hexdigest()
+            blob_path = self._blob_path(digest)
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            with self._lock:
+                stored = os.path.exists(blob_path)
+                os.replace(tmp_path, blob_path)
+                if self._size is not None and not stored:
+                    self._size += os.path.getsize(blob_path)
+        except BaseException:
+            _remove(tmp_path)
+            raise
+
+        self._write_atomic(self._url_path(url), digest.encode())
+        logger.debug(f"cached {url} as sha256:{digest}")
+
+        if self.size() > self.max_size:
+            self.evict()
+        return digest
+
+    def _blobs(self) -> List[Tuple[float, int, str]]:
+        blobs = []
+        for root, _, files in os.walk(os.path.join(self.root, "blobs")):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                blobs.append((stat.st_mtime, stat.st_size, path))
+        return blobs
+
+    def size(self) -> int:
+        """
+        Total size of cached artifacts in bytes (walks the cache once).
+        """
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._blobs())
+            return self._size
+
+    def evict(self):
+        """
+        Remove least recently used artifacts, until cache is within
+        LOW_WATERMARK of max_size, and urls of removed artifacts.
+        """
+        with self._lock:
+            blobs = self._blobs()
+            total_size = sum(size for _, size, _ in blobs)
+            target = self.max_size * LOW_WATERMARK
+            for _, size, path in sorted(blobs):
+                if total_size <= target:
+                    break
+
+                _remove(path)
+                total_size -= size
+                logger.debug(f"evicted {path} from cache")
+            self._size = total_size
+
+            urls_dir = os.path.join(self.root, "urls")
+            for name in os.listdir(urls_dir):
+                path = os.path.join(urls_dir, name)
+                try:
+                    with open(path, "r") as file:
+                        digest = file.read().strip()
+                except FileNotFoundError:
+                    continue
+                if not os.path.exists(self._blob_path(digest)):
+                    _remove(path)
@@ -1,12 +1,27 @@
-import dataclasses
+import functools
+import itertools
 import logging
+import os
 import click
 import requests
+from fetcher_py import archive, lockfile
+from fetcher_py.budget import ByteBudget, format_size, parse_size
+from fetcher_py.bulk import DEFAULT_JOBS
+from fetcher_py.cache import ArtifactCache
+from fetcher_py.compression import DEFAULT_LEVEL, CompressionPolicy
+from fetcher_py.httpcache import HttpCache
 from fetcher_py.fetcher import (
     Fetcher,
 )
+from fetcher_py.metrics import Metrics
+from fetcher_py.options import Options
+from fetcher_py.plan import Totals, summarize
+from fetcher_py.ratelimit import RateLimiter
+from fetcher_py.selection import Selection
+from fetcher_py.serialize import component_to_json, parse_fields, result_to_json
+from fetcher_py.server import DEFAULT_PORT, make_server
+from fetcher_py.store import ComponentStore
 from click_help_colors import HelpColorsGroup
-import json
 
 logging.basicConfig(
     format="[%(levelname)-8s] %(message)s",
@@ -14,10 +29,149 @@ logging.basicConfig(
 )
 
 
+def size_option(ctx, param, value):
+    if value is None:
+        return None
+
+    try:
+        return parse_size(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from None
+
+
+def fields_option(ctx, param, value):
+    try:
+        return parse_fields(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from None
+
+
+SELECTION_OPTIONS = [
+    click.option(
+        "--kind",
+        "kinds",
+        multiple=True,
+        help="Only download artifacts of this kind, e.g. sdist, bdist_wheel, src (repeatable).",
+    ),
+    click.option(
+        "--python-tag",
+        "python_tags",
+        multiple=True,
+        help="Only download wheels for this python, e.g. cp311 (repeatable).",
+    ),
+    click.option(
+        "--platform",
+        "platforms",
+        multiple=True,
+        help="Only download wheels for this platform, e.g. manylinux_x86_64 (repeatable, accepts globs).",
+    ),
+    click.option(
+        "--max-artifact-size",
+        callback=size_option,
+        help="Refuse artifacts larger than this, e.g. 500M (unlimited by default).",
+    ),
+    click.option(
+        "--max-total-size",
+        callback=size_option,
+        help="Stop once this many bytes were downloaded in total, e.g. 10G (unlimited by default).",
+    ),
+]
+
+
+def selection_options(f):
+    """
+    Add options selecting artifacts (--kind, --python-tag, --platform), and
+    limiting their size (--max-artifact-size, --max-total-size).
+    """
+    for option in reversed(SELECTION_OPTIONS):
+        f = option(f)
+    return f
+
+
+def selects_artifacts(f):
+    """
+    Accept selection options after a command too, adding to (or replacing
+    sizes of) those given before it, e.g. download pip://numpy --kind sdist.
+    """
+
+    @functools.wraps(f)
+    def command(
+        options,
+        *args,
+        kinds,
+        python_tags,
+        platforms,
+        max_artifact_size,
+        max_total_size,
+        **kwargs,
+    ):
+        if kinds or python_tags or platforms:
+            selection = options.selection
+            options.selection = Selection(
+                selection.kinds | set(kinds),
+                selection.python_tags | set(python_tags),
+                selection.platforms | set(platforms),
+            )
+        if max_artifact_size is not None or max_total_size is not None:
+            budget = options.budget or ByteBudget()
+            options.budget = ByteBudget(
+                budget.max_artifact_size
+                if max_artifact_size is None
+                else max_artifact_size,
+                budget.max_total_size if max_total_size is None else max_total_size,
+            )
+        return f(options, *args, **kwargs)
+
+    return selection_options(command)
+
+
 @click.group(
     cls=HelpColorsGroup, help_headers_color="yellow", help_options_color="green"
 )
-def cli():
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    envvar="FETCHER_PY_CACHE_DIR",
+    help="Directory for artifact, metadata, and component caches (disabled by default).",
+)
+@click.option(
+    "--rate-limit",
+    type=click.FloatRange(min=0, min_open=True),
+    envvar="FETCHER_PY_RATE_LIMIT",
+    help="Maximum requests per second to each host (by default, only hosts with published limits are limited).",
+)
+@click.option(
+    "--compress-level",
+    type=click.IntRange(0, 9),
+    default=DEFAULT_LEVEL,
+    show_default=True,
+    help="Deflate level of output archives, already compressed artifacts are always stored (0 stores everything).",
+)
+@selection_options
+@click.option(
+    "--metrics-file",
+    type=click.Path(dir_okay=False),
+    help="Write metrics in Prometheus text format to this file on exit (e.g. for node_exporter's textfile collector).",
+)
+@click.option(
+    "--metrics-port",
+    type=click.IntRange(0, 65535),
+    help="Serve metrics in Prometheus text format on this local port, while running.",
+)
+@click.pass_context
+def cli(
+    ctx,
+    cache_dir,
+    rate_limit,
+    compress_level,
+    kinds,
+    python_tags,
+    platforms,
+    max_artifact_size,
+    max_total_size,
+    metrics_file,
+    metrics_port,
+):
     """
     Command-line tool for fetching and inspecting package
     artifacts.
@@ -61,8 +215,50 @@ def cli():
         # --------
         >> download pip://numpy@1.0.0 > artifacts.zip
         >> download pip://numpy@1.0.0 -o some/path/where/to/write/artifacts.zip
+        #
+        # many packages (one json line per package)
+        # -----------------------------------------
+        >> batch queries.txt --jobs 32 --out-dir artifacts/
+        #
+        # reuse artifacts and metadata downloaded before
+        # ----------------------------------------------
+        >> --cache-dir ~/.cache/fetcher-py download pip://numpy@1.0.0 > artifacts.zip
+        #
+        # stay within registry limits in bulk jobs
+        # ----------------------------------------
+        >> --rate-limit 5 download gem://coulda@0.7.1 > artifacts.zip
+        #
+        # sizes of artifacts, without downloading them
+        # --------------------------------------------
+        >> --max-artifact-size 100M plan queries.txt
+        #
+        # time spent per registry, and phase
+        # ----------------------------------
+        >> --metrics-file fetcher.prom batch queries.txt --out-dir artifacts/
+        #
+        # keep registries, and caches warm between requests
+        # -------------------------------------------------
+        >> --cache-dir ~/.cache/fetcher-py serve --port 8765
     """
-    pass
+    ctx.obj = Options(
+        compression=CompressionPolicy(compress_level),
+        selection=Selection(kinds, python_tags, platforms),
+    )
+    if cache_dir:
+        ctx.obj.cache = ArtifactCache(cache_dir)
+        ctx.obj.http_cache = HttpCache(os.path.join(cache_dir, "http"))
+        ctx.obj.store = ComponentStore(os.path.join(cache_dir, "components.db"))
+    if rate_limit:
+        ctx.obj.rate_limiter = RateLimiter(default_rate=rate_limit)
+    if max_artifact_size is not None or max_total_size is not None:
+        ctx.obj.budget = ByteBudget(max_artifact_size, max_total_size)
+    if metrics_file or metrics_port is not None:
+        ctx.obj.metrics = Metrics()
+    if metrics_port is not None:
+        server = ctx.obj.metrics.serve(metrics_port)
+        ctx.call_on_close(server.shutdown)
+    if metrics_file:
+        ctx.call_on_close(lambda: ctx.obj.metrics.write_textfile(metrics_file))
 
 
 @cli.command()
@@ -70,7 +266,9 @@ def cli():
 @click.option(
     "--out", "-o", type=click.Path(), help="Output file path for downloaded package."
 )
-def download(package_query, out):
+@click.pass_obj
+@selects_artifacts
+def download(options, package_query, out):
     """Download a package based on the provided query.
 
     \b
@@ -80,14 +278,15 @@ def download(package_query, out):
     is also created, which has
         .
         - ./metadata/component.json (raw component metadata)
-        - ./metadata/urls.txt (url used to download)
+        - ./metadata/urls.txt (url used to download, and sha256 digest of artifact)
 
     \b
-    Note that, it retrieves all artifacts, regardless of host
-    machine's os/arch etc. For example, 'numpy' package may have
-    had artifact for say, for linux, macOs, windows (and respective
+    Note that, by default, it retrieves all artifacts, regardless
+    of host machine's os/arch etc. For example, 'numpy' package may
+    have had artifact for say, for linux, macOs, windows (and respective
     python versions). We will fetch all artifact regardless of
-    compatibility.
+    compatibility, unless artifacts are selected with --kind,
+    --python-tag, and --platform options.
 
     \b
     Examples:
@@ -98,6 +297,8 @@ def download(package_query, out):
       .
       >> fetcher download pip://numpy@1.0.0 --o artifact.zip
       .
+      >> fetcher download pip://numpy@1.26.0 --python-tag cp311 --platform manylinux_x86_64 > artifact.zip
+      .
       # >> unzip -l artifact.zip
       #
       #  Archive:  artifact.zip
@@ -109,10 +310,10 @@ def download(package_query, out):
       #  ---------                     -------
       #  1905854                       3 files
     """
-    fetcher = Fetcher(requests.session())
+    fetcher = Fetcher(requests.session(), options)
     if not out:
         stream = fetcher.download_raw(package_query)
-        click.echo(stream.getvalue(), nl=False)
+        archive.copy_to(stream, click.get_binary_stream("stdout"))
     else:
         fetcher.download(package_query, out)
         click.echo(f"wrote file to {out}")
@@ -120,7 +321,13 @@ def download(package_query, out):
 
 @cli.command()
 @click.argument("package_query", metavar="PACKAGE_QUERY")
-def get(package_query):
+@click.option(
+    "--fields",
+    callback=fields_option,
+    help="Comma separated fields of components to write (e.g. name,version,declared_licenses), all by default.",
+)
+@click.pass_obj
+def get(options, package_query, fields):
     """Get information about a package based on the provided query.
 
     \b
@@ -148,12 +355,321 @@ def get(package_query):
       # you can pipe stdout to other tools
       >> fetcher get pip://numpy@1.0.0 | jq
       >> fetcher get pip://numpy@1.0.0 > out_component.txt
+
+    \b
+      # only some fields
+      >> fetcher get pip://numpy@1.0.0 --fields name,version,declared_licenses
     """
 
-    fetcher = Fetcher(requests.session())
+    fetcher = Fetcher(requests.session(), options)
     comp = fetcher.get(package_query)
-    json_str = json.dumps(dataclasses.asdict(comp))
-    click.echo(f"{json_str}")
+    click.echo(component_to_json(comp, fields))
+
+
+@cli.command()
+@click.argument("queries", type=click.File("r"), default="-")
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=DEFAULT_JOBS,
+    show_default=True,
+    help="Number of packages processed concurrently.",
+)
+@click.option(
+    "--out-dir",
+    "-o",
+    type=click.Path(file_okay=False),
+    help="Directory to write artifacts of each package to (metadata only, if not set).",
+)
+@click.option(
+    "--lockfile",
+    "-l",
+    "lockfiles",
+    multiple=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Lockfile to read pinned packages from, instead of QUERIES (repeatable).",
+)
+@click.option(
+    "--fields",
+    callback=fields_option,
+    help="Comma separated fields of components to write (e.g. name,version,declared_licenses), all by default.",
+)
+@click.pass_obj
+@selects_artifacts
+def batch(options, queries, jobs, out_dir, lockfiles, fields):
+    """Get (or download) many packages, listed one query per line.
+
+    \b
+    Queries are read from QUERIES file (or stdin), blank lines
+    are skipped, and duplicates are processed once. One json
+    line is written to stdout per query, as soon as it finishes
+    (in order of completion, not input):
+        .
+        {"query": ..., "ok": true, "path": ..., "error": null, "component": {...}}
+
+    \b
+    With --out-dir, artifacts of each package are zipped to
+    <out-dir>/<ecosystem>/<name>@<version>.zip (as with download).
+    Exit code is 1, if any query failed.
+
+    \b
+    With --lockfile, pinned packages are read from lockfiles
+    (requirements.txt, poetry.lock, package-lock.json, Cargo.lock,
+    Gemfile.lock, composer.lock, packages.lock.json). Artifacts
+    recorded by the lockfile are downloaded directly, without
+    asking the registry for metadata.
+
+    \b
+    Examples:
+    ---------
+
+    \b
+      >> fetcher batch queries.txt --jobs 32
+      >> cat queries.txt | fetcher batch --out-dir artifacts/
+      >> fetcher batch queries.txt | jq -c 'select(.ok | not)'
+      >> fetcher batch queries.txt --fields name,version,declared_licenses
+      >> fetcher batch -l Cargo.lock -l package-lock.json --out-dir artifacts/
+    """
+    if lockfiles:
+        queries = itertools.chain.from_iterable(map(lockfile.read, lockfiles))
+
+    fetcher = Fetcher(requests.session(), options)
+    if out_dir:
+        results = fetcher.download_many(queries, out_dir, jobs)
+    else:
+        results = fetcher.get_many(queries, jobs)
+
+    failed = 0
+    for result in results:
+        failed += 0 if result.ok else 1
+        click.echo(result_to_json(result, fields))
+
+    if failed:
+        logging.error(f"{failed} queries failed")
+        raise SystemExit(1)
+
+
+@cli.command()
+@click.argument("package_queries", nargs=-1, required=True)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=DEFAULT_JOBS,
+    show_default=True,
+    help="Number of packages processed concurrently.",
+)
+@click.option(
+    "--out-dir",
+    "-o",
+    type=click.Path(file_okay=False),
+    help="Directory to write artifacts of each package to (metadata only, if not set).",
+)
+@click.option(
+    "--depth",
+    type=click.IntRange(min=0),
+    default=None,
+    help="Maximum depth of dependencies (unlimited, if not set).",
+)
+@click.option(
+    "--fields",
+    callback=fields_option,
+    help="Comma separated fields of components to write (e.g. name,version,declared_licenses), all by default.",
+)
+@click.pass_obj
+@selects_artifacts
+def closure(options, package_queries, jobs, out_dir, depth, fields):
+    """Get (or download) packages, and their transitive dependencies.
+
+    \b
+    Dependencies declared in metadata of each package are
+    resolved concurrently, breadth first. Each version range
+    is resolved once, and each resolved version is written
+    (and downloaded) once. One json line is written to stdout
+    per package, as soon as it finishes:
+        .
+        {"query": ..., "ok": true, "path": ..., "error": null, "depth": 1,
+         "required_by": ..., "dependencies": [...], "component": {...}}
+
+    \b
+    Only runtime dependencies, in the same ecosystem, are
+    followed (environment markers of pypi are not evaluated,
+    dependencies of every platform are included). Exit code
+    is 1, if any package failed.
+
+    \b
+    Examples:
+    ---------
+
+    \b
+      >> fetcher closure npm://express@4.18.2
+      >> fetcher closure pip://requests --depth 1
+      >> fetcher closure cargo://serde_json --out-dir artifacts/ --jobs 32
+    """
+    fetcher = Fetcher(requests.session(), options)
+    results = fetcher.closure(package_queries, jobs, depth, out_dir)
+
+    failed = 0
+    for result in results:
+        failed += 0 if result.ok else 1
+        click.echo(result_to_json(result, fields))
+
+    if failed:
+        logging.error(f"{failed} packages failed")
+        raise SystemExit(1)
+
+
+def totals_line(label: str, totals: Totals) -> str:
+    unknown = f", {totals.unknown} of unknown size" if totals.unknown else ""
+    rejected = f", {totals.rejected} rejected" if totals.rejected else ""
+    return (
+        f"{label}: {totals.packages} packages, {totals.artifacts} artifacts, "
+        f"{format_size(totals.size)}{unknown}{rejected}"
+    )
+
+
+@cli.command()
+@click.argument("queries", type=click.File("r"), default="-")
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=DEFAULT_JOBS,
+    show_default=True,
+    help="Number of packages planned concurrently.",
+)
+@click.option(
+    "--lockfile",
+    "-l",
+    "lockfiles",
+    multiple=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Lockfile to read pinned packages from, instead of QUERIES (repeatable).",
+)
+@click.pass_obj
+@selects_artifacts
+def plan(options, queries, jobs, lockfiles):
+    """Show artifacts, and their sizes, a batch download would fetch.
+
+    \b
+    Nothing is downloaded: packages are resolved, and sizes are
+    taken from registry metadata (or Content-Length of a HEAD
+    request). One line is written per package, followed by
+    totals per ecosystem, and overall. Artifacts above
+    --max-artifact-size are listed as rejected.
+
+    \b
+    Examples:
+    ---------
+
+    \b
+      >> fetcher plan queries.txt
+      >> fetcher plan -l poetry.lock --kind sdist
+      >> fetcher --max-artifact-size 50M --max-total-size 2G plan queries.txt
+    """
+    if lockfiles:
+        queries = itertools.chain.from_iterable(map(lockfile.read, lockfiles))
+
+    fetcher = Fetcher(requests.session(), options)
+    plans, failed = [], 0
+    for result in fetcher.plan_many(queries, jobs):
+        if not result.ok:
+            failed += 1
+            click.echo(f"{result.query}: {type(result.error).__name__}: {result.error}")
+            continue
+
+        plans.append(result.plan)
+        artifacts = [a for a in result.plan.artifacts if a.rejected is None]
+        unknown = (
+            f" ({result.plan.unknown} of unknown size)" if result.plan.unknown else ""
+        )
+        click.echo(
+            f"{result.query}: {len(artifacts)} artifacts, "
+            f"{format_size(result.plan.size)}{unknown}"
+        )
+        for artifact in result.plan.artifacts:
+            if artifact.rejected is not None:
+                click.echo(f"  rejected {artifact.kind} {artifact.rejected}")
+
+    overall = Totals()
+    for ecosystem, totals in sorted(summarize(plans).items()):
+        click.echo(totals_line(ecosystem, totals))
+    for result_plan in plans:
+        overall.add(result_plan)
+    click.echo(totals_line("total", overall))
+
+    budget = options.budget
+    if budget is not None and budget.max_total_size is not None:
+        if overall.size > budget.max_total_size:
+            logging.warning(
+                f"planned {format_size(overall.size)} is above max total size of "
+                f"{format_size(budget.max_total_size)}"
+            )
+
+    if failed:
+        logging.error(f"{failed} queries failed")
+        raise SystemExit(1)
+
+
+@cli.command()
+@click.option(
+    "--host",
+    default="127.0.0.1",
+    show_default=True,
+    help="Address to listen on.",
+)
+@click.option(
+    "--port",
+    type=click.IntRange(0, 65535),
+    default=DEFAULT_PORT,
+    show_default=True,
+    help="Port to listen on.",
+)
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False),
+    help="Unix socket to listen on, instead of --host and --port.",
+)
+@click.pass_obj
+def serve(options, host, port, socket_path):
+    """Serve get, and download over a local HTTP API, until interrupted.
+
+    \b
+    Registries, connection pools, resolved versions, and caches
+    are kept warm between requests. Concurrent requests of the
+    same package (after its version is resolved) share a single
+    upstream fetch.
+
+    \b
+    Endpoints:
+    ----------
+        GET /get?query=<query>[&fields=name,version]
+        GET /download?query=<query>
+        GET /healthz
+        GET /metrics (with --metrics-file, or --metrics-port)
+
+    \b
+    Examples:
+    ---------
+
+    \b
+      >> fetcher --cache-dir ~/.cache/fetcher-py serve --port 8765
+      >> fetcher serve --socket /tmp/fetcher.sock
+      >> curl 'localhost:8765/get?query=pip://numpy@1.0.0'
+      >> curl 'localhost:8765/download?query=npm://express' > artifacts.zip
+    """
+    fetcher = Fetcher(requests.session(), options)
+    server = make_server(fetcher, host, port, socket_path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None and os.path.exists(socket_path):
+            os.remove(socket_path)
 
 
 if __name__ == "__main__":
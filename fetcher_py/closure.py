@@ -0,0 +1,130 @@
+"""Transitive dependency closure of packages.
+
+The dependency graph is expanded breadth first, on one thread pool:
+dependencies of a package are queued as soon as it is resolved, and
+resolved by the next free worker, while other packages of the same
+depth are still in flight.
+
+Dependencies are deduplicated twice. By query (ecosystem, name, and
+version range), before they are resolved, so a range required by many
+packages is resolved once. And by (ecosystem, name, resolved version)
+after, so a version required through different ranges is expanded (and
+downloaded) once.
+"""
+
+import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from fetcher_py.bulk import DEFAULT_JOBS, Result, follow, resolved_key
+
+logger = logging.getLogger(__name__)
+
+
+def run(
+    queries: Iterable[str],
+    stages: List[Callable[[Result], None]],
+    jobs: int = DEFAULT_JOBS,
+    max_depth: Optional[int] = None,
+) -> Iterator[Result]:
+    """
+    Run queries, and their transitive dependencies through stages, yielding
+    results as they finish.
+
+    The first stage resolves the package, filling in package, component,
+    and dependencies (queries) of the result. Remaining stages (e.g.
+    download) run once per unique resolved package, other queries (and
+    dependency edges) resolved to it are yielded with its outcome once it
+    finishes. A failed package is yielded with its error, and its
+    dependencies are not expanded.
+
+    Parameters:
+    - queries: Package query strings, the roots of the closure.
+    - stages: Functions applied to the result of each package, in order.
+    - jobs: Number of stage calls run concurrently.
+    - max_depth: Maximum depth of dependencies expanded (default is unlimited,
+      0 expands none).
+
+    Returns:
+    - Iterator of Result (with depth, and required_by), in order of completion.
+    """
+    requested: Set[str] = set()
+    # first result of each resolved package, and results waiting for it
+    leaders: Dict[Tuple[str, str, str], Result] = {}
+    followers: Dict[Tuple[str, str, str], List[Result]] = {}
+    pending: Deque[Result] = deque()
+    window = 2 * jobs
+
+    def enqueue(query: str, depth: int, required_by: Optional[str]):
+        if query and query not in requested:
+            requested.add(query)
+            pending.append(Result(query, depth=depth, required_by=required_by))
+
+    for query in queries:
+        enqueue(query.strip(), 0, None)
+
+    def finish(result: Result) -> Iterator[Result]:
+        yield result
+        key = resolved_key(result)
+        if key is not None and leaders.get(key) is result:
+            for follower in followers.pop(key, []):
+                follow(follower, result)
+                yield follower
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        in_flight = {}
+
+        def submit(result: Result, stage: int):
+            future = executor.submit(stages[stage], result)
+            in_flight[future] = (result, stage)
+
+        def admit():
+            while pending and len(in_flight) < window:
+                submit(pending.popleft(), 0)
+
+        admit()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                result, stage = in_flight.pop(future)
+                error = future.exception()
+                if error is not None:
+                    logger.debug(f"failed {result.query}: {error}")
+                    result.error = error
+                    yield from finish(result)
+                    continue
+
+                if stage == 0:
+                    key = resolved_key(result)
+                    leader = leaders.setdefault(key, result)
+                    if leader is not result:
+                        # yielded with the outcome of the leader, not expanded again
+                        logger.debug(f"{result.query} resolved to {key}, already seen")
+                        if key in followers:
+                            followers[key].append(result)
+                        else:
+                            follow(result, leader)
+                            yield result
+                        continue
+                    followers[key] = []
+
+                    if max_depth is None or result.depth < max_depth:
+                        for dependency in result.dependencies or []:
+                            enqueue(dependency, result.depth + 1, result.query)
+
+                if stage + 1 < len(stages):
+                    submit(result, stage + 1)
+                else:
+                    yield from finish(result)
+            admit()
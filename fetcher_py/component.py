@@ -1,13 +1,182 @@
+import json
+import zlib
 from typing import Any, Dict, List, Optional
-from dataclasses import dataclass
+from dataclasses import InitVar, dataclass
 
+# how raw metadata of components returned by Fetcher is kept (Options.component_raw)
+RAW_LAZY = "lazy"
+RAW_COMPRESSED = "compressed"
+RAW_LEAN = "lean"
+RAW_MODES = (RAW_LAZY, RAW_COMPRESSED, RAW_LEAN)
 
-@dataclass
+FIELDS = (
+    "name",
+    "version",
+    "registry_url",
+    "homepage_url",
+    "description",
+    "declared_licenses",
+)
+
+# raw is held as encoded bytes, until it is accessed
+_UNDECODED = object()
+
+
+@dataclass(eq=False, repr=False)
 class Component:
+    """
+    Metadata of a package, as published by its registry.
+
+    Parameters:
+    - name: Name of the package.
+    - version: Version of the package.
+    - registry_url: Base url of the registry.
+    - homepage_url: Homepage of the package, if any.
+    - description: Description of the package, if any.
+    - declared_licenses: Licenses declared by the package, if any.
+    - raw: Registry document of the package, decoded (e.g. a dict), or as
+      JSON bytes of the response, which are decoded on first access.
+    - compressed: Whether raw bytes are zlib compressed.
+    """
+
+    __slots__ = FIELDS + ("_raw", "_encoded", "_compressed")
+
     name: str
     version: str
     registry_url: str
     homepage_url: Optional[str]
     description: Optional[str]
     declared_licenses: List[str]
-    raw: Dict[str, Any]
+    raw: Any
+    compressed: InitVar[bool] = False
+
+    def __post_init__(self, compressed: bool):
+        if isinstance(self._raw, (bytes, bytearray)):
+            self._encoded = bytes(self._raw)
+            self._raw = _UNDECODED
+            self._compressed = compressed
+
+    def _get_raw(self) -> Any:
+        # encoded bytes are read first, and dropped after raw is set, so
+        # threads sharing the component always see one of them
+        encoded = self._encoded
+        raw = self._raw
+        if raw is _UNDECODED:
+            if self._compressed:
+                encoded = zlib.decompress(encoded)
+            raw = self._raw = json.loads(encoded)
+            # keep one copy, decoded
+            self._encoded = None
+        return raw
+
+    def _set_raw(self, value: Any):
+        self._raw = value
+        self._encoded = None
+        self._compressed = False
+
+    @property
+    def is_lean(self) -> bool:
+        return self._raw is None
+
+    @property
+    def encoded_raw(self) -> Optional[bytes]:
+        """
+        JSON bytes of raw, while it is not decoded (None once it is).
+        """
+        encoded = self._encoded
+        if self._raw is not _UNDECODED:
+            return None
+        if self._compressed:
+            return zlib.decompress(encoded)
+        return encoded
+
+    def raw_bytes(self) -> bytes:
+        """
+        JSON bytes of raw, without decoding it, when it was not accessed yet.
+        """
+        encoded = self.encoded_raw
+        if encoded is not None:
+            return encoded
+        return json.dumps(self._raw).encode()
+
+    def compact(self, compress: bool = True):
+        """
+        Keep raw as (compressed) JSON bytes, until it is accessed again.
+        """
+        if self._raw is None or (self._raw is _UNDECODED and not compress):
+            return
+        if self._raw is _UNDECODED and self._compressed:
+            return
+
+        encoded = self.raw_bytes()
+        self._raw = _UNDECODED
+        self._encoded = zlib.compress(encoded) if compress else encoded
+        self._compressed = compress
+
+    def lean(self):
+        """
+        Drop raw, keeping only typed fields (registries can not list, or
+        download artifacts of a lean component).
+        """
+        self.raw = None
+
+    def shrink(self, mode: str):
+        """
+        Apply one of RAW_MODES to raw.
+        """
+        if mode == RAW_COMPRESSED:
+            self.compact()
+        elif mode == RAW_LEAN:
+            self.lean()
+        elif mode != RAW_LAZY:
+            raise ValueError(f"unknown raw mode {mode}, expected one of {RAW_MODES}")
+
+    def to_dict(self, raw: bool = True) -> Dict[str, Any]:
+        """
+        Fields of the component, as a dict (with raw decoded, if raw).
+        """
+        data = {field: getattr(self, field) for field in FIELDS}
+        if raw:
+            data["raw"] = self.raw
+        return data
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in FIELDS)
+        if self._raw is _UNDECODED:
+            compressed = ", compressed" if self._compressed else ""
+            raw = f"<{len(self._encoded)} bytes{compressed}>"
+        else:
+            raw = repr(self._raw)
+        return f"Component({fields}, raw={raw})"
+
+
+# set once the dataclass is made, so raw stays a field (decoded by asdict,
+# and replace), and is decoded on access
+Component.raw = property(Component._get_raw, Component._set_raw)
+
+
+@dataclass
+class Dependency:
+    """
+    Dependency of a package, as declared in its metadata.
+
+    Parameters:
+    - name: Name of the dependency, in the same ecosystem.
+    - version: Version range, in the syntax of the ecosystem (None is any
+      version, which resolves to the latest one).
+    """
+
+    name: str
+    version: Optional[str] = None
+
+    def query(self, ecosystem: str) -> str:
+        if self.version is None:
+            return f"{ecosystem}://{self.name}"
+        return f"{ecosystem}://{self.name}@{self.version}"
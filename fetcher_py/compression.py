@@ -0,0 +1,122 @@
+"""Compression policy for output archives.
+
+Most artifacts (.tar.gz, .whl, .crate, .nupkg, OCI layers, ...) are
+already compressed, deflating them again burns CPU for (next to) no gain,
+so they are stored as is. Everything else (e.g. git source trees, and
+metadata) is deflated.
+
+Artifacts are recognized by their file name suffix, or by the magic bytes
+of their content, for artifacts named without suffix (e.g. OCI blobs,
+named by their digest).
+"""
+
+import zlib
+from typing import Iterable, Optional
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+DEFAULT_LEVEL = 6
+
+STORED_SUFFIXES = (
+    ".gz",
+    ".tgz",
+    ".bz2",
+    ".xz",
+    ".zst",
+    ".zip",
+    ".7z",
+    ".whl",
+    ".egg",
+    ".crate",
+    ".nupkg",
+    ".gem",
+    ".jar",
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+)
+
+MAGIC_NUMBERS = (
+    b"\x1f\x8b",  # gzip
+    b"PK\x03\x04",  # zip (wheel, jar, nupkg, ...)
+    b"\x28\xb5\x2f\xfd",  # zstd
+    b"\xfd7zXZ\x00",  # xz
+    b"BZh",  # bzip2
+    b"7z\xbc\xaf\x27\x1c",  # 7z
+    b"\x89PNG",
+    b"\xff\xd8\xff",  # jpeg
+)
+
+# number of bytes needed to recognize any of MAGIC_NUMBERS
+MAGIC_SIZE = max(len(magic) for magic in MAGIC_NUMBERS)
+
+
+class CompressionPolicy:
+    def __init__(
+        self,
+        level: int = DEFAULT_LEVEL,
+        stored_suffixes: Iterable[str] = STORED_SUFFIXES,
+    ):
+        """
+        Initialize the policy.
+
+        :param level: Deflate level (1 is fastest, 9 is smallest), 0 stores
+                      every entry without compression.
+        :param stored_suffixes: Suffixes of file names to store without compression.
+        """
+        if not 0 <= level <= zlib.Z_BEST_COMPRESSION:
+            raise ValueError(f"compression level must be within 0 and 9, got {level}")
+
+        self.level = level
+        self.stored_suffixes = tuple(suffix.lower() for suffix in stored_suffixes)
+
+    def is_compressed(self, name: str, head: bytes = b"") -> bool:
+        """
+        Whether content is already compressed, by its name, or its first bytes.
+        """
+        return name.lower().endswith(self.stored_suffixes) or head.startswith(
+            MAGIC_NUMBERS
+        )
+
+    def compress_type(self, name: str, head: bytes = b"") -> int:
+        """
+        Compression method for an entry.
+
+        :param name: The name of the entry within the zip file.
+        :param head: First MAGIC_SIZE bytes of the content (if known).
+        :return: ZIP_STORED, or ZIP_DEFLATED.
+        """
+        if self.level == 0 or self.is_compressed(name, head):
+            return ZIP_STORED
+        return ZIP_DEFLATED
+
+    def compress_level(self, compress_type: int) -> Optional[int]:
+        return self.level if compress_type == ZIP_DEFLATED else None
+
+    def writestr(self, zip_file: ZipFile, name: str, data):
+        """
+        Write data as an entry of the zip file, per policy.
+        """
+        head = data[:MAGIC_SIZE] if isinstance(data, bytes) else b""
+        compress_type = self.compress_type(name, head)
+        zip_file.writestr(
+            name,
+            data,
+            compress_type=compress_type,
+            compresslevel=self.compress_level(compress_type),
+        )
+
+    def write(self, zip_file: ZipFile, path: str, arcname: str):
+        """
+        Write file at path as an entry of the zip file, per policy.
+        """
+        with open(path, "rb") as file:
+            head = file.read(MAGIC_SIZE)
+
+        compress_type = self.compress_type(arcname, head)
+        zip_file.write(
+            path,
+            arcname=arcname,
+            compress_type=compress_type,
+            compresslevel=self.compress_level(compress_type),
+        )
@@ -1,111 +1,484 @@
+import asyncio
 import json
+import shutil
+import tempfile
+import time
 import requests
 import io
-from zipfile import ZipFile
-from concurrent.futures import ThreadPoolExecutor
+from zipfile import ZIP_STORED, ZipFile, ZipInfo
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
+from typing import Optional
+from fetcher_py.archive import SpooledArchive
+from fetcher_py.compression import MAGIC_SIZE
+from fetcher_py.hooks import Span, trace
+from fetcher_py.integrity import DigestHasher, IntegrityError, parse_digest
+from fetcher_py.metrics import current_registry, timed
+from fetcher_py.options import Options
+from fetcher_py.plan import head_size
+from fetcher_py.segmented import SegmentedDownload, probe
 
 logger = logging.getLogger(__name__)
 
 METADATA_DIR = ".metadata"
+CHUNK_SIZE = 1024 * 1024
 
 
-def serialize_sets(obj):
-    if isinstance(obj, set):
-        return list(obj)
+def mk_zip_info(
+    name, file_size, compress_type=ZIP_STORED, compress_level=None
+) -> ZipInfo:
+    """
+    Make a ZipInfo for an entry of known size.
+
+    Setting file_size upfront lets ZipFile pick Zip64 headers for
+    entries larger than 4GB when writing them in streaming fashion.
+
+    :param name: The name of the entry within the zip file.
+    :param file_size: The uncompressed size of the entry in bytes.
+    :param compress_type: The compression method of the entry.
+    :param compress_level: The compression level (default is method's default).
+    :return: ZipInfo for the entry.
+    """
+    zip_info = ZipInfo(name, date_time=time.localtime(time.time())[:6])
+    zip_info.external_attr = 0o600 << 16
+    zip_info.file_size = file_size
+    zip_info.compress_type = compress_type
+    zip_info._compresslevel = compress_level
+    return zip_info
 
 
 class Downloader:
-    def __init__(self):
+    def __init__(
+        self,
+        options: Optional[Options] = None,
+        session: Optional[requests.Session] = None,
+    ):
+        """
+        Initialize the Downloader.
+
+        :param options: Options shared with Fetcher, and registries.
+        :param session: The session to download with (default is a new session),
+                        registries pass their own, so connections are reused.
+        """
+        self.options = options or Options()
         self.download_list = {}
+        self.digests = {}
+        self.sizes = {}
+        self.max_sizes = {}
+        self.verified = {}
         self.metadatas = {}
-        self.session = requests.Session()
+        self.skipped = []
+        self.session = session or requests.Session()
+        # label of metrics, downloads run on other threads
+        self.registry = current_registry()
 
-    def add(self, key, url):
+    def add(
+        self,
+        key,
+        url,
+        digest: Optional[str] = None,
+        size: Optional[int] = None,
+        max_size: Optional[int] = None,
+    ):
         """
         Add a file to the download list.
 
+        Files not accepted by Options.selection are not added (they are
+        recorded in skipped instead).
+
         :param key: The key to use as the folder name in the zip file.
         :param url: The URL of the file to download.
+        :param digest: The digest published by the registry ('<algorithm>:<hex>'), if any.
+        :param size: The size in bytes published by the registry, if any.
+        :param max_size: An upper bound of the size published by the registry, if any
+                         (e.g. unpacked size), only checked against the artifact budget.
         """
         if key == METADATA_DIR:
             raise ValueError(f"cannot have {METADATA_DIR} key for URL!")
 
+        selection = self.options.selection
+        if selection and not selection.accepts(key, url):
+            self.skipped.append(url)
+            logger.debug(f"skipped url={url} under key={key}, it is not selected")
+            return
+
         if key not in self.download_list:
             self.download_list[key] = set()
 
         self.download_list[key].add(url)
+        if digest is not None:
+            self.digests[url] = digest
+        if size is not None:
+            self.sizes[url] = size
+        if max_size is not None:
+            self.max_sizes[url] = max_size
 
         logger.debug(f"added url={url} under key={key}")
 
     def add_metadata(self, name: str, value: str):
         self.metadatas[name] = value
 
+    def _open_cached(self, url):
+        """
+        Open the cached artifact for the url, if any.
+
+        Only artifacts with a digest published by the registry are cached,
+        others may change behind the same url. They are looked up by
+        expected sha256, and by url for other algorithms (and verified
+        against the published digest again, before they are used).
+        Artifacts found by sha256 were verified when stored, so they are
+        not re-hashed.
+        """
+        cache = self.options.cache
+        expected = self.digests.get(url)
+        if cache is None or expected is None:
+            return None
+
+        algorithm, value = parse_digest(expected)
+        digest = value if algorithm == "sha256" else cache.digest_of(url)
+        path = cache.get_by_digest(digest) if digest is not None else None
+        if path is None:
+            return None
+
+        try:
+            cached_file = open(path, "rb")
+        except FileNotFoundError:
+            return None
+
+        if algorithm != "sha256":
+            hasher = DigestHasher(expected)
+            for chunk in iter(lambda: cached_file.read(CHUNK_SIZE), b""):
+                hasher.update(chunk)
+            try:
+                hasher.verify(url)
+            except IntegrityError as e:
+                logger.debug(f"cached artifact is stale: {e}")
+                cached_file.close()
+                return None
+            cached_file.seek(0)
+
+        self.verified[url] = f"sha256:{digest}"
+        return cached_file
+
+    def _store_cached(self, url, file_content, sha256: str):
+        """
+        Store a verified artifact in the cache, if the registry published its
+        digest. Failing to store it (e.g. disk is full) only logs a warning.
+        """
+        cache = self.options.cache
+        if cache is None or url not in self.digests:
+            return
+
+        try:
+            cache.put(url, file_content, parse_digest(sha256)[1])
+        except OSError as e:
+            logger.warning(f"failed to cache {url}: {e}")
+        finally:
+            file_content.seek(0)
+
+    def _reserve(self, url, probed_size: Optional[int]) -> int:
+        """
+        Check the artifact against Options.budget, before requesting it.
+
+        Size is taken from the probe, the registry, or a HEAD request. When
+        the registry publishes an upper bound of the size only, the bound is
+        checked, and the streamed bytes are charged instead.
+
+        :return: Bytes charged to the budget (0 when the size is not known).
+        """
+        budget = self.options.budget
+        if budget is None:
+            return 0
+
+        size = probed_size if probed_size is not None else self.sizes.get(url)
+        if size is None and url in self.max_sizes:
+            budget.check(url, self.max_sizes[url])
+            return 0
+        if size is None:
+            size = head_size(self.session, url)
+        if size is None:
+            return 0
+
+        budget.check(url, size)
+        budget.charge(url, size)
+        return size
+
     def download_file(self, key, url):
         """
         Helper function to download a single file.
 
+        Response body is streamed in chunks of CHUNK_SIZE into a temporary
+        file, so the artifact is never held in memory as a whole. Returned
+        file object is positioned at the start, and must be closed by the caller.
+
+        When Options.segments is above 1, and the server accepts byte ranges,
+        large artifacts are fetched over concurrent (and resumable) ranges.
+
+        Content is hashed while it is streamed, and verified against the
+        digest given to add (if any). Artifacts failing verification are
+        not returned. Verified sha256 is recorded in verified.
+
+        When Options.cache is set, artifact is read from the cache if present,
+        and stored in the cache once downloaded.
+
+        When Options.budget is set, artifacts of known size above the budget
+        are not requested, and others are cut off once they exceed it.
+        Bytes of failed downloads are refunded to the budget.
+
+        At most Options.max_downloads artifacts (across every Downloader
+        sharing the options) are downloaded at once, others wait for a slot.
+
         :param key: The key to use as the folder name in the zip file.
         :param url: The URL of the file to download.
-        :return: Tuple containing key, file name, and BytesIO object with file content.
+        :return: Tuple containing key, file name, and file object with file content.
         """
+        attributes = dict(url=url, kind=key, registry=self.registry)
+        with timed(self.options.metrics, "download", self.registry):
+            try:
+                with trace(self.options.hooks, "download_file", **attributes) as span:
+                    return self._download_file(key, url, span)
+            except Exception as e:
+                return key, None, f"Failed to download {url}. Error: {str(e)}"
+
+    def _download_file(self, key, url, span: Span):
+        metrics = self.options.metrics
+        file_name = url.split("/")[-1]
+        cached_file = self._open_cached(url)
+        span.set("cached", cached_file is not None)
+        if cached_file is not None:
+            logger.debug(f"cache hit for {url}")
+            if metrics is not None:
+                metrics.cache_requests.inc(cache="artifact", result="hit")
+            return key, file_name, cached_file
+
+        if metrics is not None and self.options.cache is not None:
+            metrics.cache_requests.inc(cache="artifact", result="miss")
+
+        with self.options.download_slots():
+            return self._fetch_file(key, url, file_name, span)
+
+    def _fetch_file(self, key, url, file_name, span: Span):
+        metrics = self.options.metrics
+        budget = self.options.budget
+        file_content = tempfile.TemporaryFile()
+        charged = 0
         try:
-            response = self.session.get(url)
-            response.raise_for_status()
+            hasher = DigestHasher(self.digests.get(url))
+            probed = probe(self.session, url) if self.options.segments > 1 else None
+            size = probed.size if probed is not None else None
+            charged = self._reserve(url, size)
+            if size is not None and size >= self.options.segment_threshold:
+                SegmentedDownload(
+                    self.session,
+                    url,
+                    size,
+                    self.options.segments,
+                    self.options.retries,
+                    CHUNK_SIZE,
+                    probed.validator,
+                ).run(file_content)
+                span.set("bytes", size)
+                if metrics is not None:
+                    metrics.downloaded_bytes.inc(size, registry=self.registry)
+
+                # segments arrive out of order, so assembled file is hashed
+                file_content.seek(0)
+                for chunk in iter(lambda: file_content.read(CHUNK_SIZE), b""):
+                    hasher.update(chunk)
+            else:
+                with self.session.get(url, stream=True) as response:
+                    response.raise_for_status()
+                    received = 0
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        received += len(chunk)
+                        span.set("bytes", received)
+                        if budget is not None:
+                            budget.check(url, received)
+                            # bytes beyond the reserved size are charged as they arrive
+                            if received > charged:
+                                budget.charge(url, received - charged)
+                                charged = received
+
+                        if metrics is not None:
+                            metrics.downloaded_bytes.inc(
+                                len(chunk), registry=self.registry
+                            )
+
+                        hasher.update(chunk)
+                        file_content.write(chunk)
+
+            hasher.verify(url)
+            self.verified[url] = hasher.sha256
 
-            file_content = response.content
-            file_name = url.split("/")[-1]
-            return key, file_name, io.BytesIO(file_content)
-        except Exception as e:
-            return key, None, f"Failed to download {url}. Error: {str(e)}"
+            file_content.seek(0)
+            self._store_cached(url, file_content, hasher.sha256)
 
-    def get_as_zipped(self, max_workers=None) -> io.BytesIO:
+            return key, file_name, file_content
+        except Exception:
+            file_content.close()
+            if charged:
+                budget.refund(url, charged)
+            raise
+
+    def _write_entry(self, zip_file: ZipFile, name: str, file_content_stream):
+        """
+        Copy a downloaded file into the zip file, chunk by chunk.
+
+        Entry is compressed per Options.compression, already compressed
+        artifacts (recognized by name, or content) are stored as is.
+
+        :param zip_file: The zip file to write to.
+        :param name: The name of the entry within the zip file.
+        :param file_content_stream: File object with the content, closed once copied.
         """
-        Download all files in the download list and return a ZipFile as a BytesIO stream.
+        with timed(self.options.metrics, "zip", self.registry), file_content_stream:
+            file_size = file_content_stream.seek(0, io.SEEK_END)
+            file_content_stream.seek(0)
+            head = file_content_stream.read(MAGIC_SIZE)
+            file_content_stream.seek(0)
+
+            policy = self.options.compression
+            compress_type = policy.compress_type(name, head)
+            zip_info = mk_zip_info(
+                name, file_size, compress_type, policy.compress_level(compress_type)
+            )
+            with zip_file.open(zip_info, "w") as zip_entry:
+                shutil.copyfileobj(file_content_stream, zip_entry, CHUNK_SIZE)
 
-        :param max_workers: The maximum number of worker threads (default is None, which uses the ThreadPool size).
-        :return: BytesIO object containing the zip file content.
+    def _write_metadata(self, zip_file: ZipFile):
         """
-        all_urls = set.union(*self.download_list.values())
+        Write metadata, and urls (with verified digests) into the zip file.
+        """
+        with timed(self.options.metrics, "zip", self.registry):
+            self._write_metadata_entries(zip_file)
+
+    def _write_metadata_entries(self, zip_file: ZipFile):
+        for key, value in self.metadatas.items():
+            self.options.compression.writestr(zip_file, f"{METADATA_DIR}/{key}", value)
+            logger.debug(f"Added {METADATA_DIR}/{key} to the zip file")
+
+        urls = {
+            key: [
+                {"url": url, "digest": self.verified.get(url)} for url in sorted(urls)
+            ]
+            for key, urls in self.download_list.items()
+        }
+        self.options.compression.writestr(
+            zip_file, f"{METADATA_DIR}/urls.txt", json.dumps(urls, indent=4)
+        )
+        logger.debug(f"Added {METADATA_DIR}/urls.txt to the zip file")
+
+    def _raise_for_empty(self):
+        all_urls = set().union(*self.download_list.values())
+        if len(all_urls) < 1 and self.skipped:
+            raise ValueError(
+                f"no artifact url were selected to download ({len(self.skipped)} skipped)!"
+            )
         if len(all_urls) < 1:
             raise ValueError("no artifact url were provided to download!")
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [
-                executor.submit(self.download_file, key, url)
+    def get_as_zipped(self, max_workers=None) -> SpooledArchive:
+        """
+        Download all files in the download list and return a ZipFile as a SpooledArchive.
+
+        Each artifact is copied into its zip entry as soon as its download
+        completes, so only CHUNK_SIZE bytes per worker are held in memory
+        while downloading.
+
+        :param max_workers: The maximum number of worker threads (default is the
+                            number of artifacts, up to Options.max_downloads, which
+                            also bounds downloads across concurrent calls).
+        :return: SpooledArchive containing the zip file content, which is spilled
+                 to disk once it grows beyond Options.max_memory.
+        """
+        self._raise_for_empty()
+
+        if max_workers is None:
+            count = sum(len(urls) for urls in self.download_list.values())
+            max_workers = min(count, self.options.max_downloads)
+
+        artifacts_persisted = 0
+        zip_buffer = self.options.mk_archive()
+        with ZipFile(zip_buffer, "w") as zip_file:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(self.download_file, key, url)
+                    for key, urls in self.download_list.items()
+                    for url in urls
+                ]
+
+                for future in as_completed(futures):
+                    key, file_name, file_content_stream = future.result()
+                    if file_name is None:
+                        logger.error(f"Error: {file_content_stream}")
+                        continue
+
+                    logger.debug(f"Downloaded {file_name}")
+                    self._write_entry(
+                        zip_file, f"{key}/{file_name}", file_content_stream
+                    )
+                    artifacts_persisted += 1
+                    logger.debug(f"Added {key}/{file_name} to the zip file")
+
+            self._write_metadata(zip_file)
+
+        if artifacts_persisted < 1:
+            zip_buffer.close()
+            raise ValueError("failed to download all artifacts!")
+
+        return zip_buffer
+
+    async def aget_as_zipped(self) -> SpooledArchive:
+        """
+        Download all files in the download list on threads, without blocking
+        the event loop.
+
+        Same as get_as_zipped, except downloads, and writes to the archive
+        run on the executor shared through Options, so at most
+        Options.max_threads of them (across all concurrent calls) are
+        in flight (see fetcher_py.aio).
+
+        :return: SpooledArchive containing the zip file content.
+        """
+        self._raise_for_empty()
+
+        loop = asyncio.get_running_loop()
+        executor = self.options.executor()
+
+        artifacts_persisted = 0
+        zip_buffer = self.options.mk_archive()
+        zip_file = ZipFile(zip_buffer, "w")
+        try:
+            tasks = [
+                loop.run_in_executor(executor, self.download_file, key, url)
                 for key, urls in self.download_list.items()
                 for url in urls
             ]
 
-            file_contents = []
-            for future in futures:
-                key, file_name, file_content_stream = future.result()
-                if file_name is not None:
-                    file_contents.append((key, file_name, file_content_stream))
-                    logger.debug(f"Downloaded {file_name}")
-                else:
+            for task in asyncio.as_completed(tasks):
+                key, file_name, file_content_stream = await task
+                if file_name is None:
                     logger.error(f"Error: {file_content_stream}")
+                    continue
 
-        artifacts_persisted = 0
-        zip_buffer = io.BytesIO()
-        with ZipFile(zip_buffer, "a") as zip_file:
-            for key, file_name, file_content_stream in file_contents:
+                logger.debug(f"Downloaded {file_name}")
+                await loop.run_in_executor(
+                    executor,
+                    self._write_entry,
+                    zip_file,
+                    f"{key}/{file_name}",
+                    file_content_stream,
+                )
                 artifacts_persisted += 1
-                file_content_stream.seek(0)
-                zip_file.writestr(f"{key}/{file_name}", file_content_stream.read())
                 logger.debug(f"Added {key}/{file_name} to the zip file")
 
-            for key, value in self.metadatas.items():
-                zip_file.writestr(f"{METADATA_DIR}/{key}", value)
-                logger.debug(f"Added {METADATA_DIR}/{key} to the zip file")
-
-            zip_file.writestr(
-                f"{METADATA_DIR}/urls.txt",
-                json.dumps(self.download_list, indent=4, default=serialize_sets),
-            )
-            logger.debug(f"Added {METADATA_DIR}/urls.txt to the zip file")
+            await loop.run_in_executor(executor, self._write_metadata, zip_file)
+        finally:
+            # central directory is written to a (possibly spilled) archive
+            await loop.run_in_executor(executor, zip_file.close)
 
         if artifacts_persisted < 1:
+            zip_buffer.close()
             raise ValueError("failed to download all artifacts!")
 
         return zip_buffer
@@ -1,11 +1,25 @@
-import io
 import logging
 import os
+import threading
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import quote
 import requests
-from fetcher_py.component import Component
+from requests.adapters import HTTPAdapter
+from fetcher_py import aio, archive, bulk, closure
+from fetcher_py.archive import SpooledArchive
+from fetcher_py.bulk import DEFAULT_JOBS, Result
+from fetcher_py.component import RAW_LAZY, Component
+from fetcher_py.downloader import Downloader
+from fetcher_py.adapters import is_default_adapter
+from fetcher_py.hooks import Hooks, SpanCallback
+from fetcher_py.httpcache import CachingAdapter
+from fetcher_py.lockfile import LockedPackage
+from fetcher_py.metrics import timed
+from fetcher_py.options import Options
 from fetcher_py.package import Package
+from fetcher_py.plan import Plan, plan_artifact
+from fetcher_py.ratelimit import RateLimitedAdapter
 from fetcher_py.protocol.git import GitRegistry
 from fetcher_py.protocol.url import UrlRegistry
 from fetcher_py.registry.brew import BrewRegistry
@@ -39,15 +53,98 @@ ECOSYSTEM_REGISTRIES: Dict[str, Registry] = {
 logger = logging.getLogger(__name__)
 
 
+def archive_path(package: Package, component: Component) -> str:
+    """
+    Relative path of the archive of a package, used by download_many.
+
+    Parameters:
+    - package: The package.
+    - component: Component resolved for the package.
+
+    Returns:
+    - Path in <ecosystem>/<name>@<version>.zip form, with name quoted.
+    """
+    name = quote(package.name, safe="")
+    return os.path.join(package.ecosystem, f"{name}@{component.version}.zip")
+
+
 class Fetcher:
-    def __init__(self, session: requests.Session):
+    def __init__(self, session: requests.Session, options: Optional[Options] = None):
         """
         Initialize the Fetcher with a requests session.
 
         Parameters:
-        - session: A requests.Session object.
+        - session: A requests.Session object, shared by metadata requests,
+          and artifact downloads. Its default adapters are replaced with ones
+          pooled per options, adapters mounted by the caller are kept (and
+          wrapped by the HTTP cache, when options have http_cache).
+        - options: Options shared with registries and downloaders.
         """
         self.session = session
+        self.options = options or Options()
+        # per (ecosystem, base url), see _get_registry
+        self._registries: Dict[Tuple[str, Optional[str]], Registry] = {}
+        self._registries_lock = threading.Lock()
+
+        for prefix in ["https://", "http://"]:
+            adapter = self.session.get_adapter(prefix)
+            if is_default_adapter(adapter):
+                self.session.mount(prefix, self._mk_adapter())
+            elif self.options.http_cache is not None and not isinstance(
+                adapter, CachingAdapter
+            ):
+                # adapters mounted by the caller (e.g. with retries) are kept,
+                # requests not served from the cache are sent with them
+                self.session.mount(
+                    prefix,
+                    CachingAdapter(
+                        self.options.http_cache,
+                        adapter=adapter,
+                        metrics=self.options.metrics,
+                    ),
+                )
+
+    def add_hooks(
+        self,
+        on_start: Optional[SpanCallback] = None,
+        on_error: Optional[SpanCallback] = None,
+        on_finish: Optional[SpanCallback] = None,
+    ) -> Hooks:
+        """
+        Register callbacks for spans around network calls (see fetcher_py.hooks).
+
+        Parameters:
+        - on_start: Called with the span, when a call starts.
+        - on_error: Called with the span (whose error is set), when a call fails.
+        - on_finish: Called with the span, when a call finishes (even if it failed).
+
+        Returns:
+        - Hooks of options, shared with registries, and downloaders.
+        """
+        if self.options.hooks is None:
+            self.options.hooks = Hooks()
+        return self.options.hooks.add(on_start, on_error, on_finish)
+
+    def _mk_adapter(self) -> HTTPAdapter:
+        """
+        Make adapter, with connection pools sized by options, limited by
+        the rate limiter of options.
+
+        Returns:
+        - CachingAdapter if options have http_cache, otherwise RateLimitedAdapter.
+        """
+        adapter_kwargs = dict(
+            limiter=self.options.rate_limiter,
+            pool_connections=self.options.pool_connections,
+            pool_maxsize=self.options.pool_maxsize,
+            pool_block=self.options.pool_block,
+            tcp_keepalive=self.options.tcp_keepalive,
+            metrics=self.options.metrics,
+        )
+        if self.options.http_cache is not None:
+            return CachingAdapter(self.options.http_cache, **adapter_kwargs)
+
+        return RateLimitedAdapter(**adapter_kwargs)
 
     def get(self, query) -> Component:
         """
@@ -60,9 +157,29 @@ class Fetcher:
         - Component object representing the package.
         """
         package = Package.parse(query)
-        return self._get_registry(package.ecosystem).get(package)
+        return self._shrink(self._get_registry(package.ecosystem).get(package))
+
+    def resolve(self, query: str) -> Package:
+        """
+        Resolve version of a package (missing, 'latest', or a range) to an
+        exact version, without fetching its metadata.
+
+        Versions of registries, which resolve them while fetching metadata
+        (brew, url, git, oci), are left as they are.
+
+        Parameters:
+        - query: Package query string.
+
+        Returns:
+        - Package with its exact version.
+        """
+        package = Package.parse(query)
+        registry = self._get_registry(package.ecosystem)
+        if registry.version_scheme is not None:
+            registry.resolve(package)
+        return package
 
-    def raw(self, query) -> Tuple[Component, io.BytesIO]:
+    def raw(self, query) -> Tuple[Component, SpooledArchive]:
         """
         Retrieve raw component, and data bytes.
 
@@ -75,7 +192,7 @@ class Fetcher:
         package = Package.parse(query)
         return self._get_registry(package.ecosystem).raw(package)
 
-    def download_raw(self, query) -> io.BytesIO:
+    def download_raw(self, query) -> SpooledArchive:
         """
         Download the raw content of a package.
 
@@ -98,20 +215,293 @@ class Fetcher:
         """
         package = Package.parse(query)
         downloaded_bytes = self._get_registry(package.ecosystem).download(package)
+        self._persist(downloaded_bytes, destination, package.ecosystem)
+
+    def _persist(
+        self,
+        downloaded_bytes: SpooledArchive,
+        destination: Path,
+        registry: Optional[str] = None,
+    ):
+        with timed(self.options.metrics, "write", registry):
+            parent = os.path.dirname(destination)
+            if parent != "":
+                os.makedirs(parent, exist_ok=True)
+
+            archive.persist(downloaded_bytes, destination)
+
+    def get_many(
+        self, queries: Iterable[Union[str, LockedPackage]], jobs: int = DEFAULT_JOBS
+    ) -> Iterator[Result]:
+        """
+        Get information about many packages concurrently.
+
+        Parameters:
+        - queries: Package query strings, or packages read from lockfiles
+          (duplicates are fetched once).
+        - jobs: Number of packages resolved concurrently.
+
+        Returns:
+        - Iterator of Result (with component, or error), in order of completion.
+        """
+        return bulk.run(queries, self._stages(self._resolve), jobs)
+
+    def download_many(
+        self,
+        queries: Iterable[Union[str, LockedPackage]],
+        destination_dir: Path,
+        jobs: int = DEFAULT_JOBS,
+    ) -> Iterator[Result]:
+        """
+        Download many packages concurrently, each to its own archive.
+
+        Metadata of upcoming packages is resolved while artifacts of earlier
+        packages are downloaded. Archives are written to
+        <destination_dir>/<ecosystem>/<name>@<version>.zip (see archive_path).
+
+        Packages read from lockfiles, which record their artifacts, are
+        downloaded without resolving them with their registry (component of
+        their result is made from the lockfile).
+
+        Parameters:
+        - queries: Package query strings, or packages read from lockfiles
+          (duplicates, and queries resolved to the same version are
+          downloaded once, and written atomically).
+        - destination_dir: Directory to write archives to.
+        - jobs: Number of packages resolved, or downloaded concurrently.
+
+        Returns:
+        - Iterator of Result (with component and path, or error), in order of completion.
+        """
+
+        def resolve(result: Result):
+            if result.locked is not None and result.locked.artifacts:
+                result.component = result.locked.to_component()
+            else:
+                self._resolve(result)
+
+        def download(result: Result):
+            path = os.path.join(
+                destination_dir, archive_path(result.package, result.component)
+            )
+            downloaded_bytes = self._download_result(result)
+            self._persist(downloaded_bytes, path, result.package.ecosystem)
+            result.path = path
+
+        return bulk.run(queries, self._stages(resolve, download), jobs)
+
+    def closure(
+        self,
+        queries: Union[str, Iterable[str]],
+        jobs: int = DEFAULT_JOBS,
+        max_depth: Optional[int] = None,
+        destination_dir: Optional[Path] = None,
+    ) -> Iterator[Result]:
+        """
+        Get (and optionally download) packages, and their transitive dependencies.
+
+        Dependencies are read from metadata of each resolved package (see
+        Registry.get_dependencies), and resolved concurrently, breadth first.
+        Each version range is resolved once, and each resolved version is
+        expanded (and downloaded) once.
+
+        Parameters:
+        - queries: Package query string, or query strings (roots of the closure).
+        - jobs: Number of packages resolved, or downloaded concurrently.
+        - max_depth: Maximum depth of dependencies (default is unlimited).
+        - destination_dir: Directory to write archives to (see download_many),
+          when None, nothing is downloaded.
+
+        Returns:
+        - Iterator of Result (with component, depth, required_by, and
+          dependencies, or error), in order of completion.
+        """
+        if isinstance(queries, str):
+            queries = [queries]
+
+        def expand(result: Result):
+            self._resolve(result)
+            ecosystem = result.package.ecosystem
+            registry = self._get_registry(ecosystem)
+            result.dependencies = [
+                dependency.query(ecosystem)
+                for dependency in registry.get_dependencies(result.component)
+            ]
+
+        def download(result: Result):
+            path = os.path.join(
+                destination_dir, archive_path(result.package, result.component)
+            )
+            downloaded_bytes = self._download_result(result)
+            self._persist(downloaded_bytes, path, result.package.ecosystem)
+            result.path = path
+
+        stages = [expand] if destination_dir is None else [expand, download]
+        return closure.run(queries, self._stages(*stages), jobs, max_depth)
+
+    def plan(self, query: str) -> Plan:
+        """
+        Plan download of a package, without downloading any artifact.
+
+        Parameters:
+        - query: Package query string.
+
+        Returns:
+        - Plan with artifacts which would be downloaded, and their sizes.
+        """
+        package = Package.parse(query)
+        return self._get_registry(package.ecosystem).plan(package)
+
+    def plan_many(
+        self, queries: Iterable[Union[str, LockedPackage]], jobs: int = DEFAULT_JOBS
+    ) -> Iterator[Result]:
+        """
+        Plan download of many packages concurrently (see plan).
+
+        Packages read from lockfiles, which record their artifacts, are
+        planned without resolving them with their registry.
+
+        Parameters:
+        - queries: Package query strings, or packages read from lockfiles
+          (duplicates are planned once).
+        - jobs: Number of packages planned concurrently.
+
+        Returns:
+        - Iterator of Result (with component and plan, or error), in order of completion.
+        """
+
+        def plan(result: Result):
+            locked = result.locked
+            if locked is not None and locked.artifacts:
+                result.component = locked.to_component()
+                artifacts = [
+                    plan_artifact(self.options, self.session, a.kind, a.url)
+                    for a in locked.artifacts
+                ]
+                result.plan = Plan(result.package, result.component, artifacts)
+                return
+
+            self._resolve(result)
+            registry = self._get_registry(result.package.ecosystem)
+            only_digests = locked.digests if locked is not None else None
+            result.plan = registry.plan_component(
+                result.package, result.component, only_digests or None
+            )
 
-        parent = os.path.dirname(destination)
-        if parent != "":
-            os.makedirs(parent, exist_ok=True)
+        return bulk.run(queries, self._stages(plan), jobs)
 
-        with open(destination, "wb") as file:
-            file.write(downloaded_bytes.getvalue())
+    def _shrink(self, component: Component) -> Component:
+        if self.options.component_raw != RAW_LAZY:
+            component.shrink(self.options.component_raw)
+        return component
 
-    def _get_registry(self, ecosystem):
+    def _stages(self, *stages: Callable[[Result], None]) -> List[Callable]:
+        """
+        Stages of a bulk operation, followed by shrinking components of
+        results per Options.component_raw (on the pool, after every stage,
+        which may need raw metadata).
+        """
+        if self.options.component_raw == RAW_LAZY:
+            return list(stages)
+
+        def shrink(result: Result):
+            self._shrink(result.component)
+
+        return list(stages) + [shrink]
+
+    def _resolve(self, result: Result):
+        if result.package is None:
+            result.package = Package.parse(result.query)
+
+        result.component = self._get_registry(result.package.ecosystem).get(
+            result.package
+        )
+
+    def _download_result(self, result: Result) -> SpooledArchive:
+        locked = result.locked
+        if locked is not None and locked.artifacts:
+            downloader = Downloader(self.options, self.session)
+            for artifact in locked.artifacts:
+                downloader.add(artifact.kind, artifact.url, artifact.digest)
+            return downloader.get_as_zipped()
+
+        registry = self._get_registry(result.package.ecosystem)
+        only_digests = locked.digests if locked is not None else None
+        return registry.download_component(
+            result.package, result.component, only_digests or None
+        )
+
+    async def aget(self, query) -> Component:
+        """
+        Get information about a package on a thread, without blocking the
+        event loop (see fetcher_py.aio).
+
+        Parameters:
+        - query: Package query string.
+
+        Returns:
+        - Component object representing the package.
+        """
+        package = Package.parse(query)
+        component = await self._get_registry(package.ecosystem).aget(package)
+        if self.options.component_raw == RAW_LAZY:
+            return component
+        # compressing raw metadata is cpu bound
+        return await aio.run(self.options, self._shrink, component)
+
+    async def araw(self, query) -> Tuple[Component, SpooledArchive]:
+        """
+        Retrieve raw component, and data bytes on threads, without blocking
+        the event loop (see fetcher_py.aio).
+
+        Parameters:
+        - query: Package query string.
+
+        Returns:
+        - Tuple of Component, and Raw bytes of the downloaded content.
+        """
+        package = Package.parse(query)
+        return await self._get_registry(package.ecosystem).araw(package)
+
+    async def adownload_raw(self, query) -> SpooledArchive:
+        """
+        Download the raw content of a package on threads, without blocking
+        the event loop (see fetcher_py.aio).
+
+        Parameters:
+        - query: Package query string.
+
+        Returns:
+        - Raw bytes of the downloaded content.
+        """
+        package = Package.parse(query)
+        return await self._get_registry(package.ecosystem).adownload(package)
+
+    async def adownload(self, query: str, destination: Path):
+        """
+        Download a package to the specified destination on threads, without
+        blocking the event loop (see fetcher_py.aio).
+
+        Parameters:
+        - query: Package query string.
+        - destination: Destination path for downloading the package.
+        """
+        registry = Package.parse(query).ecosystem
+        downloaded_bytes = await self.adownload_raw(query)
+        await aio.run(
+            self.options, self._persist, downloaded_bytes, destination, registry
+        )
+
+    def _get_registry(self, ecosystem, base_url: Optional[str] = None) -> Registry:
         """
         Get the appropriate registry based on the ecosystem.
 
+        Registries are made once per ecosystem, and base url, and kept for
+        the lifetime of the fetcher (they are shared by concurrent queries).
+
         Parameters:
         - ecosystem: Name of the ecosystem (e.g., 'pip').
+        - base_url: Base url of the registry (default is the public one).
 
         Returns:
         - Registry object for the specified ecosystem.
@@ -119,4 +509,12 @@ class Fetcher:
         if ecosystem not in ECOSYSTEM_REGISTRIES:
             raise ValueError(f"Unsupported ecosystem: {ecosystem}")
 
-        return ECOSYSTEM_REGISTRIES[ecosystem](self.session)
+        key = (ecosystem, base_url)
+        with self._registries_lock:
+            registry = self._registries.get(key)
+            if registry is None:
+                registry = ECOSYSTEM_REGISTRIES[ecosystem](
+                    self.session, base_url=base_url, options=self.options
+                )
+                self._registries[key] = registry
+            return registry
@@ -0,0 +1,180 @@
+"""Event hooks, and tracing spans around network calls.
+
+A span is opened around every registry call (get_default, get, raw,
+download), Downloader.download_file, git clone, and OCI blob pull:
+
+    registry.get_default   package, ecosystem
+    registry.get           package, ecosystem
+    registry.raw           package, ecosystem
+    registry.download      package, ecosystem
+    download_file          url, kind, registry, bytes, cached
+    git.clone              url, ref
+    oci.pull_blob          container, digest, bytes
+
+Hooks get each span when it starts, when it fails (with span.error set),
+and when it finishes (successfully or not). Exceptions raised by hooks
+are logged, and never interrupt fetching.
+
+When opentelemetry-api is installed, OpenTelemetryHooks turn spans into
+OpenTelemetry spans.
+"""
+
+import contextlib
+import logging
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SpanCallback = Callable[["Span"], None]
+
+
+class Span:
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        """
+        Timed network call, with attributes (e.g. url, and bytes).
+
+        :param name: The name of the span (e.g. 'registry.get').
+        :param attributes: Attributes known when the span starts.
+        """
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.error: Optional[BaseException] = None
+        # per hook state (e.g. OpenTelemetry span), keyed by hook
+        self.context: Dict[int, Any] = {}
+
+    @property
+    def duration(self) -> Optional[float]:
+        return None if self.end is None else self.end - self.start
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def __repr__(self):
+        return f"Span({self.name!r}, {self.attributes!r}, duration={self.duration})"
+
+
+class Hooks:
+    def __init__(self):
+        """
+        Callbacks for start, error, and finish of spans.
+        """
+        self.on_start: List[SpanCallback] = []
+        self.on_error: List[SpanCallback] = []
+        self.on_finish: List[SpanCallback] = []
+
+    def add(
+        self,
+        on_start: Optional[SpanCallback] = None,
+        on_error: Optional[SpanCallback] = None,
+        on_finish: Optional[SpanCallback] = None,
+    ) -> "Hooks":
+        """
+        Register callbacks (any of them can be omitted).
+
+        :return: self, so calls can be chained.
+        """
+        for callbacks, callback in [
+            (self.on_start, on_start),
+            (self.on_error, on_error),
+            (self.on_finish, on_finish),
+        ]:
+            if callback is not None:
+                callbacks.append(callback)
+        return self
+
+    def _call(self, callbacks: List[SpanCallback], span: Span):
+        for callback in callbacks:
+            try:
+                callback(span)
+            except Exception:
+                logger.exception(f"hook failed for {span.name} span")
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """
+        Open a span, calling hooks when it starts, fails, and finishes.
+
+        :param name: The name of the span.
+        :param attributes: Attributes known when the span starts.
+        """
+        span = Span(name, attributes)
+        self._call(self.on_start, span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = e
+            span.end = time.time()
+            self._call(self.on_error, span)
+            raise
+        finally:
+            span.end = span.end or time.time()
+            self._call(self.on_finish, span)
+
+
+@contextlib.contextmanager
+def _untraced(name: str, **attributes) -> Iterator[Span]:
+    yield Span(name, attributes)
+
+
+def trace(hooks: Optional[Hooks], name: str, **attributes):
+    """
+    Hooks.span, or a span nobody listens to when hooks are disabled.
+    """
+    if hooks is None:
+        return _untraced(name, **attributes)
+    return hooks.span(name, **attributes)
+
+
+def _otel_attributes(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        k: v if isinstance(v, (bool, int, float, str)) else str(v)
+        for k, v in attributes.items()
+        if v is not None
+    }
+
+
+class OpenTelemetryHooks(Hooks):
+    def __init__(self, tracer=None):
+        """
+        Hooks, which record spans with OpenTelemetry (requires opentelemetry-api).
+
+        :param tracer: The tracer to use (default is the one of the global
+                       tracer provider, named 'fetcher_py').
+        """
+        try:
+            from opentelemetry import trace as otel_trace
+        except ImportError:
+            raise ImportError(
+                "OpenTelemetryHooks requires opentelemetry-api to be installed"
+            ) from None
+
+        super().__init__()
+        self._otel_trace = otel_trace
+        self.tracer = tracer or otel_trace.get_tracer("fetcher_py")
+        self.add(self._start, self._error, self._finish)
+
+    def _start(self, span: Span):
+        span.context[id(self)] = self.tracer.start_span(
+            f"fetcher_py.{span.name}",
+            attributes=_otel_attributes(span.attributes),
+            start_time=int(span.start * 1e9),
+        )
+
+    def _error(self, span: Span):
+        otel_span = span.context.get(id(self))
+        if otel_span is not None and isinstance(span.error, Exception):
+            otel_span.record_exception(span.error)
+            otel_span.set_status(
+                self._otel_trace.Status(self._otel_trace.StatusCode.ERROR)
+            )
+
+    def _finish(self, span: Span):
+        otel_span = span.context.pop(id(self), None)
+        if otel_span is None:
+            return
+
+        otel_span.set_attributes(_otel_attributes(span.attributes))
+        otel_span.end(end_time=int(span.end * 1e9))
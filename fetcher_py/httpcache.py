@@ -0,0 +1,303 @@
+"""Persistent HTTP cache for registry metadata.
+
+Responses with a validator (ETag or Last-Modified) are stored on disk,
+and revalidated with conditional requests (If-None-Match and
+If-Modified-Since), so unchanged metadata costs a 304 response instead of
+the whole document. Responses which are fresh per Cache-Control max-age
+are served from disk, without any request.
+
+Only non-streamed GET requests are cached, artifact downloads (which are
+streamed) are left to ArtifactCache. Requests carrying credentials
+(Authorization) are never cached. Responses are keyed by url, and values
+of request headers named in their Vary header (e.g. Accept), so each
+negotiated variant is stored, and served, on its own.
+"""
+
+import email.utils
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List, Mapping, Optional
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from fetcher_py.ratelimit import RateLimitedAdapter
+
+logger = logging.getLogger(__name__)
+
+# body is stored decoded, so headers describing its transfer are not kept
+TRANSFER_HEADERS = ["Content-Encoding", "Content-Length", "Transfer-Encoding"]
+
+
+def parse_vary(value: Optional[str]) -> List[str]:
+    """
+    Parse Vary header into lowercase header names (['*'] varies on anything).
+    """
+    return sorted({name.strip().lower() for name in (value or "").split(",")} - {""})
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """
+    Parse Cache-Control header into directives.
+
+    :param value: Value of the Cache-Control header.
+    :return: Mapping of lowercase directive to its value (None if it has no value).
+    """
+    directives = {}
+    for directive in (value or "").split(","):
+        name, _, arg = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+def vary_values(names: List[str], request_headers: Mapping[str, str]) -> Dict[str, str]:
+    """
+    Values of request headers named in Vary (missing ones are empty).
+    """
+    headers = CaseInsensitiveDict(request_headers)
+    return {name: headers.get(name, "") for name in names}
+
+
+class CachedResponse:
+    def __init__(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        body: bytes,
+        stored_at,
+        request_headers: Optional[Mapping[str, str]] = None,
+    ):
+        self.url = url
+        self.headers = CaseInsensitiveDict(headers)
+        for name in TRANSFER_HEADERS:
+            self.headers.pop(name, None)
+        self.body = body
+        self.stored_at = stored_at
+        # values of request headers named in Vary, the response was negotiated with
+        self.vary = vary_values(
+            parse_vary(self.headers.get("Vary")), request_headers or {}
+        )
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("ETag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get("Last-Modified")
+
+    def freshness_lifetime(self) -> int:
+        """
+        Seconds for which the response is fresh, after it was stored.
+        """
+        directives = parse_cache_control(self.headers.get("Cache-Control"))
+        if "no-cache" in directives:
+            return 0
+
+        max_age = directives.get("max-age") or ""
+        if max_age.isdigit():
+            age = self.headers.get("Age", "")
+            return int(max_age) - (int(age) if age.isdigit() else 0)
+
+        expires = self.headers.get("Expires")
+        date = self.headers.get("Date")
+        if expires and date:
+            try:
+                expires_at = email.utils.parsedate_to_datetime(expires)
+                date_at = email.utils.parsedate_to_datetime(date)
+                return int((expires_at - date_at).total_seconds())
+            except (TypeError, ValueError):
+                return 0
+
+        return 0
+
+    def is_fresh(self) -> bool:
+        return time.time() - self.stored_at < self.freshness_lifetime()
+
+    def to_response(
+        self, request: requests.PreparedRequest, adapter
+    ) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(self.body)
+        response.url = request.url
+        response.request = request
+        response.connection = adapter
+        response.from_cache = True
+        return response
+
+
+class HttpCache:
+    def __init__(self, root: str):
+        """
+        Initialize the cache.
+
+        :param root: The directory to store responses in.
+        """
+        self.root = os.path.expanduser(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, url: str, vary: Optional[Dict[str, str]] = None) -> str:
+        key = url if not vary else url + "\n" + json.dumps(vary, sort_keys=True)
+        return os.path.join(self.root, hashlib.sha256(key.encode()).hexdigest())
+
+    def _vary_path(self, url: str) -> str:
+        return self._path(url) + ".vary"
+
+    def _write_atomic(self, path: str, data: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
+    def load(
+        self, url: str, request_headers: Optional[Mapping[str, str]] = None
+    ) -> Optional[CachedResponse]:
+        """
+        Load stored response for the url, negotiated with the same values of
+        request headers named in its Vary header, if any.
+
+        :param url: The url.
+        :param request_headers: Headers of the request.
+        """
+        try:
+            with open(self._vary_path(url), "r") as file:
+                names = json.load(file)
+        except (FileNotFoundError, ValueError):
+            names = []
+        vary = vary_values(names, request_headers or {})
+
+        try:
+            with open(self._path(url, vary), "rb") as file:
+                meta = json.loads(file.readline())
+                body = file.read()
+        except (FileNotFoundError, ValueError):
+            return None
+
+        cached = CachedResponse(
+            url, meta["headers"], body, meta["stored_at"], request_headers
+        )
+        if cached.vary != vary:
+            # Vary of the stored response differs from the index
+            return None
+        return cached
+
+    def save(self, cached: CachedResponse):
+        """
+        Atomically store the response, as one line of json metadata followed by body.
+        """
+        meta = {"headers": dict(cached.headers), "stored_at": cached.stored_at}
+        names = sorted(cached.vary)
+        self._write_atomic(self._vary_path(cached.url), json.dumps(names).encode())
+        self._write_atomic(
+            self._path(cached.url, cached.vary),
+            json.dumps(meta).encode() + b"\n" + cached.body,
+        )
+
+
+def is_storable(response: requests.Response) -> bool:
+    directives = parse_cache_control(response.headers.get("Cache-Control"))
+    has_validator = "ETag" in response.headers or "Last-Modified" in response.headers
+    has_lifetime = "max-age" in directives
+    return (
+        response.status_code == 200
+        and "no-store" not in directives
+        and "*" not in parse_vary(response.headers.get("Vary"))
+        and (has_validator or has_lifetime)
+    )
+
+
+class CachingAdapter(RateLimitedAdapter):
+    def __init__(
+        self,
+        cache: Optional[HttpCache] = None,
+        adapter: Optional[BaseAdapter] = None,
+        **kwargs,
+    ):
+        """
+        RateLimitedAdapter, which serves and revalidates GET requests from the cache.
+
+        Requests served from the cache are not rate limited.
+
+        :param cache: The cache to use, when None, adapter does not cache anything.
+        :param adapter: Adapter to send requests not served from the cache with
+                        (e.g. one mounted by the caller, with its own retries),
+                        instead of this one (which then neither pools, nor
+                        rate limits them).
+        :param kwargs: Passed to RateLimitedAdapter.
+        """
+        self.cache = cache
+        self.adapter = adapter
+        super().__init__(**kwargs)
+
+    def _forward(self, request, **kwargs):
+        if getattr(self, "adapter", None) is not None:
+            return self.adapter.send(request, **kwargs)
+        return super().send(request, **kwargs)
+
+    def close(self):
+        super().close()
+        if getattr(self, "adapter", None) is not None:
+            self.adapter.close()
+
+    def _count(self, result: str):
+        if getattr(self, "metrics", None) is not None:
+            self.metrics.cache_requests.inc(cache="http", result=result)
+
+    def send(self, request, stream=False, **kwargs):
+        if (
+            self.cache is None
+            or request.method != "GET"
+            or stream
+            or "Authorization" in request.headers
+        ):
+            return self._forward(request, stream=stream, **kwargs)
+
+        cached = self.cache.load(request.url, request.headers)
+        if cached is not None:
+            if cached.is_fresh():
+                logger.debug(f"http cache hit for {request.url}")
+                self._count("hit")
+                return cached.to_response(request, self)
+
+            if cached.etag:
+                request.headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                request.headers["If-Modified-Since"] = cached.last_modified
+
+        response = self._forward(request, stream=stream, **kwargs)
+        if response.status_code == 304 and cached is not None:
+            logger.debug(f"http cache revalidated {request.url}")
+            self._count("revalidated")
+            response.close()
+            cached.headers.update(response.headers)
+            for name in TRANSFER_HEADERS:
+                cached.headers.pop(name, None)
+            cached.stored_at = time.time()
+            self.cache.save(cached)
+            return cached.to_response(request, self)
+
+        self._count("miss")
+        if is_storable(response):
+            self.cache.save(
+                CachedResponse(
+                    request.url,
+                    dict(response.headers),
+                    response.content,
+                    time.time(),
+                    request.headers,
+                )
+            )
+
+        return response
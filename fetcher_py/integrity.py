@@ -0,0 +1,109 @@
+"""Artifact integrity, using digests published by registries.
+
+Digests are represented as '<algorithm>:<hex>' (e.g. 'sha256:ab12...'),
+which is also the form used by OCI registries.
+"""
+
+import base64
+import binascii
+import hashlib
+from typing import Optional, Tuple
+
+
+class IntegrityError(ValueError):
+    pass
+
+
+def parse_digest(digest: str) -> Tuple[str, str]:
+    """
+    Split digest into algorithm, and lowercase hex.
+
+    :param digest: Digest in '<algorithm>:<hex>' form.
+    :return: Tuple of algorithm and hex.
+    """
+    algorithm, sep, hexdigest = digest.partition(":")
+    if not sep or algorithm.lower() not in hashlib.algorithms_available:
+        raise ValueError(f"unsupported digest: {digest}")
+
+    return algorithm.lower(), hexdigest.strip().lower()
+
+
+def from_hex(algorithm: str, hexdigest: Optional[str]) -> Optional[str]:
+    """
+    Make digest from algorithm, and hex (if any).
+    """
+    if not hexdigest:
+        return None
+
+    return f"{algorithm.lower()}:{hexdigest.strip().lower()}"
+
+
+def from_base64(algorithm: str, value: Optional[str]) -> Optional[str]:
+    """
+    Make digest from algorithm, and base64 encoded hash (if any).
+    """
+    if not value:
+        return None
+
+    try:
+        return from_hex(algorithm, base64.b64decode(value).hex())
+    except binascii.Error:
+        return None
+
+
+def from_sri(integrity: Optional[str]) -> Optional[str]:
+    """
+    Make digest from subresource integrity string (e.g. 'sha512-<base64>').
+
+    When many hashes are listed, the first one is used.
+    """
+    if not integrity:
+        return None
+
+    algorithm, sep, value = integrity.split()[0].partition("-")
+    if not sep:
+        return None
+
+    return from_base64(algorithm, value)
+
+
+class DigestHasher:
+    def __init__(self, expected: Optional[str] = None):
+        """
+        Incremental hasher, computing sha256, and the expected digest's algorithm.
+
+        :param expected: The expected digest, if any.
+        """
+        self.expected = expected
+        self._sha256 = hashlib.sha256()
+        self._expected = None
+
+        if expected is not None:
+            algorithm, _ = parse_digest(expected)
+            if algorithm != "sha256":
+                self._expected = hashlib.new(algorithm)
+
+    def update(self, chunk: bytes):
+        self._sha256.update(chunk)
+        if self._expected is not None:
+            self._expected.update(chunk)
+
+    @property
+    def sha256(self) -> str:
+        return from_hex("sha256", self._sha256.hexdigest())
+
+    def verify(self, name: str):
+        """
+        Verify hashed content against the expected digest, if any.
+
+        :param name: The name of the content (used in error message).
+        """
+        if self.expected is None:
+            return
+
+        algorithm, expected_hex = parse_digest(self.expected)
+        hasher = self._sha256 if self._expected is None else self._expected
+        if hasher.hexdigest() != expected_hex:
+            raise IntegrityError(
+                f"{algorithm} digest mismatch for {name}: expected {expected_hex}, got {hasher.hexdigest()}"
+            )
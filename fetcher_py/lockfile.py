@@ -0,0 +1,327 @@
+"""Lockfile readers, turning lockfiles into packages for bulk fetching.
+
+Supported lockfiles (by file name):
+
+- requirements.txt (pinned with ==, and optional --hash)
+- poetry.lock
+- package-lock.json, and npm-shrinkwrap.json
+- Cargo.lock
+- Gemfile.lock
+- composer.lock
+- packages.lock.json (NuGet)
+
+Where a lockfile records where artifacts are (npm resolved, Cargo crates.io
+checksum, Gemfile.lock remote, composer dist, NuGet contentHash), they are
+downloaded directly, without a metadata round-trip to the registry. Where
+it only records hashes (requirements.txt, poetry.lock), artifacts are
+resolved by the registry, and restricted to the locked hashes.
+
+Reading poetry.lock, and Cargo.lock requires python 3.11+ (tomllib), or the
+tomli package.
+"""
+
+import json
+import logging
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from fetcher_py.component import Component
+from fetcher_py.integrity import from_base64, from_hex, from_sri
+from fetcher_py.package import Package
+from fetcher_py.registry.cargo import mk_download_url
+
+logger = logging.getLogger(__name__)
+
+CRATES_IO_SOURCES = [
+    "registry+https://github.com/rust-lang/crates.io-index",
+    "sparse+https://index.crates.io/",
+]
+NUGET_FLAT_CONTAINER = "https://api.nuget.org/v3-flatcontainer"
+
+
+@dataclass
+class LockedArtifact:
+    kind: str
+    url: str
+    digest: Optional[str] = None
+
+
+@dataclass
+class LockedPackage:
+    """
+    Package pinned by a lockfile.
+
+    Parameters:
+    - package: The package, with locked version.
+    - artifacts: Artifacts recorded by the lockfile, downloaded without
+      resolving the package with its registry (if any).
+    - digests: Digests ('<algorithm>:<hex>') of the only artifacts to
+      download, for lockfiles recording hashes without urls (if any).
+    """
+
+    package: Package
+    artifacts: List[LockedArtifact] = field(default_factory=list)
+    digests: Set[str] = field(default_factory=set)
+
+    @property
+    def query(self) -> str:
+        return f"{self.package.ecosystem}://{self.package.name}@{self.package.version}"
+
+    def to_component(self) -> Component:
+        """
+        Make component from what the lockfile records, for packages with artifacts.
+        """
+        return Component(
+            name=self.package.name,
+            version=self.package.version,
+            registry_url=None,
+            homepage_url=None,
+            description=None,
+            declared_licenses=None,
+            raw={"artifacts": [asdict(artifact) for artifact in self.artifacts]},
+        )
+
+
+def _load_toml(text: str) -> dict:
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise ImportError(
+                "reading toml lockfiles requires python 3.11+, or tomli package"
+            ) from None
+
+    return tomllib.loads(text)
+
+
+REQUIREMENT = re.compile(
+    r"^([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*===?\s*([^\s;,\\]+)"
+)
+REQUIREMENT_HASH = re.compile(r"--hash[=\s]\s*([A-Za-z0-9]+:[0-9a-fA-F]+)")
+
+
+def read_requirements(text: str) -> Iterator[LockedPackage]:
+    """
+    Read requirements pinned with ==, and their hashes (if any).
+    """
+    for line in re.sub(r"\\\r?\n", " ", text).splitlines():
+        line = re.sub(r"(^|\s)#.*$", "", line).strip()
+        match = REQUIREMENT.match(line)
+        if match is None:
+            continue
+
+        name, version = match.groups()
+        digests = {digest.lower() for digest in REQUIREMENT_HASH.findall(line)}
+        yield LockedPackage(Package("pip", name, version), digests=digests)
+
+
+def read_poetry_lock(text: str) -> Iterator[LockedPackage]:
+    """
+    Read packages from pypi, and hashes of their files.
+    """
+    data = _load_toml(text)
+    legacy_files = data.get("metadata", {}).get("files", {})
+
+    for entry in data.get("package", []):
+        source_type = entry.get("source", {}).get("type")
+        if source_type is not None:
+            logger.debug(f"skipping {entry['name']} from {source_type} source")
+            continue
+
+        files = entry.get("files") or legacy_files.get(entry["name"], [])
+        digests = {file["hash"].lower() for file in files if "hash" in file}
+        package = Package("pip", entry["name"], entry["version"])
+        yield LockedPackage(package, digests=digests)
+
+
+def read_package_lock(text: str) -> Iterator[LockedPackage]:
+    """
+    Read packages from npm lockfile (version 1, 2, and 3).
+    """
+    data = json.loads(text)
+
+    def mk_locked(name: str, entry: dict) -> Optional[LockedPackage]:
+        if entry.get("link") or not entry.get("version"):
+            return None
+
+        package = Package("npm", name, entry["version"])
+        resolved = entry.get("resolved")
+        if resolved is None:
+            return LockedPackage(package)
+
+        digest = from_sri(entry.get("integrity"))
+        return LockedPackage(package, [LockedArtifact("src", resolved, digest)])
+
+    packages = data.get("packages")
+    if packages is not None:
+        for path, entry in packages.items():
+            if "node_modules/" not in path:
+                continue
+
+            locked = mk_locked(path.rsplit("node_modules/", 1)[1], entry)
+            if locked is not None:
+                yield locked
+        return
+
+    def walk(dependencies: Dict[str, dict]) -> Iterator[LockedPackage]:
+        for name, entry in dependencies.items():
+            locked = mk_locked(name, entry)
+            if locked is not None:
+                yield locked
+            yield from walk(entry.get("dependencies", {}))
+
+    yield from walk(data.get("dependencies", {}))
+
+
+def read_cargo_lock(text: str) -> Iterator[LockedPackage]:
+    """
+    Read crates from crates.io (workspace, git, and other registries are skipped).
+    """
+    for entry in _load_toml(text).get("package", []):
+        if entry.get("source") not in CRATES_IO_SOURCES:
+            continue
+
+        name, version = entry["name"], entry["version"]
+        url = mk_download_url(name, version)
+        digest = from_hex("sha256", entry.get("checksum"))
+        yield LockedPackage(
+            Package("cargo", name, version), [LockedArtifact("src", url, digest)]
+        )
+
+
+GEM_SPEC = re.compile(r"^    (\S+) \(([^)]+)\)$")
+GEM_CHECKSUM = re.compile(r"^  (\S+) \(([^)]+)\)(?: sha256=([0-9a-fA-F]+))?")
+
+
+def read_gemfile_lock(text: str) -> Iterator[LockedPackage]:
+    """
+    Read gems from GEM sections, with their checksums (Bundler 2.5+).
+
+    Gems locked for several platforms are read as one package, with the
+    gem of each platform as its artifacts.
+    """
+    specs, checksums = [], {}
+    section, remote = None, None
+    for line in text.splitlines():
+        if line and not line[0].isspace():
+            section = line.strip()
+            continue
+
+        if section == "GEM":
+            if line.strip().startswith("remote:"):
+                remote = line.split(":", 1)[1].strip()
+                continue
+
+            match = GEM_SPEC.match(line)
+            if match is not None and remote is not None:
+                specs.append((remote, *match.groups()))
+        elif section == "CHECKSUMS":
+            match = GEM_CHECKSUM.match(line)
+            if match is not None:
+                name, full_version, sha256 = match.groups()
+                checksums[(name, full_version)] = from_hex("sha256", sha256)
+
+    # platform specific gems are locked as <version>-<platform>, each
+    # platform's gem is an artifact of the same package
+    packages: Dict[Tuple[str, str, str], LockedPackage] = {}
+    for remote, name, full_version in specs:
+        version = full_version.split("-", 1)[0]
+        url = f"{remote.rstrip('/')}/gems/{name}-{full_version}.gem"
+        digest = checksums.get((name, full_version))
+        locked = packages.get((remote, name, version))
+        if locked is None:
+            locked = packages[(remote, name, version)] = LockedPackage(
+                Package("gem", name, version)
+            )
+        locked.artifacts.append(LockedArtifact("src", url, digest))
+
+    yield from packages.values()
+
+
+def read_composer_lock(text: str) -> Iterator[LockedPackage]:
+    """
+    Read packages (including dev packages), with their dist archives.
+    """
+    data = json.loads(text)
+    for entry in data.get("packages", []) + data.get("packages-dev", []):
+        package = Package("composer", entry["name"], entry["version"])
+        dist = entry.get("dist") or {}
+        if not dist.get("url"):
+            yield LockedPackage(package)
+            continue
+
+        digest = from_hex("sha1", dist.get("shasum"))
+        yield LockedPackage(package, [LockedArtifact("src", dist["url"], digest)])
+
+
+def read_nuget_lock(text: str) -> Iterator[LockedPackage]:
+    """
+    Read packages of all target frameworks (project references are skipped).
+
+    Packages are downloaded from nuget.org, as lockfile does not record
+    the source of packages.
+    """
+    data = json.loads(text)
+    for dependencies in data.get("dependencies", {}).values():
+        for name, entry in dependencies.items():
+            version = entry.get("resolved")
+            if entry.get("type") == "Project" or not version:
+                continue
+
+            lower_name, lower_version = name.lower(), version.lower()
+            url = (
+                f"{NUGET_FLAT_CONTAINER}/{lower_name}/{lower_version}/"
+                f"{lower_name}.{lower_version}.nupkg"
+            )
+            digest = from_base64("sha512", entry.get("contentHash"))
+            yield LockedPackage(
+                Package("nuget", name, version), [LockedArtifact("src", url, digest)]
+            )
+
+
+READERS: Dict[str, Callable[[str], Iterator[LockedPackage]]] = {
+    "requirements.txt": read_requirements,
+    "poetry.lock": read_poetry_lock,
+    "package-lock.json": read_package_lock,
+    "npm-shrinkwrap.json": read_package_lock,
+    "Cargo.lock": read_cargo_lock,
+    "Gemfile.lock": read_gemfile_lock,
+    "composer.lock": read_composer_lock,
+    "packages.lock.json": read_nuget_lock,
+}
+
+
+def get_reader(path: str) -> Callable[[str], Iterator[LockedPackage]]:
+    """
+    Get reader for the lockfile, by its file name.
+
+    Any other *.txt file (e.g. requirements-dev.txt) is read as requirements.
+    """
+    name = os.path.basename(path)
+    if name in READERS:
+        return READERS[name]
+    if name.endswith(".txt"):
+        return read_requirements
+
+    raise ValueError(f"Unsupported lockfile: {path}")
+
+
+def read(path: str) -> Iterator[LockedPackage]:
+    """
+    Read pinned packages from the lockfile.
+
+    Parameters:
+    - path: Path of the lockfile.
+
+    Returns:
+    - Iterator of LockedPackage.
+    """
+    reader = get_reader(path)
+    with open(path, "r", encoding="utf-8") as file:
+        text = file.read()
+
+    return reader(text)
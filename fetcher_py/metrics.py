@@ -0,0 +1,328 @@
+"""Metrics of fetching, in Prometheus text exposition format.
+
+Time is measured per phase, and per registry (ecosystem of the package):
+
+    resolve    version resolution, of missing versions, 'latest', and ranges
+               (Registry.get_default)
+    metadata   metadata fetch (Registry.get, excluding resolve)
+    download   transfer of a single artifact (Downloader.download_file)
+    zip        assembly of the output archive
+    write      write of the output archive to disk (Fetcher.download)
+
+Phases are exclusive, time spent in a nested phase is not counted by the
+enclosing one. Downloads run concurrently, so their total can exceed wall
+clock time.
+
+Metrics are exported with Metrics.write_textfile (e.g. for node_exporter's
+textfile collector), or served over HTTP with Metrics.serve.
+"""
+
+import bisect
+import contextlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+UNKNOWN_REGISTRY = "unknown"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_local = threading.local()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return f"{{{pairs}}}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        """
+        Monotonically increasing value, per combination of labels.
+
+        :param name: Name of the metric.
+        :param help: Description of the metric.
+        :param labelnames: Names of the labels.
+        """
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        """
+        Distribution of observed values, per combination of labels.
+
+        :param name: Name of the metric.
+        :param help: Description of the metric.
+        :param labelnames: Names of the labels.
+        :param buckets: Upper bounds of buckets (+Inf is implied).
+        """
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per labels: count per bucket (last one is +Inf), and sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0], [0.0]))
+            return sum(counts)
+
+    def sum(self, **labels) -> float:
+        with self._lock:
+            _, total = self._values.get(self._key(labels), ([0], [0.0]))
+            return total[0]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    labels = _format_labels(names, key + (_format_value(bound),))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total[0])}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def current_registry() -> str:
+    """
+    Registry of the innermost phase (or registry scope) of this thread.
+    """
+    stack = getattr(_local, "stack", None)
+    return stack[-1][0] if stack else UNKNOWN_REGISTRY
+
+
+class Metrics:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Metrics of fetching, shared through Options.
+
+        :param buckets: Upper bounds (in seconds) of latency histogram buckets.
+        """
+        self.phase_seconds = Histogram(
+            "fetcher_py_phase_seconds",
+            "Time spent per phase, and registry.",
+            ["registry", "phase"],
+            buckets,
+        )
+        self.downloaded_bytes = Counter(
+            "fetcher_py_downloaded_bytes_total",
+            "Bytes of artifacts transferred (cache hits are not counted).",
+            ["registry"],
+        )
+        self.http_request_seconds = Histogram(
+            "fetcher_py_http_request_seconds",
+            "Time to response headers, per host.",
+            ["host"],
+            buckets,
+        )
+        self.http_responses = Counter(
+            "fetcher_py_http_responses_total",
+            "HTTP responses, per host, and status code.",
+            ["host", "status"],
+        )
+        self.http_retries = Counter(
+            "fetcher_py_http_retries_total",
+            "Requests retried after a throttled (429, 503) response, per host.",
+            ["host"],
+        )
+        self.cache_requests = Counter(
+            "fetcher_py_cache_requests_total",
+            "Cache lookups, per cache (artifact, http, component), and result (hit, miss, revalidated).",
+            ["cache", "result"],
+        )
+
+    @property
+    def all(self) -> List[object]:
+        return [
+            self.phase_seconds,
+            self.downloaded_bytes,
+            self.http_request_seconds,
+            self.http_responses,
+            self.http_retries,
+            self.cache_requests,
+        ]
+
+    @contextlib.contextmanager
+    def phase(self, phase: Optional[str], registry: Optional[str] = None):
+        """
+        Measure time spent in the phase, excluding nested phases.
+
+        :param phase: Name of the phase, when None, only registry is scoped
+                      (for nested phases, which do not know their registry).
+        :param registry: Registry label (default is the enclosing one's).
+        """
+        registry = registry or current_registry()
+        if not hasattr(_local, "stack"):
+            _local.stack = []
+
+        # [registry, seconds spent in nested phases]
+        frame = [registry, 0.0]
+        _local.stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _local.stack.pop()
+            if phase is not None:
+                self.phase_seconds.observe(
+                    elapsed - frame[1], registry=registry, phase=phase
+                )
+                if _local.stack:
+                    _local.stack[-1][1] += elapsed
+            elif _local.stack:
+                _local.stack[-1][1] += frame[1]
+
+    def render(self) -> str:
+        """
+        Render all metrics in Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self.all:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        """
+        Atomically write metrics to path (e.g. for node_exporter's textfile collector).
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        with os.fdopen(fd, "w") as file:
+            file.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serve metrics over HTTP (at any path), from a daemon thread.
+
+        :param port: The port to listen on (0 picks a free one).
+        :param host: The address to listen on.
+        :return: The server, stop it with shutdown().
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        logger.debug(f"serving metrics on {host}:{server.server_address[1]}")
+        return server
+
+
+@contextlib.contextmanager
+def _scope(registry: Optional[str]):
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+
+    _local.stack.append([registry or current_registry(), 0.0])
+    try:
+        yield
+    finally:
+        _local.stack.pop()
+
+
+def timed(metrics: Optional[Metrics], phase: Optional[str], registry=None):
+    """
+    Metrics.phase, or only scope of the registry (for current_registry, used
+    by hooks) when metrics are disabled.
+    """
+    if metrics is None:
+        return _scope(registry)
+    return metrics.phase(phase, registry)
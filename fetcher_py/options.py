@@ -0,0 +1,142 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from fetcher_py.archive import DEFAULT_MAX_MEMORY, SpooledArchive
+from fetcher_py.budget import ByteBudget
+from fetcher_py.cache import ArtifactCache
+from fetcher_py.component import RAW_LAZY
+from fetcher_py.compression import CompressionPolicy
+from fetcher_py.hooks import Hooks
+from fetcher_py.httpcache import HttpCache
+from fetcher_py.metrics import Metrics
+from fetcher_py.ratelimit import RateLimiter
+from fetcher_py.selection import Selection
+from fetcher_py.store import ComponentStore
+from fetcher_py.ttlcache import DEFAULT_TTL
+
+
+@dataclass
+class Options:
+    """
+    Tunables shared by Fetcher, registries, and Downloader.
+
+    Parameters:
+    - max_memory: Bytes of an output archive kept in memory, before it
+      is spilled over to a temporary file.
+    - spool_dir: Directory for spilled archives (default is the system
+      temp directory). When on the same filesystem as the destination,
+      Fetcher.download moves the archive instead of copying it.
+    - segments: Number of concurrent byte ranges used to download a
+      single artifact. Values above 1 probe each artifact with HEAD
+      request, and split artifacts of at least segment_threshold bytes
+      when the server accepts byte ranges.
+    - segment_threshold: Minimum size of an artifact to be segmented.
+    - retries: Number of times a byte range is resumed after a failure.
+    - cache: Content-addressed artifact cache, checked before downloading
+      any artifact (default is no cache).
+    - http_cache: Persistent HTTP cache for registry metadata, revalidated
+      with conditional requests (default is no cache).
+    - max_threads: Size of the thread pool, the async API (Fetcher.aget,
+      Registry.araw, Downloader.aget_as_zipped) runs blocking calls on.
+      Requests are still made with requests, so this also bounds requests
+      in flight (one thread each, see fetcher_py.aio).
+    - pool_connections: Number of hosts, whose connection pools are kept
+      by the session's adapters.
+    - pool_maxsize: Maximum number of connections kept alive per host.
+      Should be at least the number of concurrent downloads (threads of
+      Downloader, times segments), otherwise extra connections are
+      discarded after use instead of being reused.
+    - pool_block: Whether to wait for a free connection when a host's pool
+      is exhausted, instead of opening an extra one.
+    - tcp_keepalive: Whether to enable TCP keep-alive on pooled connections.
+    - rate_limiter: Per-host rate limiter, retrying 429 and 503 responses
+      (default limits registries with published limits only, set to None
+      to disable).
+    - compression: Compression policy of output archives (default stores
+      already compressed artifacts, and deflates the rest at level 6).
+    - selection: Artifacts to download, by kind, python tag, and platform
+      (default is every artifact listed by the registry).
+    - budget: Maximum bytes per artifact, and in total, downloaded by
+      everything using these options (default is unlimited).
+    - metrics: Per-phase, and per-registry metrics (latency, bytes, HTTP
+      statuses, retries, cache hits), exported in Prometheus text format
+      (default is no metrics).
+    - hooks: Callbacks for start, error, and finish of spans around network
+      calls (registry calls, artifact downloads, git clones, and OCI blob
+      pulls), default is no hooks.
+    - service_ttl: Seconds registries kept by Fetcher reuse service state,
+      which is costly to set up (NuGet service index, and registrations,
+      authenticated OCI clients), before refreshing it (None never
+      refreshes, 0 disables caching).
+    - versions_ttl: Seconds releases of a package, listed to resolve
+      version ranges, and latest versions, are reused by registries kept
+      by Fetcher (None never refreshes, 0 disables caching).
+    - store: Persistent store of components, serving metadata of exact
+      versions (pinned, or once resolved) without asking the registry
+      (default is no store).
+    - component_raw: How raw metadata of components returned by Fetcher is
+      kept: 'lazy' as bytes of the response (when the registry keeps them),
+      decoded on first access, 'compressed' as compressed bytes, decoded on
+      first access, or 'lean' dropped once artifacts are downloaded, or
+      planned (typed fields only).
+    - max_downloads: Maximum number of artifact downloads in flight, across
+      every package (and call) using these options, e.g. all packages of
+      Fetcher.download_many (default matches pool_maxsize).
+    """
+
+    max_memory: int = DEFAULT_MAX_MEMORY
+    spool_dir: Optional[str] = None
+    segments: int = 1
+    segment_threshold: int = 16 * 1024 * 1024
+    retries: int = 3
+    cache: Optional[ArtifactCache] = None
+    http_cache: Optional[HttpCache] = None
+    max_threads: int = 256
+    pool_connections: int = 10
+    pool_maxsize: int = 32
+    pool_block: bool = False
+    tcp_keepalive: bool = True
+    rate_limiter: Optional[RateLimiter] = field(default_factory=RateLimiter)
+    compression: CompressionPolicy = field(default_factory=CompressionPolicy)
+    selection: Optional[Selection] = None
+    budget: Optional[ByteBudget] = None
+    metrics: Optional[Metrics] = None
+    hooks: Optional[Hooks] = None
+    service_ttl: Optional[float] = DEFAULT_TTL
+    versions_ttl: Optional[float] = 300.0
+    store: Optional[ComponentStore] = None
+    component_raw: str = RAW_LAZY
+    max_downloads: int = 32
+
+    _executor: Optional[ThreadPoolExecutor] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _download_slots: Optional[threading.BoundedSemaphore] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _executor_lock = threading.Lock()
+
+    def mk_archive(self) -> SpooledArchive:
+        return SpooledArchive(self.max_memory, self.spool_dir)
+
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        Thread pool used by the async API, created on first use.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_threads, thread_name_prefix="fetcher_py"
+                )
+            return self._executor
+
+    def download_slots(self) -> threading.BoundedSemaphore:
+        """
+        Semaphore of max_downloads slots, held by each artifact download.
+        """
+        with self._executor_lock:
+            if self._download_slots is None:
+                self._download_slots = threading.BoundedSemaphore(self.max_downloads)
+            return self._download_slots
@@ -0,0 +1,143 @@
+"""Download plans (dry-run).
+
+A plan lists artifacts a download would fetch, with their sizes, taken
+from registry metadata when published, or from Content-Length of a HEAD
+request otherwise, without downloading any artifact.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+import requests
+
+from fetcher_py.budget import BudgetExceededError
+from fetcher_py.component import Component
+from fetcher_py.package import Package
+
+logger = logging.getLogger(__name__)
+
+
+def head_size(session: requests.Session, url: str) -> Optional[int]:
+    """
+    Get size of the artifact from Content-Length of a HEAD request.
+
+    :return: Size in bytes, or None if it is not known.
+    """
+    try:
+        resp = session.head(url, allow_redirects=True)
+    except requests.RequestException as e:
+        logger.debug(f"could not get size of {url}: {e}")
+        return None
+
+    content_length = resp.headers.get("Content-Length", "")
+    if not resp.ok or not content_length.isdigit():
+        return None
+
+    return int(content_length)
+
+
+@dataclass
+class PlannedArtifact:
+    """
+    Artifact a download would fetch.
+
+    Parameters:
+    - kind: The kind of the artifact (e.g. sdist, src).
+    - url: The URL of the artifact.
+    - size: Size in bytes (None if not known).
+    - rejected: Why the artifact would not be downloaded (e.g. it is above
+      the budget), None if it would.
+    """
+
+    kind: str
+    url: str
+    size: Optional[int] = None
+    rejected: Optional[str] = None
+
+
+def plan_artifact(
+    options,
+    session: requests.Session,
+    kind: str,
+    url: str,
+    size: Optional[int] = None,
+) -> PlannedArtifact:
+    """
+    Plan artifact, getting its size with a HEAD request when not known,
+    and checking it against the budget of options.
+    """
+    if size is None:
+        size = head_size(session, url)
+
+    rejected = None
+    if options.budget is not None and size is not None:
+        try:
+            options.budget.check(url, size)
+        except BudgetExceededError as e:
+            rejected = str(e)
+
+    return PlannedArtifact(kind, url, size, rejected)
+
+
+@dataclass
+class Plan:
+    """
+    Artifacts a download of a package would fetch.
+
+    Parameters:
+    - package: The package planned.
+    - component: Component the package was resolved to.
+    - artifacts: Artifacts, including the rejected ones.
+    """
+
+    package: Package
+    component: Component
+    artifacts: List[PlannedArtifact] = field(default_factory=list)
+
+    @property
+    def size(self) -> int:
+        """
+        Known bytes of artifacts which would be downloaded.
+        """
+        return sum(a.size or 0 for a in self.artifacts if a.rejected is None)
+
+    @property
+    def unknown(self) -> int:
+        """
+        Number of artifacts which would be downloaded, whose size is not known.
+        """
+        return sum(1 for a in self.artifacts if a.rejected is None and a.size is None)
+
+
+@dataclass
+class Totals:
+    """
+    Totals of many plans (rejected artifacts are counted, but not sized).
+    """
+
+    packages: int = 0
+    artifacts: int = 0
+    rejected: int = 0
+    unknown: int = 0
+    size: int = 0
+
+    def add(self, plan: Plan):
+        self.packages += 1
+        self.artifacts += sum(1 for a in plan.artifacts if a.rejected is None)
+        self.rejected += sum(1 for a in plan.artifacts if a.rejected is not None)
+        self.unknown += plan.unknown
+        self.size += plan.size
+
+
+def summarize(plans: Iterable[Plan]) -> Dict[str, Totals]:
+    """
+    Total plans per ecosystem.
+
+    Returns:
+    - Mapping of ecosystem to its Totals.
+    """
+    totals: Dict[str, Totals] = {}
+    for plan in plans:
+        totals.setdefault(plan.package.ecosystem, Totals()).add(plan)
+    return totals
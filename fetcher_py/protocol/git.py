@@ -1,11 +1,13 @@
-import io
 import os
 import tempfile
 from typing import Optional, Tuple
 import zipfile
 from fetcher_py.component import Component
 from fetcher_py.package import Package
-from fetcher_py.registry._registry import Registry
+from fetcher_py.archive import SpooledArchive
+from fetcher_py.hooks import trace
+from fetcher_py.options import Options
+from fetcher_py.registry._registry import Registry, instrumented
 from requests import Session
 from git import Repo
 
@@ -15,18 +17,24 @@ class GitRegistry(Registry):
         self,
         session: Session,
         base_url: Optional[str] = None,
+        options: Optional[Options] = None,
     ):
-        super().__init__(session, base_url)
+        super().__init__(session, base_url, options)
 
     def reachable(self):
         raise NotImplementedError()
 
+    def _clone(self, entry: Package, temp_dir: str) -> Repo:
+        with trace(self.options.hooks, "git.clone", url=entry.name, ref=entry.version):
+            return Repo.clone_from(
+                entry.name, temp_dir, branch=entry.version, single_branch=True
+            )
+
+    @instrumented("metadata")
     def get(self, entry: Package) -> Component:
         data = None
         with tempfile.TemporaryDirectory() as temp_dir:
-            repo = Repo.clone_from(
-                entry.name, temp_dir, branch=entry.version, single_branch=True
-            )
+            repo = self._clone(entry, temp_dir)
             try:
                 if entry.version:
                     repo.git.checkout(entry.version)
@@ -46,13 +54,12 @@ class GitRegistry(Registry):
 
         return Component(**data)
 
-    def raw(self, entry: Package) -> Tuple[Component, bytes]:
-        zip_data = io.BytesIO()
+    @instrumented(None)
+    def raw(self, entry: Package) -> Tuple[Component, SpooledArchive]:
+        zip_data = self.options.mk_archive()
 
         with tempfile.TemporaryDirectory() as temp_dir:
-            repo = Repo.clone_from(
-                entry.name, temp_dir, branch=entry.version, single_branch=True
-            )
+            repo = self._clone(entry, temp_dir)
             try:
                 if entry.version:
                     repo.git.checkout(entry.version)
@@ -74,10 +81,11 @@ class GitRegistry(Registry):
                     for file in files:
                         file_path = os.path.join(root, file)
                         arcname = os.path.relpath(file_path, temp_dir)
-                        zip_file.write(file_path, arcname=arcname)
+                        self.options.compression.write(zip_file, file_path, arcname)
 
             return Component(**data), zip_data
 
-    def download(self, entry: Package) -> io.BytesIO:
+    @instrumented(None)
+    def download(self, entry: Package) -> SpooledArchive:
         _, io_bytes = self.raw(entry)
         return io_bytes
@@ -1,11 +1,11 @@
-import io
 from typing import Optional, Tuple
 
 import requests
 from fetcher_py.component import Component
 from fetcher_py.package import Package
-from fetcher_py.downloader import Downloader
-from fetcher_py.registry._registry import Registry
+from fetcher_py.archive import SpooledArchive
+from fetcher_py.options import Options
+from fetcher_py.registry._registry import Registry, instrumented
 from requests import Session
 
 
@@ -14,8 +14,9 @@ class UrlRegistry(Registry):
         self,
         session: Session,
         base_url: Optional[str] = None,
+        options: Optional[Options] = None,
     ):
-        super().__init__(session, base_url)
+        super().__init__(session, base_url, options)
 
     def reachable(self):
         try:
@@ -24,9 +25,11 @@ class UrlRegistry(Registry):
         except requests.ConnectionError:
             return False
 
+    @instrumented("resolve")
     def get_default(self, entry: Package) -> str:
         raise NotImplementedError("There can be no versioning for url based package")
 
+    @instrumented("metadata")
     def get(self, entry: Package) -> Component:
         resp = self.session.get(f"{entry.ecosystem}://{entry.name}")
         resp.raise_for_status()
@@ -42,15 +45,13 @@ class UrlRegistry(Registry):
 
         return Component(**data)
 
-    def raw(self, entry: Package) -> Tuple[Component, bytes]:
+    @instrumented(None)
+    def raw(self, entry: Package) -> Tuple[Component, SpooledArchive]:
         component = self.get(entry)
-        downloader = Downloader()
-        for kind, url in self.get_artifact_urls(component):
-            downloader.add(kind, url)
+        return component, self._mk_downloader(component).get_as_zipped()
 
-        return component, downloader.get_as_zipped()
-
-    def download(self, entry: Package) -> io.BytesIO:
+    @instrumented(None)
+    def download(self, entry: Package) -> SpooledArchive:
         _, io_bytes = self.raw(entry)
         return io_bytes
 
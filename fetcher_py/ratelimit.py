@@ -0,0 +1,225 @@
+"""Per-host rate limiting, with Retry-After aware backoff.
+
+Requests to each host are paced with a token bucket (when the host has a
+rate), and responses asking to slow down (429, and 503) are retried after
+pausing all requests to the host, for as long as Retry-After asks, or for
+an exponential backoff with jitter when it is absent.
+"""
+
+import email.utils
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from fetcher_py.adapters import PooledAdapter
+from fetcher_py.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 503)
+
+# published limits of registries, in requests per second
+DEFAULT_RATES = {
+    # https://crates.io/data-access#api
+    "crates.io": 1.0,
+}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse Retry-After header, given in seconds or as HTTP date.
+
+    :param value: Value of the Retry-After header.
+    :return: Seconds to wait, or None if header is missing or invalid.
+    """
+    if not value:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Token bucket, refilled at rate tokens per second, up to burst tokens.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token, going in debt when the bucket is empty.
+
+        :return: Seconds to wait before the token can be used.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        rates: Optional[Dict[str, float]] = None,
+        default_rate: Optional[float] = None,
+        burst: int = 1,
+        retries: int = 5,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 60.0,
+        max_retry_after: float = 300.0,
+    ):
+        """
+        Initialize the rate limiter, shared by all threads using a session.
+
+        :param rates: Requests per second, by host (default is DEFAULT_RATES).
+        :param default_rate: Requests per second for other hosts (default is unlimited).
+        :param burst: Number of requests a host's bucket can hold.
+        :param retries: Number of times a 429, or 503 response is retried.
+        :param backoff_factor: Backoff (in seconds) of the first retry without Retry-After,
+                               which doubles for every following retry.
+        :param max_backoff: Maximum backoff in seconds.
+        :param max_retry_after: Retry-After (in seconds) above which response is not retried.
+        """
+        self.rates = DEFAULT_RATES if rates is None else rates
+        self.default_rate = default_rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+
+        self._buckets: Dict[str, Optional[TokenBucket]] = {}
+        self._paused_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host: str) -> Optional[TokenBucket]:
+        with self._lock:
+            if host not in self._buckets:
+                rate = self.rates.get(host, self.default_rate)
+                self._buckets[host] = TokenBucket(rate, self.burst) if rate else None
+            return self._buckets[host]
+
+    def acquire(self, host: str):
+        """
+        Block until a request to the host is allowed.
+        """
+        while True:
+            with self._lock:
+                pause = self._paused_until.get(host, 0.0) - time.monotonic()
+            if pause <= 0:
+                break
+            time.sleep(pause)
+
+        bucket = self._bucket(host)
+        if bucket is not None:
+            wait = bucket.reserve()
+            if wait > 0:
+                time.sleep(wait)
+
+    def pause(self, host: str, seconds: float):
+        """
+        Pause all requests to the host for seconds (pauses only ever extend).
+        """
+        with self._lock:
+            until = time.monotonic() + seconds
+            self._paused_until[host] = max(self._paused_until.get(host, 0.0), until)
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Exponential backoff with full jitter, for the attempt (starting at 0).
+        """
+        return random.uniform(
+            0, min(self.max_backoff, self.backoff_factor * (2**attempt))
+        )
+
+    def retry_delay(self, response: requests.Response, attempt: int) -> Optional[float]:
+        """
+        Seconds to wait before retrying the response, or None if it is not retried.
+        """
+        if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+            return None
+
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is None:
+            return self.backoff(attempt)
+
+        if retry_after > self.max_retry_after:
+            return None
+
+        return retry_after
+
+
+class RateLimitedAdapter(PooledAdapter):
+    def __init__(
+        self,
+        limiter: Optional[RateLimiter] = None,
+        metrics: Optional[Metrics] = None,
+        **kwargs,
+    ):
+        """
+        PooledAdapter, which paces requests, and retries throttled responses.
+
+        :param limiter: The limiter to use, when None, requests are not limited.
+        :param metrics: Metrics to record latency, statuses, and retries to (if any).
+        :param kwargs: Passed to PooledAdapter.
+        """
+        self.limiter = limiter
+        self.metrics = metrics
+        super().__init__(**kwargs)
+
+    def _send(self, host: str, request, **kwargs):
+        metrics = getattr(self, "metrics", None)
+        if metrics is None:
+            return super().send(request, **kwargs)
+
+        start = time.perf_counter()
+        response = super().send(request, **kwargs)
+        metrics.http_request_seconds.observe(time.perf_counter() - start, host=host)
+        metrics.http_responses.inc(host=host, status=str(response.status_code))
+        return response
+
+    def send(self, request, **kwargs):
+        host = urlparse(request.url).hostname or ""
+        limiter = getattr(self, "limiter", None)
+        if limiter is None:
+            return self._send(host, request, **kwargs)
+
+        attempt = 0
+        while True:
+            limiter.acquire(host)
+            response = self._send(host, request, **kwargs)
+
+            delay = limiter.retry_delay(response, attempt)
+            if delay is None:
+                return response
+
+            logger.debug(
+                f"{host} responded {response.status_code}, pausing for {delay:.2f}s"
+            )
+            response.close()
+            if getattr(self, "metrics", None) is not None:
+                self.metrics.http_retries.inc(host=host)
+            limiter.pause(host, delay)
+            attempt += 1
@@ -1,14 +1,107 @@
+import functools
+import logging
 from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Set, Tuple
 from requests import Session
-from fetcher_py.component import Component
+from fetcher_py import aio
+from fetcher_py.archive import SpooledArchive
+from fetcher_py.component import Component, Dependency
+from fetcher_py.downloader import Downloader
+from fetcher_py.hooks import trace
+from fetcher_py.metrics import timed
+from fetcher_py.options import Options
 
 from fetcher_py.package import Package
+from fetcher_py.plan import Plan, plan_artifact
+from fetcher_py.ttlcache import TTLCache
+from fetcher_py.versions import Release, is_pinned, is_release, select
+
+logger = logging.getLogger(__name__)
+
+
+def instrumented(phase: Optional[str]):
+    """
+    Decorate a method of a registry (taking the package), to trace it as a
+    span, and time it as phase.
+
+    Parameters:
+    - phase: Phase of metrics, None only scopes the registry label (e.g. of
+      downloads, and archive assembly nested in the method).
+    """
+
+    def decorator(method):
+        name = f"registry.{method.__name__}"
+
+        @functools.wraps(method)
+        def wrapper(self, entry: Package, *args, **kwargs):
+            package = f"{entry.ecosystem}://{entry.name}@{entry.version}"
+            attributes = dict(package=package, ecosystem=entry.ecosystem)
+            with timed(self.options.metrics, phase, entry.ecosystem):
+                with trace(self.options.hooks, name, **attributes) as span:
+                    result = method(self, entry, *args, **kwargs)
+                    # version is resolved by the call, when it was not given
+                    span.set(
+                        "package", f"{entry.ecosystem}://{entry.name}@{entry.version}"
+                    )
+                    return result
+
+        return wrapper
+
+    return decorator
+
+
+def stored(method):
+    """
+    Decorate get of a registry, to read components from Options.store, and
+    write fetched ones to it. Only releases are stored, dist-tags and
+    branches (e.g. npm's next, composer's dev-main) move, so they are
+    always fetched (the release a dist-tag points to is stored).
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, entry: Package) -> Component:
+        store = self.options.store
+        # versions of registries without a scheme are not known before get
+        if store is None or self.version_scheme is None:
+            return method(self, entry)
+
+        self.resolve(entry)
+        if is_release(self.version_scheme, entry.version):
+            component = store.get(
+                entry.ecosystem, entry.name, entry.version, self.base_url
+            )
+            metrics = self.options.metrics
+            if metrics is not None:
+                result = "miss" if component is None else "hit"
+                metrics.cache_requests.inc(cache="component", result=result)
+            if component is not None:
+                return component
+
+        component = method(self, entry)
+        # stored under the release returned (and the queried one, when spelled
+        # differently), never under a dist-tag or branch
+        if is_release(self.version_scheme, component.version):
+            for version in {entry.version, component.version}:
+                if is_release(self.version_scheme, version):
+                    store.put(entry.ecosystem, entry.name, version, component)
+        return component
+
+    return wrapper
 
 
 class Registry(ABC):
-    def __init__(self, session: Session, base_url: str):
+    # versioning scheme of ranges in queries (see fetcher_py.versions), None
+    # when versions are resolved by the registry itself
+    version_scheme: Optional[str] = None
+
+    def __init__(
+        self, session: Session, base_url: str, options: Optional[Options] = None
+    ):
         self.session = session
         self.base_url = base_url
+        self.options = options or Options()
+        # releases per package name
+        self._releases: TTLCache[List[Release]] = TTLCache(self.options.versions_ttl)
 
     @abstractmethod
     def reachable(self) -> bool:
@@ -21,3 +114,228 @@ class Registry(ABC):
     @abstractmethod
     def download(self, entry: Package) -> bytes:
         pass
+
+    def get_artifact_digests(self, component: Component) -> Dict[str, str]:
+        """
+        Get digests published by the registry for artifact urls.
+
+        Parameters:
+        - component: Component, whose artifacts are downloaded.
+
+        Returns:
+        - Mapping of artifact url to its digest ('<algorithm>:<hex>').
+        """
+        return {}
+
+    def get_artifact_sizes(self, component: Component) -> Dict[str, int]:
+        """
+        Get sizes published by the registry for artifact urls.
+
+        Parameters:
+        - component: Component, whose artifacts are downloaded.
+
+        Returns:
+        - Mapping of artifact url to its size in bytes.
+        """
+        return {}
+
+    def get_artifact_max_sizes(self, component: Component) -> Dict[str, int]:
+        """
+        Get upper bounds of sizes published by the registry for artifact urls,
+        of registries not publishing exact sizes. Bounds are only checked
+        against the artifact budget, bytes downloaded are charged instead.
+
+        Parameters:
+        - component: Component, whose artifacts are downloaded.
+
+        Returns:
+        - Mapping of artifact url to an upper bound of its size in bytes.
+        """
+        return {}
+
+    def get_dependencies(self, component: Component) -> List[Dependency]:
+        """
+        Get runtime dependencies declared by the package (development,
+        optional, and extra only dependencies are left out).
+
+        Parameters:
+        - component: Component returned by get for the package.
+
+        Returns:
+        - Dependencies in the same ecosystem, with their version ranges.
+        """
+        return []
+
+    def list_versions(self, name: str) -> List[Release]:
+        """
+        List releases of a package, as published by the registry.
+
+        Parameters:
+        - name: Name of the package.
+
+        Returns:
+        - Releases, including yanked ones (marked as such).
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not list versions")
+
+    def releases(self, name: str) -> List[Release]:
+        """
+        Releases of a package, listed once, and reused for Options.versions_ttl.
+        """
+        return self._releases.get(name, lambda: self.list_versions(name))
+
+    def resolve(self, entry: Package):
+        """
+        Resolve version of entry in place with get_default, when it is
+        missing, 'latest', or a range.
+        """
+        if not is_pinned(self.version_scheme, entry.version):
+            entry.version = self.get_default(entry)
+
+    def select_version(self, entry: Package) -> str:
+        """
+        Select the highest release matching version of entry (a range, or
+        latest when missing), skipping yanked releases.
+
+        Parameters:
+        - entry: The package, with a range, 'latest', or no version.
+
+        Returns:
+        - The version, as published.
+        """
+        version = select(self.version_scheme, self.releases(entry.name), entry.version)
+        if version is None:
+            raise ValueError(
+                f"could not find version of {entry.name} matching "
+                f"{entry.version or 'latest'}"
+            )
+        return version
+
+    def plan(self, entry: Package) -> Plan:
+        """
+        Plan download of a package, without downloading any artifact.
+
+        Parameters:
+        - entry: The package to plan.
+
+        Returns:
+        - Plan with artifacts, and their sizes.
+        """
+        return self.plan_component(entry, self.get(entry))
+
+    def plan_component(
+        self,
+        entry: Package,
+        component: Component,
+        only_digests: Optional[Set[str]] = None,
+    ) -> Plan:
+        """
+        Plan download of an already resolved component.
+
+        Artifacts are those download_component would fetch (per
+        Options.selection). Sizes are taken from the registry, or from a HEAD
+        request otherwise. Artifacts above Options.budget are marked as
+        rejected. Registries not listing artifacts with get_artifact_urls
+        plan no artifacts.
+
+        Parameters:
+        - entry: The package, component was resolved for.
+        - component: Component returned by get for the package.
+        - only_digests: Digests of the only artifacts to plan (default is all).
+
+        Returns:
+        - Plan with artifacts, and their sizes.
+        """
+        plan = Plan(entry, component)
+        if getattr(self, "get_artifact_urls", None) is None:
+            return plan
+
+        downloader = self._mk_downloader(component, only_digests)
+        for kind, urls in sorted(downloader.download_list.items()):
+            for url in sorted(urls):
+                plan.artifacts.append(
+                    plan_artifact(
+                        self.options, self.session, kind, url, downloader.sizes.get(url)
+                    )
+                )
+        return plan
+
+    async def aget(self, entry: Package) -> Component:
+        """
+        Get information about a package on a thread, without blocking the
+        event loop (see fetcher_py.aio).
+        """
+        return await aio.run(self.options, self.get, entry)
+
+    def _mk_downloader(
+        self, component: Component, only_digests: Optional[Set[str]] = None
+    ) -> Downloader:
+        """
+        Make Downloader for artifacts listed by get_artifact_urls.
+
+        When only_digests is given, artifacts whose published digest is not
+        one of them are skipped.
+        """
+        downloader = Downloader(self.options, self.session)
+        digests = self.get_artifact_digests(component)
+        sizes = self.get_artifact_sizes(component)
+        max_sizes = self.get_artifact_max_sizes(component)
+
+        for kind, url in self.get_artifact_urls(component):
+            if only_digests is not None and digests.get(url) not in only_digests:
+                logger.debug(f"skipping {url}, its digest is not locked")
+                continue
+            downloader.add(
+                kind, url, digests.get(url), sizes.get(url), max_sizes.get(url)
+            )
+
+        return downloader
+
+    def download_component(
+        self,
+        entry: Package,
+        component: Component,
+        only_digests: Optional[Set[str]] = None,
+    ) -> SpooledArchive:
+        """
+        Download artifacts of an already resolved component.
+
+        Registries not listing artifacts with get_artifact_urls run raw,
+        which resolves the component again.
+
+        Parameters:
+        - entry: The package, component was resolved for.
+        - component: Component returned by get for the package.
+        - only_digests: Digests ('<algorithm>:<hex>') of the only artifacts
+          to download (e.g. hashes locked by a lockfile), default is all.
+
+        Returns:
+        - SpooledArchive with zipped artifacts.
+        """
+        if getattr(self, "get_artifact_urls", None) is None:
+            _, io_bytes = self.raw(entry)
+            return io_bytes
+
+        with timed(self.options.metrics, None, entry.ecosystem):
+            return self._mk_downloader(component, only_digests).get_as_zipped()
+
+    async def araw(self, entry: Package) -> Tuple[Component, SpooledArchive]:
+        """
+        Retrieve component, and its artifacts on threads, without blocking
+        the event loop (see fetcher_py.aio).
+
+        Artifacts of registries listing them with get_artifact_urls are
+        downloaded with Downloader.aget_as_zipped, otherwise raw is run
+        on the executor. Listing artifacts (which may request metadata,
+        e.g. NuGet catalog leaves) runs on the executor as well.
+        """
+        if getattr(self, "get_artifact_urls", None) is None:
+            return await aio.run(self.options, self.raw, entry)
+
+        component = await self.aget(entry)
+        downloader = await aio.run(self.options, self._mk_downloader, component)
+        return component, await downloader.aget_as_zipped()
+
+    async def adownload(self, entry: Package) -> SpooledArchive:
+        _, io_bytes = await self.araw(entry)
+        return io_bytes
@@ -1,9 +1,10 @@
-import io
-from typing import Optional, Tuple
-from fetcher_py.component import Component
+from typing import Dict, List, Optional, Tuple
+from fetcher_py.component import Component, Dependency
 from fetcher_py.package import Package
-from fetcher_py.downloader import Downloader
-from ._registry import Registry
+from fetcher_py.archive import SpooledArchive
+from fetcher_py.options import Options
+from fetcher_py.integrity import from_hex
+from ._registry import Registry, instrumented
 from requests import Session
 
 
@@ -12,16 +13,18 @@ class BrewRegistry(Registry):
         self,
         session: Session,
         base_url: Optional[str] = None,
+        options: Optional[Options] = None,
     ):
         if base_url is None:
             base_url = "https://formulae.brew.sh/api/formula"
 
-        super().__init__(session, base_url)
+        super().__init__(session, base_url, options)
 
     def reachable(self):
         resp = self.session.head(self.base_url)
         return resp.ok
 
+    @instrumented("resolve")
     def get_default(self, entry: Package) -> str:
         resp = self.session.get(f"{self.base_url}/{entry.name}.json")
         resp.raise_for_status()
@@ -32,6 +35,7 @@ class BrewRegistry(Registry):
 
         return version
 
+    @instrumented("metadata")
     def get(self, entry: Package) -> Component:
         resp = self.session.get(f"{self.base_url}/{entry.name}.json")
         resp.raise_for_status()
@@ -45,19 +49,20 @@ class BrewRegistry(Registry):
             homepage_url=data.get("homepage"),
             description=data.get("desc"),
             declared_licenses=data.get("license"),
-            raw=data,
+            raw=resp.content,
         )
 
-    def raw(self, entry: Package) -> Tuple[Component, bytes]:
-        component = self.get(entry)
-        downloader = Downloader()
-
-        for kind, url in self.get_artifact_urls(component):
-            downloader.add(kind, url)
+    def get_dependencies(self, component: Component) -> List[Dependency]:
+        # formulae are not versioned, their dependencies neither
+        return [Dependency(name) for name in component.raw.get("dependencies") or []]
 
-        return component, downloader.get_as_zipped()
+    @instrumented(None)
+    def raw(self, entry: Package) -> Tuple[Component, SpooledArchive]:
+        component = self.get(entry)
+        return component, self._mk_downloader(component).get_as_zipped()
 
-    def download(self, entry: Package) -> io.BytesIO:
+    @instrumented(None)
+    def download(self, entry: Package) -> SpooledArchive:
         _, io_bytes = self.raw(entry)
         return io_bytes
 
@@ -65,3 +70,8 @@ class BrewRegistry(Registry):
         src_url = component.raw.get("urls", {}).get("stable", {}).get("url")
         if src_url:
             yield "src", src_url
+
+    def get_artifact_digests(self, component: Component) -> Dict[str, str]:
+        stable = component.raw.get("urls", {}).get("stable", {})
+        digest = from_hex("sha256", stable.get("checksum"))
+        return {stable["url"]: digest} if digest and stable.get("url") else {}
@@ -2,16 +2,19 @@
 
 TODO: Use Index Format (even for private??)
 TODO: Private registry custom format
-TODO: Check Rate limits
 TODO: Premptively download index
 """
-import io
+
 import json
-from typing import Optional, Tuple
-from fetcher_py.component import Component
+from typing import Dict, List, Optional, Tuple
+from fetcher_py.component import Component, Dependency
 from fetcher_py.package import Package
-from fetcher_py.downloader import Downloader
-from ._registry import Registry
+from fetcher_py.archive import SpooledArchive
+from fetcher_py.options import Options
+from fetcher_py.integrity import from_hex
+from fetcher_py.ttlcache import TTLCache
+from fetcher_py.versions import Release
+from ._registry import Registry, instrumented, stored
 from requests import Session
 from urllib.parse import urlparse
 
@@ -44,44 +47,79 @@ def get_host(url):
 
 
 class CargoRegistry(Registry):
-    def __init__(self, session: Session, base_url: Optional[str] = None):
+    version_scheme = "cargo"
+
+    def __init__(
+        self,
+        session: Session,
+        base_url: Optional[str] = None,
+        options: Optional[Options] = None,
+    ):
         base_url = base_url or DEFAULT_BASE_URL
-        super().__init__(session, base_url)
+        super().__init__(session, base_url, options)
+        # parsed index lines per crate name (crates.io only)
+        self._index: TTLCache[List[dict]] = TTLCache(self.options.versions_ttl)
 
     def reachable(self):
         resp = self.session.head(self.base_url)
         return resp.ok
 
-    def get_default(self, entry: Package) -> str:
-        resp = self.session.get(f"{self.base_url}/{entry.name}")
+    def _get_index(self, name: str) -> List[dict]:
+        resp = self.session.get(mk_index_url(name))
+        resp.raise_for_status()
+        return [
+            extract_version_from_index_line(line)[1]
+            for line in resp.text.splitlines()
+            if line.strip()
+        ]
+
+    def index(self, name: str, refresh: bool = False) -> List[dict]:
+        """
+        Lines of the crate in the sparse index, reused for Options.versions_ttl.
+        """
+        if refresh:
+            self._index.invalidate(name)
+        return self._index.get(name, lambda: self._get_index(name))
+
+    def list_versions(self, name: str) -> List[Release]:
+        if self.base_url == DEFAULT_BASE_URL:
+            return [
+                Release(line["vers"], bool(line.get("yanked")))
+                for line in self.index(name)
+            ]
+
+        resp = self.session.get(f"{self.base_url}/{name}")
         resp.raise_for_status()
         data = resp.json()
+        if isinstance(data, list):
+            return [Release(item["version"]) for item in data]
+        return [
+            Release(item["num"], bool(item.get("yanked")))
+            for item in data.get("versions", [])
+        ]
+
+    @instrumented("resolve")
+    def get_default(self, entry: Package) -> str:
+        return self.select_version(entry)
 
-        # Assume that the first version in the list is the default version
-        default_version = data[0]["version"]
-        return default_version
+    def _find_in_index(self, entry: Package, refresh: bool) -> Optional[dict]:
+        for line in self.index(entry.name, refresh):
+            if line.get("vers") == entry.version:
+                return dict(line, num=entry.version)
+        return None
 
+    @instrumented("metadata")
+    @stored
     def get(self, entry: Package) -> Component:
         data = None
-        if self.base_url == DEFAULT_BASE_URL and entry.version is not None:
-            index_url = mk_index_url(entry.name)
-            resp = self.session.get(index_url)
-            resp.raise_for_status()
-
-            for line in resp.text.splitlines():
-                version_from_line, raw = extract_version_from_index_line(line)
-                if version_from_line == entry.version:
-                    data = raw
-                    data["num"] = entry.version
-                    break
-
+        self.resolve(entry)
+        if self.base_url == DEFAULT_BASE_URL:
+            # cached index may predate the version, it is fetched again once
+            data = self._find_in_index(entry, False) or self._find_in_index(entry, True)
             if data is None:
                 raise ValueError(f"{entry.version} does not exist!")
 
         else:
-            if entry.version is None:
-                entry.version = self.get_default(entry)
-
             resp = self.session.get(f"{self.base_url}/{entry.name}/{entry.version}")
             resp.raise_for_status()
             data = resp.json()
@@ -96,15 +134,27 @@ class CargoRegistry(Registry):
             raw=data,
         )
 
-    def raw(self, entry: Package) -> Tuple[Component, bytes]:
+    def get_dependencies(self, component: Component) -> List[Dependency]:
+        dependencies = []
+        # only index entries list dependencies (not the api of other registries)
+        for dep in component.raw.get("deps") or []:
+            if dep.get("optional") or dep.get("kind") not in (None, "normal", "build"):
+                continue
+
+            # bare requirements are caret requirements in cargo
+            req = dep.get("req") or "*"
+            if req[0].isdigit():
+                req = f"^{req}"
+            dependencies.append(Dependency(dep.get("package") or dep["name"], req))
+        return dependencies
+
+    @instrumented(None)
+    def raw(self, entry: Package) -> Tuple[Component, SpooledArchive]:
         component = self.get(entry)
-        downloader = Downloader()
-        for kind, url in self.get_artifact_urls(component):
-            downloader.add(kind, url)
-
-        return component, downloader.get_as_zipped()
+        return component, self._mk_downloader(component).get_as_zipped()
 
-    def download(self, entry: Package) -> io.BytesIO:
+    @instrumented(None)
+    def download(self, entry: Package) -> SpooledArchive:
         _, io_bytes = self.raw(entry)
         return io_bytes
 
@@ -118,3 +168,12 @@ class CargoRegistry(Registry):
 
             host = get_host(self.base_url)
             yield "src", f"{host}/{dl_path}"
+
+    def get_artifact_digests(self, component: Component) -> Dict[str, str]:
+        digest = from_hex(
+            "sha256", component.raw.get("cksum") or component.raw.get("checksum")
+        )
+        if digest is None:
+            return {}
+
+        return {url: digest for _, url in self.get_artifact_urls(component)}
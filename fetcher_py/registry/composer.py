@@ -1,59 +1,103 @@
-import io
-from typing import Optional, Tuple
-from fetcher_py.component import Component
+from typing import Dict, List, Optional, Tuple
+from fetcher_py.component import Component, Dependency
 from fetcher_py.package import Package
-from fetcher_py.downloader import Downloader
-from ._registry import Registry
+from fetcher_py.archive import SpooledArchive
+from fetcher_py.options import Options
+from fetcher_py.integrity import from_hex
+from fetcher_py.ttlcache import TTLCache
+from fetcher_py.versions import Release
+from ._registry import Registry, instrumented, stored
 from requests import Session
 
 
+def expand_minified(versions: List[dict]) -> List[dict]:
+    """
+    Expand minified p2 versions, which only list keys changed since the
+    previous version ("__unset" removes a key).
+    """
+    expanded = []
+    current: dict = {}
+    for version in versions:
+        current = dict(current)
+        for key, value in version.items():
+            if value == "__unset":
+                current.pop(key, None)
+            else:
+                current[key] = value
+        expanded.append(current)
+    return expanded
+
+
 class ComposerRegistry(Registry):
+    version_scheme = "composer"
+
     def __init__(
         self,
         session: Session,
         base_url: Optional[str] = None,
+        options: Optional[Options] = None,
     ):
         if base_url is None:
             base_url = "https://repo.packagist.org"
 
-        super().__init__(session, base_url)
+        super().__init__(session, base_url, options)
+        # p2 metadata (tagged versions) per package name
+        self._metadata: TTLCache[dict] = TTLCache(self.options.versions_ttl)
 
     def reachable(self):
         resp = self.session.head(self.base_url)
         return resp.ok
 
-    def get_default(self, entry: Package) -> str:
-        resp = self.session.get(f"{self.base_url}/p2/{entry.name}.json")
-        resp.raise_for_status()
-        data = resp.json()
-
-        for pkg, pkg_versions in data.get("packages", {}).items():
-            if pkg == entry.name:
-                return pkg_versions[0].get("version")
-
-    def get(self, entry: Package) -> Component:
-        if entry.version is None:
-            entry.version = self.get_default(entry)
-
-        resp = self.session.get(f"{self.base_url}/p2/{entry.name}.json")
+    def _get_metadata(self, name: str) -> dict:
+        resp = self.session.get(f"{self.base_url}/p2/{name}.json")
         resp.raise_for_status()
         data = resp.json()
+        if data.get("minified") == "composer/2.0":
+            data["packages"] = {
+                pkg: expand_minified(versions)
+                for pkg, versions in data.get("packages", {}).items()
+            }
+        return data
+
+    def metadata(self, name: str, refresh: bool = False) -> dict:
+        """
+        p2 metadata of the package, reused for Options.versions_ttl.
+        """
+        if refresh:
+            self._metadata.invalidate(name)
+        return self._metadata.get(name, lambda: self._get_metadata(name))
+
+    def list_versions(self, name: str) -> List[Release]:
+        pkg_versions = self.metadata(name).get("packages", {}).get(name, [])
+        return [Release(v["version"]) for v in pkg_versions if "version" in v]
+
+    @instrumented("resolve")
+    def get_default(self, entry: Package) -> str:
+        return self.select_version(entry)
 
-        raw_data = None
+    def _find_version(self, entry: Package, refresh: bool) -> Optional[dict]:
+        data = self.metadata(entry.name, refresh)
         for pkg, pkg_versions in data.get("packages", {}).items():
             if pkg == entry.name:
                 for pkg_version in pkg_versions:
-                    print("pkg_version", pkg_version)
                     if (
                         pkg_version.get("version") == entry.version
                         or pkg_version.get("version_normalized") == entry.version
                     ):
-                        raw_data = pkg_version
-                        break
+                        return pkg_version
+        return None
 
+    @instrumented("metadata")
+    @stored
+    def get(self, entry: Package) -> Component:
+        self.resolve(entry)
+
+        # cached metadata may predate the version, it is fetched again once
+        raw_data = self._find_version(entry, False) or self._find_version(entry, True)
         if raw_data is None:
             raise ValueError(f"could not find {entry.version} for {entry.name}")
 
+        data = self.metadata(entry.name)
         return Component(
             name=raw_data.get("name", entry.name),
             version=raw_data.get("version", entry.version),
@@ -64,18 +108,35 @@ class ComposerRegistry(Registry):
             raw=raw_data,
         )
 
-    def raw(self, entry: Package) -> Tuple[Component, bytes]:
+    def get_dependencies(self, component: Component) -> List[Dependency]:
+        require = component.raw.get("require")
+        if not isinstance(require, dict):
+            return []
+
+        dependencies = []
+        for name, constraint in require.items():
+            # platform requirements (php, ext-*, lib-*) are not packages
+            if "/" not in name:
+                continue
+            if constraint == "self.version":
+                constraint = component.version
+            dependencies.append(Dependency(name, constraint or None))
+        return dependencies
+
+    @instrumented(None)
+    def raw(self, entry: Package) -> Tuple[Component, SpooledArchive]:
         component = self.get(entry)
-        downloader = Downloader()
-
-        for kind, url in self.get_artifact_urls(component):
-            downloader.add(kind, url)
+        return component, self._mk_downloader(component).get_as_zipped()
 
-        return component, downloader.get_as_zipped()
-
-    def download(self, entry: Package) -> io.BytesIO:
+    @instrumented(None)
+    def download(self, entry: Package) -> SpooledArchive:
         _, io_bytes = self.raw(entry)
         return io_bytes
 
     def get_artifact_urls(self, component: Component):
         yield "src", component.raw.get("dist", {}).get("url")
+
+    def get_artifact_digests(self, component: Component) -> Dict[str, str]:
+        dist = component.raw.get("dist", {})
+        digest = from_hex("sha1", dist.get("shasum"))
+        return {dist["url"]: digest} if digest and dist.get("url") else {}
@@ -1,28 +1,41 @@
-import io
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
 from fetcher_py.component import Component
 from fetcher_py.package import Package
-from fetcher_py.downloader import Downloader
-from ._registry import Registry
+from fetcher_py.archive import SpooledArchive
+from fetcher_py.options import Options
+from fetcher_py.integrity import from_hex
+from fetcher_py.versions import LATEST
+from ._registry import Registry, instrumented, stored
 from requests import Session
 
 
 class CpanRegistry(Registry):
+    # ranges are resolved by metacpan
+    version_scheme = "cpan"
+
     def __init__(
         self,
         session: Session,
         base_url: Optional[str] = None,
+        options: Optional[Options] = None,
     ):
         if base_url is None:
             base_url = "https://fastapi.metacpan.org"
-        super().__init__(session, base_url)
+        super().__init__(session, base_url, options)
 
     def reachable(self):
         resp = self.session.head(self.base_url)
         return resp.ok
 
+    @instrumented("resolve")
     def get_default(self, entry: Package) -> str:
-        resp = self.session.get(f"{self.base_url}/v1/download_url/{entry.name}")
+        params = None
+        if entry.version is not None and entry.version.strip() not in ("", LATEST):
+            params = {"version": entry.version}
+
+        resp = self.session.get(
+            f"{self.base_url}/v1/download_url/{entry.name}", params=params
+        )
         resp.raise_for_status()
         data = resp.json()
         version = data.get("version")
@@ -31,9 +44,10 @@ class CpanRegistry(Registry):
 
         return version
 
+    @instrumented("metadata")
+    @stored
     def get(self, entry: Package) -> Component:
-        if entry.version is None:
-            entry.version = self.get_default(entry)
+        self.resolve(entry)
 
         resp = self.session.get(
             f"{self.base_url}/v1/download_url/{entry.name}?version===${entry.version}"
@@ -48,21 +62,23 @@ class CpanRegistry(Registry):
             homepage_url=None,
             description=None,
             declared_licenses=data.get("licenses"),
-            raw=data,
+            raw=resp.content,
         )
 
-    def raw(self, entry: Package) -> Tuple[Component, bytes]:
+    @instrumented(None)
+    def raw(self, entry: Package) -> Tuple[Component, SpooledArchive]:
         component = self.get(entry)
-        downloader = Downloader()
+        return component, self._mk_downloader(component).get_as_zipped()
 
-        for kind, url in self.get_artifact_urls(component):
-            downloader.add(kind, url)
-
-        return component, downloader.get_as_zipped()
-
-    def download(self, entry: Package) -> io.BytesIO:
+    @instrumented(None)
+    def download(self, entry: Package) -> SpooledArchive:
         _, io_bytes = self.raw(entry)
         return io_bytes
 
     def get_artifact_urls(self, component: Component):
         yield "src", component.raw.get("download_url")
+
+    def get_artifact_digests(self, component: Component) -> Dict[str, str]:
+        url = component.raw.get("download_url")
+        digest = from_hex("sha256", component.raw.get("checksum_sha256"))
+        return {url: digest} if digest and url else {}
@@ -1,42 +1,48 @@
-import io
-from typing import Optional, Tuple
-from fetcher_py.component import Component
+from typing import Dict, List, Optional, Tuple
+from fetcher_py.component import Component, Dependency
 from fetcher_py.package import Package
-from fetcher_py.downloader import Downloader
-from ._registry import Registry
+from fetcher_py.archive import SpooledArchive
+from fetcher_py.options import Options
+from fetcher_py.integrity import from_hex
+from fetcher_py.versions import Release
+from ._registry import Registry, instrumented, stored
 from requests import Session
 
 
 class GemRegistry(Registry):
+    version_scheme = "rubygems"
+
     def __init__(
         self,
         session: Session,
         base_url: Optional[str] = None,
+        options: Optional[Options] = None,
     ):
         if base_url is None:
             base_url = "https://rubygems.org"
 
-        super().__init__(session, base_url)
+        super().__init__(session, base_url, options)
 
     def reachable(self):
         resp = self.session.head(self.base_url)
         return resp.ok
 
-    def get_default(self, entry: Package) -> str:
-        resp = self.session.get(
-            f"{self.base_url}/api/versions/{entry.name}/latest.json"
-        )
+    def list_versions(self, name: str) -> List[Release]:
+        resp = self.session.get(f"{self.base_url}/api/v1/versions/{name}.json")
         resp.raise_for_status()
-        data = resp.json()
-        version = data.get("version")
-        if version is None:
-            raise ValueError(f"Could not find version for package {entry.name}")
 
-        return version
+        # one entry per platform, yanked versions are not listed
+        versions = dict.fromkeys(item["number"] for item in resp.json())
+        return [Release(version) for version in versions]
 
+    @instrumented("resolve")
+    def get_default(self, entry: Package) -> str:
+        return self.select_version(entry)
+
+    @instrumented("metadata")
+    @stored
     def get(self, entry: Package) -> Component:
-        if entry.version is None:
-            entry.version = self.get_default(entry)
+        self.resolve(entry)
 
         resp = self.session.get(
             f"{self.base_url}/api/v2/rubygems/{entry.name}/versions/{entry.version}.json"
@@ -51,21 +57,29 @@ class GemRegistry(Registry):
             homepage_url=data.get("homepage_uri") or data.get("project_uri"),
             description=data.get("info"),
             declared_licenses=data.get("licenses"),
-            raw=data,
+            raw=resp.content,
         )
 
-    def raw(self, entry: Package) -> Tuple[Component, bytes]:
-        component = self.get(entry)
-        downloader = Downloader()
-
-        for kind, url in self.get_artifact_urls(component):
-            downloader.add(kind, url)
+    def get_dependencies(self, component: Component) -> List[Dependency]:
+        runtime = (component.raw.get("dependencies") or {}).get("runtime") or []
+        return [
+            Dependency(dep["name"], dep.get("requirements") or None) for dep in runtime
+        ]
 
-        return component, downloader.get_as_zipped()
+    @instrumented(None)
+    def raw(self, entry: Package) -> Tuple[Component, SpooledArchive]:
+        component = self.get(entry)
+        return component, self._mk_downloader(component).get_as_zipped()
 
-    def download(self, entry: Package) -> io.BytesIO:
+    @instrumented(None)
+    def download(self, entry: Package) -> SpooledArchive:
         _, io_bytes = self.raw(entry)
         return io_bytes
 
     def get_artifact_urls(self, component: Component):
         yield "src", component.raw.get("gem_uri")
+
+    def get_artifact_digests(self, component: Component) -> Dict[str, str]:
+        url = component.raw.get("gem_uri")
+        digest = from_hex("sha256", component.raw.get("sha"))
+        return {url: digest} if digest and url else {}
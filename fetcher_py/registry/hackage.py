@@ -1,41 +1,49 @@
-import io
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from fetcher_py.component import Component
 from fetcher_py.package import Package
-from fetcher_py.downloader import Downloader
-from ._registry import Registry
+from fetcher_py.archive import SpooledArchive
+from fetcher_py.options import Options
+from fetcher_py.versions import Release
+from ._registry import Registry, instrumented, stored
 from requests import Session
 
 
 class HackageRegistry(Registry):
+    version_scheme = "pvp"
+
     def __init__(
         self,
         session: Session,
         base_url: Optional[str] = None,
+        options: Optional[Options] = None,
     ):
         if base_url is None:
             base_url = "https://hackage.haskell.org"
 
-        super().__init__(session, base_url)
+        super().__init__(session, base_url, options)
 
     def reachable(self):
         resp = self.session.head(self.base_url)
         return resp.ok
 
-    def get_default(self, entry: Package) -> str:
-        resp = self.session.get(f"{self.base_url}/package/{entry.name}.json")
+    def list_versions(self, name: str) -> List[Release]:
+        resp = self.session.get(f"{self.base_url}/package/{name}.json")
         resp.raise_for_status()
-        data = resp.json()
 
-        version = list(data.keys())[-1]
-        if version is None:
-            raise ValueError(f"Could not find version for package {entry.name}")
+        # version -> status (normal, or deprecated)
+        return [
+            Release(version, yanked=status == "deprecated")
+            for version, status in resp.json().items()
+        ]
 
-        return version
+    @instrumented("resolve")
+    def get_default(self, entry: Package) -> str:
+        return self.select_version(entry)
 
+    @instrumented("metadata")
+    @stored
     def get(self, entry: Package) -> Component:
-        if entry.version is None:
-            entry.version = self.get_default(entry)
+        self.resolve(entry)
 
         resp = self.session.get(
             f"{self.base_url}/package/{entry.name}-{entry.version}.json"
@@ -50,19 +58,16 @@ class HackageRegistry(Registry):
             homepage_url=data.get("homepage") or data.get("repository"),
             description=data.get("description"),
             declared_licenses=data.get("license"),
-            raw=data,
+            raw=resp.content,
         )
 
-    def raw(self, entry: Package) -> Tuple[Component, bytes]:
+    @instrumented(None)
+    def raw(self, entry: Package) -> Tuple[Component, SpooledArchive]:
         component = self.get(entry)
-        downloader = Downloader()
-
-        for kind, url in self.get_artifact_urls(component):
-            downloader.add(kind, url)
-
-        return component, downloader.get_as_zipped()
+        return component, self._mk_downloader(component).get_as_zipped()
 
-    def download(self, entry: Package) -> io.BytesIO:
+    @instrumented(None)
+    def download(self, entry: Package) -> SpooledArchive:
         _, io_bytes = self.raw(entry)
         return io_bytes
 
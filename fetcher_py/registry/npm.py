@@ -3,43 +3,62 @@
 - https://github.com/npm/registry/blob/master/docs/user/authentication.md
 - https://github.com/npm/registry/blob/master/docs/REGISTRY-API.md#getpackageversion
 """
-import io
-from typing import Optional, Tuple
-from fetcher_py.component import Component
+
+from typing import Dict, List, Optional, Tuple
+from fetcher_py.component import Component, Dependency
 from fetcher_py.package import Package
-from fetcher_py.downloader import Downloader
-from ._registry import Registry
+from fetcher_py.archive import SpooledArchive
+from fetcher_py.options import Options
+from fetcher_py.integrity import from_hex, from_sri
+from fetcher_py.versions import Release
+from ._registry import Registry, instrumented, stored
 from requests import Session
 
+# abbreviated metadata, listing versions only with what installers need
+ABBREVIATED_METADATA = "application/vnd.npm.install-v1+json"
+
 
 class NpmRegistry(Registry):
+    version_scheme = "npm"
+
     def __init__(
         self,
         session: Session,
         base_url: Optional[str] = None,
+        options: Optional[Options] = None,
     ):
         if base_url is None:
             base_url = "https://registry.npmjs.org"
 
-        super().__init__(session, base_url)
+        super().__init__(session, base_url, options)
 
     def reachable(self):
         resp = self.session.head(self.base_url)
         return resp.ok
 
-    def get_default(self, entry: Package) -> str:
-        resp = self.session.get(f"{self.base_url}/{entry.name}")
+    def list_versions(self, name: str) -> List[Release]:
+        resp = self.session.get(
+            f"{self.base_url}/{name}", headers={"Accept": ABBREVIATED_METADATA}
+        )
         resp.raise_for_status()
         data = resp.json()
-        version = data.get("version")
-        if version is None:
-            raise ValueError("could not find version: {data}")
 
-        return version
+        versions = data.get("versions")
+        if versions is None:
+            version = data.get("version")
+            return [Release(version)] if version is not None else []
+
+        # unpublished versions are removed, deprecated ones are still installable
+        return [Release(version) for version in versions]
+
+    @instrumented("resolve")
+    def get_default(self, entry: Package) -> str:
+        return self.select_version(entry)
 
+    @instrumented("metadata")
+    @stored
     def get(self, entry: Package) -> Component:
-        if entry.version is None:
-            entry.version = self.get_default(entry)
+        self.resolve(entry)
 
         resp = self.session.get(f"{self.base_url}/{entry.name}/{entry.version}")
         resp.raise_for_status()
@@ -52,21 +71,49 @@ class NpmRegistry(Registry):
             homepage_url=data.get("homepage") or data.get("repository", {}).get("url"),
             description=data.get("description"),
             declared_licenses=data.get("license"),
-            raw=data,
+            raw=resp.content,
         )
 
-    def raw(self, entry: Package) -> Tuple[Component, bytes]:
-        component = self.get(entry)
-        downloader = Downloader()
-
-        for kind, url in self.get_artifact_urls(component):
-            downloader.add(kind, url)
+    def get_dependencies(self, component: Component) -> List[Dependency]:
+        dependencies = []
+        for name, spec in (component.raw.get("dependencies") or {}).items():
+            spec = spec.strip() or "*"
+            if spec.startswith("npm:"):
+                # aliased package: "npm:<name>@<range>"
+                alias = spec[len("npm:") :]
+                name, _, spec = alias.rpartition("@")
+                if not name:
+                    name, spec = alias, "*"
+            elif ":" in spec or "/" in spec:
+                # git, file, and url dependencies are not on the registry
+                continue
+            dependencies.append(Dependency(name, spec or "*"))
+        return dependencies
 
-        return component, downloader.get_as_zipped()
+    @instrumented(None)
+    def raw(self, entry: Package) -> Tuple[Component, SpooledArchive]:
+        component = self.get(entry)
+        return component, self._mk_downloader(component).get_as_zipped()
 
-    def download(self, entry: Package) -> io.BytesIO:
+    @instrumented(None)
+    def download(self, entry: Package) -> SpooledArchive:
         _, io_bytes = self.raw(entry)
         return io_bytes
 
     def get_artifact_urls(self, component: Component):
         yield "src", component.raw.get("dist", {}).get("tarball")
+
+    def get_artifact_digests(self, component: Component) -> Dict[str, str]:
+        dist = component.raw.get("dist", {})
+        digest = from_sri(dist.get("integrity")) or from_hex("sha1", dist.get("shasum"))
+        return {dist["tarball"]: digest} if digest and dist.get("tarball") else {}
+
+    def get_artifact_max_sizes(self, component: Component) -> Dict[str, int]:
+        # registry publishes unpacked size only, which bounds the tarball size
+        dist = component.raw.get("dist", {})
+        size = dist.get("unpackedSize")
+        return (
+            {dist["tarball"]: size}
+            if isinstance(size, int) and dist.get("tarball")
+            else {}
+        )
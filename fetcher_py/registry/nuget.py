@@ -1,18 +1,27 @@
-import io
-from typing import Optional, Tuple
-from fetcher_py.component import Component
+from typing import Dict, List, Optional, Tuple
+from fetcher_py.component import Component, Dependency
 from fetcher_py.package import Package
-from fetcher_py.downloader import Downloader
-from ._registry import Registry
+from fetcher_py.archive import SpooledArchive
+from fetcher_py.options import Options
+from fetcher_py.integrity import from_base64
+from fetcher_py.ttlcache import DEFAULT_TTL, TTLCache
+from fetcher_py.versions import Release
+from ._registry import Registry, instrumented, stored
 import requests
 
 
 class NugetIndex:
-    def __init__(self, session: requests.Session, index_url) -> None:
+    def __init__(
+        self, session: requests.Session, index_url, ttl: Optional[float] = DEFAULT_TTL
+    ) -> None:
         self.session = session
         self.index_url = index_url
-        self.index_data = self._get_index_data()
-        self.registration_data = None
+        # service index, and registration leaves, per (name, version)
+        self._cache: TTLCache[dict] = TTLCache(ttl)
+
+    @property
+    def index_data(self):
+        return self._cache.get("index.json", self._get_index_data)
 
     def _remove_trailing_slash(self, url: str) -> str:
         return url.rstrip("/")
@@ -32,35 +41,43 @@ class NugetIndex:
                 return self._remove_trailing_slash(resource["@id"])
         raise ValueError("Catalog URL not found in index resources.")
 
-    def any_version(self, package_name: str) -> str:
+    def versions(self, package_name: str) -> List[Release]:
         catalog_url = self._get_catalog_url()
         resp = self.session.get(f"{catalog_url}/{package_name.lower()}/index.json")
         resp.raise_for_status()
 
-        pkg_index = resp.json()
-        items = pkg_index.get("items", [])
-
-        if len(items) > 0:
-            child_items = items[-1].get("items", [])
-            if len(child_items) > 0:
-                return child_items[-1].get("catalogEntry", {}).get("version")
-
-        raise ValueError(f"could not find any version for {package_name}")
-
-    def package_version_url(self, package_name: str, version: str) -> str:
+        releases = []
+        for page in resp.json().get("items", []):
+            # pages of packages with many versions are not inlined
+            if "items" not in page:
+                page_resp = self.session.get(page["@id"])
+                page_resp.raise_for_status()
+                page = page_resp.json()
+
+            for leaf in page.get("items", []):
+                entry = leaf.get("catalogEntry", {})
+                if entry.get("version") is not None:
+                    # unlisted versions are hidden from search, and resolution
+                    unlisted = entry.get("listed") is False
+                    releases.append(Release(entry["version"], yanked=unlisted))
+        return releases
+
+    def registration_data(self, package_name: str, version: str) -> dict:
         catalog_url = self._get_catalog_url()
         package_url = f"{catalog_url}/{package_name.lower()}/{version.lower()}.json"
 
-        if self.registration_data is None:
+        def load():
             resp = self.session.get(package_url)
             resp.raise_for_status()
-            self.registration_data = resp.json()
+            return resp.json()
+
+        return self._cache.get((package_name.lower(), version.lower()), load)
 
-        return self.registration_data.get("catalogEntry")
+    def package_version_url(self, package_name: str, version: str) -> str:
+        return self.registration_data(package_name, version).get("catalogEntry")
 
     def packge_version_download_url(self, package_name: str, version: str) -> str:
-        self.package_version_url(package_name, version)
-        url = self.registration_data.get("packageContent")
+        url = self.registration_data(package_name, version).get("packageContent")
         if url is not None:
             return url
 
@@ -72,35 +89,39 @@ class NugetIndex:
             ):
                 url = self._remove_trailing_slash(resource["@id"])
 
-        return f"{url}/{package_name.lower()}/{version.lower()}/{package_name.lower()}.{version.lower()}.nupkg "
+        return f"{url}/{package_name.lower()}/{version.lower()}/{package_name.lower()}.{version.lower()}.nupkg"
 
 
 class NuGetRegistry(Registry):
+    version_scheme = "nuget"
+
     def __init__(
         self,
         session: requests.Session,
         base_url: Optional[str] = None,
+        options: Optional[Options] = None,
     ):
         if base_url is None:
             base_url = "https://api.nuget.org/v3"
 
-        self.index = NugetIndex(session, base_url)
-        super().__init__(session, base_url)
+        super().__init__(session, base_url, options)
+        self.index = NugetIndex(session, base_url, self.options.service_ttl)
 
     def reachable(self):
         resp = self.session.head(self.base_url)
         return resp.ok
 
-    def get_default(self, entry: Package) -> str:
-        version = self.index.any_version(entry.name)
-        if version is None:
-            raise ValueError(f"could not find any version for {entry.name}")
+    def list_versions(self, name: str) -> List[Release]:
+        return self.index.versions(name)
 
-        return version
+    @instrumented("resolve")
+    def get_default(self, entry: Package) -> str:
+        return self.select_version(entry)
 
+    @instrumented("metadata")
+    @stored
     def get(self, entry: Package) -> Component:
-        if entry.version is None:
-            entry.version = self.get_default(entry)
+        self.resolve(entry)
 
         resp = self.session.get(
             self.index.package_version_url(entry.name, entry.version)
@@ -115,19 +136,45 @@ class NuGetRegistry(Registry):
             homepage_url=data.get("projectUrl"),
             description=data.get("description"),
             declared_licenses=data.get("licenseExpression") or data.get("license"),
-            raw=data,
+            raw=resp.content,
         )
 
-    def raw(self, entry: Package) -> Tuple[Component, bytes]:
+    def get_dependencies(self, component: Component) -> List[Dependency]:
+        # union over target frameworks, a package is required once
+        dependencies: Dict[str, Dependency] = {}
+        for group in component.raw.get("dependencyGroups") or []:
+            for dep in group.get("dependencies") or []:
+                key = dep["id"].lower()
+                if key in dependencies:
+                    continue
+
+                # a bare version is a minimum version in nuget
+                version = dep.get("range") or None
+                if version is not None and version[0] not in "[(":
+                    version = f"[{version}, )"
+                dependencies[key] = Dependency(dep["id"], version)
+        return list(dependencies.values())
+
+    @instrumented(None)
+    def raw(self, entry: Package) -> Tuple[Component, SpooledArchive]:
         component = self.get(entry)
-        downloader = Downloader()
-        download_url = self.index.packge_version_download_url(
-            component.name, component.version
-        )
-        downloader.add("src", download_url)
-
-        return component, downloader.get_as_zipped()
+        return component, self._mk_downloader(component).get_as_zipped()
 
-    def download(self, entry: Package) -> io.BytesIO:
+    @instrumented(None)
+    def download(self, entry: Package) -> SpooledArchive:
         _, io_bytes = self.raw(entry)
         return io_bytes
+
+    def get_artifact_urls(self, component: Component):
+        yield (
+            "src",
+            self.index.packge_version_download_url(component.name, component.version),
+        )
+
+    def get_artifact_digests(self, component: Component) -> Dict[str, str]:
+        algorithm = component.raw.get("packageHashAlgorithm") or "SHA512"
+        digest = from_base64(algorithm, component.raw.get("packageHash"))
+        if digest is None:
+            return {}
+
+        return {url: digest for _, url in self.get_artifact_urls(component)}
@@ -1,21 +1,31 @@
-import dataclasses
-import io
 import json
 import logging
 import tempfile
-from typing import Optional
+from typing import Optional, Set, Tuple
 import zipfile
 from fetcher_py.component import Component
 from fetcher_py.package import Package
-from ._registry import Registry
+from fetcher_py.archive import SpooledArchive
+from fetcher_py.options import Options
+from fetcher_py.downloader import CHUNK_SIZE
+from fetcher_py.hooks import trace
+from fetcher_py.integrity import DigestHasher, parse_digest
+from fetcher_py.plan import Plan, plan_artifact
+from fetcher_py.ttlcache import TTLCache
+from ._registry import Registry, instrumented
 from requests import Session
+import oras.container
 import oras.provider
 import os
+import shutil
 
 logger = logging.getLogger(__name__)
 
 
 class MyProvider(oras.provider.Registry):
+    # set by OciRegistry, to trace blob pulls with its hooks
+    options: Optional[Options] = None
+
     def inspect(self, *args, **kwargs):
         container = super().get_container(kwargs["target"])
         super().load_configs(container)
@@ -37,21 +47,110 @@ class MyProvider(oras.provider.Registry):
 
         return files
 
+    def download_blob(self, container, digest: str, outfile: str) -> str:
+        """
+        Stream download a blob into an output file, verifying its digest
+        while it is being streamed.
+
+        Blobs are content addressed, so with Options.cache, sha256 blobs are
+        copied from the cache when present, and stored in it once verified.
+        """
+        try:
+            outdir = os.path.dirname(outfile)
+            if outdir:
+                os.makedirs(outdir, exist_ok=True)
+
+            attributes = dict(container=str(container), digest=digest)
+            hooks = self.options.hooks if self.options is not None else None
+            with trace(hooks, "oci.pull_blob", **attributes) as span:
+                cached = self._cached_blob(digest)
+                span.set("cached", cached is not None)
+                if cached is not None:
+                    shutil.copyfile(cached, outfile)
+                    return outfile
+
+                hasher, received = DigestHasher(digest), 0
+                with self.get_blob(container, digest, stream=True) as r:
+                    r.raise_for_status()
+                    with open(outfile, "wb") as f:
+                        for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                            hasher.update(chunk)
+                            f.write(chunk)
+                            received += len(chunk)
+                span.set("bytes", received)
+
+                hasher.verify(digest)
+                self._store_blob(container, digest, outfile)
+
+        # Allow an empty layer to fail and return /dev/null
+        except Exception as e:
+            if digest == oras.defaults.blank_hash:
+                return os.devnull
+            raise e
+        return outfile
+
+    def _cached_blob(self, digest: str) -> Optional[str]:
+        cache = self.options.cache if self.options is not None else None
+        if cache is None or parse_digest(digest)[0] != "sha256":
+            return None
+
+        path = cache.get_by_digest(parse_digest(digest)[1])
+        metrics = self.options.metrics
+        if metrics is not None:
+            result = "miss" if path is None else "hit"
+            metrics.cache_requests.inc(cache="artifact", result=result)
+        return path
+
+    def _store_blob(self, container, digest: str, path: str):
+        cache = self.options.cache if self.options is not None else None
+        if cache is None or parse_digest(digest)[0] != "sha256":
+            return
+
+        url = f"{self.prefix}://{container.get_blob_url(digest)}"
+        try:
+            with open(path, "rb") as file:
+                cache.put(url, file, parse_digest(digest)[1])
+        except OSError as e:
+            logger.warning(f"failed to cache {url}: {e}")
+
 
 class OciRegistry(Registry):
     def __init__(
         self,
         session: Session,
         base_url: Optional[str] = None,
+        options: Optional[Options] = None,
     ):
-        self.provider = MyProvider()
-        super().__init__(session, base_url)
+        super().__init__(session, base_url, options)
+        # provider keeps its auth token, so it is reused until service_ttl,
+        # tokens are scoped to a repository, so is each provider
+        self._providers: TTLCache[MyProvider] = TTLCache(self.options.service_ttl)
+
+    def provider(self, target: str) -> MyProvider:
+        """
+        Get provider of the repository of target, sending its token to the
+        repository's registry host only.
+        """
+        container = oras.container.Container(target)
+        key = (container.registry, container.api_prefix)
+        return self._providers.get(key, self._mk_provider)
+
+    def _mk_provider(self) -> MyProvider:
+        provider = MyProvider()
+        provider.options = self.options
+        # requests go through the registry's session (its adapters, proxies,
+        # and TLS settings), tokens are sent per request, not kept on it
+        provider.session = self.session
+        provider.auth.session = self.session
+        provider._tls_verify = self.session.verify
+        return provider
 
     def reachable(self):
         return None
 
+    @instrumented("metadata")
     def get(self, entry: Package) -> Component:
-        data = self.provider.inspect(target=entry.name)
+        data = self.provider(entry.name).inspect(target=entry.name)
         return Component(
             name=entry.name,
             version=None,
@@ -62,8 +161,9 @@ class OciRegistry(Registry):
             raw=data,
         )
 
-    def raw(self, entry: Package) -> io.BytesIO:
-        zip_data = io.BytesIO()
+    @instrumented(None)
+    def raw(self, entry: Package) -> Tuple[Component, SpooledArchive]:
+        zip_data = self.options.mk_archive()
         component = self.get(entry)
         with tempfile.TemporaryDirectory() as temp_dir:
             # write metadata
@@ -71,21 +171,67 @@ class OciRegistry(Registry):
             os.makedirs(metadata_dir)
             component_json_path = os.path.join(metadata_dir, "component.json")
             with open(component_json_path, "w") as json_file:
-                json.dump(dataclasses.asdict(component), json_file, indent=2)
+                json.dump(component.to_dict(), json_file, indent=2)
 
             # write blobs
             dist_dir = os.path.join(temp_dir, "dist")
             os.makedirs(dist_dir)
-            self.provider.pull(target=entry.name, outdir=dist_dir)
+            charged = self._reserve(component)
+            try:
+                self.provider(entry.name).pull(target=entry.name, outdir=dist_dir)
+            except Exception:
+                if charged:
+                    self.options.budget.refund(entry.name, charged)
+                raise
             with zipfile.ZipFile(zip_data, "w") as zip_file:
                 for root, _, files in os.walk(temp_dir):
                     for file in files:
                         file_path = os.path.join(root, file)
                         arcname = os.path.relpath(file_path, temp_dir)
-                        zip_file.write(file_path, arcname=arcname)
+                        self.options.compression.write(zip_file, file_path, arcname)
 
         return component, zip_data
 
-    def download(self, entry: Package) -> io.BytesIO:
+    def _reserve(self, component: Component) -> int:
+        # layer sizes are in the manifest, so every layer is checked before
+        # pulling, and the image is charged at once
+        if self.options.budget is None:
+            return 0
+
+        sizes = [
+            (layer["digest"], layer["size"])
+            for layer in component.raw.get("layers", [])
+            if isinstance(layer.get("size"), int)
+        ]
+        for digest, size in sizes:
+            self.options.budget.check(digest, size)
+
+        total = sum(size for _, size in sizes)
+        self.options.budget.charge(component.name, total)
+        return total
+
+    def plan_component(
+        self,
+        entry: Package,
+        component: Component,
+        only_digests: Optional[Set[str]] = None,
+    ) -> Plan:
+        plan = Plan(entry, component)
+        container = oras.container.Container(entry.name)
+        prefix = self.provider(entry.name).prefix
+        for layer in component.raw.get("layers", []):
+            if only_digests is not None and layer["digest"] not in only_digests:
+                continue
+
+            # manifests give layer sizes, blob url is requested only without one
+            url = f"{prefix}://{container.get_blob_url(layer['digest'])}"
+            size = layer.get("size") if isinstance(layer.get("size"), int) else None
+            plan.artifacts.append(
+                plan_artifact(self.options, self.session, "layer", url, size)
+            )
+        return plan
+
+    @instrumented(None)
+    def download(self, entry: Package) -> SpooledArchive:
         _, io_bytes = self.raw(entry)
         return io_bytes
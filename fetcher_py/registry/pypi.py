@@ -1,36 +1,65 @@
-import io
-from typing import Optional, Tuple
-from fetcher_py.component import Component
+import re
+from typing import Dict, List, Optional, Tuple
+from fetcher_py.component import Component, Dependency
 from fetcher_py.package import Package
-from fetcher_py.downloader import Downloader
-from ._registry import Registry
+from fetcher_py.archive import SpooledArchive
+from fetcher_py.options import Options
+from fetcher_py.integrity import from_hex
+from fetcher_py.versions import Release
+from ._registry import Registry, instrumented, stored
 from requests import Session
 
+# PEP 508 requirement: name, [extras], version specifiers (optionally in
+# parentheses), or @ url, and ; environment marker
+REQUIREMENT = re.compile(
+    r"^\s*(?P<name>[A-Za-z0-9][A-Za-z0-9._-]*)\s*(\[[^\]]*\])?\s*"
+    r"(\(?(?P<spec>[^;@()]*)\)?|@\s*(?P<url>[^;]+))?"
+    r"\s*(;\s*(?P<marker>.*))?$"
+)
+
 
 class PypiRegistry(Registry):
-    def __init__(self, session: Session, base_url: Optional[str] = None):
+    version_scheme = "pep440"
+
+    def __init__(
+        self,
+        session: Session,
+        base_url: Optional[str] = None,
+        options: Optional[Options] = None,
+    ):
         if base_url is None:
             base_url = "https://pypi.org/pypi"
 
-        super().__init__(session, base_url)
+        super().__init__(session, base_url, options)
 
     def reachable(self):
         resp = self.session.head(self.base_url)
         return resp.ok
 
-    def get_default(self, entry: Package) -> str:
-        resp = self.session.get(f"{self.base_url}/{entry.name}/json")
+    def list_versions(self, name: str) -> List[Release]:
+        resp = self.session.get(f"{self.base_url}/{name}/json")
         resp.raise_for_status()
         data = resp.json()
-        version = data.get("info", {}).get("version")
-        if version is None:
-            raise ValueError("could not find version: {data}")
 
-        return version
+        releases = data.get("releases")
+        if releases is None:
+            version = data.get("info", {}).get("version")
+            return [Release(version)] if version is not None else []
+
+        # releases without files can not be downloaded, same as yanked ones
+        return [
+            Release(version, yanked=all(f.get("yanked") for f in files))
+            for version, files in releases.items()
+        ]
+
+    @instrumented("resolve")
+    def get_default(self, entry: Package) -> str:
+        return self.select_version(entry)
 
+    @instrumented("metadata")
+    @stored
     def get(self, entry: Package) -> Component:
-        if entry.version is None:
-            entry.version = self.get_default(entry)
+        self.resolve(entry)
 
         resp = self.session.get(f"{self.base_url}/{entry.name}/{entry.version}/json")
         resp.raise_for_status()
@@ -44,22 +73,51 @@ class PypiRegistry(Registry):
             homepage_url=info.get("home_page") or info.get("project_url"),
             description=info.get("description"),
             declared_licenses=info.get("license"),
-            raw=data,
+            raw=resp.content,
         )
 
-    def raw(self, entry: Package) -> Tuple[Component, bytes]:
-        component = self.get(entry)
-        downloader = Downloader()
+    def get_dependencies(self, component: Component) -> List[Dependency]:
+        dependencies = []
+        for requirement in component.raw.get("info", {}).get("requires_dist") or []:
+            match = REQUIREMENT.match(requirement)
+            # direct url references are not on the registry
+            if match is None or match.group("url"):
+                continue
+
+            marker = match.group("marker") or ""
+            if "extra" in marker:
+                continue
 
-        for kind, url in self.get_artifact_urls(component):
-            downloader.add(kind, url)
+            name = re.sub(r"[-_.]+", "-", match.group("name")).lower()
+            spec = (match.group("spec") or "").replace(" ", "")
+            dependencies.append(Dependency(name, spec or None))
+        return dependencies
 
-        return component, downloader.get_as_zipped()
+    @instrumented(None)
+    def raw(self, entry: Package) -> Tuple[Component, SpooledArchive]:
+        component = self.get(entry)
+        return component, self._mk_downloader(component).get_as_zipped()
 
-    def download(self, entry: Package) -> io.BytesIO:
+    @instrumented(None)
+    def download(self, entry: Package) -> SpooledArchive:
         _, io_bytes = self.raw(entry)
         return io_bytes
 
     def get_artifact_urls(self, component: Component):
         for url in component.raw["urls"]:
             yield url["packagetype"], url["url"]
+
+    def get_artifact_digests(self, component: Component) -> Dict[str, str]:
+        digests = {}
+        for url in component.raw["urls"]:
+            digest = from_hex("sha256", url.get("digests", {}).get("sha256"))
+            if digest is not None:
+                digests[url["url"]] = digest
+        return digests
+
+    def get_artifact_sizes(self, component: Component) -> Dict[str, int]:
+        return {
+            url["url"]: url["size"]
+            for url in component.raw["urls"]
+            if isinstance(url.get("size"), int)
+        }
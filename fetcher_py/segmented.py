@@ -0,0 +1,204 @@
+"""Segmented downloads, using HTTP Range requests.
+
+Large artifacts are split into byte ranges, which are fetched
+concurrently into a preallocated file. When a connection drops,
+each segment resumes from the last byte it has written.
+
+Ranges are requested without content encoding, and conditionally on the
+validator (ETag, or Last-Modified) of the probe, so segments of a file
+changed in between are never stitched together.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+# ranges are of the bytes as stored, not of an encoding of them
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+class IncompleteSegmentError(IOError):
+    pass
+
+
+class Probe(NamedTuple):
+    # content length
+    size: int
+    # strong ETag, or Last-Modified (None when the server sent neither)
+    validator: Optional[str] = None
+
+
+def _validator(headers) -> Optional[str]:
+    etag = headers.get("ETag")
+    # weak ETags can not be used with If-Range
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified")
+
+
+def probe(session: requests.Session, url: str) -> Optional[Probe]:
+    """
+    Probe the url with HEAD request.
+
+    :param session: The session to use.
+    :param url: The URL of the file to download.
+    :return: Content length, and validator, if server accepts byte ranges for
+             the url (without content encoding), otherwise None.
+    """
+    try:
+        resp = session.head(url, headers=IDENTITY, allow_redirects=True)
+    except requests.RequestException as e:
+        logger.debug(f"could not probe {url}: {e}")
+        return None
+
+    if not resp.ok or resp.headers.get("Accept-Ranges", "").lower() != "bytes":
+        return None
+
+    content_length = resp.headers.get("Content-Length", "")
+    if not content_length.isdigit():
+        return None
+
+    return Probe(int(content_length), _validator(resp.headers))
+
+
+class Segment:
+    def __init__(self, start: int, end: int):
+        """
+        Byte range of a file, with inclusive start and end.
+        """
+        self.start = start
+        self.end = end
+        self.written = 0
+
+    @property
+    def remaining(self) -> int:
+        return self.end - self.start + 1 - self.written
+
+    @property
+    def range_header(self) -> str:
+        return f"bytes={self.start + self.written}-{self.end}"
+
+
+def mk_segments(size: int, segments: int) -> List[Segment]:
+    """
+    Split size bytes into (at most) segments byte ranges of similar length.
+    """
+    segments = max(1, min(segments, size))
+    length, extra = divmod(size, segments)
+
+    result, start = [], 0
+    for i in range(segments):
+        end = start + length + (1 if i < extra else 0) - 1
+        result.append(Segment(start, end))
+        start = end + 1
+
+    return result
+
+
+class SegmentedDownload:
+    def __init__(
+        self,
+        session: requests.Session,
+        url: str,
+        size: int,
+        segments: int,
+        retries: int,
+        chunk_size: int,
+        validator: Optional[str] = None,
+    ):
+        """
+        Download of a single file over concurrent byte ranges.
+
+        :param session: The session to use.
+        :param url: The URL of the file to download.
+        :param size: The size of the file, as reported by the server.
+        :param segments: The number of byte ranges to fetch concurrently.
+        :param retries: The number of times a segment is resumed after a failure.
+        :param chunk_size: The size of chunks streamed from each response.
+        :param validator: ETag, or Last-Modified of the probe, sent as If-Range,
+                          and expected of every range.
+        """
+        self.session = session
+        self.url = url
+        self.size = size
+        self.segments = mk_segments(size, segments)
+        self.retries = retries
+        self.chunk_size = chunk_size
+        self.validator = validator
+        self._lock = threading.Lock()
+
+    def run(self, file):
+        """
+        Download all segments into the file, which is preallocated to size.
+
+        :param file: Seekable binary file object to write to.
+        """
+        file.truncate(self.size)
+        with ThreadPoolExecutor(max_workers=len(self.segments)) as executor:
+            futures = [
+                executor.submit(self._fetch, segment, file) for segment in self.segments
+            ]
+            for future in futures:
+                future.result()
+
+        logger.debug(f"downloaded {self.url} in {len(self.segments)} segments")
+
+    def _fetch(self, segment: Segment, file):
+        attempt = 0
+        while segment.remaining > 0:
+            try:
+                self._fetch_once(segment, file)
+            except RETRYABLE_ERRORS + (IncompleteSegmentError,) as e:
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+
+                logger.debug(f"resuming {self.url} with {segment.range_header}: {e}")
+
+    def _fetch_once(self, segment: Segment, file):
+        headers = {"Range": segment.range_header, **IDENTITY}
+        if self.validator is not None:
+            headers["If-Range"] = self.validator
+        with self.session.get(self.url, headers=headers, stream=True) as resp:
+            resp.raise_for_status()
+            # a changed file is sent whole (200), with If-Range
+            if resp.status_code != 206:
+                raise ValueError(
+                    f"expected partial content for {self.url}, got {resp.status_code}"
+                )
+            if resp.headers.get("Content-Encoding", "identity") != "identity":
+                raise ValueError(
+                    f"range of {self.url} is encoded as {resp.headers['Content-Encoding']}"
+                )
+            if self.validator is not None and self.validator not in (
+                resp.headers.get("ETag"),
+                resp.headers.get("Last-Modified"),
+            ):
+                raise ValueError(f"{self.url} changed while it was downloaded")
+
+            for chunk in resp.iter_content(chunk_size=self.chunk_size):
+                chunk = chunk[: segment.remaining]
+                with self._lock:
+                    file.seek(segment.start + segment.written)
+                    file.write(chunk)
+                segment.written += len(chunk)
+
+                if segment.remaining == 0:
+                    break
+
+        if segment.remaining > 0:
+            raise IncompleteSegmentError(
+                f"connection closed with {segment.remaining} bytes remaining"
+            )
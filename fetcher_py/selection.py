@@ -0,0 +1,129 @@
+"""Selection of artifacts to download.
+
+Registries list every artifact of a package (e.g. all wheels of numpy),
+a Selection narrows them down by artifact kind (the key artifacts are
+placed under, e.g. sdist, bdist_wheel, src), and for python wheels, by
+python tag, and platform tag. Artifacts which are not wheels are only
+filtered by kind.
+"""
+
+import re
+from fnmatch import fnmatchcase
+from typing import Iterable, Optional, Set
+
+PYTHON_TAG = re.compile(r"^(cp|py|pp)(\d)(\d*)$")
+VERSIONED_PLATFORM = re.compile(r"^(manylinux|musllinux|macosx)(?:_?\d+)+_(.+)$")
+
+
+def parse_wheel_tags(url: str):
+    """
+    Get python, abi, and platform tags of a wheel, from its file name.
+
+    :param url: The URL (or file name) of the artifact.
+    :return: Tuple of sets of python, abi, and platform tags, or None if not a wheel.
+    """
+    file_name = url.split("/")[-1].split("?")[0]
+    if not file_name.lower().endswith(".whl"):
+        return None
+
+    parts = file_name[: -len(".whl")].split("-")
+    if len(parts) not in (5, 6):
+        return None
+
+    python, abi, platform = parts[-3:]
+    return set(python.split(".")), set(abi.split(".")), set(platform.split("."))
+
+
+def normalize_platform(tag: str) -> str:
+    """
+    Drop version from platform tag, e.g. manylinux_2_17_x86_64, and
+    manylinux2014_x86_64 both become manylinux_x86_64.
+    """
+    match = VERSIONED_PLATFORM.match(tag)
+    if match is None:
+        return tag
+    return f"{match.group(1)}_{match.group(2)}"
+
+
+class Selection:
+    def __init__(
+        self,
+        kinds: Optional[Iterable[str]] = None,
+        python_tags: Optional[Iterable[str]] = None,
+        platforms: Optional[Iterable[str]] = None,
+    ):
+        """
+        Initialize the selection, empty (or None) criteria select everything.
+
+        :param kinds: Artifact kinds to select (e.g. sdist, bdist_wheel, src).
+        :param python_tags: Python tags of wheels to select (e.g. cp311).
+                            Wheels for any python of the same version (py3,
+                            py311), and abi3 wheels of older versions are
+                            selected too.
+        :param platforms: Platform tags of wheels to select, as glob patterns,
+                          matched as is, and without version (e.g.
+                          manylinux_x86_64 selects manylinux2014_x86_64).
+                          Pure python wheels (any) are always selected.
+        """
+        self.kinds: Set[str] = set(kinds or [])
+        self.python_tags: Set[str] = set(python_tags or [])
+        self.platforms: Set[str] = set(platforms or [])
+
+    def __bool__(self) -> bool:
+        return bool(self.kinds or self.python_tags or self.platforms)
+
+    def accepts(self, kind: str, url: str) -> bool:
+        """
+        Whether the artifact is selected.
+
+        :param kind: The kind of the artifact (key it is added with to Downloader).
+        :param url: The URL of the artifact.
+        """
+        if self.kinds and kind not in self.kinds:
+            return False
+
+        tags = parse_wheel_tags(url)
+        if tags is None:
+            return True
+
+        python, abi, platform = tags
+        return self._accepts_python(python, abi) and self._accepts_platform(platform)
+
+    def _accepts_python(self, python: Set[str], abi: Set[str]) -> bool:
+        if not self.python_tags:
+            return True
+
+        for requested in self.python_tags:
+            if requested in python:
+                return True
+
+            match = PYTHON_TAG.match(requested)
+            if match is None:
+                continue
+
+            _, major, minor = match.groups()
+            if {f"py{major}", f"py{major}{minor}"} & python:
+                return True
+
+            if "abi3" in abi and minor:
+                for tag in python:
+                    wheel = PYTHON_TAG.match(tag)
+                    if (
+                        wheel is not None
+                        and wheel.group(2) == major
+                        and wheel.group(3)
+                        and int(wheel.group(3)) <= int(minor)
+                    ):
+                        return True
+
+        return False
+
+    def _accepts_platform(self, platform: Set[str]) -> bool:
+        if not self.platforms or "any" in platform:
+            return True
+
+        return any(
+            fnmatchcase(tag, pattern) or fnmatchcase(normalize_platform(tag), pattern)
+            for tag in platform
+            for pattern in self.platforms
+        )
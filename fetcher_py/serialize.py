@@ -0,0 +1,128 @@
+"""JSON serialization of components, and bulk results.
+
+Output of `fetcher get`, `batch`, and `closure` is dominated by raw
+registry metadata, which is written without a deep copy, and without
+decoding it at all when the component still holds the JSON bytes of the
+registry response (it is spliced into the output as it is).
+
+orjson is used when it is installed, the standard library otherwise.
+Output is compact, UTF-8 encoded JSON on a single line.
+"""
+
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fetcher_py.bulk import Result
+from fetcher_py.component import FIELDS, Component
+
+try:
+    import orjson
+except ImportError:  # optional, faster encoder
+    orjson = None
+
+# fields of a component, which can be projected
+COMPONENT_FIELDS = FIELDS + ("raw",)
+
+_BOM = b"\xef\xbb\xbf"
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Encode value as compact JSON (with orjson, when it is installed).
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value)
+        except TypeError:
+            # e.g. integers beyond 64 bits, which the standard library encodes
+            pass
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def parse_fields(value: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse comma separated fields of a component (None is every field).
+
+    :param value: e.g. 'name,version,declared_licenses'.
+    :return: Fields, in given order.
+    """
+    if value is None:
+        return None
+
+    fields = [field.strip() for field in value.split(",") if field.strip()]
+    unknown = [field for field in fields if field not in COMPONENT_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"unknown fields {', '.join(unknown)}, expected any of "
+            f"{', '.join(COMPONENT_FIELDS)}"
+        )
+    return fields
+
+
+def _splice(head: bytes, encoded: List[Tuple[str, bytes]]) -> bytes:
+    # append already encoded members to the encoded object head
+    if not encoded:
+        return head
+
+    members = b",".join(dumps(key) + b":" + value for key, value in encoded)
+    separator = b"," if head != b"{}" else b""
+    return head[:-1] + separator + members + b"}"
+
+
+def _encode_raw(component: Component) -> bytes:
+    encoded = component.encoded_raw
+    if encoded is not None:
+        encoded = encoded.strip()
+        # spliced only if it is on a single line, as is (pretty printed
+        # documents are encoded again)
+        if (
+            encoded[:1] in (b"{", b"[")
+            and b"\n" not in encoded
+            and b"\r" not in encoded
+            and not encoded.startswith(_BOM)
+        ):
+            return encoded
+    return dumps(component.raw)
+
+
+def component_to_json(
+    component: Component, fields: Optional[Sequence[str]] = None
+) -> bytes:
+    """
+    Encode the component as a JSON object.
+
+    :param component: The component.
+    :param fields: Fields to include, in order (default is every field).
+    """
+    fields = COMPONENT_FIELDS if fields is None else fields
+    data = {field: getattr(component, field) for field in fields if field != "raw"}
+    encoded = [("raw", _encode_raw(component))] if "raw" in fields else []
+    return _splice(dumps(data), encoded)
+
+
+def result_to_json(result: Result, fields: Optional[Sequence[str]] = None) -> bytes:
+    """
+    Encode the result of a bulk operation as a JSON object (query, ok,
+    path, error, component, and depth, required_by, dependencies of closures).
+
+    :param result: The result.
+    :param fields: Fields of the component to include (default is every field).
+    """
+    data = {
+        "query": result.query,
+        "ok": result.ok,
+        "path": result.path,
+        "error": f"{type(result.error).__name__}: {result.error}"
+        if result.error is not None
+        else None,
+    }
+    if result.depth is not None:
+        data["depth"] = result.depth
+        data["required_by"] = result.required_by
+        data["dependencies"] = result.dependencies
+
+    if result.component is None:
+        component = b"null"
+    else:
+        component = component_to_json(result.component, fields)
+    return _splice(dumps(data), [("component", component)])
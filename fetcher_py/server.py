@@ -0,0 +1,285 @@
+"""Long-running fetcher daemon, serving get and download over HTTP.
+
+One Fetcher is kept for the lifetime of the daemon, so registries,
+connection pools, resolved versions, and caches stay warm across
+requests. Concurrent requests of the same resolved package (ranges and
+'latest' are resolved first) are collapsed into a single upstream fetch,
+whose result is served to every waiter.
+
+API (on a TCP port, or a Unix socket):
+
+    GET /get?query=<query>[&fields=name,version]   component, as json
+    GET /download?query=<query>                    zip archive of artifacts
+    GET /healthz                                   {"ok": true}
+    GET /metrics                                   Prometheus metrics (with Options.metrics)
+
+Errors are returned as {"error": "<type>: <message>"}, with status 400
+for invalid queries, 404 for packages (or versions) missing upstream,
+and 502 for other upstream failures.
+"""
+
+import contextlib
+import logging
+import os
+import shutil
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from fetcher_py.fetcher import Fetcher
+from fetcher_py.metrics import CONTENT_TYPE
+from fetcher_py.package import Package
+from fetcher_py.serialize import component_to_json, dumps, parse_fields
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+CHUNK_SIZE = 1024 * 1024
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+        self.participants = 1
+
+
+class Coalescer:
+    def __init__(self):
+        """
+        Collapses concurrent calls with the same key into a single call,
+        whose result (or exception) is shared by every caller.
+        """
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    @contextlib.contextmanager
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Any],
+        release: Optional[Callable[[Any], None]] = None,
+    ) -> Iterator[Any]:
+        """
+        Call fn, unless a call of the key is in flight already, and share its value.
+
+        Calls started after the value is returned call fn again, values
+        are not cached.
+
+        :param key: Key of the call.
+        :param fn: Called without arguments, by the first caller.
+        :param release: Called with the value, once every caller sharing it
+                        has left the context (e.g. to close it).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.participants += 1
+
+        if leader:
+            try:
+                call.value = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                # later callers start a new call
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            logger.debug(f"coalesced {key}")
+            call.done.wait()
+
+        try:
+            if call.error is not None:
+                raise call.error
+            yield call.value
+        finally:
+            with self._lock:
+                call.participants -= 1
+                last = call.participants == 0
+            if last and release is not None and call.error is None:
+                release(call.value)
+
+
+def _query(package: Package) -> str:
+    if package.version is None:
+        return f"{package.ecosystem}://{package.name}"
+    return f"{package.ecosystem}://{package.name}@{package.version}"
+
+
+class Service:
+    def __init__(self, fetcher: Fetcher):
+        """
+        Get, and download packages with a shared fetcher, coalescing
+        concurrent requests of the same resolved package.
+
+        :param fetcher: The fetcher, kept for the lifetime of the service.
+        """
+        self.fetcher = fetcher
+        self._calls = Coalescer()
+
+    def get(self, query: str, fields: Optional[str] = None) -> bytes:
+        """
+        Get metadata of a package, as json.
+
+        :param query: Package query string.
+        :param fields: Comma separated fields of the component (default is all).
+        """
+        projection = parse_fields(fields)
+        package = self.fetcher.resolve(query)
+        key = ("get", package.ecosystem, package.name, package.version)
+        with self._calls.do(key, lambda: self.fetcher.get(_query(package))) as comp:
+            return component_to_json(comp, projection)
+
+    @contextlib.contextmanager
+    def download(self, query: str):
+        """
+        Download artifacts of a package, as a zip archive.
+
+        :param query: Package query string.
+        :return: Context of a readable binary file of the archive.
+        """
+        package = self.fetcher.resolve(query)
+        key = ("download", package.ecosystem, package.name, package.version)
+        with self._calls.do(
+            key,
+            lambda: self.fetcher.download_raw(_query(package)),
+            release=lambda archive: archive.close(),
+        ) as archive:
+            reader = archive.open_reader()
+
+        with reader:
+            yield reader
+
+
+def _status_of(error: Exception) -> int:
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return 404 if error.response.status_code in (404, 410) else 502
+    if isinstance(error, requests.RequestException):
+        return 502
+    if isinstance(error, ValueError):
+        message = str(error).lower()
+        missing = "could not find" in message or "does not exist" in message
+        return 404 if missing else 400
+    return 502
+
+
+def _mk_handler(service: Service):
+    metrics = service.fetcher.options.metrics
+
+    class Handler(BaseHTTPRequestHandler):
+        # connections are kept alive, every response has a Content-Length
+        protocol_version = "HTTP/1.1"
+
+        def end_headers(self):
+            super().end_headers()
+            self.headers_sent = True
+
+        def _send(self, status: int, body: bytes, content_type: str):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, status: int, value: Any):
+            self._send(status, dumps(value), "application/json")
+
+        def _send_file(self, file):
+            file.seek(0, os.SEEK_END)
+            size = file.tell()
+            file.seek(0)
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/zip")
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+            shutil.copyfileobj(file, self.wfile, CHUNK_SIZE)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            self.headers_sent = False
+            try:
+                if url.path == "/healthz":
+                    self._send_json(200, {"ok": True})
+                elif url.path == "/metrics" and metrics is not None:
+                    self._send(200, metrics.render().encode(), CONTENT_TYPE)
+                elif url.path not in ("/get", "/download"):
+                    self._send_json(404, {"error": f"no such endpoint {url.path}"})
+                elif not params.get("query"):
+                    self._send_json(400, {"error": "missing query parameter"})
+                elif url.path == "/get":
+                    body = service.get(params["query"], params.get("fields"))
+                    self._send(200, body, "application/json")
+                else:
+                    with service.download(params["query"]) as file:
+                        self._send_file(file)
+            except (BrokenPipeError, ConnectionResetError):
+                logger.debug(f"client of {self.path} went away")
+            except Exception as e:
+                logger.warning(f"failed {self.path}: {type(e).__name__}: {e}")
+                if self.headers_sent:
+                    # body is cut short, client sees the connection closed
+                    # before Content-Length bytes
+                    self.close_connection = True
+                    return
+                error = f"{type(e).__name__}: {e}"
+                self._send_json(_status_of(e), {"error": error})
+
+        def address_string(self) -> str:
+            # clients of unix sockets have no address
+            return self.client_address[0] if self.client_address else "unix"
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return Handler
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        # BaseHTTPRequestHandler expects these of TCP servers
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def make_server(
+    fetcher: Fetcher,
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    socket_path: Optional[str] = None,
+) -> socketserver.BaseServer:
+    """
+    Make the daemon's server, run it with serve_forever (stop it with shutdown).
+
+    :param fetcher: The fetcher, kept for the lifetime of the server.
+    :param host: The address to listen on.
+    :param port: The port to listen on (0 picks a free one).
+    :param socket_path: Path of a Unix socket to listen on, instead of host and port
+                        (a stale socket file is replaced).
+    """
+    handler = _mk_handler(Service(fetcher))
+    if socket_path is None:
+        server = ThreadingHTTPServer((host, port), handler)
+        server.daemon_threads = True
+        logger.info(f"serving on http://{host}:{server.server_address[1]}")
+        return server
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = UnixHTTPServer(socket_path, handler)
+    logger.info(f"serving on unix socket {socket_path}")
+    return server
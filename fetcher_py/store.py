@@ -0,0 +1,220 @@
+"""Persistent store of components (package metadata), by exact version.
+
+Metadata of a published name@version does not change, so once fetched it
+is kept in two tiers:
+
+    memory   least recently used components, with raw metadata compressed,
+             bounded by their size in bytes (raw metadata of a single PyPI
+             release can be megabytes)
+    sqlite   every stored component, indexed on (ecosystem, normalized name,
+             version), with raw metadata compressed
+
+Both tiers hold raw metadata as compressed bytes, components are made
+from them on each lookup, and decode raw metadata only on access.
+
+Registries consult the store (Options.store) for releases only, after
+ranges and 'latest' are resolved, so it never serves a stale resolution.
+Dist-tags and branches (npm's next, composer's dev-main) move, so they are
+never stored.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from fetcher_py.component import Component
+
+DEFAULT_MAX_MEMORY = 64 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS components (
+    ecosystem TEXT NOT NULL,
+    name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    registry_url TEXT NOT NULL,
+    component TEXT NOT NULL,
+    raw BLOB NOT NULL,
+    size INTEGER NOT NULL, -- of raw, uncompressed
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (ecosystem, name, version, registry_url)
+)
+"""
+
+# (ecosystem, normalized name, version, registry url)
+Key = Tuple[str, str, str, str]
+# typed fields of a component, and its compressed raw metadata
+Entry = Tuple[Dict[str, Any], bytes]
+
+
+def normalize_name(ecosystem: str, name: str) -> str:
+    """
+    Normalize name of a package, per rules of its ecosystem (names which
+    differ only in case, or separators are the same package).
+    """
+    if ecosystem == "pip":
+        return re.sub(r"[-_.]+", "-", name).lower()
+    if ecosystem in ("nuget", "composer"):
+        return name.lower()
+    return name
+
+
+class ComponentStore:
+    def __init__(self, path: str, max_memory: int = DEFAULT_MAX_MEMORY):
+        """
+        Open (or create) the store.
+
+        :param path: Path of the sqlite database (':memory:' is not persisted).
+        :param max_memory: Maximum size in bytes of components kept in memory
+                           (0 disables the memory tier).
+        """
+        if path != ":memory:":
+            path = os.path.expanduser(path)
+            parent = os.path.dirname(path)
+            if parent != "":
+                os.makedirs(parent, exist_ok=True)
+
+        self.path = path
+        self.max_memory = max_memory
+        # one connection, shared by threads under the lock
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        # key -> (size, entry)
+        self._memory: "OrderedDict[Key, Tuple[int, Entry]]" = OrderedDict()
+        self._memory_size = 0
+
+        with self._lock:
+            if path != ":memory:":
+                # readers of other processes are not blocked by a writer
+                self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(SCHEMA)
+            self._db.commit()
+
+    def _key(self, ecosystem: str, name: str, version: str, registry_url: str) -> Key:
+        return (ecosystem, normalize_name(ecosystem, name), version, registry_url)
+
+    def _remember(self, key: Key, entry: Entry):
+        size = len(entry[1]) + sum(len(str(value)) for value in entry[0].values())
+        if size > self.max_memory:
+            return
+
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_size -= previous[0]
+
+        self._memory[key] = (size, entry)
+        self._memory_size += size
+        while self._memory_size > self.max_memory:
+            _, (evicted_size, _) = self._memory.popitem(last=False)
+            self._memory_size -= evicted_size
+
+    @staticmethod
+    def _load(entry: Entry) -> Component:
+        fields, raw = entry
+        return Component(**fields, raw=raw, compressed=True)
+
+    def get(
+        self, ecosystem: str, name: str, version: str, registry_url: str
+    ) -> Optional[Component]:
+        """
+        Get the stored component of name@version, if any.
+
+        :param ecosystem: Ecosystem of the package (e.g., 'pip').
+        :param name: Name of the package (normalized by the store).
+        :param version: Exact version of the package.
+        :param registry_url: Base url of the registry, the component came from.
+        """
+        key = self._key(ecosystem, name, version, registry_url)
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                self._memory.move_to_end(key)
+                return self._load(cached[1])
+
+            row = self._db.execute(
+                "SELECT component, raw FROM components WHERE ecosystem = ? "
+                "AND name = ? AND version = ? AND registry_url = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+
+            entry = (json.loads(row[0]), row[1])
+            self._remember(key, entry)
+            return self._load(entry)
+
+    def put(self, ecosystem: str, name: str, version: str, component: Component):
+        """
+        Store the component of name@version (replacing a stored one).
+
+        :param ecosystem: Ecosystem of the package (e.g., 'pip').
+        :param name: Name of the package (normalized by the store).
+        :param version: Exact version of the package, as it is queried.
+        :param component: The component, registry_url is part of its key.
+        """
+        key = self._key(ecosystem, name, version, component.registry_url)
+        fields = component.to_dict(raw=False)
+        raw_bytes = component.raw_bytes()
+        entry = (fields, zlib.compress(raw_bytes))
+        size = len(raw_bytes)
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO components VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                key + (json.dumps(fields), entry[1], size, time.time()),
+            )
+            self._db.commit()
+            self._remember(key, entry)
+
+    def _select(
+        self, columns: str, ecosystem: str, name: str, registry_url: Optional[str]
+    ) -> List[tuple]:
+        query = f"SELECT {columns} FROM components WHERE ecosystem = ? AND name = ?"
+        params = [ecosystem, normalize_name(ecosystem, name)]
+        if registry_url is not None:
+            query += " AND registry_url = ?"
+            params.append(registry_url)
+
+        with self._lock:
+            return self._db.execute(query + " ORDER BY stored_at", params).fetchall()
+
+    def versions(
+        self, ecosystem: str, name: str, registry_url: Optional[str] = None
+    ) -> List[str]:
+        """
+        List stored versions of a package, in order they were stored.
+
+        :param ecosystem: Ecosystem of the package (e.g., 'pip').
+        :param name: Name of the package (normalized by the store).
+        :param registry_url: Base url of the registry (default is any registry).
+        """
+        rows = self._select("DISTINCT version", ecosystem, name, registry_url)
+        return [version for (version,) in rows]
+
+    def components(
+        self, ecosystem: str, name: str, registry_url: Optional[str] = None
+    ) -> List[Component]:
+        """
+        Get stored components of every version of a package, in order they were stored.
+
+        :param ecosystem: Ecosystem of the package (e.g., 'pip').
+        :param name: Name of the package (normalized by the store).
+        :param registry_url: Base url of the registry (default is any registry).
+        """
+        rows = self._select("component, raw", ecosystem, name, registry_url)
+        return [self._load((json.loads(fields), raw)) for fields, raw in rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM components").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            self._db.close()
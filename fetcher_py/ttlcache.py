@@ -0,0 +1,106 @@
+"""In-memory cache of values, which expire after a time to live.
+
+Used by long-lived registries (kept by Fetcher across queries) for state,
+which is costly to set up, but changes rarely: service indexes (NuGet
+index.json), registration leaves, and authenticated clients (OCI).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+DEFAULT_TTL = 3600.0
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class TTLCache(Generic[V]):
+    def __init__(
+        self,
+        ttl: Optional[float] = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Thread-safe cache, evicting least recently used entries beyond max_entries.
+
+        :param ttl: Seconds a value is reused, before it is loaded again
+                    (None never expires, 0 disables caching).
+        :param max_entries: The maximum number of cached values.
+        :param clock: Monotonic clock, in seconds.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        # key -> (expires at, value)
+        self._entries: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self._loading: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: Hashable) -> Optional[Tuple[float, V]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self._clock():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key: Hashable, load: Callable[[], V]) -> V:
+        """
+        Get the cached value of key, loading it when missing or expired.
+
+        Concurrent callers of a missing key wait for a single load, and
+        share its value. Exceptions raised by load are not cached.
+
+        :param key: The key.
+        :param load: Called without arguments, to load the value.
+        """
+        if self.ttl == 0:
+            return load()
+
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry[1]
+            loading = self._loading.setdefault(key, threading.Lock())
+
+        with loading:
+            with self._lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    return entry[1]
+
+            try:
+                value = load()
+            except BaseException:
+                with self._lock:
+                    self._loading.pop(key, None)
+                raise
+
+            expires = float("inf") if self.ttl is None else self._clock() + self.ttl
+            with self._lock:
+                self._entries[key] = (expires, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                self._loading.pop(key, None)
+            return value
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """
+        Drop the cached value of key (every value when key is None).
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,603 @@
+"""Version ranges in queries, resolved locally against releases of a package.
+
+Ranges follow the syntax, and ordering rules of each ecosystem:
+
+    npm        ^4.18, ~1.2.3, 1.x, 1, >=1.2 <2, 1.2 - 1.4, 1 || 2
+    cargo      1, 1.2, ^1.2, ~1.2, >=1.2, <1.5, 1.*, >=1.2, <1.5
+    composer   ^1.2, ~1.2, 1.2.*, >=1.0 <2.0, 1.0 - 2.0, ^1 || ^2
+    pep440     >=1.24,<2, ~=1.4.2, ==1.*, !=1.5
+    rubygems   ~> 1.2, >= 1.0, < 2
+    pvp        ^>=1.2, >=1.2 && <1.3, ==1.2.*, ^>=1 || ^>=2
+    nuget      [1.0,2.0), (,1.0], [1.0], 1.*
+
+A version is pinned (and used as is) when it is an exact version of the
+ecosystem, or when it is not a valid range either (e.g. npm dist-tags).
+Full versions are exact, even for npm, and cargo, where partial ones
+(e.g. 1, 1.2) are ranges.
+
+'latest' (or no version) is the highest release, which is neither yanked,
+nor a pre-release (unless the package has pre-releases only). A range
+matches pre-releases only when one of its bounds is a pre-release.
+"""
+
+import functools
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Pattern, Tuple
+
+LATEST = "latest"
+
+# lowest version with a release, in loose schemes (e.g. 2-0 < 2.0.0-alpha)
+_MIN_PRE = "-0"
+
+
+@dataclass
+class Release:
+    """
+    Release of a package, as listed by its registry.
+
+    Parameters:
+    - version: The version, as published.
+    - yanked: Whether the release was yanked (or unlisted, deprecated),
+      yanked releases are never resolved from ranges.
+    """
+
+    version: str
+    yanked: bool = False
+
+
+@functools.total_ordering
+class Version:
+    def __init__(
+        self, text: str, key: tuple, release: Tuple[int, ...], prerelease: bool
+    ):
+        """
+        Parsed version, ordered by key.
+
+        :param text: The version, as published.
+        :param key: Sort key, equal for equivalent versions (e.g. 1.0, and 1.0.0).
+        :param release: Numeric release components (e.g. (1, 2, 3)).
+        :param prerelease: Whether this is a pre-release (or dev release).
+        """
+        self.text = text
+        self.key = key
+        self.release = release
+        self.prerelease = prerelease
+
+    def __eq__(self, other):
+        return isinstance(other, Version) and self.key == other.key
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"Version({self.text!r})"
+
+
+def _strip_zeros(release: Tuple[int, ...]) -> Tuple[int, ...]:
+    while len(release) > 1 and release[-1] == 0:
+        release = release[:-1]
+    return release
+
+
+_LOOSE = re.compile(
+    r"^\s*[vV=]?\s*(\d+(?:\.\d+)*)"
+    r"(?:[-.]?([0-9A-Za-z]+(?:[.-][0-9A-Za-z]+)*))?"
+    r"(?:\+[0-9A-Za-z.-]+)?\s*$"
+)
+
+
+def parse_loose(text: str) -> Optional[Version]:
+    """
+    Parse a dotted version, with an optional pre-release tag (semver, npm,
+    cargo, composer, rubygems, hackage, nuget, and cpan versions).
+    """
+    match = _LOOSE.match(text)
+    if match is None:
+        return None
+
+    release = tuple(int(p) for p in match.group(1).split("."))
+    pre = match.group(2)
+    if not pre:
+        return Version(text, (_strip_zeros(release), (1,)), release, False)
+
+    pre_key = tuple(
+        (0, int(p)) if p.isdigit() else (1, p.lower()) for p in re.split(r"[.-]", pre)
+    )
+    return Version(text, (_strip_zeros(release), (0, pre_key)), release, True)
+
+
+_PEP440 = re.compile(
+    r"^\s*v?(?:(\d+)!)?(\d+(?:\.\d+)*)"
+    r"(?:[-_.]?(a|b|c|rc|alpha|beta|pre|preview)[-_.]?(\d+)?)?"
+    r"(?:-(\d+)|[-_.]?(post|rev|r)[-_.]?(\d+)?)?"
+    r"(?:[-_.]?(dev)[-_.]?(\d+)?)?"
+    r"(?:\+[a-z0-9]+(?:[-_.][a-z0-9]+)*)?\s*$",
+    re.IGNORECASE,
+)
+_PEP440_PRE = {"a": 0, "alpha": 0, "b": 1, "beta": 1, "c": 2, "rc": 2}
+_PEP440_PRE.update({"pre": 2, "preview": 2})
+
+
+def parse_pep440(text: str) -> Optional[Version]:
+    """
+    Parse a PEP 440 version (local version labels are ignored for ordering).
+    """
+    match = _PEP440.match(text)
+    if match is None:
+        return None
+
+    epoch, release, pre, pre_n, implicit_post, post, post_n, dev, dev_n = match.groups()
+    release = tuple(int(p) for p in release.split("."))
+    if implicit_post is not None:
+        post = int(implicit_post)
+    elif post is not None:
+        post = int(post_n or 0)
+
+    if pre is None and post is None and dev is not None:
+        pre_key = (-1,)  # 1.0.dev0 < 1.0a0
+    elif pre is None:
+        pre_key = (3,)
+    else:
+        pre_key = (_PEP440_PRE[pre.lower()], int(pre_n or 0))
+    post_key = -1 if post is None else post
+    dev_key = float("inf") if dev is None else int(dev_n or 0)
+
+    key = (int(epoch or 0), _strip_zeros(release), pre_key, post_key, dev_key)
+    return Version(text, key, release, pre is not None or dev is not None)
+
+
+@dataclass
+class Comparator:
+    """
+    A single bound of a range.
+
+    Parameters:
+    - op: One of ==, !=, <, <=, >, >=, =* (release prefix), !* (not release
+      prefix), and === (same text).
+    - version: The bound (None for prefix operators).
+    - prefix: Release prefix (e.g. (1, 2) for 1.2.*), for prefix operators.
+    - implied: Whether the bound is implied by the range (e.g. <2.0.0-0 of
+      ^1.2), rather than given, so its pre-release does not let the range
+      match pre-releases.
+    """
+
+    op: str
+    version: Optional[Version] = None
+    prefix: Tuple[int, ...] = ()
+    implied: bool = False
+
+    @property
+    def prerelease(self) -> bool:
+        return self.version is not None and self.version.prerelease and not self.implied
+
+    def matches(self, version: Version) -> bool:
+        if self.op in ("=*", "!*"):
+            release = version.release + (0,) * len(self.prefix)
+            return (release[: len(self.prefix)] == self.prefix) == (self.op == "=*")
+        if self.op == "===":
+            return version.text.strip() == self.version.text.strip()
+
+        return {
+            "==": lambda: version == self.version,
+            "!=": lambda: version != self.version,
+            "<": lambda: version < self.version,
+            "<=": lambda: version <= self.version,
+            ">": lambda: version > self.version,
+            ">=": lambda: version >= self.version,
+        }[self.op]()
+
+
+@dataclass
+class Range:
+    """
+    Union of alternatives, each an intersection of comparators.
+
+    Parameters:
+    - alternatives: Comparators per alternative (an empty one matches any version).
+    """
+
+    alternatives: List[List[Comparator]] = field(default_factory=list)
+
+    def contains(self, version: Version) -> bool:
+        for comparators in self.alternatives:
+            if not all(c.matches(version) for c in comparators):
+                continue
+            if not version.prerelease or any(c.prerelease for c in comparators):
+                return True
+        return False
+
+
+@dataclass(frozen=True)
+class Scheme:
+    """
+    Versioning scheme of an ecosystem.
+
+    Parameters:
+    - name: Name of the scheme.
+    - parse_version: Parses a version (None when it is invalid).
+    - parse_range: Parses a range (raises ValueError when it is invalid).
+    - exact: Matches exact versions.
+    - branch: Matches versions of branches, which move (e.g. composer's dev-main).
+    """
+
+    name: str
+    parse_version: Callable[[str], Optional[Version]]
+    parse_range: Callable[[str], Range]
+    exact: Pattern
+    branch: Optional[Pattern] = None
+
+
+class _Bounds:
+    def __init__(self, parse_version: Callable[[str], Optional[Version]]):
+        self.parse_version = parse_version
+
+    def version(self, text: str) -> Version:
+        version = self.parse_version(text)
+        if version is None:
+            raise ValueError(f"invalid version: {text}")
+        return version
+
+    def cmp(self, op: str, text: str, implied: bool = False) -> Comparator:
+        return Comparator(op, self.version(text), implied=implied)
+
+    def below(self, parts: List[int], index: int) -> Comparator:
+        # < next release at index (e.g. <2-0 for index 0 of 1.2.3)
+        bumped = parts[:index] + [parts[index] + 1]
+        return self.cmp("<", ".".join(map(str, bumped)) + _MIN_PRE, implied=True)
+
+    def partial(
+        self, op: str, parts: List[int], tail: str, full: int, tilde: Callable
+    ) -> List[Comparator]:
+        """
+        Comparators of op with a (possibly partial) version, npm style.
+
+        :param parts: Numeric components given (before any wildcard).
+        :param tail: Pre-release, and build suffix (e.g. -beta.1).
+        :param full: Number of components of a complete version.
+        :param tilde: Index of the component bumped by ~, given parts.
+        """
+        text = ".".join(map(str, parts)) + tail
+        complete = len(parts) >= full
+        if op == "^":
+            if not parts:
+                return []
+            nonzero = [i for i, p in enumerate(parts) if p != 0]
+            index = nonzero[0] if nonzero else len(parts) - 1
+            return [self.cmp(">=", text), self.below(parts, index)]
+        if op in ("~", "~>"):
+            if not parts:
+                return []
+            return [self.cmp(">=", text), self.below(parts, tilde(parts))]
+        if not parts:
+            # wildcard (*, x): any version for =, >=, <=, no version otherwise
+            return (
+                []
+                if op in ("", "=", "==", ">=", "<=")
+                else [self.cmp("<", "0-0", True)]
+            )
+        if complete or op == "!=":
+            return [self.cmp(op if op not in ("", "=") else "==", text)]
+        if op in ("", "=", "=="):
+            return [Comparator("=*", prefix=tuple(parts))]
+        if op == ">":
+            bumped = ".".join(map(str, self._bump(parts)))
+            return [self.cmp(">=", bumped + _MIN_PRE, implied=True)]
+        if op == ">=":
+            return [self.cmp(">=", text)]
+        if op == "<":
+            return [self.cmp("<", text + _MIN_PRE, implied=True)]
+        if op == "<=":
+            return [self.below(parts, len(parts) - 1)]
+        raise ValueError(f"invalid operator: {op}")
+
+    @staticmethod
+    def _bump(parts: List[int]) -> List[int]:
+        return parts[:-1] + [parts[-1] + 1]
+
+
+_PARTIAL = re.compile(
+    r"^[vV]?(\d+|[xX*])?(?:\.(\d+|[xX*]))?(?:\.(\d+|[xX*]))?(?:\.(\d+|[xX*]))?"
+    r"((?:-[0-9A-Za-z.-]+)?(?:\+[0-9A-Za-z.-]+)?)$"
+)
+
+
+def _parse_partial(text: str) -> Tuple[List[int], str]:
+    match = _PARTIAL.match(text)
+    if match is None:
+        raise ValueError(f"invalid version: {text}")
+
+    parts = []
+    for part in match.groups()[:4]:
+        if part is None or not part.isdigit():
+            break
+        parts.append(int(part))
+    tail = match.group(5) if len(parts) >= 3 else ""
+    return parts, tail
+
+
+_OP = r"(\^|~>|~|>=|<=|!=|==|>|<|=)?"
+_HYPHEN = re.compile(r"^(\S+)\s+-\s+(\S+)$")
+
+
+def _squeeze(text: str) -> str:
+    # ">= 1.2" -> ">=1.2", so comparators split on whitespace
+    return re.sub(r"(\^|~>|~|>=|<=|!=|==|>|<|=)\s+", r"\1", text.strip())
+
+
+def _semver_alternative(
+    bounds: _Bounds,
+    text: str,
+    default_op: str,
+    full: int,
+    tilde: Callable,
+    separators: str,
+) -> List[Comparator]:
+    text = _squeeze(text)
+    hyphen = _HYPHEN.match(text)
+    if hyphen is not None:
+        low, low_tail = _parse_partial(hyphen.group(1))
+        high, high_tail = _parse_partial(hyphen.group(2))
+        comparators = bounds.partial(">=", low, low_tail, full, tilde)
+        if len(high) >= full:
+            comparators += bounds.partial("<=", high, high_tail, full, tilde)
+        elif high:
+            comparators.append(bounds.below(high, len(high) - 1))
+        return comparators
+
+    comparators = []
+    for token in re.split(separators, text):
+        if token == "":
+            continue
+        match = re.match(_OP + r"(.+)$", token)
+        op, version = match.group(1) or default_op, match.group(2)
+        parts, tail = _parse_partial(version)
+        comparators += bounds.partial(op, parts, tail, full, tilde)
+    return comparators
+
+
+def _npm_tilde(parts: List[int]) -> int:
+    return 0 if len(parts) == 1 else 1
+
+
+def _last_but_one(parts: List[int]) -> int:
+    return max(0, len(parts) - 2)
+
+
+def _parse_npm(text: str) -> Range:
+    bounds = _Bounds(parse_loose)
+    return Range(
+        [
+            _semver_alternative(bounds, alt, "", 3, _npm_tilde, r"\s+")
+            for alt in text.split("||")
+        ]
+    )
+
+
+def _parse_cargo(text: str) -> Range:
+    bounds = _Bounds(parse_loose)
+    return Range([_semver_alternative(bounds, text, "^", 3, _npm_tilde, r"\s*,\s*")])
+
+
+def _parse_composer(text: str) -> Range:
+    bounds = _Bounds(parse_loose)
+    text = re.sub(r"@\w+", "", text)  # stability flags
+    return Range(
+        [
+            _semver_alternative(bounds, alt, "", 3, _last_but_one, r"[\s,]+")
+            for alt in re.split(r"\|\|?", text)
+        ]
+    )
+
+
+def _parse_rubygems(text: str) -> Range:
+    bounds = _Bounds(parse_loose)
+    comparators = []
+    for token in _squeeze(text).split(","):
+        match = re.match(_OP + r"\s*(\S+)$", token.strip())
+        if match is None or match.group(1) in ("^", "~"):
+            raise ValueError(f"invalid requirement: {token}")
+
+        op = match.group(1) or "="
+        if op == "~>":
+            # ~> 1.2 is >= 1.2, < 2, and ~> 1.2.3 is >= 1.2.3, < 1.3
+            lower = bounds.cmp(">=", match.group(2))
+            parts = list(lower.version.release)
+            comparators += [lower, bounds.below(parts, _last_but_one(parts))]
+        else:
+            comparators.append(bounds.cmp("==" if op == "=" else op, match.group(2)))
+    return Range([comparators])
+
+
+def _parse_pep440(text: str) -> Range:
+    bounds = _Bounds(parse_pep440)
+    comparators = []
+    for token in text.split(","):
+        match = re.match(r"^\s*(~=|===|==|!=|<=|>=|<|>)\s*(\S+)\s*$", token)
+        if match is None:
+            raise ValueError(f"invalid specifier: {token}")
+
+        op, version = match.groups()
+        if op in ("==", "!=") and version.endswith(".*"):
+            prefix = tuple(int(p) for p in version[:-2].split("."))
+            comparators.append(Comparator("=*" if op == "==" else "!*", prefix=prefix))
+        elif op == "~=":
+            parsed = bounds.version(version)
+            if len(parsed.release) < 2:
+                raise ValueError(f"invalid specifier: {token}")
+            comparators.append(Comparator(">=", parsed))
+            comparators.append(Comparator("=*", prefix=parsed.release[:-1]))
+        elif op == "===":
+            comparators.append(Comparator("===", Version(version, (), (), False)))
+        else:
+            comparators.append(bounds.cmp(op, version))
+    return Range([comparators])
+
+
+def _parse_pvp(text: str) -> Range:
+    bounds = _Bounds(parse_loose)
+    alternatives = []
+    for alt in text.split("||"):
+        comparators = []
+        for token in alt.split("&&"):
+            token = token.strip()
+            if token == "-any":
+                continue
+            match = re.match(r"^(\^>=|==|>=|<=|>|<)\s*(\d+(?:\.\d+)*)(\.\*)?$", token)
+            if match is None:
+                raise ValueError(f"invalid constraint: {token}")
+
+            op, version, wildcard = match.groups()
+            parts = [int(p) for p in version.split(".")]
+            if op == "^>=":
+                # same major version (first two components)
+                padded = parts + [0] * (2 - len(parts))
+                comparators += [bounds.cmp(">=", version), bounds.below(padded, 1)]
+            elif wildcard:
+                if op != "==":
+                    raise ValueError(f"invalid constraint: {token}")
+                comparators.append(Comparator("=*", prefix=tuple(parts)))
+            else:
+                comparators.append(bounds.cmp(op, version))
+        alternatives.append(comparators)
+    return Range(alternatives)
+
+
+_INTERVAL = re.compile(r"^([\[(])\s*([^,\s]*)\s*(?:(,)\s*([^\])\s]*))?\s*([\])])$")
+
+
+def _parse_nuget(text: str) -> Range:
+    bounds = _Bounds(parse_loose)
+    text = text.strip()
+    interval = _INTERVAL.match(text)
+    if interval is not None:
+        opening, low, comma, high, closing = interval.groups()
+        if comma is None:
+            if opening != "[" or closing != "]" or not low:
+                raise ValueError(f"invalid interval: {text}")
+            return Range([[bounds.cmp("==", low)]])
+
+        comparators = []
+        if low:
+            comparators.append(bounds.cmp(">=" if opening == "[" else ">", low))
+        if high:
+            comparators.append(bounds.cmp("<=" if closing == "]" else "<", high))
+        return Range([comparators])
+
+    # floating versions (e.g. 1.*, 1.2.*, *)
+    match = re.match(r"^((?:\d+\.)*)\*$", text)
+    if match is None:
+        raise ValueError(f"invalid range: {text}")
+    prefix = tuple(int(p) for p in match.group(1).split(".") if p)
+    return Range([[Comparator("=*", prefix=prefix)] if prefix else []])
+
+
+_SEMVER = re.compile(r"^v?\d+\.\d+\.\d+(?:-[0-9A-Za-z.-]+)?(?:\+[0-9A-Za-z.-]+)?$")
+
+SCHEMES: Dict[str, Scheme] = {
+    scheme.name: scheme
+    for scheme in [
+        Scheme("npm", parse_loose, _parse_npm, _SEMVER),
+        Scheme("cargo", parse_loose, _parse_cargo, _SEMVER),
+        Scheme(
+            "composer",
+            parse_loose,
+            _parse_composer,
+            re.compile(r"^[^\s^~*<>=!|,]+$"),
+            re.compile(r"^dev-|-dev$"),
+        ),
+        Scheme("pep440", parse_pep440, _parse_pep440, re.compile(r"^[^\s*<>=!~,]+$")),
+        Scheme("rubygems", parse_loose, _parse_rubygems, re.compile(r"^[^\s<>=!~,]+$")),
+        Scheme("pvp", parse_loose, _parse_pvp, re.compile(r"^[\d.]+$")),
+        Scheme("nuget", parse_loose, _parse_nuget, re.compile(r"^[^\s\[\]()*,]+$")),
+        # ranges are resolved by metacpan (download_url), only detected here
+        Scheme("cpan", parse_loose, _parse_rubygems, re.compile(r"^[^\s<>=!~,]+$")),
+    ]
+}
+
+
+def get_scheme(name: str) -> Scheme:
+    if name not in SCHEMES:
+        raise ValueError(f"Unsupported version scheme: {name}")
+    return SCHEMES[name]
+
+
+def is_pinned(scheme: Optional[str], version: Optional[str]) -> bool:
+    """
+    Whether version is used as is (not missing, 'latest', nor a range).
+
+    :param scheme: Name of the versioning scheme (None has no ranges).
+    :param version: The version of a query.
+    """
+    if version is None or version.strip() in ("", LATEST):
+        return False
+    if scheme is None:
+        return True
+
+    return parse_range(scheme, version) is None
+
+
+def is_release(scheme: str, version: Optional[str]) -> bool:
+    """
+    Whether version is a published release, whose metadata does not change
+    (not a range, a dist-tag, nor a branch).
+
+    :param scheme: Name of the versioning scheme.
+    :param version: The version.
+    """
+    if version is None:
+        return False
+
+    scheme = get_scheme(scheme)
+    if scheme.branch is not None and scheme.branch.search(version.strip()):
+        return False
+    return scheme.parse_version(version.strip()) is not None
+
+
+def parse_range(scheme: str, text: str) -> Optional[Range]:
+    """
+    Parse text as a range of scheme.
+
+    :return: The range, or None when text is an exact version, or is not a
+             valid range (e.g. a dist-tag, which is left to the registry).
+    """
+    scheme = get_scheme(scheme)
+    if scheme.exact.match(text.strip()):
+        return None
+    try:
+        return scheme.parse_range(text)
+    except (ValueError, AttributeError):
+        return None
+
+
+def select(
+    scheme: str, releases: Iterable[Release], spec: Optional[str] = None
+) -> Optional[str]:
+    """
+    Select the highest release matching spec.
+
+    :param scheme: Name of the versioning scheme.
+    :param releases: Releases of the package.
+    :param spec: A range, or None (or 'latest') for the latest release.
+    :return: The version, as published, or None when no release matches.
+    """
+    parse = get_scheme(scheme).parse_version
+    candidates = []
+    for release in releases:
+        version = parse(release.version) if not release.yanked else None
+        if version is not None:
+            candidates.append(version)
+
+    if spec is None or spec.strip() in ("", LATEST):
+        stable = [v for v in candidates if not v.prerelease]
+        best = max(stable or candidates, default=None)
+    else:
+        version_range = parse_range(scheme, spec)
+        if version_range is None:
+            raise ValueError(f"invalid {scheme} range: {spec}")
+        best = max((v for v in candidates if version_range.contains(v)), default=None)
+
+    return best.text if best is not None else None
@@ -1,5 +1,6 @@
 import io
 from unittest.mock import MagicMock, patch
+from fetcher_py.component import Component, Dependency
 from fetcher_py.package import Package
 import pytest
 import requests_mock
@@ -99,11 +100,47 @@ def test_reachable(registry):
 
 def test_get_default(registry):
     with requests_mock.Mocker() as m:
-        m.get(PKG_WO_VERSION_URL, json=[{"version": PKG_VERSION}])
+        m.get(
+            "https://index.crates.io/ra/nd/rand",
+            text="\n".join(
+                [
+                    '{"name": "rand", "vers": "0.8.3"}',
+                    f'{{"name": "rand", "vers": "{PKG_VERSION}"}}',
+                    '{"name": "rand", "vers": "0.8.5", "yanked": true}',
+                    '{"name": "rand", "vers": "0.9.0-alpha.1"}',
+                ]
+            ),
+        )
         default_version = registry.get_default(PKG_WO_VERSION)
         assert default_version == PKG_VERSION
 
 
+def test_get_default_of_custom_registry():
+    registry = CargoRegistry(Session(), "https://cargo.example.com/api/v1/crates")
+    with requests_mock.Mocker() as m:
+        m.get(
+            f"https://cargo.example.com/api/v1/crates/{PKG_NAME}",
+            json={"versions": [{"num": "0.8.5", "yanked": True}, {"num": "0.8.4"}]},
+        )
+        assert registry.get_default(PKG_WO_VERSION) == PKG_VERSION
+
+
+def test_get_with_range_reuses_index(registry):
+    with requests_mock.Mocker() as m:
+        m.get(
+            "https://index.crates.io/ra/nd/rand",
+            text="\n".join(
+                [
+                    f'{{"name": "rand", "vers": "{PKG_VERSION}"}}',
+                    '{"name": "rand", "vers": "1.0.0"}',
+                ]
+            ),
+        )
+        component = registry.get(Package(ecosystem="cargo", name="rand", version="0.8"))
+        assert component.version == PKG_VERSION
+        assert m.call_count == 1
+
+
 def test_get(registry):
     with requests_mock.Mocker() as m:
         m.get(
@@ -115,7 +152,7 @@ def test_get(registry):
         assert component.version == PKG_VERSION
 
 
-@patch("fetcher_py.registry.cargo.Downloader")
+@patch("fetcher_py.registry._registry.Downloader")
 def test_download(mock_downloader, registry):
     with requests_mock.Mocker() as m:
         m.get(
@@ -132,8 +169,29 @@ def test_download(mock_downloader, registry):
         downloaded_bytes = registry.download(PKG)
         assert downloaded_bytes.getvalue() == b"mocked_downloaded_data"
 
-        mock_downloader.assert_called_once_with()
+        mock_downloader.assert_called_once_with(registry.options, registry.session)
         downloader_instance.add.assert_called_once_with(
-            "src", "https://static.crates.io/crates/rand/rand-0.8.4.crate"
+            "src",
+            "https://static.crates.io/crates/rand/rand-0.8.4.crate",
+            None,
+            None,
+            None,
         )
         downloader_instance.get_as_zipped.assert_called_once()
+
+
+def test_get_dependencies(registry):
+    deps = [
+        {"name": "libc", "req": "0.2", "kind": "normal", "optional": False},
+        {"name": "cc", "req": "^1.0", "kind": "build"},
+        {"name": "serde", "req": "1", "optional": True},
+        {"name": "criterion", "req": "0.5", "kind": "dev"},
+        {"name": "rand_core06", "package": "rand_core", "req": "~0.6"},
+    ]
+    component = Component(PKG_NAME, PKG_VERSION, "", None, None, [], {"deps": deps})
+
+    assert registry.get_dependencies(component) == [
+        Dependency("libc", "^0.2"),
+        Dependency("cc", "^1.0"),
+        Dependency("rand_core", "~0.6"),
+    ]
@@ -1,4 +1,5 @@
 import io
+from fetcher_py.component import Dependency
 from fetcher_py.package import Package
 import pytest
 from requests import Session
@@ -53,6 +54,28 @@ def test_get_default(registry):
         assert default_version == PKG_VERSION
 
 
+def test_get_without_version_fetches_metadata_once(registry):
+    response = {
+        "packages": {
+            PKG_NAME: [
+                {"version": "3.6.0-RC1"},
+                {"version": PKG_VERSION, "dist": {"url": "http://example.com/a.tgz"}},
+                {"version": "2.9.2"},
+            ]
+        }
+    }
+    with requests_mock.Mocker() as m:
+        m.get(PKG_WO_VERSION_URL, json=response)
+
+        component = registry.get(Package(ecosystem="composer", name=PKG_NAME))
+        assert component.version == PKG_VERSION
+        component = registry.get(
+            Package(ecosystem="composer", name=PKG_NAME, version="^2.0")
+        )
+        assert component.version == "2.9.2"
+        assert m.call_count == 1
+
+
 def test_get(registry):
     with requests_mock.Mocker() as m:
         m.get(PKG_URL, json=JSON_RESPONSE)
@@ -62,7 +85,7 @@ def test_get(registry):
         assert component.version == PKG_VERSION
 
 
-@patch("fetcher_py.registry.composer.Downloader")
+@patch("fetcher_py.registry._registry.Downloader")
 def test_download(mock_downloader, registry):
     with requests_mock.Mocker() as m:
         m.get(PKG_URL, json=JSON_RESPONSE)
@@ -74,9 +97,9 @@ def test_download(mock_downloader, registry):
 
         downloaded_bytes = registry.download(PKG)
         assert downloaded_bytes.getvalue() == b"mocked_downloaded_data"
-        mock_downloader.assert_called_once_with()
+        mock_downloader.assert_called_once_with(registry.options, registry.session)
         downloader_instance.add.assert_called_once_with(
-            "src", "http://example.com/package.tgz"
+            "src", "http://example.com/package.tgz", None, None, None
         )
         downloader_instance.get_as_zipped.assert_called_once()
 
@@ -92,3 +115,31 @@ def test_get_artifact_urls(registry):
         kind, url = artifact_urls[0]
         assert kind == "src"
         assert url == "http://example.com/package.tgz"
+
+
+def test_get_dependencies_of_minified_metadata(registry):
+    response = {
+        "minified": "composer/2.0",
+        "packages": {
+            PKG_NAME: [
+                {
+                    "version": "3.6.0",
+                    "require": {"php": ">=8.1", "psr/log": "^2.0 || ^3.0"},
+                    "license": ["MIT"],
+                },
+                {"version": PKG_VERSION},
+                {"version": "3.4.0", "require": "__unset"},
+            ]
+        },
+    }
+    with requests_mock.Mocker() as m:
+        m.get(PKG_URL, json=response)
+
+        component = registry.get(PKG)
+        assert component.raw["license"] == ["MIT"]
+        assert registry.get_dependencies(component) == [
+            Dependency("psr/log", "^2.0 || ^3.0")
+        ]
+
+        component = registry.get(Package("composer", PKG_NAME, "3.4.0"))
+        assert registry.get_dependencies(component) == []
@@ -52,7 +52,7 @@ def test_get(registry):
         assert component.version == PKG_VERSION
 
 
-@patch("fetcher_py.registry.cpan.Downloader")
+@patch("fetcher_py.registry._registry.Downloader")
 def test_download(mock_downloader, registry):
     with requests_mock.Mocker() as m:
         json_data = {"download_url": "https://example.com/example-0.01.tar.gz"}
@@ -66,9 +66,9 @@ def test_download(mock_downloader, registry):
         downloaded_bytes = registry.download(PKG)
         assert downloaded_bytes.getvalue() == b"mocked_downloaded_data"
 
-        mock_downloader.assert_called_once_with()
+        mock_downloader.assert_called_once_with(registry.options, registry.session)
         downloader_instance.add.assert_called_once_with(
-            "src", "https://example.com/example-0.01.tar.gz"
+            "src", "https://example.com/example-0.01.tar.gz", None, None, None
         )
         downloader_instance.get_as_zipped.assert_called_once()
 
@@ -84,3 +84,11 @@ def test_get_artifact_urls(registry):
         kind, url = artifact_urls[0]
         assert kind == "src"
         assert url == "https://example.com/example-0.01.tar.gz"
+
+
+def test_get_default_with_range(registry):
+    with requests_mock.Mocker() as m:
+        m.get(PKG_WO_VERSION_URL, json={"version": PKG_VERSION})
+        entry = Package(ecosystem="cpan", name=PKG_NAME, version=">= 1.0, < 2.0")
+        assert registry.get_default(entry) == PKG_VERSION
+        assert m.last_request.qs == {"version": [">= 1.0, < 2.0"]}
@@ -1,4 +1,5 @@
 import io
+from fetcher_py.component import Component, Dependency
 from fetcher_py.package import Package
 import pytest
 from requests import Session
@@ -16,7 +17,7 @@ PKG = Package(ecosystem="gem", name=PKG_NAME, version=PKG_VERSION)
 PKG_URL = f"{BASE_URL}/api/v2/rubygems/{PKG_NAME}/versions/{PKG_VERSION}.json"
 
 PKG_WO_VERSION = Package(ecosystem="gem", name=PKG_NAME)
-PKG_WO_VERSION_URL = f"{BASE_URL}/api/versions/{PKG_NAME}/latest.json"
+PKG_WO_VERSION_URL = f"{BASE_URL}/api/v1/versions/{PKG_NAME}.json"
 
 
 @pytest.fixture
@@ -37,10 +38,23 @@ def test_reachable(registry):
 
 def test_get_default(registry):
     with requests_mock.Mocker() as m:
-        m.get(PKG_WO_VERSION_URL, json={"version": PKG_VERSION})
+        m.get(
+            PKG_WO_VERSION_URL,
+            json=[
+                {"number": "0.8.0.pre1", "prerelease": True},
+                {"number": PKG_VERSION, "platform": "ruby"},
+                {"number": PKG_VERSION, "platform": "java"},
+                {"number": "0.6.0"},
+            ],
+        )
         default_version = registry.get_default(PKG_WO_VERSION)
         assert default_version == PKG_VERSION
 
+        pessimistic = Package(ecosystem="gem", name=PKG_NAME, version="~> 0.6.0")
+        assert registry.get_default(pessimistic) == "0.6.0"
+        # releases are listed once
+        assert m.call_count == 1
+
 
 def test_get(registry):
     with requests_mock.Mocker() as m:
@@ -52,7 +66,7 @@ def test_get(registry):
         assert component.version == PKG_VERSION
 
 
-@patch("fetcher_py.registry.gem.Downloader")
+@patch("fetcher_py.registry._registry.Downloader")
 def test_download(mock_downloader, registry):
     with requests_mock.Mocker() as m:
         json_data = {"gem_uri": "http://example.com/package.tgz"}
@@ -67,9 +81,9 @@ def test_download(mock_downloader, registry):
         downloaded_bytes = registry.download(PKG)
         assert downloaded_bytes.getvalue() == b"mocked_downloaded_data"
 
-        mock_downloader.assert_called_once_with()
+        mock_downloader.assert_called_once_with(registry.options, registry.session)
         downloader_instance.add.assert_called_once_with(
-            "src", "http://example.com/package.tgz"
+            "src", "http://example.com/package.tgz", None, None, None
         )
         downloader_instance.get_as_zipped.assert_called_once()
 
@@ -86,3 +100,15 @@ def test_get_artifact_urls(registry):
         kind, url = artifact_urls[0]
         assert kind == "src"
         assert url == "http://example.com/package.tgz"
+
+
+def test_get_dependencies(registry):
+    dependencies = {
+        "runtime": [{"name": "rack", "requirements": ">= 2.0, < 4"}],
+        "development": [{"name": "rspec", "requirements": "~> 3.0"}],
+    }
+    component = Component(
+        PKG_NAME, PKG_VERSION, "", None, None, [], {"dependencies": dependencies}
+    )
+
+    assert registry.get_dependencies(component) == [Dependency("rack", ">= 2.0, < 4")]
@@ -37,10 +37,16 @@ def test_reachable(registry):
 
 def test_get_default(registry):
     with requests_mock.Mocker() as m:
-        m.get(PKG_WO_VERSION_URL, json={PKG_VERSION: "normal"})
+        m.get(
+            PKG_WO_VERSION_URL,
+            json={"0.7.2": "deprecated", PKG_VERSION: "normal", "0.6.3": "normal"},
+        )
         default_version = registry.get_default(PKG_WO_VERSION)
         assert default_version == PKG_VERSION
 
+        major = Package(ecosystem="hackage", name=PKG_NAME, version="^>=0.6")
+        assert registry.get_default(major) == "0.6.3"
+
 
 def test_get(registry):
     with requests_mock.Mocker() as m:
@@ -52,7 +58,7 @@ def test_get(registry):
         assert component.version == PKG_VERSION
 
 
-@patch("fetcher_py.registry.hackage.Downloader")
+@patch("fetcher_py.registry._registry.Downloader")
 def test_download(mock_downloader, registry):
     with requests_mock.Mocker() as m:
         m.get(PKG_URL, json={})
@@ -65,10 +71,13 @@ def test_download(mock_downloader, registry):
         downloaded_bytes = registry.download(PKG)
         assert downloaded_bytes.getvalue() == b"mocked_downloaded_data"
 
-        mock_downloader.assert_called_once_with()
+        mock_downloader.assert_called_once_with(registry.options, registry.session)
         downloader_instance.add.assert_called_once_with(
             "src",
             f"http://hackage.haskell.org/package/{PKG_NAME}-{PKG_VERSION}/{PKG_NAME}-{PKG_VERSION}.tar.gz",
+            None,
+            None,
+            None,
         )
         downloader_instance.get_as_zipped.assert_called_once()
 
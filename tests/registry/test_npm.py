@@ -1,4 +1,8 @@
+import base64
 import io
+from fetcher_py.budget import ByteBudget
+from fetcher_py.component import Component, Dependency
+from fetcher_py.options import Options
 from fetcher_py.package import Package
 import pytest
 from requests import Session
@@ -42,6 +46,31 @@ def test_get_default(registry):
         assert default_version == PKG_VERSION
 
 
+def test_get_with_range(registry):
+    versions = ["4.17.20", PKG_VERSION, "5.0.0-beta.1", "3.10.1"]
+    with requests_mock.Mocker() as m:
+        m.get(PKG_WO_VERSION_URL, json={"versions": {v: {} for v in versions}})
+        m.get(PKG_URL, json={"name": PKG_NAME, "version": PKG_VERSION})
+
+        entry = Package(ecosystem="npm", name=PKG_NAME, version="^4.17")
+        component = registry.get(entry)
+        assert entry.version == PKG_VERSION
+        assert component.version == PKG_VERSION
+        assert m.request_history[0].headers["Accept"] == (
+            "application/vnd.npm.install-v1+json"
+        )
+
+
+def test_get_with_dist_tag(registry):
+    with requests_mock.Mocker() as m:
+        m.get(f"{BASE_URL}/{PKG_NAME}/next", json={"version": PKG_VERSION})
+        component = registry.get(
+            Package(ecosystem="npm", name=PKG_NAME, version="next")
+        )
+        assert component.version == PKG_VERSION
+        assert m.call_count == 1
+
+
 def test_get(registry):
     with requests_mock.Mocker() as m:
         json_data = {"name": PKG_NAME, "version": PKG_VERSION}
@@ -52,7 +81,7 @@ def test_get(registry):
         assert component.version == PKG_VERSION
 
 
-@patch("fetcher_py.registry.npm.Downloader")
+@patch("fetcher_py.registry._registry.Downloader")
 def test_download(mock_downloader, registry):
     with requests_mock.Mocker() as m:
         json_data = {"dist": {"tarball": "http://example.com/package.tgz"}}
@@ -67,9 +96,9 @@ def test_download(mock_downloader, registry):
         downloaded_bytes = registry.download(PKG)
         assert downloaded_bytes.getvalue() == b"mocked_downloaded_data"
 
-        mock_downloader.assert_called_once_with()
+        mock_downloader.assert_called_once_with(registry.options, registry.session)
         downloader_instance.add.assert_called_once_with(
-            "src", "http://example.com/package.tgz"
+            "src", "http://example.com/package.tgz", None, None, None
         )
         downloader_instance.get_as_zipped.assert_called_once()
 
@@ -86,3 +115,68 @@ def test_get_artifact_urls(registry):
         kind, url = artifact_urls[0]
         assert kind == "src"
         assert url == "http://example.com/package.tgz"
+
+
+def test_get_artifact_digests(registry):
+    with requests_mock.Mocker() as m:
+        json_data = {
+            "dist": {
+                "tarball": "http://example.com/package.tgz",
+                "shasum": "cd" * 20,
+                "integrity": "sha512-" + base64.b64encode(b"\xab" * 64).decode(),
+            }
+        }
+        m.get(PKG_URL, json=json_data)
+
+        component = registry.get(PKG)
+        digests = registry.get_artifact_digests(component)
+
+        assert digests == {"http://example.com/package.tgz": "sha512:" + "ab" * 64}
+
+
+def test_download_checks_unpacked_size_against_budget():
+    budget = ByteBudget(max_artifact_size=512)
+    registry = NpmRegistry(Session(), BASE_URL, Options(budget=budget))
+    tarball = "http://example.com/package.tgz"
+    with requests_mock.Mocker() as m:
+        json_data = {"dist": {"tarball": tarball, "unpackedSize": 1024}}
+        m.get(PKG_URL, json=json_data)
+        m.get(tarball, content=b"tarball")
+
+        with pytest.raises(ValueError, match="failed to download all artifacts"):
+            registry.download(PKG)
+        assert not any(r.url == tarball for r in m.request_history)
+
+    assert budget.used == 0
+
+
+def test_get_artifact_max_sizes(registry):
+    with requests_mock.Mocker() as m:
+        json_data = {
+            "dist": {"tarball": "http://example.com/package.tgz", "unpackedSize": 1024}
+        }
+        m.get(PKG_URL, json=json_data)
+
+        component = registry.get(PKG)
+        sizes = registry.get_artifact_max_sizes(component)
+
+        assert sizes == {"http://example.com/package.tgz": 1024}
+
+
+def test_get_dependencies(registry):
+    dependencies = {
+        "debug": "2.6.9",
+        "@types/node": "",
+        "string-width-cjs": "npm:string-width@^4.2.0",
+        "local": "file:../local",
+        "forked": "user/repo#main",
+    }
+    component = Component(
+        PKG_NAME, PKG_VERSION, "", None, None, [], {"dependencies": dependencies}
+    )
+
+    assert registry.get_dependencies(component) == [
+        Dependency("debug", "2.6.9"),
+        Dependency("@types/node", "*"),
+        Dependency("string-width", "^4.2.0"),
+    ]
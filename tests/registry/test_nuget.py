@@ -0,0 +1,145 @@
+from requests import Session
+import pytest
+import requests_mock
+from fetcher_py.component import Component, Dependency
+from fetcher_py.options import Options
+from fetcher_py.package import Package
+from fetcher_py.registry.nuget import NuGetRegistry
+
+BASE_URL = "https://api.nuget.org/v3"
+REGISTRATIONS_URL = "https://api.nuget.org/v3/registration5-semver1"
+CONTENT_URL = "https://api.nuget.org/v3-flatcontainer"
+
+INDEX = {
+    "resources": [
+        {"@id": f"{REGISTRATIONS_URL}/", "@type": "RegistrationsBaseUrl"},
+        {"@id": f"{CONTENT_URL}/", "@type": "PackageBaseAddress/3.0.0"},
+    ]
+}
+
+
+def registration(name, version):
+    return {
+        "catalogEntry": f"https://api.nuget.org/v3/catalog0/{name}.{version}.json",
+        "packageContent": f"{CONTENT_URL}/{name}/{version}/{name}.{version}.nupkg",
+    }
+
+
+@pytest.fixture
+def registry():
+    return NuGetRegistry(Session(), BASE_URL)
+
+
+def test_index_is_fetched_lazily_and_reused(registry):
+    with requests_mock.Mocker() as m:
+        m.get(f"{BASE_URL}/index.json", json=INDEX)
+        m.get(f"{REGISTRATIONS_URL}/a/1.0.0.json", json=registration("a", "1.0.0"))
+        m.get(f"{REGISTRATIONS_URL}/b/1.0.0.json", json=registration("b", "1.0.0"))
+        assert m.call_count == 0
+
+        registry.index.package_version_url("a", "1.0.0")
+        registry.index.package_version_url("b", "1.0.0")
+
+        index_calls = [r for r in m.request_history if r.url.endswith("/v3/index.json")]
+        assert len(index_calls) == 1
+
+
+def test_registrations_are_cached_per_package(registry):
+    with requests_mock.Mocker() as m:
+        m.get(f"{BASE_URL}/index.json", json=INDEX)
+        for name in ["a", "b"]:
+            m.get(
+                f"{REGISTRATIONS_URL}/{name}/1.0.0.json",
+                json=registration(name, "1.0.0"),
+            )
+
+        assert registry.index.packge_version_download_url("A", "1.0.0") == (
+            f"{CONTENT_URL}/a/1.0.0/a.1.0.0.nupkg"
+        )
+        assert registry.index.packge_version_download_url("b", "1.0.0") == (
+            f"{CONTENT_URL}/b/1.0.0/b.1.0.0.nupkg"
+        )
+        assert registry.index.package_version_url("a", "1.0.0").endswith(
+            "/a.1.0.0.json"
+        )
+        # index, and one registration per package
+        assert m.call_count == 3
+
+
+def test_service_ttl_zero_refetches_index():
+    registry = NuGetRegistry(Session(), BASE_URL, Options(service_ttl=0))
+    with requests_mock.Mocker() as m:
+        m.get(f"{BASE_URL}/index.json", json=INDEX)
+        m.get(f"{REGISTRATIONS_URL}/a/1.0.0.json", json=registration("a", "1.0.0"))
+
+        registry.index.package_version_url("a", "1.0.0")
+        registry.index.package_version_url("a", "1.0.0")
+        assert m.call_count == 4
+
+
+def test_get(registry):
+    with requests_mock.Mocker() as m:
+        m.get(f"{BASE_URL}/index.json", json=INDEX)
+        m.get(f"{REGISTRATIONS_URL}/a/1.0.0.json", json=registration("a", "1.0.0"))
+        m.get(
+            "https://api.nuget.org/v3/catalog0/a.1.0.0.json",
+            json={"id": "A", "version": "1.0.0", "description": "desc"},
+        )
+
+        component = registry.get(Package(ecosystem="nuget", name="a", version="1.0.0"))
+        assert component.name == "A"
+        assert component.version == "1.0.0"
+        assert component.description == "desc"
+
+
+def test_get_default_skips_unlisted_versions(registry):
+    index_url = f"{REGISTRATIONS_URL}/a/index.json"
+    page_url = f"{REGISTRATIONS_URL}/a/page/2.0.0/3.0.0.json"
+
+    def leaf(version, listed=True):
+        return {"catalogEntry": {"version": version, "listed": listed}}
+
+    with requests_mock.Mocker() as m:
+        m.get(f"{BASE_URL}/index.json", json=INDEX)
+        m.get(
+            index_url,
+            json={
+                "items": [
+                    {"items": [leaf("1.0.0"), leaf("1.5.0")]},
+                    {"@id": page_url},
+                ]
+            },
+        )
+        m.get(page_url, json={"items": [leaf("2.0.0"), leaf("3.0.0", listed=False)]})
+
+        def resolve(version):
+            return registry.get_default(Package("nuget", "a", version))
+
+        assert resolve(None) == "2.0.0"
+        assert resolve("[1.0,2.0)") == "1.5.0"
+        assert resolve("1.*") == "1.5.0"
+
+
+def test_get_dependencies(registry):
+    groups = [
+        {
+            "targetFramework": "net6.0",
+            "dependencies": [
+                {"id": "System.Memory", "range": "[4.5.5, )"},
+                {"id": "Microsoft.CSharp", "range": "4.7.0"},
+            ],
+        },
+        {
+            "targetFramework": "netstandard2.0",
+            "dependencies": [{"id": "system.memory", "range": "[4.5.4, )"}],
+        },
+        {"targetFramework": "net8.0"},
+    ]
+    component = Component(
+        "Pkg", "1.0.0", "", None, None, [], {"dependencyGroups": groups}
+    )
+
+    assert registry.get_dependencies(component) == [
+        Dependency("System.Memory", "[4.5.5, )"),
+        Dependency("Microsoft.CSharp", "[4.7.0, )"),
+    ]
@@ -0,0 +1,114 @@
+import hashlib
+from unittest.mock import patch
+
+import oras.container
+import pytest
+import requests_mock
+from requests import Session
+
+from fetcher_py.budget import BudgetExceededError, ByteBudget
+from fetcher_py.cache import ArtifactCache
+from fetcher_py.options import Options
+from fetcher_py.package import Package
+from fetcher_py.registry.oci import MyProvider, OciRegistry
+
+PKG = Package(ecosystem="oci", name="ghcr.io/org/image:1.0")
+MANIFEST = {
+    "layers": [
+        {"digest": "sha256:" + "a" * 64, "size": 6},
+        {"digest": "sha256:" + "b" * 64, "size": 6},
+    ]
+}
+
+
+@pytest.fixture
+def budget():
+    return ByteBudget(max_artifact_size=8, max_total_size=16)
+
+
+@pytest.fixture
+def registry(budget):
+    return OciRegistry(Session(), options=Options(budget=budget))
+
+
+def test_raw_charges_image_once(registry, budget):
+    with patch.object(MyProvider, "inspect", return_value=MANIFEST):
+        with patch.object(MyProvider, "pull", return_value=[]):
+            registry.raw(PKG)
+
+    assert budget.used == 12
+
+
+def test_raw_checks_every_layer_before_charging(registry, budget):
+    manifest = {"layers": MANIFEST["layers"] + [{"digest": "sha256:c", "size": 9}]}
+    with patch.object(MyProvider, "inspect", return_value=manifest):
+        with patch.object(MyProvider, "pull") as pull:
+            with pytest.raises(BudgetExceededError, match="above max artifact size"):
+                registry.raw(PKG)
+
+    pull.assert_not_called()
+    assert budget.used == 0
+
+
+def test_raw_refunds_failed_pull(registry, budget):
+    error = ValueError("unauthorized")
+    with patch.object(MyProvider, "inspect", return_value=MANIFEST):
+        with patch.object(MyProvider, "pull", side_effect=error):
+            with pytest.raises(ValueError, match="unauthorized"):
+                registry.raw(PKG)
+
+    assert budget.used == 0
+
+
+def test_providers_are_scoped_to_repositories(registry):
+    provider = registry.provider("ghcr.io/org/image:1.0")
+
+    assert registry.provider("ghcr.io/org/image@sha256:" + "a" * 64) is provider
+    assert registry.provider("ghcr.io/org/other:1.0") is not provider
+    assert registry.provider("quay.io/org/image:1.0") is not provider
+
+
+def test_plan_component_uses_blob_urls(registry):
+    manifest = {"layers": MANIFEST["layers"] + [{"digest": "sha256:c"}]}
+    with patch.object(MyProvider, "inspect", return_value=manifest):
+        component = registry.get(PKG)
+
+    with requests_mock.Mocker() as m:
+        m.head("https://ghcr.io/v2/org/image/blobs/sha256:c", status_code=401)
+        plan = registry.plan_component(PKG, component)
+        # sizes in the manifest are not requested
+        assert m.call_count == 1
+
+    assert [a.url for a in plan.artifacts] == [
+        "https://ghcr.io/v2/org/image/blobs/" + layer["digest"]
+        for layer in manifest["layers"]
+    ]
+    assert [a.size for a in plan.artifacts] == [6, 6, None]
+
+
+def test_providers_send_requests_through_the_registry_session(registry):
+    registry.session.verify = "/etc/ssl/custom-ca.pem"
+    provider = registry.provider("ghcr.io/org/image:1.0")
+
+    assert provider.session is registry.session
+    assert provider.auth.session is registry.session
+    with requests_mock.Mocker(session=registry.session) as m:
+        m.get("https://ghcr.io/v2/org/image/blobs/sha256:a", content=b"blob")
+        assert provider.get_blob("ghcr.io/org/image:1.0", "sha256:a").content == b"blob"
+        assert m.last_request.verify == "/etc/ssl/custom-ca.pem"
+
+
+def test_download_blob_stores_and_reuses_layers_by_digest(tmp_path):
+    digest = "sha256:" + hashlib.sha256(b"blob").hexdigest()
+    registry = OciRegistry(Session(), options=Options(cache=ArtifactCache(tmp_path)))
+    provider = registry.provider("ghcr.io/org/image:1.0")
+    container = oras.container.Container("ghcr.io/org/image:1.0")
+
+    with requests_mock.Mocker(session=registry.session) as m:
+        m.get(f"https://ghcr.io/v2/org/image/blobs/{digest}", content=b"blob")
+        provider.download_blob(container, digest, str(tmp_path / "first"))
+        provider.download_blob(container, digest, str(tmp_path / "second"))
+        assert m.call_count == 1
+
+    assert (tmp_path / "second").read_bytes() == b"blob"
+    assert registry.options.cache.get_by_digest(digest[len("sha256:") :])
@@ -1,4 +1,7 @@
+import asyncio
+import zipfile
 import io
+from fetcher_py.component import Component, Dependency
 from fetcher_py.package import Package
 import pytest
 from requests import Session
@@ -33,6 +36,28 @@ def test_get_default(registry):
         assert default_version == "1.18.5"
 
 
+def test_get_default_with_range(registry):
+    releases = {
+        "1.23.5": [{"yanked": False}],
+        "1.24.4": [{"yanked": False}],
+        "1.26.0": [{"yanked": True}],
+        "1.25.2": [{"yanked": False}],
+        "1.25.3": [],
+        "2.0.0rc1": [{"yanked": False}],
+    }
+    with requests_mock.Mocker() as m:
+        m.get("https://pypi.org/numpy/json", json={"releases": releases})
+
+        def resolve(spec):
+            return registry.get_default(Package("pip", "numpy", spec))
+
+        assert resolve(">=1.24,<2") == "1.25.2"
+        assert resolve("~=1.24.0") == "1.24.4"
+        assert resolve("latest") == "1.25.2"
+        assert resolve(">=2.0.0rc1") == "2.0.0rc1"
+        assert m.call_count == 1
+
+
 def test_get(registry):
     with requests_mock.Mocker() as m:
         json_data = {"info": {"name": "numpy", "version": "1.18.5"}}
@@ -43,7 +68,7 @@ def test_get(registry):
         assert component.version == "1.18.5"
 
 
-@patch("fetcher_py.registry.pypi.Downloader")
+@patch("fetcher_py.registry._registry.Downloader")
 def test_download(mock_downloader, registry):
     with requests_mock.Mocker() as m:
         json_data = {
@@ -60,9 +85,9 @@ def test_download(mock_downloader, registry):
         downloaded_bytes = registry.download(PKG)
         assert downloaded_bytes.getvalue() == b"mocked_downloaded_data"
 
-        mock_downloader.assert_called_once_with()
+        mock_downloader.assert_called_once_with(registry.options, registry.session)
         downloader_instance.add.assert_called_once_with(
-            "sdist", "http://example.com/package.zip"
+            "sdist", "http://example.com/package.zip", None, None, None
         )
         downloader_instance.get_as_zipped.assert_called_once()
 
@@ -81,3 +106,115 @@ def test_get_artifact_urls(registry):
         kind, url = artifact_urls[0]
         assert kind == "sdist"
         assert url == "http://example.com/package.zip"
+
+
+def test_get_artifact_digests(registry):
+    with requests_mock.Mocker() as m:
+        json_data = {
+            "urls": [
+                {
+                    "packagetype": "sdist",
+                    "url": "http://example.com/package.zip",
+                    "digests": {"sha256": "AB" * 32},
+                }
+            ]
+        }
+        m.get("https://pypi.org/numpy/1.18.5/json", json=json_data)
+
+        component = registry.get(PKG)
+        digests = registry.get_artifact_digests(component)
+
+        assert digests == {"http://example.com/package.zip": "sha256:" + "ab" * 32}
+
+
+def test_get_artifact_sizes(registry):
+    with requests_mock.Mocker() as m:
+        json_data = {
+            "urls": [
+                {
+                    "packagetype": "sdist",
+                    "url": "http://example.com/package.zip",
+                    "size": 2048,
+                },
+                {"packagetype": "bdist_wheel", "url": "http://example.com/a.whl"},
+            ]
+        }
+        m.get("https://pypi.org/numpy/1.18.5/json", json=json_data)
+
+        component = registry.get(PKG)
+        sizes = registry.get_artifact_sizes(component)
+
+        assert sizes == {"http://example.com/package.zip": 2048}
+
+
+def test_plan(registry):
+    with requests_mock.Mocker() as m:
+        json_data = {
+            "urls": [
+                {
+                    "packagetype": "sdist",
+                    "url": "http://example.com/package.zip",
+                    "size": 2048,
+                },
+                {"packagetype": "bdist_wheel", "url": "http://example.com/a.whl"},
+            ]
+        }
+        m.get("https://pypi.org/numpy/1.18.5/json", json=json_data)
+        m.head("http://example.com/a.whl", headers={"Content-Length": "512"})
+
+        plan = registry.plan(PKG)
+
+        assert [(a.kind, a.url, a.size) for a in plan.artifacts] == [
+            ("bdist_wheel", "http://example.com/a.whl", 512),
+            ("sdist", "http://example.com/package.zip", 2048),
+        ]
+        assert plan.size == 2560
+        assert m.call_count == 2
+
+
+def test_araw(registry):
+    with requests_mock.Mocker() as m:
+        json_data = {
+            "info": {"name": "numpy", "version": "1.18.5"},
+            "urls": [{"packagetype": "sdist", "url": "http://example.com/numpy.zip"}],
+        }
+        m.get("https://pypi.org/numpy/1.18.5/json", json=json_data)
+        m.get("http://example.com/numpy.zip", content=b"sdist")
+
+        component, zip_buffer = asyncio.run(registry.araw(PKG))
+
+    assert component.name == "numpy"
+    with zipfile.ZipFile(zip_buffer, "r") as z:
+        assert z.read("sdist/numpy.zip") == b"sdist"
+
+
+def test_download_component(registry):
+    component = MagicMock(
+        raw={"urls": [{"packagetype": "sdist", "url": "http://example.com/numpy.zip"}]}
+    )
+    with requests_mock.Mocker() as m:
+        m.get("http://example.com/numpy.zip", content=b"sdist")
+        zip_buffer = registry.download_component(PKG, component)
+
+        assert m.call_count == 1
+
+    with zipfile.ZipFile(zip_buffer, "r") as z:
+        assert z.read("sdist/numpy.zip") == b"sdist"
+
+
+def test_get_dependencies(registry):
+    requires_dist = [
+        "Typing_Extensions (>=4.0)",
+        "idna<4,>=2.5",
+        "colorama ; sys_platform == 'win32'",
+        "pytest>=7 ; extra == 'test'",
+        "pip @ https://example.com/pip.whl",
+    ]
+    raw = {"info": {"requires_dist": requires_dist}}
+    component = Component("numpy", "1.18.5", "", None, None, [], raw)
+
+    assert registry.get_dependencies(component) == [
+        Dependency("typing-extensions", ">=4.0"),
+        Dependency("idna", "<4,>=2.5"),
+        Dependency("colorama"),
+    ]
@@ -41,7 +41,7 @@ def test_get(registry):
         assert component.version is None
 
 
-@patch("fetcher_py.protocol.url.Downloader")
+@patch("fetcher_py.registry._registry.Downloader")
 def test_download(mock_downloader, registry):
     with requests_mock.Mocker() as m:
         m.get(PKG_URL, text="somethings")
@@ -55,8 +55,10 @@ def test_download(mock_downloader, registry):
         downloaded_bytes = registry.download(PKG)
         assert downloaded_bytes.getvalue() == b"mocked_downloaded_data"
 
-        mock_downloader.assert_called_once_with()
-        downloader_instance.add.assert_called_once_with("url", PKG_URL)
+        mock_downloader.assert_called_once_with(registry.options, registry.session)
+        downloader_instance.add.assert_called_once_with(
+            "url", PKG_URL, None, None, None
+        )
         downloader_instance.get_as_zipped.assert_called_once()
 
 
@@ -0,0 +1,43 @@
+import pickle
+import socket
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from fetcher_py.adapters import (
+    PooledAdapter,
+    is_default_adapter,
+    keepalive_socket_options,
+)
+
+
+def test_keepalive_socket_options():
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in keepalive_socket_options()
+
+
+def test_pooled_adapter():
+    adapter = PooledAdapter(pool_maxsize=64)
+    pool_kw = adapter.poolmanager.connection_pool_kw
+
+    assert pool_kw["maxsize"] == 64
+    assert pool_kw["socket_options"] == keepalive_socket_options()
+
+
+def test_pooled_adapter_without_keepalive():
+    adapter = PooledAdapter(tcp_keepalive=False)
+    assert "socket_options" not in adapter.poolmanager.connection_pool_kw
+
+
+def test_pooled_adapter_pickles():
+    adapter = pickle.loads(pickle.dumps(PooledAdapter(pool_maxsize=64)))
+
+    assert adapter.tcp_keepalive
+    assert adapter.poolmanager.connection_pool_kw["maxsize"] == 64
+    assert "socket_options" in adapter.poolmanager.connection_pool_kw
+
+
+def test_is_default_adapter():
+    assert is_default_adapter(requests.Session().get_adapter("https://"))
+    assert not is_default_adapter(HTTPAdapter(max_retries=5))
+    assert not is_default_adapter(HTTPAdapter(pool_maxsize=64))
+    assert not is_default_adapter(PooledAdapter())
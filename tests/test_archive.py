@@ -0,0 +1,114 @@
+import os
+import tempfile
+import zipfile
+
+from fetcher_py.archive import SpooledArchive, persist
+
+
+def test_stays_in_memory_within_budget():
+    with SpooledArchive(max_memory=16) as archive:
+        archive.write(b"0123456789")
+        assert not archive.rolled
+        assert archive.getvalue() == b"0123456789"
+
+
+def test_spills_to_disk_over_budget():
+    archive = SpooledArchive(max_memory=16)
+    archive.write(b"0123456789")
+    archive.write(b"0123456789")
+
+    assert archive.rolled
+    assert os.path.exists(archive.path)
+    assert archive.getvalue() == b"01234567890123456789"
+
+    path = archive.path
+    archive.close()
+    assert not os.path.exists(path)
+
+
+def test_zip_file_over_budget():
+    archive = SpooledArchive(max_memory=64)
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        zip_file.writestr("a.txt", b"a" * 1024)
+        zip_file.writestr("b.txt", b"b" * 1024)
+
+    assert archive.rolled
+    with zipfile.ZipFile(archive, "r") as zip_file:
+        assert zip_file.read("a.txt") == b"a" * 1024
+        assert zip_file.read("b.txt") == b"b" * 1024
+
+
+def test_persist_moves_spilled_file():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        archive = SpooledArchive(max_memory=4, dir=temp_dir)
+        archive.write(b"0123456789")
+        spilled_path = archive.path
+
+        destination = os.path.join(temp_dir, "out.zip")
+        persist(archive, destination)
+
+        assert not os.path.exists(spilled_path)
+        with open(destination, "rb") as file:
+            assert file.read() == b"0123456789"
+
+
+def test_persist_writes_in_memory_archive():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        archive = SpooledArchive()
+        archive.write(b"0123456789")
+
+        destination = os.path.join(temp_dir, "out.zip")
+        persist(archive, destination)
+
+        with open(destination, "rb") as file:
+            assert file.read() == b"0123456789"
+
+
+def test_open_reader_is_independent():
+    for max_memory in (1024, 4):
+        archive = SpooledArchive(max_memory=max_memory)
+        archive.write(b"0123456789")
+
+        with archive.open_reader() as first, archive.open_reader() as second:
+            assert first.read(4) == b"0123"
+            assert second.read() == b"0123456789"
+            # readers outlive the archive
+            archive.close()
+            assert first.read() == b"456789"
+
+
+def test_persist_spilled_file_follows_umask():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        modes = []
+        for max_memory in (1024, 4):
+            archive = SpooledArchive(max_memory=max_memory, dir=temp_dir)
+            archive.write(b"0123456789")
+
+            destination = os.path.join(temp_dir, f"{max_memory}.zip")
+            persist(archive, destination)
+            modes.append(os.stat(destination).st_mode & 0o777)
+
+        # same mode as any file created by the process, not 0600 of mkstemp
+        reference = os.path.join(temp_dir, "reference")
+        open(reference, "wb").close()
+        assert modes == [os.stat(reference).st_mode & 0o777] * 2
+
+
+def test_persist_replaces_destination_atomically():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        destination = os.path.join(temp_dir, "out.zip")
+        with open(destination, "wb") as file:
+            file.write(b"old archive, longer than the new one")
+        reader = open(destination, "rb")
+
+        archive = SpooledArchive()
+        archive.write(b"0123456789")
+        persist(archive, destination)
+
+        # readers of the replaced archive are not affected, and no temporary
+        # files are left behind
+        with reader:
+            assert reader.read() == b"old archive, longer than the new one"
+        with open(destination, "rb") as file:
+            assert file.read() == b"0123456789"
+        assert os.listdir(temp_dir) == ["out.zip"]
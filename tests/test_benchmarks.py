@@ -0,0 +1,35 @@
+import pytest
+
+from benchmarks.fake_registries import ECOSYSTEMS, FakeRegistries
+from benchmarks.harness import Scenario, percentile, run_scenario
+
+
+@pytest.fixture(scope="module")
+def registries():
+    with FakeRegistries(packages=2, artifact_size=1024) as registries:
+        yield registries
+
+
+# oci is served too, but needs the oras version pinned by poetry.lock
+@pytest.mark.parametrize("ecosystem", [e for e in ECOSYSTEMS if e != "oci"])
+@pytest.mark.parametrize("mode", ["get", "download", "bulk"])
+def test_fake_registries(registries, ecosystem, mode):
+    if ecosystem == "git" and registries.git_repo is None:
+        pytest.skip("GitPython is not installed")
+
+    scenario = Scenario(
+        ecosystem, mode, 2, registries.queries(ecosystem), registries.port
+    )
+    measurement = run_scenario(registries, scenario, isolated=False)
+
+    assert measurement.first_error is None
+    assert measurement.packages == 2
+    if mode != "get" and ecosystem != "git":
+        assert measurement.bytes >= 2 * 1024
+
+
+def test_percentile():
+    assert percentile([], 50) == 0.0
+    assert percentile([3, 1, 2, 4], 50) == 2
+    assert percentile(list(range(1, 101)), 99) == 99
+    assert percentile([1], 99) == 1
@@ -0,0 +1,65 @@
+import pytest
+
+from fetcher_py.budget import BudgetExceededError, ByteBudget, format_size, parse_size
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("512", 512),
+        ("10K", 10 * 1024),
+        ("10M", 10 * 1024**2),
+        ("1.5G", int(1.5 * 1024**3)),
+        ("2GiB", 2 * 1024**3),
+        ("1t", 1024**4),
+    ],
+)
+def test_parse_size(value, expected):
+    assert parse_size(value) == expected
+
+
+def test_parse_size_rejects_invalid_size():
+    with pytest.raises(ValueError, match="invalid size"):
+        parse_size("lots")
+
+
+def test_format_size():
+    assert format_size(None) == "?"
+    assert format_size(512) == "512 B"
+    assert format_size(1536) == "1.5 KiB"
+    assert format_size(10 * 1024**2) == "10.0 MiB"
+
+
+def test_check_rejects_artifact_above_max_artifact_size():
+    budget = ByteBudget(max_artifact_size=10)
+    budget.check("https://example.com/a", 10)
+
+    with pytest.raises(BudgetExceededError, match="above max artifact size"):
+        budget.check("https://example.com/b", 11)
+
+
+def test_charge_stops_at_max_total_size():
+    budget = ByteBudget(max_total_size=10)
+    budget.charge("https://example.com/a", 6)
+
+    with pytest.raises(BudgetExceededError, match="does not fit in the budget"):
+        budget.charge("https://example.com/b", 5)
+
+    budget.charge("https://example.com/c", 4)
+    assert budget.used == 10
+
+
+def test_refund_returns_bytes_to_the_budget():
+    budget = ByteBudget(max_total_size=10)
+    budget.charge("https://example.com/a", 6)
+    budget.refund("https://example.com/a", 6)
+
+    budget.charge("https://example.com/b", 10)
+    assert budget.used == 10
+
+
+def test_unlimited_budget():
+    budget = ByteBudget()
+    budget.check("https://example.com/a", 1024**4)
+    budget.charge("https://example.com/a", 1024**4)
+    assert budget.used == 1024**4
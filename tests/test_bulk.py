@@ -0,0 +1,133 @@
+import threading
+
+import pytest
+
+from fetcher_py import bulk
+from fetcher_py.bulk import Result, unique
+from fetcher_py.component import Component
+from fetcher_py.lockfile import LockedPackage
+from fetcher_py.package import Package
+
+
+def test_unique():
+    queries = ["pip://a", " pip://b\n", "", "pip://a", "pip://b"]
+    assert [result.query for result in unique(queries)] == ["pip://a", "pip://b"]
+
+
+def test_unique_with_locked_packages():
+    locked = LockedPackage(Package("npm", "react", "18.2.0"))
+    results = list(unique([locked, "npm://react@18.2.0", "npm://vue@3.0.0"]))
+
+    assert [result.query for result in results] == [
+        "npm://react@18.2.0",
+        "npm://vue@3.0.0",
+    ]
+    assert results[0].locked is locked
+    assert results[0].package == locked.package
+    assert results[1].package is None
+
+
+def test_result_ok():
+    assert Result("pip://a").ok
+    assert not Result("pip://a", error=ValueError("nope")).ok
+
+
+def test_run_applies_stages_in_order():
+    def first(result):
+        result.path = result.query
+
+    def second(result):
+        result.path += "!"
+
+    results = bulk.run(["pip://a", "pip://b", "pip://a"], [first, second], jobs=2)
+
+    assert sorted(result.path for result in results) == ["pip://a!", "pip://b!"]
+
+
+def test_run_stops_failed_query():
+    second_calls = []
+
+    def first(result):
+        if result.query == "pip://bad":
+            raise ValueError("bad query")
+
+    results = list(bulk.run(["pip://bad", "pip://ok"], [first, second_calls.append]))
+
+    assert {result.query: result.ok for result in results} == {
+        "pip://bad": False,
+        "pip://ok": True,
+    }
+    assert [result.query for result in second_calls] == ["pip://ok"]
+    assert str(next(r for r in results if not r.ok).error) == "bad query"
+
+
+def test_run_consumes_queries_lazily():
+    consumed = []
+
+    def queries():
+        for i in range(100):
+            consumed.append(i)
+            yield f"pip://package{i}"
+
+    results = bulk.run(queries(), [lambda result: None], jobs=2)
+    next(results)
+
+    # only a window of 2 * jobs queries is admitted at a time
+    assert len(consumed) <= 5
+    assert len(list(results)) == 99
+
+
+def test_run_overlaps_stages_of_different_queries():
+    metadata_of_second = threading.Event()
+
+    def metadata(result):
+        if result.query == "pip://second":
+            metadata_of_second.set()
+
+    def download(result):
+        if result.query == "pip://first":
+            assert metadata_of_second.wait(timeout=5)
+
+    results = list(bulk.run(["pip://first", "pip://second"], [metadata, download], 2))
+    assert all(result.ok for result in results)
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_run_without_queries(jobs):
+    assert list(bulk.run([], [lambda result: None], jobs)) == []
+
+
+def test_run_dedups_resolved_packages():
+    downloads = []
+
+    def resolve(result):
+        result.package = Package("pip", "numpy", None)
+        result.component = Component(
+            "numpy", "1.26.0", "https://pypi.org/pypi", None, None, [], raw={}
+        )
+
+    def download(result):
+        downloads.append(result.query)
+        result.path = "pip/numpy@1.26.0.zip"
+
+    queries = ["pip://numpy", "pip://numpy@1.26.0", "pip://numpy@>=1"]
+    results = list(bulk.run(queries, [resolve, download], jobs=4))
+
+    assert len(downloads) == 1
+    assert sorted(result.query for result in results) == sorted(queries)
+    assert {result.path for result in results} == {"pip/numpy@1.26.0.zip"}
+
+
+def test_run_shares_errors_of_resolved_packages():
+    def resolve(result):
+        result.package = Package("pip", "numpy", None)
+        result.component = Component(
+            "numpy", "1.26.0", "https://pypi.org/pypi", None, None, [], raw={}
+        )
+
+    def download(result):
+        raise ValueError("failed to download all artifacts!")
+
+    results = list(bulk.run(["pip://numpy", "pip://numpy@1.26.0"], [resolve, download]))
+
+    assert [result.ok for result in results] == [False, False]
@@ -0,0 +1,75 @@
+import hashlib
+import io
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from fetcher_py.cache import ArtifactCache
+
+URL = "https://static.crates.io/crates/rand/rand-0.8.4.crate"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ArtifactCache(str(tmp_path), max_size=1024)
+
+
+def test_put_and_get(cache):
+    digest = cache.put(URL, io.BytesIO(b"crate"))
+
+    assert digest == hashlib.sha256(b"crate").hexdigest()
+    assert cache.digest_of(URL) == digest
+    with cache.open(URL) as file:
+        assert file.read() == b"crate"
+
+
+def test_get_by_digest_is_shared_across_urls(cache):
+    digest = cache.put(URL, io.BytesIO(b"crate"))
+    cache.put("https://mirror.example.com/rand-0.8.4.crate", io.BytesIO(b"crate"))
+
+    assert cache.get_by_digest(digest) == cache.get(URL)
+    assert len(os.listdir(os.path.join(cache.root, "tmp"))) == 0
+
+
+def test_miss(cache):
+    assert cache.get(URL) is None
+    assert cache.open(URL) is None
+    assert cache.get_by_digest("0" * 64) is None
+
+
+def test_evicts_least_recently_used(cache):
+    cache.put("https://example.com/a", io.BytesIO(b"a" * 400))
+    cache.put("https://example.com/b", io.BytesIO(b"b" * 400))
+
+    # mark 'a' as used, after 'b'
+    path_a = cache.get("https://example.com/a")
+    os.utime(path_a, (time.time() + 10, time.time() + 10))
+
+    cache.put("https://example.com/c", io.BytesIO(b"c" * 400))
+
+    assert cache.get("https://example.com/a") is not None
+    assert cache.get("https://example.com/b") is None
+    assert cache.get("https://example.com/c") is not None
+
+
+def test_tracks_size_without_walking(cache):
+    cache.put("https://example.com/a", io.BytesIO(b"a" * 100))
+    assert cache.size() == 100
+
+    with patch.object(cache, "_blobs", side_effect=AssertionError("walked")):
+        cache.put("https://example.com/b", io.BytesIO(b"b" * 100))
+        # same content under another url takes no space
+        cache.put("https://example.com/c", io.BytesIO(b"b" * 100))
+    assert cache.size() == 200
+
+
+def test_evicts_urls_of_evicted_artifacts(cache):
+    cache.put("https://example.com/a", io.BytesIO(b"a" * 600))
+    cache.put("https://example.com/b", io.BytesIO(b"b" * 600))
+
+    assert cache.digest_of("https://example.com/a") is None
+    assert cache.digest_of("https://example.com/b") is not None
+    assert len(os.listdir(os.path.join(cache.root, "urls"))) == 1
+    assert cache.size() == 600
@@ -0,0 +1,210 @@
+import io
+import json
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from fetcher_py.bulk import Result
+from fetcher_py.cli import cli
+from fetcher_py.component import Component
+from fetcher_py.fetcher import Fetcher
+from fetcher_py.package import Package
+from fetcher_py.plan import Plan, PlannedArtifact
+
+COMPONENT = Component(
+    name="numpy",
+    version="1.0",
+    registry_url="https://pypi.org/pypi",
+    homepage_url=None,
+    description=None,
+    declared_licenses=None,
+    raw={},
+)
+
+
+def test_batch_streams_json_lines():
+    results = [
+        Result("pip://numpy@1.0", component=COMPONENT),
+        Result("pip://missing", error=ValueError("not found")),
+    ]
+    with patch.object(Fetcher, "get_many", return_value=iter(results)) as get_many:
+        result = CliRunner().invoke(
+            cli, ["batch", "--jobs", "4"], input="pip://numpy@1.0\npip://missing\n"
+        )
+
+    assert result.exit_code == 1
+    assert list(get_many.call_args[0][0]) == ["pip://numpy@1.0\n", "pip://missing\n"]
+    assert get_many.call_args[0][1] == 4
+
+    lines = [json.loads(line) for line in result.stdout.splitlines()]
+    assert lines[0]["ok"]
+    assert lines[0]["component"]["name"] == "numpy"
+    assert lines[1] == {
+        "query": "pip://missing",
+        "ok": False,
+        "component": None,
+        "path": None,
+        "error": "ValueError: not found",
+    }
+
+
+def test_batch_downloads_to_out_dir(tmp_path):
+    queries = tmp_path / "queries.txt"
+    queries.write_text("pip://numpy@1.0\n")
+    results = [Result("pip://numpy@1.0", component=COMPONENT, path="out/numpy.zip")]
+
+    with patch.object(Fetcher, "download_many", return_value=iter(results)) as dl:
+        result = CliRunner().invoke(
+            cli, ["batch", str(queries), "--out-dir", str(tmp_path / "out")]
+        )
+
+    assert result.exit_code == 0
+    assert dl.call_args[0][1] == str(tmp_path / "out")
+    assert json.loads(result.stdout)["path"] == "out/numpy.zip"
+
+
+def test_batch_reads_lockfiles(tmp_path):
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("numpy==1.0\n")
+
+    with patch.object(Fetcher, "get_many", return_value=iter([])) as get_many:
+        result = CliRunner().invoke(cli, ["batch", "--lockfile", str(requirements)])
+
+    assert result.exit_code == 0
+    assert [p.query for p in get_many.call_args[0][0]] == ["pip://numpy@1.0"]
+
+
+def test_selection_options():
+    with patch.object(Fetcher, "get_many", return_value=iter([])):
+        with patch("fetcher_py.cli.Fetcher", wraps=Fetcher) as fetcher:
+            args = ["--kind", "bdist_wheel", "--python-tag", "cp311", "batch"]
+            result = CliRunner().invoke(cli, args, input="")
+
+    assert result.exit_code == 0
+    selection = fetcher.call_args[0][1].selection
+    assert selection.kinds == {"bdist_wheel"}
+    assert selection.python_tags == {"cp311"}
+    assert selection.platforms == set()
+
+
+def test_selection_options_after_command():
+    with patch.object(Fetcher, "download_raw", return_value=io.BytesIO(b"zip")):
+        with patch("fetcher_py.cli.Fetcher", wraps=Fetcher) as fetcher:
+            args = ["--kind", "sdist", "--max-total-size", "1G", "download"]
+            args += ["pip://numpy@1.0", "--kind", "src", "--max-artifact-size", "2K"]
+            result = CliRunner().invoke(cli, args)
+
+    assert result.exit_code == 0
+    options = fetcher.call_args[0][1]
+    assert options.selection.kinds == {"sdist", "src"}
+    assert options.budget.max_artifact_size == 2048
+    assert options.budget.max_total_size == 1024**3
+
+
+def test_commands_accept_selection_options():
+    for command in ["download", "batch", "plan", "closure"]:
+        result = CliRunner().invoke(cli, [command, "--help"])
+
+        assert result.exit_code == 0
+        for option in ["--kind", "--python-tag", "--platform", "--max-total-size"]:
+            assert option in result.stdout
+
+
+def test_plan_prints_sizes_and_totals():
+    plan = Plan(
+        Package.parse("pip://numpy@1.0"),
+        COMPONENT,
+        [
+            PlannedArtifact("sdist", "https://example.com/numpy.zip", 1024),
+            PlannedArtifact(
+                "bdist_wheel", "https://example.com/a.whl", 4096, "too big"
+            ),
+        ],
+    )
+    results = [Result("pip://numpy@1.0", component=COMPONENT, plan=plan)]
+
+    with patch.object(Fetcher, "plan_many", return_value=iter(results)):
+        with patch("fetcher_py.cli.Fetcher", wraps=Fetcher) as fetcher:
+            args = ["--max-artifact-size", "2K", "plan"]
+            result = CliRunner().invoke(cli, args, input="pip://numpy@1.0\n")
+
+    assert result.exit_code == 0
+    assert fetcher.call_args[0][1].budget.max_artifact_size == 2048
+    assert result.stdout.splitlines() == [
+        "pip://numpy@1.0: 1 artifacts, 1.0 KiB",
+        "  rejected bdist_wheel too big",
+        "pip: 1 packages, 1 artifacts, 1.0 KiB, 1 rejected",
+        "total: 1 packages, 1 artifacts, 1.0 KiB, 1 rejected",
+    ]
+
+
+def test_rejects_invalid_size():
+    result = CliRunner().invoke(cli, ["--max-total-size", "lots", "plan"], input="")
+
+    assert result.exit_code == 2
+    assert "invalid size" in result.output
+
+
+def test_closure_streams_json_lines():
+    results = [
+        Result(
+            "pip://numpy@1.0",
+            component=COMPONENT,
+            depth=0,
+            dependencies=["pip://six"],
+        ),
+        Result(
+            "pip://six",
+            error=ValueError("not found"),
+            depth=1,
+            required_by="pip://numpy@1.0",
+        ),
+    ]
+    with patch.object(Fetcher, "closure", return_value=iter(results)) as closure:
+        result = CliRunner().invoke(
+            cli, ["closure", "pip://numpy@1.0", "--depth", "2", "-j", "4"]
+        )
+
+    assert result.exit_code == 1
+    assert closure.call_args[0] == (("pip://numpy@1.0",), 4, 2, None)
+
+    lines = [json.loads(line) for line in result.stdout.splitlines()]
+    assert lines[0]["dependencies"] == ["pip://six"]
+    assert lines[1] == {
+        "query": "pip://six",
+        "ok": False,
+        "component": None,
+        "path": None,
+        "error": "ValueError: not found",
+        "depth": 1,
+        "required_by": "pip://numpy@1.0",
+        "dependencies": None,
+    }
+
+
+def test_get_fields():
+    with patch.object(Fetcher, "get", return_value=COMPONENT):
+        result = CliRunner().invoke(
+            cli, ["get", "pip://numpy@1.0", "--fields", "name,version"]
+        )
+
+    assert result.exit_code == 0
+    assert json.loads(result.stdout) == {"name": "numpy", "version": "1.0"}
+
+
+def test_unknown_fields():
+    result = CliRunner().invoke(cli, ["get", "pip://numpy@1.0", "--fields", "size"])
+
+    assert result.exit_code == 2
+    assert "unknown fields size" in result.output
+
+
+def test_serve_stops_on_interrupt(tmp_path):
+    path = str(tmp_path / "fetcher.sock")
+    with patch("fetcher_py.cli.make_server") as make_server:
+        make_server.return_value.serve_forever.side_effect = KeyboardInterrupt
+        result = CliRunner().invoke(cli, ["serve", "--socket", path])
+
+    assert result.exit_code == 0
+    assert make_server.call_args[0][1:] == ("127.0.0.1", 8765, path)
+    make_server.return_value.server_close.assert_called_once()
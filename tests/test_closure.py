@@ -0,0 +1,132 @@
+import threading
+
+from fetcher_py import closure
+from fetcher_py.bulk import Result
+from fetcher_py.component import Component, Dependency
+from fetcher_py.package import Package
+
+# query -> (resolved version, dependency queries)
+GRAPH = {
+    "npm://app": ("1.0.0", ["npm://a@^1", "npm://b@^2"]),
+    "npm://a@^1": ("1.2.0", ["npm://c@~3.1", "npm://b@^2"]),
+    "npm://b@^2": ("2.0.1", ["npm://c@3.1.4"]),
+    "npm://c@~3.1": ("3.1.4", ["npm://d"]),
+    "npm://c@3.1.4": ("3.1.4", ["npm://d"]),
+    "npm://d": ("0.1.0", []),
+}
+
+
+def mk_component(name: str, version: str) -> Component:
+    return Component(name, version, "", None, None, [], {})
+
+
+def resolve(graph, calls=None):
+    def stage(result: Result):
+        if calls is not None:
+            calls.append(result.query)
+        if result.query not in graph:
+            raise ValueError(f"{result.query} not found")
+
+        result.package = Package.parse(result.query)
+        version, dependencies = graph[result.query]
+        result.component = mk_component(result.package.name, version)
+        result.dependencies = dependencies
+
+    return stage
+
+
+def test_dependency_query():
+    assert Dependency("left-pad").query("npm") == "npm://left-pad"
+    assert Dependency("@types/node", "^18").query("npm") == "npm://@types/node@^18"
+
+
+def test_run_expands_transitive_dependencies():
+    calls = []
+    results = list(closure.run(["npm://app"], [resolve(GRAPH, calls)], jobs=4))
+
+    by_name = {result.package.name: result for result in results}
+    assert sorted(by_name) == ["a", "app", "b", "c", "d"]
+    assert by_name["app"].depth == 0
+    assert by_name["app"].required_by is None
+    assert by_name["a"].depth == 1
+    assert by_name["a"].required_by == "npm://app"
+    assert by_name["d"].depth == 3
+
+    # each range is resolved once, even if required by many packages
+    assert sorted(calls) == sorted(set(calls))
+    assert "npm://b@^2" in calls
+
+
+def test_run_expands_resolved_version_once():
+    expanded = []
+
+    def record(result: Result):
+        expanded.append(result.query)
+
+    results = list(
+        closure.run(["npm://app"], [resolve(GRAPH), record], jobs=4, max_depth=None)
+    )
+
+    # c@~3.1 and c@3.1.4 resolve to the same version, expanded once, and
+    # both edges are yielded
+    c = [r for r in results if r.package.name == "c"]
+    assert sorted(r.required_by for r in c) == ["npm://a@^1", "npm://b@^2"]
+    assert c[0].component is c[1].component
+    assert len([q for q in expanded if q.startswith("npm://c@")]) == 1
+    assert len([q for q in expanded if q == "npm://d"]) == 1
+
+
+def test_run_yields_every_root_resolved_to_the_same_version():
+    def fail(result: Result):
+        raise ValueError("boom")
+
+    graph = {**GRAPH, "npm://d@0.1.0": ("0.1.0", [])}
+    results = list(
+        closure.run(["npm://d", "npm://d@0.1.0"], [resolve(graph), fail], jobs=1)
+    )
+
+    assert sorted(r.query for r in results) == ["npm://d", "npm://d@0.1.0"]
+    # outcome of the leader is shared
+    assert results[0].error is results[1].error
+
+
+def test_run_max_depth():
+    results = list(closure.run(["npm://app"], [resolve(GRAPH)], max_depth=1))
+
+    assert sorted(r.query for r in results) == ["npm://a@^1", "npm://app", "npm://b@^2"]
+
+    results = list(closure.run(["npm://app"], [resolve(GRAPH)], max_depth=0))
+    assert [r.query for r in results] == ["npm://app"]
+
+
+def test_run_reports_failures_without_expanding():
+    graph = dict(GRAPH)
+    graph["npm://app"] = ("1.0.0", ["npm://missing", "npm://d"])
+
+    results = list(closure.run(["npm://app"], [resolve(graph)]))
+
+    failed = [r for r in results if not r.ok]
+    assert [r.query for r in failed] == ["npm://missing"]
+    assert failed[0].required_by == "npm://app"
+    assert str(failed[0].error) == "npm://missing not found"
+    assert sorted(r.query for r in results if r.ok) == ["npm://app", "npm://d"]
+
+
+def test_run_is_concurrent():
+    barrier = threading.Barrier(2, timeout=5)
+    graph = {
+        "npm://app": ("1.0.0", ["npm://a", "npm://b"]),
+        "npm://a": ("1.0.0", []),
+        "npm://b": ("1.0.0", []),
+    }
+    inner = resolve(graph)
+
+    def stage(result: Result):
+        inner(result)
+        if result.query != "npm://app":
+            # would time out, if siblings were resolved one at a time
+            barrier.wait()
+
+    results = list(closure.run(["npm://app"], [stage], jobs=2))
+
+    assert all(result.ok for result in results)
@@ -0,0 +1,128 @@
+import dataclasses
+import json
+import zlib
+
+import pytest
+import requests
+import requests_mock
+
+from fetcher_py.component import RAW_COMPRESSED, RAW_LEAN, Component
+from fetcher_py.fetcher import Fetcher
+from fetcher_py.options import Options
+from fetcher_py.package import Package
+
+RAW = {"info": {"name": "numpy", "description": "arrays " * 100}, "urls": []}
+
+
+def mk_component(raw=RAW, compressed=False) -> Component:
+    return Component(
+        "numpy",
+        "1.0",
+        "https://pypi.org/pypi",
+        None,
+        "arrays",
+        ["BSD"],
+        raw,
+        compressed,
+    )
+
+
+def test_raw_bytes_are_decoded_on_first_access():
+    component = mk_component(json.dumps(RAW).encode())
+
+    assert repr(component).endswith(f"raw=<{len(json.dumps(RAW))} bytes>)")
+    assert component.raw == RAW
+    assert component.raw is component.raw
+    assert component._encoded is None
+
+
+def test_compressed_raw_bytes():
+    component = mk_component(zlib.compress(json.dumps(RAW).encode()), True)
+
+    assert component.raw_bytes() == json.dumps(RAW).encode()
+    assert component.raw == RAW
+
+
+def test_compact():
+    component = mk_component()
+    component.compact()
+
+    assert component._compressed
+    assert len(component._encoded) < len(json.dumps(RAW))
+    assert component == mk_component()
+
+    component.compact(compress=False)
+    assert component.raw_bytes() == json.dumps(RAW).encode()
+
+
+def test_lean():
+    component = mk_component()
+    component.shrink(RAW_LEAN)
+
+    assert component.is_lean
+    assert component.raw is None
+    assert component.to_dict(raw=False) == mk_component().to_dict(raw=False)
+
+
+def test_shrink_with_unknown_mode():
+    with pytest.raises(ValueError):
+        mk_component().shrink("tiny")
+
+
+def test_to_dict_and_equality():
+    component = mk_component(json.dumps(RAW).encode())
+
+    assert component.to_dict() == {
+        "name": "numpy",
+        "version": "1.0",
+        "registry_url": "https://pypi.org/pypi",
+        "homepage_url": None,
+        "description": "arrays",
+        "declared_licenses": ["BSD"],
+        "raw": RAW,
+    }
+    assert component == mk_component()
+    assert component != mk_component({})
+    assert not hasattr(component, "__dict__")
+
+
+def test_is_a_dataclass():
+    component = mk_component(json.dumps(RAW).encode())
+
+    assert [field.name for field in dataclasses.fields(component)] == [
+        "name",
+        "version",
+        "registry_url",
+        "homepage_url",
+        "description",
+        "declared_licenses",
+        "raw",
+    ]
+    assert dataclasses.asdict(component) == component.to_dict()
+
+    replaced = dataclasses.replace(component, version="2.0")
+    assert replaced.version == "2.0" and replaced.raw == RAW
+    assert component.version == "1.0"
+
+
+def test_registry_keeps_response_bytes():
+    registry = Fetcher(requests.Session())._get_registry("pip")
+    with requests_mock.Mocker() as m:
+        m.get("https://pypi.org/pypi/numpy/1.0/json", json=RAW)
+        component = registry.get(Package("pip", "numpy", "1.0"))
+
+    assert "bytes>" in repr(component)
+    assert component.raw == RAW
+
+
+@pytest.mark.parametrize("mode", [RAW_COMPRESSED, RAW_LEAN])
+def test_fetcher_shrinks_components_of_results(mode):
+    fetcher = Fetcher(requests.Session(), Options(component_raw=mode))
+    with requests_mock.Mocker() as m:
+        m.get("https://pypi.org/pypi/numpy/1.0/json", json=RAW)
+        (result,) = list(fetcher.get_many(["pip://numpy@1.0"]))
+        component = fetcher.get("pip://numpy@1.0")
+
+    for component in (result.component, component):
+        assert component.name == "numpy"
+        assert component.raw == (RAW if mode == RAW_COMPRESSED else None)
@@ -0,0 +1,59 @@
+import gzip
+import zipfile
+from zipfile import ZIP_DEFLATED, ZIP_STORED
+
+import pytest
+
+from fetcher_py.compression import CompressionPolicy
+
+
+@pytest.mark.parametrize(
+    "name, head, expected",
+    [
+        ("src/numpy-1.0.tar.gz", b"", ZIP_STORED),
+        ("bdist_wheel/numpy-1.0-cp311-none-any.WHL", b"", ZIP_STORED),
+        ("src/axum-0.1.0.crate", b"", ZIP_STORED),
+        ("dist/sha256:abcd", gzip.compress(b"layer")[:8], ZIP_STORED),
+        ("dist/sha256:abcd", b"PK\x03\x04\x14\x00", ZIP_STORED),
+        ("src/main.rs", b"fn main", ZIP_DEFLATED),
+        (".metadata/urls.txt", b"", ZIP_DEFLATED),
+    ],
+)
+def test_compress_type(name, head, expected):
+    assert CompressionPolicy().compress_type(name, head) == expected
+
+
+def test_level_zero_stores_everything():
+    policy = CompressionPolicy(level=0)
+    assert policy.compress_type("src/main.rs") == ZIP_STORED
+    assert policy.compress_level(ZIP_STORED) is None
+
+
+def test_invalid_level():
+    with pytest.raises(ValueError, match="compression level"):
+        CompressionPolicy(level=10)
+
+
+def test_custom_suffixes():
+    policy = CompressionPolicy(stored_suffixes=[".BIN"])
+    assert policy.compress_type("firmware.bin") == ZIP_STORED
+    assert policy.compress_type("numpy-1.0.tar.gz") == ZIP_DEFLATED
+
+
+def test_write(tmp_path):
+    text = tmp_path / "main.rs"
+    text.write_text("fn main() {}\n" * 100)
+    layer = tmp_path / "layer"
+    layer.write_bytes(gzip.compress(b"layer"))
+
+    policy = CompressionPolicy(level=9)
+    with zipfile.ZipFile(tmp_path / "out.zip", "w") as zip_file:
+        policy.write(zip_file, str(text), "main.rs")
+        policy.write(zip_file, str(layer), "layer")
+        policy.writestr(zip_file, "urls.txt", "{}")
+
+    with zipfile.ZipFile(tmp_path / "out.zip") as zip_file:
+        assert zip_file.getinfo("main.rs").compress_type == ZIP_DEFLATED
+        assert zip_file.getinfo("layer").compress_type == ZIP_STORED
+        assert zip_file.getinfo("urls.txt").compress_type == ZIP_DEFLATED
+        assert zip_file.read("main.rs") == text.read_bytes()
@@ -1,8 +1,21 @@
+import asyncio
+import hashlib
+import io
+import json
+import threading
+import time
 import zipfile
+from unittest.mock import patch
 
 import pytest
+import requests
 import requests_mock
+from fetcher_py.budget import ByteBudget
+from fetcher_py.cache import ArtifactCache
+from fetcher_py.compression import CompressionPolicy
 from fetcher_py.downloader import Downloader
+from fetcher_py.options import Options
+from fetcher_py.selection import Selection
 
 
 @pytest.fixture
@@ -72,3 +85,312 @@ def test_get_as_zipped(downloader):
                     content = z.read(f"{key}/{file_name}").decode()
                     expected_content = f"Test content for {url}"
                     assert content == expected_content
+
+
+def test_get_as_zipped_skips_failed_downloads(downloader):
+    ok_url = "https://example.com/ok.txt"
+    failed_url = "https://example.com/missing.txt"
+
+    with requests_mock.Mocker() as m:
+        m.get(ok_url, content=b"ok")
+        m.get(failed_url, status_code=404)
+
+        downloader.add("src", ok_url)
+        downloader.add("src", failed_url)
+        zip_buffer = downloader.get_as_zipped()
+
+    with zipfile.ZipFile(zip_buffer, "r") as z:
+        assert z.read("src/ok.txt") == b"ok"
+        assert "src/missing.txt" not in z.namelist()
+        assert z.testzip() is None
+
+
+def test_download_file_method_segmented():
+    url = "https://example.com/big.bin"
+    content = b"0123456789" * 10
+
+    def callback(request, context):
+        start, end = request.headers["Range"][len("bytes=") :].split("-")
+        context.status_code = 206
+        return content[int(start) : int(end) + 1]
+
+    downloader = Downloader(Options(segments=3, segment_threshold=10))
+    with requests_mock.Mocker() as m:
+        m.head(url, headers={"Accept-Ranges": "bytes", "Content-Length": "100"})
+        m.get(url, content=callback)
+        key, file_name, file_content_stream = downloader.download_file("src", url)
+
+    assert file_name == "big.bin"
+    assert file_content_stream.read() == content
+    assert m.call_count == 4
+
+
+@pytest.mark.parametrize("algorithm", ["sha256", "sha512"])
+def test_download_file_method_uses_cache(tmp_path, algorithm):
+    url = "https://example.com/file1.txt"
+    digest = f"{algorithm}:" + hashlib.new(algorithm, b"Test content").hexdigest()
+    downloader = Downloader(Options(cache=ArtifactCache(str(tmp_path))))
+    downloader.add("folder1", url, digest)
+
+    with requests_mock.Mocker() as m:
+        m.get(url, content=b"Test content")
+        _, _, first = downloader.download_file("folder1", url)
+        _, _, second = downloader.download_file("folder1", url)
+
+    assert m.call_count == 1
+    assert first.read() == b"Test content"
+    assert second.read() == b"Test content"
+
+
+def test_download_file_method_caches_only_published_digests(tmp_path):
+    url = "https://example.com/latest.tar.gz"
+    downloader = Downloader(Options(cache=ArtifactCache(str(tmp_path))))
+
+    with requests_mock.Mocker() as m:
+        m.get(url, [{"content": b"v1"}, {"content": b"v2"}])
+        _, _, first = downloader.download_file("src", url)
+        _, _, second = downloader.download_file("src", url)
+
+    # the url may serve other content later, so it is fetched again
+    assert (first.read(), second.read()) == (b"v1", b"v2")
+    assert downloader.options.cache.digest_of(url) is None
+
+
+def test_download_file_method_revalidates_cached_url(tmp_path):
+    url = "https://example.com/file1.txt"
+    cache = ArtifactCache(str(tmp_path))
+    cache.put(url, io.BytesIO(b"old content"))
+    downloader = Downloader(Options(cache=cache))
+    downloader.add("src", url, "sha512:" + hashlib.sha512(b"new").hexdigest())
+
+    with requests_mock.Mocker() as m:
+        m.get(url, content=b"new")
+        _, _, file_content_stream = downloader.download_file("src", url)
+
+    assert file_content_stream.read() == b"new"
+    assert m.call_count == 1
+
+
+def test_download_file_method_survives_failing_cache(tmp_path):
+    url = "https://example.com/file1.txt"
+    cache = ArtifactCache(str(tmp_path))
+    downloader = Downloader(Options(cache=cache))
+    downloader.add("src", url, "sha256:" + hashlib.sha256(b"content").hexdigest())
+
+    disk_full = OSError(28, "No space left on device")
+    with requests_mock.Mocker() as m, patch.object(cache, "put", side_effect=disk_full):
+        m.get(url, content=b"content")
+        key, file_name, file_content_stream = downloader.download_file("src", url)
+
+    assert file_name == "file1.txt"
+    assert file_content_stream.read() == b"content"
+
+
+def test_get_as_zipped_verifies_digests(downloader):
+    ok_url = "https://example.com/ok.txt"
+    bad_url = "https://example.com/bad.txt"
+    ok_digest = "sha256:" + hashlib.sha256(b"ok").hexdigest()
+
+    with requests_mock.Mocker() as m:
+        m.get(ok_url, content=b"ok")
+        m.get(bad_url, content=b"tampered")
+
+        downloader.add("src", ok_url, ok_digest)
+        downloader.add("src", bad_url, "sha256:" + hashlib.sha256(b"bad").hexdigest())
+        zip_buffer = downloader.get_as_zipped()
+
+    with zipfile.ZipFile(zip_buffer, "r") as z:
+        assert z.namelist() == ["src/ok.txt", ".metadata/urls.txt"]
+        assert json.loads(z.read(".metadata/urls.txt")) == {
+            "src": [
+                {"url": bad_url, "digest": None},
+                {"url": ok_url, "digest": ok_digest},
+            ]
+        }
+
+
+def test_aget_as_zipped(downloader):
+    url1 = "https://example.com/file1.txt"
+    url2 = "https://example.com/file2.txt"
+
+    with requests_mock.Mocker() as m:
+        m.get(url1, content=b"one")
+        m.get(url2, status_code=404)
+
+        downloader.add("folder1", url1)
+        downloader.add("folder2", url2)
+        zip_buffer = asyncio.run(downloader.aget_as_zipped())
+
+    with zipfile.ZipFile(zip_buffer, "r") as z:
+        assert sorted(z.namelist()) == [".metadata/urls.txt", "folder1/file1.txt"]
+        assert z.read("folder1/file1.txt") == b"one"
+
+
+def test_aget_as_zipped_fails_when_nothing_downloaded(downloader):
+    with requests_mock.Mocker() as m:
+        m.get("https://example.com/file1.txt", status_code=500)
+
+        downloader.add("folder1", "https://example.com/file1.txt")
+        with pytest.raises(ValueError, match="failed to download all artifacts"):
+            asyncio.run(downloader.aget_as_zipped())
+
+
+def test_downloads_with_given_session():
+    session = requests.Session()
+    downloader = Downloader(session=session)
+    assert downloader.session is session
+
+    url = "https://example.com/file1.txt"
+    with requests_mock.Mocker(session=session) as m:
+        m.get(url, content=b"content")
+        _, _, file_content_stream = downloader.download_file("folder1", url)
+
+    assert file_content_stream.read() == b"content"
+
+
+def test_get_as_zipped_applies_compression_policy():
+    downloader = Downloader(Options(compression=CompressionPolicy(level=9)))
+    text_url = "https://example.com/LICENSE"
+    archive_url = "https://example.com/numpy.tar.gz"
+
+    with requests_mock.Mocker() as m:
+        m.get(text_url, content=b"license text " * 100)
+        m.get(archive_url, content=b"\x1f\x8b compressed already")
+
+        downloader.add("src", text_url)
+        downloader.add("src", archive_url)
+        zip_buffer = downloader.get_as_zipped()
+
+    with zipfile.ZipFile(zip_buffer, "r") as z:
+        assert z.getinfo("src/LICENSE").compress_type == zipfile.ZIP_DEFLATED
+        assert z.getinfo("src/numpy.tar.gz").compress_type == zipfile.ZIP_STORED
+        assert z.read("src/LICENSE") == b"license text " * 100
+
+
+def test_add_skips_unselected_artifacts():
+    downloader = Downloader(Options(selection=Selection(kinds=["sdist"])))
+    downloader.add("sdist", "https://example.com/numpy.tar.gz")
+    downloader.add("bdist_wheel", "https://example.com/numpy-1.0-py3-none-any.whl")
+
+    assert downloader.download_list == {"sdist": {"https://example.com/numpy.tar.gz"}}
+    assert downloader.skipped == ["https://example.com/numpy-1.0-py3-none-any.whl"]
+
+
+def test_get_as_zipped_fails_when_nothing_selected():
+    downloader = Downloader(Options(selection=Selection(kinds=["sdist"])))
+    downloader.add("bdist_wheel", "https://example.com/numpy-1.0-py3-none-any.whl")
+
+    with pytest.raises(
+        ValueError, match=r"no artifact url were selected to download \(1 skipped\)"
+    ):
+        downloader.get_as_zipped()
+
+
+def test_download_file_rejects_artifact_above_budget():
+    budget = ByteBudget(max_artifact_size=4)
+    downloader = Downloader(Options(budget=budget))
+    url = "https://example.com/file1.txt"
+    downloader.add("folder1", url, size=12)
+
+    with requests_mock.Mocker() as m:
+        m.get(url, content=b"Test content")
+        _, file_name, error = downloader.download_file("folder1", url)
+
+    assert file_name is None
+    assert "above max artifact size" in error
+    assert m.call_count == 0
+    assert budget.used == 0
+
+
+def test_download_file_cuts_off_artifact_of_unknown_size():
+    budget = ByteBudget(max_total_size=4)
+    downloader = Downloader(Options(budget=budget))
+    url = "https://example.com/file1.txt"
+
+    with requests_mock.Mocker() as m:
+        m.head(url, status_code=405)
+        m.get(url, content=b"Test content")
+        _, file_name, error = downloader.download_file("folder1", url)
+
+    assert file_name is None
+    assert "does not fit in the budget" in error
+
+
+def test_download_file_charges_streamed_bytes_of_bounded_size():
+    budget = ByteBudget(max_artifact_size=64, max_total_size=64)
+    downloader = Downloader(Options(budget=budget))
+    url = "https://example.com/file1.tgz"
+    # an upper bound (e.g. npm unpacked size) is checked, but not charged
+    downloader.add("folder1", url, max_size=48)
+
+    with requests_mock.Mocker() as m:
+        m.get(url, content=b"Test content")
+        _, file_name, file = downloader.download_file("folder1", url)
+        file.close()
+
+    assert file_name == "file1.tgz"
+    assert m.call_count == 1
+    assert budget.used == len(b"Test content")
+
+
+def test_download_file_charges_bytes_beyond_reserved_size():
+    budget = ByteBudget(max_total_size=64)
+    downloader = Downloader(Options(budget=budget))
+    url = "https://example.com/file1.txt"
+    downloader.add("folder1", url, size=4)
+
+    with requests_mock.Mocker() as m:
+        m.get(url, content=b"Test content")
+        _, _, file = downloader.download_file("folder1", url)
+        file.close()
+
+    assert budget.used == len(b"Test content")
+
+
+@pytest.mark.parametrize("digest, status", [("sha256:" + "0" * 64, 200), (None, 500)])
+def test_download_file_refunds_failed_download(digest, status):
+    budget = ByteBudget(max_total_size=64)
+    budget.charge("https://example.com/other", 8)
+    downloader = Downloader(Options(budget=budget))
+    url = "https://example.com/file1.txt"
+    downloader.add("folder1", url, digest, size=12)
+
+    with requests_mock.Mocker() as m:
+        m.get(url, content=b"Test content", status_code=status)
+        _, file_name, _ = downloader.download_file("folder1", url)
+
+    assert file_name is None
+    assert budget.used == 8
+
+
+def test_downloads_are_bounded_across_downloaders():
+    options = Options(max_downloads=2)
+    lock, in_flight, peak = threading.Lock(), [0], [0]
+
+    def callback(request, context):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.02)
+        with lock:
+            in_flight[0] -= 1
+        return b"content"
+
+    downloaders = [Downloader(options) for _ in range(3)]
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, content=callback)
+        for i, downloader in enumerate(downloaders):
+            for j in range(4):
+                downloader.add("src", f"https://example.com/{i}/{j}.txt")
+
+        threads = [
+            threading.Thread(target=downloader.get_as_zipped)
+            for downloader in downloaders
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert m.call_count == 12
+    assert peak[0] <= 2
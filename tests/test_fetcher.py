@@ -1,12 +1,23 @@
+import asyncio
+import hashlib
 import io
 import os
 import tempfile
+import threading
+import zipfile
 import pytest
 import requests
+import requests_mock
+from requests.adapters import HTTPAdapter
 from unittest.mock import patch, MagicMock
+from fetcher_py.adapters import PooledAdapter
+from fetcher_py.httpcache import CachingAdapter, HttpCache
 from fetcher_py.fetcher import (
     Fetcher,
+    archive_path,
 )  # Replace 'your_module' with the actual module name
+from fetcher_py.lockfile import LockedArtifact, LockedPackage
+from fetcher_py.options import Options
 from fetcher_py.package import Package
 from fetcher_py.registry.pypi import PypiRegistry
 
@@ -97,3 +108,330 @@ def test_get_with_invalid_ecosystem(fetcher, invalid_query):
 def test_download_raw_with_invalid_ecosystem(fetcher, invalid_query):
     with pytest.raises(ValueError, match="Invalid package identifier format"):
         fetcher.download_raw(invalid_query)
+
+
+@pytest.mark.parametrize(
+    "ecosystem, registry_class",
+    [
+        ("pip", PypiRegistry),
+    ],
+)
+def test_aget(fetcher, ecosystem, registry_class):
+    with patch.object(registry_class, "get") as mock_get:
+        mock_get.return_value = f"Mocked Component for {ecosystem}"
+        result = asyncio.run(fetcher.aget(f"{ecosystem}://some_package"))
+
+    mock_get.assert_called_once_with(Package(name="some_package", ecosystem=ecosystem))
+    assert result == f"Mocked Component for {ecosystem}"
+
+
+def test_aget_many_concurrently(fetcher):
+    async def get_all():
+        queries = [f"pip://package{i}" for i in range(20)]
+        return await asyncio.gather(*[fetcher.aget(query) for query in queries])
+
+    with patch.object(PypiRegistry, "get", side_effect=lambda p: p.name):
+        result = asyncio.run(get_all())
+
+    assert result == [f"package{i}" for i in range(20)]
+
+
+@pytest.mark.parametrize(
+    "ecosystem, registry_class",
+    [
+        ("pip", PypiRegistry),
+    ],
+)
+def test_adownload(fetcher, ecosystem, registry_class):
+    async def mock_adownload(package):
+        return io.BytesIO(b"Mocked Raw Data")
+
+    with patch.object(registry_class, "adownload", side_effect=mock_adownload):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            destination = os.path.join(temp_dir, "out", f"{ecosystem}_destination")
+            asyncio.run(fetcher.adownload(f"{ecosystem}://p1", destination))
+
+            with open(destination, "rb") as file:
+                assert file.read() == b"Mocked Raw Data"
+
+
+def test_mounts_pooled_adapters():
+    session = requests.Session()
+    options = Options(pool_maxsize=64)
+    Fetcher(session, options)
+
+    for prefix in ["https://", "http://"]:
+        adapter = session.get_adapter(prefix)
+        assert isinstance(adapter, PooledAdapter)
+        assert adapter.poolmanager.connection_pool_kw["maxsize"] == 64
+        assert adapter.limiter is options.rate_limiter
+
+
+def test_keeps_adapters_mounted_by_caller():
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=5)
+    session.mount("https://", adapter)
+    Fetcher(session)
+
+    assert session.get_adapter("https://") is adapter
+    assert isinstance(session.get_adapter("http://"), PooledAdapter)
+
+
+def test_caches_behind_adapters_mounted_by_caller(tmp_path):
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=5)
+    session.mount("https://", adapter)
+    Fetcher(session, Options(http_cache=HttpCache(str(tmp_path))))
+
+    caching = session.get_adapter("https://")
+    assert isinstance(caching, CachingAdapter)
+    assert caching.adapter is adapter
+
+    response = requests.Response()
+    response.status_code = 200
+    response.headers["Cache-Control"] = "max-age=600"
+    response.raw = io.BytesIO(b"{}")
+    with patch.object(adapter, "send", return_value=response) as send:
+        session.get("https://pypi.org/pypi/numpy/json")
+        session.get("https://pypi.org/pypi/numpy/json")
+
+    # sent with the caller's adapter once, served from the cache after
+    assert send.call_count == 1
+
+
+def test_get_many(fetcher):
+    queries = ["pip://a@1.0", "pip://b@2.0", "pip://a@1.0", "invalid"]
+    with patch.object(PypiRegistry, "get", side_effect=lambda p: p.name):
+        results = {result.query: result for result in fetcher.get_many(queries)}
+
+    assert sorted(results) == ["invalid", "pip://a@1.0", "pip://b@2.0"]
+    assert results["pip://a@1.0"].component == "a"
+    assert results["pip://b@2.0"].component == "b"
+    assert not results["invalid"].ok
+    assert "Invalid package identifier format" in str(results["invalid"].error)
+
+
+def test_download_many(tmp_path):
+    fetcher = Fetcher(requests.Session())
+    json_data = {
+        "info": {"name": "numpy", "version": "1.0"},
+        "urls": [{"packagetype": "sdist", "url": "https://example.com/numpy.zip"}],
+    }
+
+    with requests_mock.Mocker() as m:
+        m.get("https://pypi.org/pypi/numpy/1.0/json", json=json_data)
+        m.get("https://pypi.org/pypi/missing/1.0/json", status_code=404)
+        m.get("https://example.com/numpy.zip", content=b"sdist")
+
+        queries = ["pip://numpy@1.0", "pip://missing@1.0"]
+        results = {r.query: r for r in fetcher.download_many(queries, str(tmp_path))}
+
+    assert results["pip://numpy@1.0"].path == str(tmp_path / "pip" / "numpy@1.0.zip")
+    with zipfile.ZipFile(results["pip://numpy@1.0"].path) as z:
+        assert z.read("sdist/numpy.zip") == b"sdist"
+
+    assert not results["pip://missing@1.0"].ok
+    assert results["pip://missing@1.0"].path is None
+
+
+def test_download_many_dedups_resolved_versions(tmp_path):
+    fetcher = Fetcher(requests.Session())
+    json_data = {
+        "info": {"name": "numpy", "version": "1.0"},
+        "urls": [{"packagetype": "sdist", "url": "https://example.com/numpy.zip"}],
+    }
+
+    with requests_mock.Mocker() as m:
+        m.get("https://pypi.org/pypi/numpy/json", json={"releases": {"1.0": [{}]}})
+        m.get("https://pypi.org/pypi/numpy/1.0/json", json=json_data)
+        m.get("https://example.com/numpy.zip", content=b"sdist")
+
+        queries = ["pip://numpy", "pip://numpy@1.0"]
+        results = list(fetcher.download_many(queries, str(tmp_path)))
+        downloads = [r for r in m.request_history if r.url.endswith("numpy.zip")]
+
+    assert len(downloads) == 1
+    assert {r.path for r in results} == {str(tmp_path / "pip" / "numpy@1.0.zip")}
+    assert all(r.ok for r in results)
+
+
+def test_archive_path():
+    package = Package.parse("composer://psr/http-message@2.0")
+    component = MagicMock(version="2.0")
+
+    assert archive_path(package, component) == os.path.join(
+        "composer", "psr%2Fhttp-message@2.0.zip"
+    )
+
+
+def test_download_many_with_locked_artifacts(tmp_path):
+    fetcher = Fetcher(requests.Session())
+    url = "https://static.crates.io/crates/axum/axum-0.1.0.crate"
+    locked = LockedPackage(
+        Package("cargo", "axum", "0.1.0"), [LockedArtifact("src", url)]
+    )
+
+    with requests_mock.Mocker() as m:
+        m.get(url, content=b"crate")
+        (result,) = fetcher.download_many([locked], str(tmp_path))
+
+        # no metadata was requested from the registry
+        assert [request.url for request in m.request_history] == [url]
+
+    assert result.ok
+    assert result.component.version == "0.1.0"
+    with zipfile.ZipFile(result.path) as z:
+        assert z.read("src/axum-0.1.0.crate") == b"crate"
+
+
+def test_download_many_with_locked_digests(tmp_path):
+    fetcher = Fetcher(requests.Session())
+    sdist, wheel = b"sdist", b"wheel"
+    json_data = {
+        "info": {"name": "numpy", "version": "1.0"},
+        "urls": [
+            {
+                "packagetype": "sdist",
+                "url": "https://example.com/numpy.zip",
+                "digests": {"sha256": hashlib.sha256(sdist).hexdigest()},
+            },
+            {
+                "packagetype": "bdist_wheel",
+                "url": "https://example.com/numpy.whl",
+                "digests": {"sha256": hashlib.sha256(wheel).hexdigest()},
+            },
+        ],
+    }
+    locked = LockedPackage(
+        Package("pip", "numpy", "1.0"),
+        digests={"sha256:" + hashlib.sha256(sdist).hexdigest()},
+    )
+
+    with requests_mock.Mocker() as m:
+        m.get("https://pypi.org/pypi/numpy/1.0/json", json=json_data)
+        m.get("https://example.com/numpy.zip", content=sdist)
+        m.get("https://example.com/numpy.whl", content=wheel)
+        (result,) = fetcher.download_many([locked], str(tmp_path))
+
+    with zipfile.ZipFile(result.path) as z:
+        assert z.namelist() == ["sdist/numpy.zip", ".metadata/urls.txt"]
+
+
+def test_plan_many():
+    fetcher = Fetcher(requests.Session())
+    json_data = {
+        "info": {"name": "numpy", "version": "1.0"},
+        "urls": [
+            {
+                "packagetype": "sdist",
+                "url": "https://example.com/numpy.zip",
+                "size": 100,
+            }
+        ],
+    }
+    url = "https://static.crates.io/crates/axum/axum-0.1.0.crate"
+    locked = LockedPackage(
+        Package("cargo", "axum", "0.1.0"), [LockedArtifact("src", url)]
+    )
+
+    with requests_mock.Mocker() as m:
+        m.get("https://pypi.org/pypi/numpy/1.0/json", json=json_data)
+        m.head(url, headers={"Content-Length": "20"})
+        results = {r.query: r for r in fetcher.plan_many(["pip://numpy@1.0", locked])}
+
+        # only metadata of numpy was requested, size of axum is from HEAD
+        assert sorted(request.method for request in m.request_history) == [
+            "GET",
+            "HEAD",
+        ]
+
+    assert results["pip://numpy@1.0"].plan.size == 100
+    assert results["cargo://axum@0.1.0"].plan.size == 20
+
+
+def test_registries_are_reused():
+    fetcher = Fetcher(requests.Session())
+
+    registry = fetcher._get_registry("pip")
+    assert fetcher._get_registry("pip") is registry
+    assert fetcher._get_registry("npm") is not registry
+    assert fetcher._get_registry("pip", "https://pypi.example.com") is not registry
+    assert fetcher._get_registry("pip", "https://pypi.example.com").base_url == (
+        "https://pypi.example.com"
+    )
+
+
+def test_closure(tmp_path):
+    fetcher = Fetcher(requests.Session())
+    numpy = {
+        "info": {
+            "name": "numpy",
+            "version": "1.0",
+            "requires_dist": ["Six (>=1.0)", "pytest ; extra == 'test'"],
+        },
+        "urls": [{"packagetype": "sdist", "url": "https://example.com/numpy.zip"}],
+    }
+    six = {
+        "info": {"name": "six", "version": "1.16.0", "requires_dist": None},
+        "urls": [{"packagetype": "sdist", "url": "https://example.com/six.zip"}],
+    }
+
+    with requests_mock.Mocker() as m:
+        m.get("https://pypi.org/pypi/numpy/1.0/json", json=numpy)
+        m.get(
+            "https://pypi.org/pypi/six/json",
+            json={"releases": {"0.9": [{}], "1.16.0": [{}]}},
+        )
+        m.get("https://pypi.org/pypi/six/1.16.0/json", json=six)
+        m.get("https://example.com/numpy.zip", content=b"numpy")
+        m.get("https://example.com/six.zip", content=b"six")
+
+        results = {r.query: r for r in fetcher.closure("pip://numpy@1.0")}
+        assert sorted(results) == ["pip://numpy@1.0", "pip://six@>=1.0"]
+        assert results["pip://numpy@1.0"].dependencies == ["pip://six@>=1.0"]
+        assert results["pip://six@>=1.0"].component.version == "1.16.0"
+        assert results["pip://six@>=1.0"].required_by == "pip://numpy@1.0"
+
+        results = list(fetcher.closure(["pip://numpy@1.0"], destination_dir=tmp_path))
+
+    assert all(result.ok for result in results)
+    assert (tmp_path / "pip" / "six@1.16.0.zip").exists()
+
+
+def test_resolve():
+    fetcher = Fetcher(requests.Session())
+
+    with requests_mock.Mocker() as m:
+        m.get(
+            "https://pypi.org/pypi/six/json",
+            json={"releases": {"0.9": [{}], "1.16.0": [{}]}},
+        )
+        assert fetcher.resolve("pip://six@>=1.0") == Package("pip", "six", "1.16.0")
+        assert fetcher.resolve("pip://six").version == "1.16.0"
+        # brew resolves versions while fetching metadata
+        assert fetcher.resolve("brew://wget") == Package("brew", "wget")
+        assert m.call_count == 1
+
+
+def test_araw_lists_artifacts_off_the_event_loop():
+    fetcher = Fetcher(requests.Session())
+    data = {
+        "info": {"name": "numpy", "version": "1.0"},
+        "urls": [{"packagetype": "sdist", "url": "https://example.com/numpy.zip"}],
+    }
+    threads = []
+    list_urls = PypiRegistry.get_artifact_urls
+
+    def get_artifact_urls(self, component):
+        threads.append(threading.current_thread())
+        return list_urls(self, component)
+
+    with patch.object(PypiRegistry, "get_artifact_urls", get_artifact_urls):
+        with requests_mock.Mocker() as m:
+            m.get("https://pypi.org/pypi/numpy/1.0/json", json=data)
+            m.get("https://example.com/numpy.zip", content=b"numpy")
+            component, archive = asyncio.run(fetcher.araw("pip://numpy@1.0"))
+
+    assert threads and threading.main_thread() not in threads
+    with zipfile.ZipFile(archive) as zip_file:
+        assert zip_file.read("sdist/numpy.zip") == b"numpy"
@@ -0,0 +1,124 @@
+import pytest
+import requests
+import requests_mock
+
+from fetcher_py.downloader import Downloader
+from fetcher_py.fetcher import Fetcher
+from fetcher_py.hooks import Hooks, trace
+from fetcher_py.options import Options
+
+
+def test_span_calls_hooks():
+    events = []
+    hooks = Hooks().add(
+        on_start=lambda span: events.append(("start", span.name)),
+        on_error=lambda span: events.append(("error", span.name)),
+        on_finish=lambda span: events.append(("finish", span.name)),
+    )
+
+    with hooks.span("registry.get", package="pip://numpy@1.0") as span:
+        span.set("bytes", 10)
+
+    assert events == [("start", "registry.get"), ("finish", "registry.get")]
+    assert span.attributes == {"package": "pip://numpy@1.0", "bytes": 10}
+    assert span.duration >= 0
+
+
+def test_span_calls_error_hooks():
+    events = []
+    hooks = Hooks().add(
+        on_error=lambda span: events.append(("error", span.error)),
+        on_finish=lambda span: events.append(("finish", span.error)),
+    )
+
+    error = ValueError("not found")
+    with pytest.raises(ValueError):
+        with hooks.span("registry.get"):
+            raise error
+
+    assert events == [("error", error), ("finish", error)]
+
+
+def test_failing_hook_does_not_interrupt():
+    def fail(span):
+        raise RuntimeError("hook failed")
+
+    with Hooks().add(on_start=fail, on_finish=fail).span("download_file") as span:
+        span.set("bytes", 1)
+
+
+def test_trace_without_hooks():
+    with trace(None, "download_file", url="https://example.com/a") as span:
+        span.set("bytes", 1)
+
+    assert span.attributes == {"url": "https://example.com/a", "bytes": 1}
+
+
+def test_fetcher_traces_network_calls(tmp_path):
+    fetcher = Fetcher(requests.Session())
+    finished = []
+    fetcher.add_hooks(on_finish=finished.append)
+    json_data = {
+        "info": {"name": "numpy", "version": "1.0"},
+        "urls": [{"packagetype": "sdist", "url": "https://example.com/numpy.zip"}],
+    }
+
+    with requests_mock.Mocker() as m:
+        m.get("https://pypi.org/pypi/numpy/json", json={"info": {"version": "1.0"}})
+        m.get("https://pypi.org/pypi/numpy/1.0/json", json=json_data)
+        m.get("https://example.com/numpy.zip", content=b"sdist")
+        fetcher.download("pip://numpy", str(tmp_path / "numpy.zip"))
+
+    spans = {span.name: span for span in finished}
+    assert sorted(spans) == [
+        "download_file",
+        "registry.download",
+        "registry.get",
+        "registry.get_default",
+        "registry.raw",
+    ]
+    assert spans["registry.get"].attributes["package"] == "pip://numpy@1.0"
+    assert spans["download_file"].attributes == {
+        "url": "https://example.com/numpy.zip",
+        "kind": "sdist",
+        "registry": "pip",
+        "cached": False,
+        "bytes": 5,
+    }
+
+
+def test_download_file_error_is_traced():
+    errors = []
+    downloader = Downloader(Options(hooks=Hooks().add(on_error=errors.append)))
+    url = "https://example.com/file1.txt"
+
+    with requests_mock.Mocker() as m:
+        m.get(url, status_code=404)
+        _, file_name, _ = downloader.download_file("folder1", url)
+
+    assert file_name is None
+    assert [span.attributes["url"] for span in errors] == [url]
+    assert isinstance(errors[0].error, requests.HTTPError)
+
+
+def test_opentelemetry_hooks():
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+
+    from fetcher_py.hooks import OpenTelemetryHooks
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    hooks = OpenTelemetryHooks(provider.get_tracer("test"))
+
+    with hooks.span("download_file", url="https://example.com/a") as span:
+        span.set("bytes", 1)
+
+    (otel_span,) = exporter.get_finished_spans()
+    assert otel_span.name == "fetcher_py.download_file"
+    assert otel_span.attributes["bytes"] == 1
@@ -0,0 +1,152 @@
+import io
+from unittest.mock import patch
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from fetcher_py.httpcache import CachingAdapter, HttpCache, parse_cache_control
+from fetcher_py.metrics import Metrics
+
+URL = "https://pypi.org/pypi/numpy/json"
+
+
+def mk_response(status_code, headers=None, body=b""):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response.raw = io.BytesIO(body)
+    return response
+
+
+@pytest.fixture
+def session(tmp_path):
+    session = requests.Session()
+    session.mount("https://", CachingAdapter(HttpCache(str(tmp_path))))
+    return session
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, {}),
+        ("max-age=60", {"max-age": "60"}),
+        (
+            "public, max-age=60, no-cache",
+            {"public": None, "max-age": "60", "no-cache": None},
+        ),
+    ],
+)
+def test_parse_cache_control(value, expected):
+    assert parse_cache_control(value) == expected
+
+
+def test_revalidates_with_etag(session):
+    responses = [
+        mk_response(200, {"ETag": '"v1"'}, b'{"info": {}}'),
+        mk_response(304, {"ETag": '"v1"'}),
+    ]
+    with patch.object(HTTPAdapter, "send", side_effect=responses) as send:
+        first = session.get(URL)
+        second = session.get(URL)
+
+    assert first.json() == {"info": {}}
+    assert second.status_code == 200
+    assert second.json() == {"info": {}}
+    assert second.from_cache
+    assert send.call_args_list[1][0][0].headers["If-None-Match"] == '"v1"'
+
+
+def test_serves_fresh_response_without_request(session):
+    responses = [mk_response(200, {"Cache-Control": "max-age=600"}, b"{}")]
+    with patch.object(HTTPAdapter, "send", side_effect=responses) as send:
+        session.get(URL)
+        assert session.get(URL).json() == {}
+
+    assert send.call_count == 1
+
+
+def test_does_not_store_no_store(session):
+    responses = [
+        mk_response(200, {"ETag": '"v1"', "Cache-Control": "no-store"}, b"{}"),
+        mk_response(200, {}, b"{}"),
+    ]
+    with patch.object(HTTPAdapter, "send", side_effect=responses) as send:
+        session.get(URL)
+        session.get(URL)
+
+    assert "If-None-Match" not in send.call_args_list[1][0][0].headers
+
+
+def test_skips_streamed_requests(session):
+    responses = [
+        mk_response(200, {"ETag": '"v1"'}, b"artifact"),
+        mk_response(200, {"ETag": '"v1"'}, b"artifact"),
+    ]
+    with patch.object(HTTPAdapter, "send", side_effect=responses) as send:
+        session.get(URL, stream=True).close()
+        session.get(URL, stream=True).close()
+
+    assert "If-None-Match" not in send.call_args_list[1][0][0].headers
+
+
+def test_counts_cache_requests(tmp_path):
+    metrics = Metrics()
+    session = requests.Session()
+    session.mount("https://", CachingAdapter(HttpCache(str(tmp_path)), metrics=metrics))
+
+    responses = [mk_response(200, {"ETag": '"v1"'}, b"{}"), mk_response(304)]
+    with patch.object(HTTPAdapter, "send", side_effect=responses):
+        session.get(URL)
+        session.get(URL)
+
+    assert metrics.cache_requests.value(cache="http", result="miss") == 1
+    assert metrics.cache_requests.value(cache="http", result="revalidated") == 1
+    assert metrics.http_responses.value(host="pypi.org", status="304") == 1
+
+
+def test_keys_on_vary_headers(session):
+    headers = {"Cache-Control": "max-age=600", "Vary": "Accept"}
+    abbreviated = "application/vnd.npm.install-v1+json"
+    responses = [
+        mk_response(200, headers, b'{"full": true}'),
+        mk_response(200, headers, b'{"full": false}'),
+    ]
+    with patch.object(HTTPAdapter, "send", side_effect=responses) as send:
+        assert session.get(URL).json() == {"full": True}
+        assert session.get(URL, headers={"Accept": abbreviated}).json() == {
+            "full": False
+        }
+        # each variant is served from the cache
+        assert session.get(URL).json() == {"full": True}
+        assert session.get(URL, headers={"Accept": abbreviated}).json() == {
+            "full": False
+        }
+
+    assert send.call_count == 2
+
+
+def test_skips_requests_with_authorization(session):
+    responses = [
+        mk_response(200, {"Cache-Control": "max-age=600"}, b"secret"),
+        mk_response(200, {"Cache-Control": "max-age=600"}, b"public"),
+    ]
+    with patch.object(HTTPAdapter, "send", side_effect=responses) as send:
+        assert session.get(URL, headers={"Authorization": "Bearer t"}).content == (
+            b"secret"
+        )
+        assert session.get(URL).content == b"public"
+
+    assert send.call_count == 2
+
+
+def test_does_not_store_vary_star(session):
+    responses = [
+        mk_response(200, {"Cache-Control": "max-age=600", "Vary": "*"}, b"{}"),
+        mk_response(200, {}, b"{}"),
+    ]
+    with patch.object(HTTPAdapter, "send", side_effect=responses) as send:
+        session.get(URL)
+        session.get(URL)
+
+    assert send.call_count == 2
@@ -0,0 +1,58 @@
+import hashlib
+
+import pytest
+
+from fetcher_py.integrity import (
+    DigestHasher,
+    IntegrityError,
+    from_base64,
+    from_sri,
+    parse_digest,
+)
+
+CONTENT = b"some artifact"
+SHA256 = hashlib.sha256(CONTENT).hexdigest()
+SHA512 = hashlib.sha512(CONTENT).hexdigest()
+
+
+@pytest.mark.parametrize(
+    "digest, expected",
+    [
+        ("sha256:AB12", ("sha256", "ab12")),
+        ("SHA512:cd34", ("sha512", "cd34")),
+    ],
+)
+def test_parse_digest(digest, expected):
+    assert parse_digest(digest) == expected
+
+
+@pytest.mark.parametrize("digest", ["ab12", "nope:ab12"])
+def test_parse_digest_fails_for_unsupported(digest):
+    with pytest.raises(ValueError):
+        parse_digest(digest)
+
+
+def test_from_sri():
+    assert from_sri("sha512-q83vEjRWeJA=") == "sha512:abcdef1234567890"
+    assert from_sri("sha512-q83vEjRWeJA= sha1-AAAA") == "sha512:abcdef1234567890"
+    assert from_sri("sha512") is None
+    assert from_sri(None) is None
+    assert from_base64("sha512", None) is None
+
+
+@pytest.mark.parametrize("expected", [None, f"sha256:{SHA256}", f"sha512:{SHA512}"])
+def test_hasher_verifies(expected):
+    hasher = DigestHasher(expected)
+    hasher.update(CONTENT[:4])
+    hasher.update(CONTENT[4:])
+
+    hasher.verify("artifact")
+    assert hasher.sha256 == f"sha256:{SHA256}"
+
+
+def test_hasher_fails_on_mismatch():
+    hasher = DigestHasher("sha512:" + "0" * 128)
+    hasher.update(CONTENT)
+
+    with pytest.raises(IntegrityError, match="digest mismatch for artifact"):
+        hasher.verify("artifact")
@@ -0,0 +1,287 @@
+import base64
+import json
+
+import pytest
+
+from fetcher_py import lockfile
+from fetcher_py.lockfile import (
+    LockedArtifact,
+    LockedPackage,
+    get_reader,
+    read_cargo_lock,
+    read_composer_lock,
+    read_gemfile_lock,
+    read_nuget_lock,
+    read_package_lock,
+    read_poetry_lock,
+    read_requirements,
+)
+from fetcher_py.package import Package
+
+SHA256 = "ab" * 32
+
+
+def has_toml():
+    try:
+        lockfile._load_toml("")
+        return True
+    except ImportError:
+        return False
+
+
+requires_toml = pytest.mark.skipif(not has_toml(), reason="requires tomllib or tomli")
+
+
+def test_read_requirements():
+    text = f"""
+# comment
+--index-url https://pypi.org/simple
+numpy==1.26.0  # pinned
+requests[socks]==2.31.0 ; python_version >= "3.8" \\
+    --hash=sha256:{SHA256.upper()} \\
+    --hash=sha256:{"cd" * 32}
+click>=8.0
+-e ./local
+"""
+    assert list(read_requirements(text)) == [
+        LockedPackage(Package("pip", "numpy", "1.26.0")),
+        LockedPackage(
+            Package("pip", "requests", "2.31.0"),
+            digests={f"sha256:{SHA256}", f"sha256:{'cd' * 32}"},
+        ),
+    ]
+
+
+@requires_toml
+def test_read_poetry_lock():
+    text = f"""
+[[package]]
+name = "numpy"
+version = "1.26.0"
+files = [
+    {{file = "numpy-1.26.0.tar.gz", hash = "sha256:{SHA256}"}},
+]
+
+[[package]]
+name = "local"
+version = "0.1.0"
+
+[package.source]
+type = "directory"
+url = "../local"
+"""
+    assert list(read_poetry_lock(text)) == [
+        LockedPackage(Package("pip", "numpy", "1.26.0"), digests={f"sha256:{SHA256}"}),
+    ]
+
+
+def test_read_package_lock_v3():
+    integrity = base64.b64encode(bytes.fromhex("ab" * 64)).decode()
+    text = json.dumps(
+        {
+            "lockfileVersion": 3,
+            "packages": {
+                "": {"name": "app"},
+                "node_modules/@types/node": {
+                    "version": "20.0.0",
+                    "resolved": "https://registry.npmjs.org/@types/node/-/node-20.0.0.tgz",
+                    "integrity": f"sha512-{integrity}",
+                },
+                "node_modules/a/node_modules/b": {"version": "1.0.0"},
+                "node_modules/linked": {"link": True, "resolved": "../linked"},
+            },
+        }
+    )
+    assert list(read_package_lock(text)) == [
+        LockedPackage(
+            Package("npm", "@types/node", "20.0.0"),
+            [
+                LockedArtifact(
+                    "src",
+                    "https://registry.npmjs.org/@types/node/-/node-20.0.0.tgz",
+                    f"sha512:{'ab' * 64}",
+                )
+            ],
+        ),
+        LockedPackage(Package("npm", "b", "1.0.0")),
+    ]
+
+
+def test_read_package_lock_v1():
+    text = json.dumps(
+        {
+            "lockfileVersion": 1,
+            "dependencies": {
+                "a": {
+                    "version": "1.0.0",
+                    "resolved": "https://registry.npmjs.org/a/-/a-1.0.0.tgz",
+                    "dependencies": {"b": {"version": "2.0.0"}},
+                }
+            },
+        }
+    )
+    assert [p.query for p in read_package_lock(text)] == [
+        "npm://a@1.0.0",
+        "npm://b@2.0.0",
+    ]
+
+
+@requires_toml
+def test_read_cargo_lock():
+    text = f"""
+version = 3
+
+[[package]]
+name = "app"
+version = "0.1.0"
+
+[[package]]
+name = "axum"
+version = "0.1.0"
+source = "registry+https://github.com/rust-lang/crates.io-index"
+checksum = "{SHA256}"
+
+[[package]]
+name = "forked"
+version = "0.2.0"
+source = "git+https://github.com/someone/forked#abc"
+"""
+    assert list(read_cargo_lock(text)) == [
+        LockedPackage(
+            Package("cargo", "axum", "0.1.0"),
+            [
+                LockedArtifact(
+                    "src",
+                    "https://static.crates.io/crates/axum/axum-0.1.0.crate",
+                    f"sha256:{SHA256}",
+                )
+            ],
+        )
+    ]
+
+
+def test_read_gemfile_lock():
+    text = f"""GEM
+  remote: https://rubygems.org/
+  specs:
+    coulda (0.7.1)
+      rake (>= 0)
+    nokogiri (1.15.0-arm64-darwin)
+    nokogiri (1.15.0-x86_64-linux)
+
+PLATFORMS
+  arm64-darwin
+  x86_64-linux
+
+CHECKSUMS
+  coulda (0.7.1) sha256={SHA256}
+  nokogiri (1.15.0-arm64-darwin)
+  nokogiri (1.15.0-x86_64-linux)
+"""
+    assert list(read_gemfile_lock(text)) == [
+        LockedPackage(
+            Package("gem", "coulda", "0.7.1"),
+            [
+                LockedArtifact(
+                    "src",
+                    "https://rubygems.org/gems/coulda-0.7.1.gem",
+                    f"sha256:{SHA256}",
+                )
+            ],
+        ),
+        LockedPackage(
+            Package("gem", "nokogiri", "1.15.0"),
+            [
+                LockedArtifact(
+                    "src", "https://rubygems.org/gems/nokogiri-1.15.0-arm64-darwin.gem"
+                ),
+                LockedArtifact(
+                    "src", "https://rubygems.org/gems/nokogiri-1.15.0-x86_64-linux.gem"
+                ),
+            ],
+        ),
+    ]
+
+
+def test_read_composer_lock():
+    text = json.dumps(
+        {
+            "packages": [
+                {
+                    "name": "psr/http-message",
+                    "version": "2.0",
+                    "dist": {"url": "https://example.com/psr.zip", "shasum": ""},
+                }
+            ],
+            "packages-dev": [{"name": "vendor/tool", "version": "1.0.0"}],
+        }
+    )
+    assert list(read_composer_lock(text)) == [
+        LockedPackage(
+            Package("composer", "psr/http-message", "2.0"),
+            [LockedArtifact("src", "https://example.com/psr.zip")],
+        ),
+        LockedPackage(Package("composer", "vendor/tool", "1.0.0")),
+    ]
+
+
+def test_read_nuget_lock():
+    content_hash = base64.b64encode(bytes.fromhex("ab" * 64)).decode()
+    text = json.dumps(
+        {
+            "version": 1,
+            "dependencies": {
+                "net6.0": {
+                    "Newtonsoft.Json": {
+                        "type": "Direct",
+                        "resolved": "13.0.1",
+                        "contentHash": content_hash,
+                    },
+                    "MyProject": {"type": "Project"},
+                }
+            },
+        }
+    )
+    url = "https://api.nuget.org/v3-flatcontainer/newtonsoft.json/13.0.1/newtonsoft.json.13.0.1.nupkg"
+    assert list(read_nuget_lock(text)) == [
+        LockedPackage(
+            Package("nuget", "Newtonsoft.Json", "13.0.1"),
+            [LockedArtifact("src", url, f"sha512:{'ab' * 64}")],
+        )
+    ]
+
+
+@pytest.mark.parametrize(
+    "path, reader",
+    [
+        ("some/dir/Cargo.lock", read_cargo_lock),
+        ("requirements-dev.txt", read_requirements),
+        ("packages.lock.json", read_nuget_lock),
+    ],
+)
+def test_get_reader(path, reader):
+    assert get_reader(path) is reader
+
+
+def test_get_reader_fails_for_unknown_lockfile():
+    with pytest.raises(ValueError, match="Unsupported lockfile"):
+        get_reader("yarn.lock")
+
+
+def test_read(tmp_path):
+    path = tmp_path / "requirements.txt"
+    path.write_text("numpy==1.26.0\n")
+
+    assert [p.query for p in lockfile.read(str(path))] == ["pip://numpy@1.26.0"]
+
+
+def test_to_component():
+    locked = LockedPackage(
+        Package("cargo", "axum", "0.1.0"), [LockedArtifact("src", "https://x/a")]
+    )
+    component = locked.to_component()
+
+    assert (component.name, component.version) == ("axum", "0.1.0")
+    assert component.raw == {
+        "artifacts": [{"kind": "src", "url": "https://x/a", "digest": None}]
+    }
@@ -0,0 +1,98 @@
+import time
+
+import requests
+import requests_mock
+
+from fetcher_py.fetcher import Fetcher
+from fetcher_py.metrics import Counter, Histogram, Metrics, current_registry
+from fetcher_py.options import Options
+
+
+def test_counter_render():
+    counter = Counter("requests_total", "Requests.", ["host"])
+    counter.inc(host="pypi.org")
+    counter.inc(2, host="pypi.org")
+    counter.inc(host='a"b')
+
+    assert counter.value(host="pypi.org") == 3
+    assert counter.render() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{host="a\\"b"} 1',
+        'requests_total{host="pypi.org"} 3',
+    ]
+
+
+def test_histogram_render():
+    histogram = Histogram("latency_seconds", "Latency.", ["host"], [0.1, 1])
+    histogram.observe(0.05, host="pypi.org")
+    histogram.observe(0.5, host="pypi.org")
+    histogram.observe(5, host="pypi.org")
+
+    assert histogram.count(host="pypi.org") == 3
+    assert histogram.render() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{host="pypi.org",le="0.1"} 1',
+        'latency_seconds_bucket{host="pypi.org",le="1"} 2',
+        'latency_seconds_bucket{host="pypi.org",le="+Inf"} 3',
+        'latency_seconds_sum{host="pypi.org"} 5.55',
+        'latency_seconds_count{host="pypi.org"} 3',
+    ]
+
+
+def test_phases_are_exclusive():
+    metrics = Metrics()
+    with metrics.phase("metadata", "pip"):
+        time.sleep(0.02)
+        with metrics.phase(None):
+            assert current_registry() == "pip"
+            with metrics.phase("resolve"):
+                time.sleep(0.05)
+
+    assert current_registry() == "unknown"
+    resolve = metrics.phase_seconds.sum(registry="pip", phase="resolve")
+    metadata = metrics.phase_seconds.sum(registry="pip", phase="metadata")
+    assert resolve >= 0.05
+    assert 0.02 <= metadata < 0.05
+
+
+def test_write_textfile(tmp_path):
+    metrics = Metrics()
+    metrics.downloaded_bytes.inc(10, registry="npm")
+    metrics.write_textfile(str(tmp_path / "fetcher.prom"))
+
+    text = (tmp_path / "fetcher.prom").read_text()
+    assert 'fetcher_py_downloaded_bytes_total{registry="npm"} 10\n' in text
+
+
+def test_serve():
+    metrics = Metrics()
+    metrics.downloaded_bytes.inc(10, registry="npm")
+    server = metrics.serve(0)
+    try:
+        response = requests.get(f"http://127.0.0.1:{server.server_address[1]}/metrics")
+    finally:
+        server.shutdown()
+
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert 'fetcher_py_downloaded_bytes_total{registry="npm"} 10' in response.text
+
+
+def test_fetcher_records_phases(tmp_path):
+    metrics = Metrics()
+    fetcher = Fetcher(requests.Session(), Options(metrics=metrics))
+    json_data = {
+        "info": {"name": "numpy", "version": "1.0"},
+        "urls": [{"packagetype": "sdist", "url": "https://example.com/numpy.zip"}],
+    }
+
+    with requests_mock.Mocker() as m:
+        m.get("https://pypi.org/pypi/numpy/json", json={"info": {"version": "1.0"}})
+        m.get("https://pypi.org/pypi/numpy/1.0/json", json=json_data)
+        m.get("https://example.com/numpy.zip", content=b"sdist")
+        fetcher.download("pip://numpy", str(tmp_path / "numpy.zip"))
+
+    for phase in ["resolve", "metadata", "download", "zip", "write"]:
+        assert metrics.phase_seconds.count(registry="pip", phase=phase) >= 1, phase
+    assert metrics.downloaded_bytes.value(registry="pip") == 5
@@ -0,0 +1,71 @@
+import requests
+import requests_mock
+
+from fetcher_py.budget import ByteBudget
+from fetcher_py.component import Component
+from fetcher_py.options import Options
+from fetcher_py.package import Package
+from fetcher_py.plan import Plan, PlannedArtifact, head_size, plan_artifact, summarize
+
+URL = "https://example.com/numpy-1.0.tar.gz"
+
+
+def mk_plan(query, artifacts):
+    package = Package.parse(query)
+    component = Component(package.name, package.version, None, None, None, None, {})
+    return Plan(package, component, artifacts)
+
+
+def test_head_size():
+    session = requests.Session()
+    with requests_mock.Mocker() as m:
+        m.head(URL, headers={"Content-Length": "1024"})
+        assert head_size(session, URL) == 1024
+
+        m.head(URL, status_code=404)
+        assert head_size(session, URL) is None
+
+
+def test_plan_artifact_uses_known_size():
+    with requests_mock.Mocker() as m:
+        artifact = plan_artifact(Options(), requests.Session(), "sdist", URL, 10)
+
+    assert artifact == PlannedArtifact("sdist", URL, 10)
+    assert m.call_count == 0
+
+
+def test_plan_artifact_rejects_artifact_above_budget():
+    options = Options(budget=ByteBudget(max_artifact_size=512))
+    with requests_mock.Mocker() as m:
+        m.head(URL, headers={"Content-Length": "1024"})
+        artifact = plan_artifact(options, requests.Session(), "sdist", URL)
+
+    assert artifact.size == 1024
+    assert "above max artifact size" in artifact.rejected
+
+
+def test_summarize():
+    plans = [
+        mk_plan(
+            "pip://numpy@1.0",
+            [
+                PlannedArtifact("sdist", URL, 100),
+                PlannedArtifact("bdist_wheel", URL + ".whl"),
+                PlannedArtifact("bdist_wheel", URL + ".big.whl", 1000, "too big"),
+            ],
+        ),
+        mk_plan("pip://six@1.0", [PlannedArtifact("sdist", URL, 20)]),
+        mk_plan("npm://express@4.0.0", [PlannedArtifact("src", URL, 5)]),
+    ]
+
+    assert plans[0].size == 100
+    assert plans[0].unknown == 1
+
+    totals = summarize(plans)
+    assert sorted(totals) == ["npm", "pip"]
+    assert totals["pip"].packages == 2
+    assert totals["pip"].artifacts == 3
+    assert totals["pip"].rejected == 1
+    assert totals["pip"].unknown == 1
+    assert totals["pip"].size == 120
+    assert totals["npm"].size == 5
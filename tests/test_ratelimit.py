@@ -0,0 +1,139 @@
+import email.utils
+import io
+import time
+from unittest.mock import patch
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from fetcher_py.metrics import Metrics
+from fetcher_py.ratelimit import (
+    RateLimitedAdapter,
+    RateLimiter,
+    TokenBucket,
+    parse_retry_after,
+)
+
+URL = "https://crates.io/api/v1/crates/axum"
+
+
+def mk_response(status_code, headers=None, body=b""):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response.raw = io.BytesIO(body)
+    return response
+
+
+@pytest.fixture
+def limiter():
+    return RateLimiter(rates={}, backoff_factor=0.01, retries=2)
+
+
+@pytest.fixture
+def session(limiter):
+    session = requests.Session()
+    session.mount("https://", RateLimitedAdapter(limiter))
+    return session
+
+
+def test_parse_retry_after():
+    in_a_minute = email.utils.formatdate(time.time() + 60, usegmt=True)
+
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after("120") == 120.0
+    assert 55 < parse_retry_after(in_a_minute) <= 60
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, burst=2)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_limiter_paces_requests_by_host():
+    limiter = RateLimiter(rates={"crates.io": 20.0})
+
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire("crates.io")
+        limiter.acquire("rubygems.org")
+
+    assert time.monotonic() - start >= 0.09
+
+
+def test_limiter_pauses_host():
+    limiter = RateLimiter(rates={})
+    limiter.pause("crates.io", 0.1)
+    limiter.pause("crates.io", 0.01)
+
+    start = time.monotonic()
+    limiter.acquire("rubygems.org")
+    assert time.monotonic() - start < 0.05
+
+    limiter.acquire("crates.io")
+    assert time.monotonic() - start >= 0.09
+
+
+def test_backoff_is_capped():
+    limiter = RateLimiter(backoff_factor=1, max_backoff=4)
+    for attempt in range(10):
+        assert 0 <= limiter.backoff(attempt) <= 4
+
+
+def test_retries_after_retry_after(session, limiter):
+    responses = [mk_response(429, {"Retry-After": "0"}), mk_response(200, body=b"ok")]
+    with patch.object(HTTPAdapter, "send", side_effect=responses) as send:
+        with patch.object(limiter, "pause", wraps=limiter.pause) as pause:
+            response = session.get(URL)
+
+    assert response.status_code == 200
+    assert response.content == b"ok"
+    assert send.call_count == 2
+    pause.assert_called_once_with("crates.io", 0.0)
+
+
+def test_retries_with_backoff_until_exhausted(session):
+    responses = [mk_response(503) for _ in range(3)]
+    with patch.object(HTTPAdapter, "send", side_effect=responses) as send:
+        response = session.get(URL)
+
+    assert response.status_code == 503
+    assert send.call_count == 3
+
+
+def test_does_not_wait_for_long_retry_after(session):
+    responses = [mk_response(429, {"Retry-After": "3600"})]
+    with patch.object(HTTPAdapter, "send", side_effect=responses) as send:
+        response = session.get(URL)
+
+    assert response.status_code == 429
+    assert send.call_count == 1
+
+
+def test_does_not_retry_other_errors(session):
+    with patch.object(HTTPAdapter, "send", return_value=mk_response(404)) as send:
+        response = session.get(URL)
+
+    assert response.status_code == 404
+    assert send.call_count == 1
+
+
+def test_records_metrics(limiter):
+    metrics = Metrics()
+    session = requests.Session()
+    session.mount("https://", RateLimitedAdapter(limiter, metrics))
+
+    responses = [mk_response(429, {"Retry-After": "0"}), mk_response(200)]
+    with patch.object(HTTPAdapter, "send", side_effect=responses):
+        session.get(URL)
+
+    assert metrics.http_responses.value(host="crates.io", status="429") == 1
+    assert metrics.http_responses.value(host="crates.io", status="200") == 1
+    assert metrics.http_retries.value(host="crates.io") == 1
+    assert metrics.http_request_seconds.count(host="crates.io") == 2
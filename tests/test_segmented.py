@@ -0,0 +1,118 @@
+import io
+import re
+
+import pytest
+import requests_mock
+from requests import Session
+
+from fetcher_py.segmented import Probe, SegmentedDownload, mk_segments, probe
+
+URL = "https://example.com/big.bin"
+CONTENT = bytes(range(256)) * 40
+
+
+def ranged(content, truncate_first=None, etag=None):
+    calls = []
+
+    def callback(request, context):
+        start, end = re.match(r"bytes=(\d+)-(\d+)", request.headers["Range"]).groups()
+        start, end = int(start), int(end)
+        calls.append((start, end))
+        context.status_code = 206
+        if etag is not None:
+            context.headers["ETag"] = etag
+
+        body = content[start : end + 1]
+        if truncate_first is not None and len(calls) == 1:
+            return body[:truncate_first]
+        return body
+
+    return callback, calls
+
+
+@pytest.mark.parametrize(
+    "size, segments, expected",
+    [
+        (10, 3, [(0, 3), (4, 6), (7, 9)]),
+        (10, 1, [(0, 9)]),
+        (2, 4, [(0, 0), (1, 1)]),
+    ],
+)
+def test_mk_segments(size, segments, expected):
+    assert [(s.start, s.end) for s in mk_segments(size, segments)] == expected
+
+
+def test_probe():
+    with requests_mock.Mocker() as m:
+        m.head(URL, headers={"Accept-Ranges": "bytes", "Content-Length": "10"})
+        assert probe(Session(), URL) == Probe(10, None)
+        assert m.last_request.headers["Accept-Encoding"] == "identity"
+
+        headers = {"Accept-Ranges": "bytes", "Content-Length": "10", "ETag": '"v1"'}
+        m.head(URL, headers=headers)
+        assert probe(Session(), URL) == Probe(10, '"v1"')
+
+        # weak ETags can not be used with If-Range
+        modified = "Wed, 21 Oct 2015 07:28:00 GMT"
+        headers.update({"ETag": 'W/"v1"', "Last-Modified": modified})
+        m.head(URL, headers=headers)
+        assert probe(Session(), URL) == Probe(10, modified)
+
+        m.head(URL, headers={"Content-Length": "10"})
+        assert probe(Session(), URL) is None
+
+
+def test_run_fetches_all_segments():
+    callback, calls = ranged(CONTENT)
+    with requests_mock.Mocker() as m:
+        m.get(URL, content=callback)
+
+        file = io.BytesIO()
+        SegmentedDownload(Session(), URL, len(CONTENT), 4, 0, 128).run(file)
+
+    assert file.getvalue() == CONTENT
+    assert len(calls) == 4
+
+
+def test_run_resumes_incomplete_segment():
+    callback, calls = ranged(CONTENT, truncate_first=100)
+    with requests_mock.Mocker() as m:
+        m.get(URL, content=callback)
+
+        file = io.BytesIO()
+        SegmentedDownload(Session(), URL, len(CONTENT), 1, 1, 128).run(file)
+
+    assert file.getvalue() == CONTENT
+    assert calls == [(0, len(CONTENT) - 1), (100, len(CONTENT) - 1)]
+
+
+def test_run_sends_validator_of_probe():
+    callback, calls = ranged(CONTENT, etag='"v1"')
+    with requests_mock.Mocker() as m:
+        m.get(URL, content=callback)
+
+        file = io.BytesIO()
+        SegmentedDownload(Session(), URL, len(CONTENT), 2, 0, 128, '"v1"').run(file)
+
+        for request in m.request_history:
+            assert request.headers["If-Range"] == '"v1"'
+            assert request.headers["Accept-Encoding"] == "identity"
+    assert file.getvalue() == CONTENT
+
+
+@pytest.mark.parametrize(
+    "status, headers",
+    [
+        (206, {"ETag": '"v2"'}),
+        (206, {"ETag": '"v1"', "Content-Encoding": "gzip"}),
+        # file changed, If-Range sends it whole
+        (200, {"ETag": '"v2"'}),
+    ],
+)
+def test_run_rejects_changed_or_encoded_ranges(status, headers):
+    with requests_mock.Mocker() as m:
+        m.get(URL, content=CONTENT, status_code=status, headers=headers)
+
+        download = SegmentedDownload(Session(), URL, len(CONTENT), 2, 0, 128, '"v1"')
+        with pytest.raises(ValueError):
+            download.run(io.BytesIO())
@@ -0,0 +1,94 @@
+import pytest
+
+from fetcher_py.selection import Selection, normalize_platform, parse_wheel_tags
+
+FILES = "https://files.pythonhosted.org/packages/ab/cd"
+WHEEL = (
+    f"{FILES}/numpy-1.26.0-cp311-cp311-manylinux_2_17_x86_64.manylinux2014_x86_64.whl"
+)
+
+
+def test_parse_wheel_tags():
+    assert parse_wheel_tags(WHEEL) == (
+        {"cp311"},
+        {"cp311"},
+        {"manylinux_2_17_x86_64", "manylinux2014_x86_64"},
+    )
+    assert parse_wheel_tags(f"{FILES}/six-1.16.0-py2.py3-none-any.whl") == (
+        {"py2", "py3"},
+        {"none"},
+        {"any"},
+    )
+    assert parse_wheel_tags(f"{FILES}/numpy-1.26.0.tar.gz") is None
+
+
+@pytest.mark.parametrize(
+    "tag, expected",
+    [
+        ("manylinux_2_17_x86_64", "manylinux_x86_64"),
+        ("manylinux2014_aarch64", "manylinux_aarch64"),
+        ("musllinux_1_1_x86_64", "musllinux_x86_64"),
+        ("macosx_10_9_x86_64", "macosx_x86_64"),
+        ("win_amd64", "win_amd64"),
+        ("linux_x86_64", "linux_x86_64"),
+    ],
+)
+def test_normalize_platform(tag, expected):
+    assert normalize_platform(tag) == expected
+
+
+def test_empty_selection_accepts_everything():
+    selection = Selection()
+
+    assert not selection
+    assert selection.accepts("bdist_wheel", WHEEL)
+    assert selection.accepts("src", "https://example.com/a.tgz")
+
+
+def test_selects_by_kind():
+    selection = Selection(kinds=["sdist"])
+
+    assert selection
+    assert selection.accepts("sdist", f"{FILES}/numpy-1.26.0.tar.gz")
+    assert not selection.accepts("bdist_wheel", WHEEL)
+
+
+@pytest.mark.parametrize(
+    "file_name, expected",
+    [
+        ("numpy-1.26.0-cp311-cp311-win_amd64.whl", True),
+        ("numpy-1.26.0-cp310-cp310-win_amd64.whl", False),
+        ("six-1.16.0-py2.py3-none-any.whl", True),
+        ("attrs-23.1.0-py311-none-any.whl", True),
+        ("cryptography-41.0.0-cp37-abi3-win_amd64.whl", True),
+        ("future-0.1-cp312-abi3-win_amd64.whl", False),
+        ("numpy-1.26.0.tar.gz", True),
+    ],
+)
+def test_selects_by_python_tag(file_name, expected):
+    selection = Selection(python_tags=["cp311"])
+    assert selection.accepts("bdist_wheel", f"{FILES}/{file_name}") == expected
+
+
+@pytest.mark.parametrize(
+    "file_name, expected",
+    [
+        ("numpy-1.26.0-cp311-cp311-manylinux_2_17_x86_64.whl", True),
+        ("numpy-1.26.0-cp311-cp311-manylinux2014_x86_64.whl", True),
+        ("numpy-1.26.0-cp311-cp311-manylinux_2_17_aarch64.whl", False),
+        ("numpy-1.26.0-cp311-cp311-win_amd64.whl", False),
+        ("six-1.16.0-py2.py3-none-any.whl", True),
+    ],
+)
+def test_selects_by_platform(file_name, expected):
+    selection = Selection(platforms=["manylinux_x86_64"])
+    assert selection.accepts("bdist_wheel", f"{FILES}/{file_name}") == expected
+
+
+def test_selects_by_platform_glob():
+    selection = Selection(platforms=["macosx_*_arm64"])
+
+    assert selection.accepts(
+        "bdist_wheel", f"{FILES}/a-1-cp311-cp311-macosx_11_0_arm64.whl"
+    )
+    assert not selection.accepts("bdist_wheel", WHEEL)
@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from fetcher_py import serialize
+from fetcher_py.bulk import Result
+from fetcher_py.component import Component
+from fetcher_py.serialize import (
+    component_to_json,
+    dumps,
+    parse_fields,
+    result_to_json,
+)
+
+RAW = {"info": {"name": "numpy", "summary": "arrays ✓"}, "urls": [{"size": 10}]}
+
+
+def mk_component(raw=RAW) -> Component:
+    return Component("numpy", "1.0", "https://pypi.org/pypi", None, None, ["BSD"], raw)
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(serialize, "orjson", None)
+    elif serialize.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+
+def test_dumps(backend):
+    encoded = dumps({"a": [1, None, "✓"], "b": 2**70})
+
+    assert b"\n" not in encoded
+    assert json.loads(encoded) == {"a": [1, None, "✓"], "b": 2**70}
+
+
+def test_component_to_json(backend):
+    component = mk_component()
+
+    assert json.loads(component_to_json(component)) == component.to_dict()
+
+
+def test_undecoded_raw_is_spliced(backend):
+    component = mk_component(json.dumps(RAW).encode())
+
+    encoded = component_to_json(component)
+
+    assert json.loads(encoded)["raw"] == RAW
+    # raw was not decoded for it
+    assert component.encoded_raw is not None
+
+
+def test_compressed_raw_is_spliced(backend):
+    component = mk_component(json.dumps(RAW).encode())
+    component.compact()
+
+    assert json.loads(component_to_json(component))["raw"] == RAW
+
+
+def test_pretty_printed_raw_is_encoded_again(backend):
+    component = mk_component(json.dumps(RAW, indent=2).encode())
+
+    encoded = component_to_json(component)
+
+    assert b"\n" not in encoded
+    assert json.loads(encoded)["raw"] == RAW
+
+
+def test_component_fields_projection(backend):
+    component = mk_component(json.dumps(RAW).encode())
+
+    encoded = component_to_json(component, ["version", "name"])
+
+    assert encoded == b'{"version":"1.0","name":"numpy"}'
+    assert json.loads(component_to_json(component, ["raw"])) == {"raw": RAW}
+
+
+def test_lean_component_to_json(backend):
+    component = mk_component()
+    component.lean()
+
+    assert json.loads(component_to_json(component))["raw"] is None
+
+
+def test_parse_fields():
+    assert parse_fields(None) is None
+    assert parse_fields("name, version,") == ["name", "version"]
+    with pytest.raises(ValueError, match="unknown fields size"):
+        parse_fields("name,size")
+
+
+def test_result_to_json(backend):
+    result = Result(
+        "pip://numpy@1.0",
+        component=mk_component(json.dumps(RAW).encode()),
+        depth=1,
+        required_by="pip://scipy",
+        dependencies=[],
+    )
+
+    assert json.loads(result_to_json(result, ["name"])) == {
+        "query": "pip://numpy@1.0",
+        "ok": True,
+        "path": None,
+        "error": None,
+        "depth": 1,
+        "required_by": "pip://scipy",
+        "dependencies": [],
+        "component": {"name": "numpy"},
+    }
+
+    failed = Result("pip://missing", error=ValueError("not found"))
+    assert json.loads(result_to_json(failed)) == {
+        "query": "pip://missing",
+        "ok": False,
+        "path": None,
+        "error": "ValueError: not found",
+        "component": None,
+    }
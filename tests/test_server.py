@@ -0,0 +1,297 @@
+import http.client
+import json
+import socket
+import threading
+import zipfile
+
+import pytest
+import requests
+
+from fetcher_py.archive import SpooledArchive
+from fetcher_py.component import Component
+from fetcher_py.metrics import Metrics
+from fetcher_py.options import Options
+from fetcher_py.package import Package
+from fetcher_py.server import Coalescer, Service, make_server
+
+
+class FakeFetcher:
+    """Resolves any version to 1.0, fetches after release is set."""
+
+    def __init__(self, options=None):
+        self.options = options or Options()
+        self.release = threading.Event()
+        self.release.set()
+        self.calls = []
+        self.archives = []
+
+    def resolve(self, query):
+        package = Package.parse(query)
+        if package.name == "missing":
+            raise ValueError(f"could not find version of {package.name}")
+        package.version = "1.0"
+        return package
+
+    def get(self, query):
+        self.calls.append(("get", query))
+        self.release.wait(5)
+        if query.startswith("pip://broken"):
+            response = requests.Response()
+            response.status_code = 500
+            raise requests.HTTPError("500 Server Error", response=response)
+        package = Package.parse(query)
+        return Component(
+            name=package.name,
+            version=package.version,
+            registry_url="https://pypi.org/pypi",
+            homepage_url=None,
+            description="numbers",
+            declared_licenses=["BSD"],
+            raw=b'{"info":{"name":"numpy"}}',
+        )
+
+    def download_raw(self, query):
+        self.calls.append(("download", query))
+        self.release.wait(5)
+        archive = SpooledArchive(max_memory=64)
+        with zipfile.ZipFile(archive, "w") as zip_file:
+            zip_file.writestr("a.txt", b"a" * 1024)
+        self.archives.append(archive)
+        return archive
+
+
+def run_threads(target, count):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def test_coalescer_collapses_concurrent_calls():
+    coalescer = Coalescer()
+    started, release = threading.Event(), threading.Event()
+    calls, results, released = [], [], []
+
+    def fn():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return object()
+
+    def call():
+        with coalescer.do("key", fn, release=released.append) as value:
+            results.append(value)
+
+    leader = run_threads(call, 1)
+    started.wait(5)
+    waiters = run_threads(call, 7)
+    # waiters join the call in flight
+    while coalescer._calls["key"].participants < 8:
+        pass
+    release.set()
+    for thread in leader + waiters:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 8 and len(set(map(id, results))) == 1
+    # released once, by the last caller
+    assert released == results[:1]
+
+    # values are not cached
+    with coalescer.do("key", fn) as value:
+        assert value is not results[0]
+    assert len(calls) == 2
+
+
+def test_coalescer_shares_errors():
+    coalescer = Coalescer()
+    started, release = threading.Event(), threading.Event()
+    errors, released = [], []
+
+    def fn():
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    def call():
+        try:
+            with coalescer.do("key", fn, release=released.append):
+                pass
+        except ValueError as e:
+            errors.append(e)
+
+    leader = run_threads(call, 1)
+    started.wait(5)
+    waiters = run_threads(call, 3)
+    while coalescer._calls["key"].participants < 4:
+        pass
+    release.set()
+    for thread in leader + waiters:
+        thread.join()
+
+    assert len(errors) == 4 and len(set(map(id, errors))) == 1
+    assert released == []
+    assert coalescer._calls == {}
+
+
+def test_service_coalesces_resolved_packages():
+    fetcher = FakeFetcher()
+    fetcher.release.clear()
+    service = Service(fetcher)
+    results = []
+
+    def get():
+        results.append(json.loads(service.get("pip://numpy@>=0.5", "name,version")))
+
+    threads = run_threads(get, 1)
+    while not fetcher.calls:
+        pass
+    # a different range, resolved to the same version
+    threads += run_threads(
+        lambda: results.append(json.loads(service.get("pip://numpy"))), 1
+    )
+    while service._calls._calls[("get", "pip", "numpy", "1.0")].participants < 2:
+        pass
+    fetcher.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert fetcher.calls == [("get", "pip://numpy@1.0")]
+    assert {"name": "numpy", "version": "1.0"} in results
+    assert {"info": {"name": "numpy"}} in [result.get("raw") for result in results]
+
+
+def test_service_download_closes_archive():
+    fetcher = FakeFetcher()
+    service = Service(fetcher)
+
+    with service.download("pip://numpy") as file:
+        archive = fetcher.archives[0]
+        assert archive.rolled and archive._file.closed
+        with zipfile.ZipFile(file) as zip_file:
+            assert zip_file.read("a.txt") == b"a" * 1024
+
+
+@pytest.fixture
+def fetcher():
+    return FakeFetcher(Options(metrics=Metrics()))
+
+
+@pytest.fixture
+def server(fetcher):
+    server = make_server(fetcher, port=0)
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def request(server, path):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    connection.request("GET", path)
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+
+def test_get(server):
+    response, body = request(server, "/get?query=pip://numpy&fields=name,version")
+    assert response.status == 200
+    assert response.getheader("Content-Type") == "application/json"
+    assert json.loads(body) == {"name": "numpy", "version": "1.0"}
+
+    response, body = request(server, "/get?query=pip://numpy")
+    assert json.loads(body)["raw"] == {"info": {"name": "numpy"}}
+
+
+def test_download(server):
+    response, body = request(server, "/download?query=pip://numpy@1.0")
+    assert response.status == 200
+    assert response.getheader("Content-Type") == "application/zip"
+    assert int(response.getheader("Content-Length")) == len(body)
+    assert body.startswith(b"PK")
+
+
+@pytest.mark.parametrize(
+    "path, status",
+    [
+        ("/get", 400),
+        ("/get?query=pip://numpy&fields=size", 400),
+        ("/get?query=numpy", 400),
+        ("/get?query=pip://missing", 404),
+        ("/get?query=pip://broken", 502),
+        ("/nothing", 404),
+    ],
+)
+def test_errors(server, path, status):
+    response, body = request(server, path)
+    assert response.status == status
+    assert "error" in json.loads(body)
+
+
+def test_healthz_and_metrics(server):
+    response, body = request(server, "/healthz")
+    assert json.loads(body) == {"ok": True}
+
+    response, body = request(server, "/metrics")
+    assert response.status == 200
+    assert b"# TYPE" in body
+
+
+def test_closes_connection_when_download_fails_midway(server, monkeypatch):
+    def fail(*args):
+        raise OSError("disk went away")
+
+    monkeypatch.setattr("fetcher_py.server.shutil.copyfileobj", fail)
+    connection = http.client.HTTPConnection(
+        "127.0.0.1", server.server_address[1], timeout=5
+    )
+    connection.request("GET", "/download?query=pip://numpy@1.0")
+    response = connection.getresponse()
+
+    # no second response is written into the body
+    assert response.status == 200
+    with pytest.raises(http.client.IncompleteRead) as e:
+        response.read()
+    assert e.value.partial == b""
+    connection.close()
+
+
+def test_keeps_connections_alive(server):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    for _ in range(3):
+        connection.request("GET", "/healthz")
+        assert connection.getresponse().read() == b'{"ok":true}'
+    connection.close()
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs unix sockets")
+def test_unix_socket(fetcher, tmp_path):
+    path = str(tmp_path / "fetcher.sock")
+    server = make_server(fetcher, socket_path=path)
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(path)
+    client.sendall(
+        b"GET /healthz HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n"
+    )
+    response = b""
+    while True:
+        chunk = client.recv(4096)
+        if not chunk:
+            break
+        response += chunk
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+    assert response.startswith(b"HTTP/1.1 200")
+    assert response.endswith(b'{"ok":true}')
@@ -0,0 +1,215 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+import requests
+import requests_mock
+
+from fetcher_py.component import Component
+from fetcher_py.metrics import Metrics
+from fetcher_py.options import Options
+from fetcher_py.package import Package
+from fetcher_py.registry.brew import BrewRegistry
+from fetcher_py.registry.composer import ComposerRegistry
+from fetcher_py.registry.npm import NpmRegistry
+from fetcher_py.registry.pypi import PypiRegistry
+from fetcher_py.store import ComponentStore, normalize_name
+
+BASE_URL = "https://pypi.org/pypi"
+
+
+def mk_component(name="numpy", version="1.0", raw=None) -> Component:
+    return Component(
+        name=name,
+        version=version,
+        registry_url=BASE_URL,
+        homepage_url="https://numpy.org",
+        description="arrays",
+        declared_licenses=["BSD"],
+        raw=raw if raw is not None else {"info": {"name": name, "version": version}},
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ComponentStore(str(tmp_path / "components.db"))
+    yield store
+    store.close()
+
+
+def test_put_and_get(store):
+    component = mk_component()
+    store.put("pip", "numpy", "1.0", component)
+
+    assert store.get("pip", "numpy", "1.0", BASE_URL) == component
+    assert store.get("pip", "numpy", "2.0", BASE_URL) is None
+    assert store.get("pip", "numpy", "1.0", "https://pypi.example.com") is None
+    assert store.get("npm", "numpy", "1.0", BASE_URL) is None
+
+
+def test_survives_restart(tmp_path):
+    path = str(tmp_path / "components.db")
+    store = ComponentStore(path)
+    store.put("pip", "numpy", "1.0", mk_component())
+    store.close()
+
+    store = ComponentStore(path)
+    assert store.get("pip", "numpy", "1.0", BASE_URL) == mk_component()
+    assert len(store) == 1
+    store.close()
+
+
+def test_raw_is_compressed(store):
+    raw = {"info": {"description": "a" * 100_000}}
+    store.put("pip", "numpy", "1.0", mk_component(raw=raw))
+
+    with sqlite3.connect(store.path) as db:
+        (stored,) = db.execute("SELECT raw FROM components").fetchone()
+    assert len(stored) < 10_000
+    assert store.get("pip", "numpy", "1.0", BASE_URL).raw == raw
+
+
+@pytest.mark.parametrize(
+    "ecosystem, name, expected",
+    [
+        ("pip", "Typing_Extensions", "typing-extensions"),
+        ("pip", "zope.interface", "zope-interface"),
+        ("nuget", "Newtonsoft.Json", "newtonsoft.json"),
+        ("composer", "Monolog/Monolog", "monolog/monolog"),
+        ("npm", "JSONStream", "JSONStream"),
+    ],
+)
+def test_normalize_name(ecosystem, name, expected):
+    assert normalize_name(ecosystem, name) == expected
+
+
+def test_get_normalizes_name(store):
+    store.put("pip", "Typing_Extensions", "4.0", mk_component("typing_extensions"))
+
+    component = store.get("pip", "typing-extensions", "4.0", BASE_URL)
+    assert component.name == "typing_extensions"
+
+
+def test_versions_and_components(store):
+    store.put("pip", "numpy", "1.0", mk_component(version="1.0"))
+    store.put("pip", "numpy", "2.0", mk_component(version="2.0"))
+    store.put("pip", "scipy", "1.0", mk_component("scipy"))
+
+    assert store.versions("pip", "NumPy") == ["1.0", "2.0"]
+    assert store.versions("pip", "numpy", "https://pypi.example.com") == []
+    assert [c.version for c in store.components("pip", "numpy", BASE_URL)] == [
+        "1.0",
+        "2.0",
+    ]
+
+
+def test_memory_is_bounded_by_bytes(tmp_path):
+    store = ComponentStore(str(tmp_path / "components.db"), max_memory=5000)
+    # random hex is compressed to about half of its size
+    big = {"info": {"description": os.urandom(3000).hex()}}
+    store.put("pip", "a", "1.0", mk_component("a", raw=big))
+    store.put("pip", "b", "1.0", mk_component("b", raw=big))
+
+    # only the most recently used one fits in memory, both are in sqlite
+    assert [key[1] for key in store._memory] == ["b"]
+    assert store._memory_size <= 5000
+    assert store.get("pip", "a", "1.0", BASE_URL).name == "a"
+    assert [key[1] for key in store._memory] == ["a"]
+
+    # components larger than the memory tier are only in sqlite
+    huge = {"x": os.urandom(10000).hex()}
+    store.put("pip", "c", "1.0", mk_component("c", raw=huge))
+    assert [key[1] for key in store._memory] == ["a"]
+    assert store.get("pip", "c", "1.0", BASE_URL).raw == huge
+    store.close()
+
+
+def test_memory_hit_skips_sqlite(store):
+    store.put("pip", "numpy", "1.0", mk_component())
+    db, store._db = store._db, None
+
+    first = store.get("pip", "numpy", "1.0", BASE_URL)
+    assert first == mk_component()
+    # components are not shared, raw is decoded on access
+    assert store.get("pip", "numpy", "1.0", BASE_URL) is not first
+    store._db = db
+
+
+def test_concurrent_puts(store):
+    def put(i):
+        store.put("pip", f"pkg{i}", "1.0", mk_component(f"pkg{i}"))
+
+    threads = [threading.Thread(target=put, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(store) == 16
+
+
+def test_registry_serves_exact_versions_from_store(store):
+    metrics = Metrics()
+    registry = PypiRegistry(
+        requests.Session(), BASE_URL, Options(store=store, metrics=metrics)
+    )
+    data = {"info": {"name": "numpy", "version": "1.0"}, "urls": []}
+
+    with requests_mock.Mocker() as m:
+        m.get(f"{BASE_URL}/numpy/1.0/json", json=data)
+        m.get(f"{BASE_URL}/numpy/json", json={"releases": {"1.0": [{}]}})
+
+        assert registry.get(Package("pip", "numpy", "1.0")).raw == data
+        assert registry.get(Package("pip", "numpy", "1.0")).raw == data
+        assert m.call_count == 1
+
+        # ranges are resolved first, metadata of the version is stored
+        assert registry.get(Package("pip", "numpy", ">=1.0")).version == "1.0"
+        assert [r.url for r in m.request_history][1:] == [f"{BASE_URL}/numpy/json"]
+
+    assert metrics.cache_requests.value(cache="component", result="hit") == 2
+    assert metrics.cache_requests.value(cache="component", result="miss") == 1
+
+
+def test_registry_without_version_scheme_skips_store(store):
+    base_url = "https://formulae.brew.sh/api/formula"
+    registry = BrewRegistry(requests.Session(), base_url, Options(store=store))
+
+    with requests_mock.Mocker() as m:
+        m.get(f"{base_url}/wget.json", json={"versions": {"stable": "1.21"}})
+        registry.get(Package("brew", "wget"))
+        registry.get(Package("brew", "wget"))
+        assert m.call_count == 2
+
+    assert len(store) == 0
+
+
+def test_registry_skips_store_for_dist_tags(store):
+    base_url = "https://registry.npmjs.org"
+    registry = NpmRegistry(requests.Session(), base_url, Options(store=store))
+    data = {"name": "react", "version": "19.0.0-rc.1"}
+
+    with requests_mock.Mocker() as m:
+        m.get(f"{base_url}/react/next", json=data)
+        registry.get(Package("npm", "react", "next"))
+        m.get(f"{base_url}/react/next", json={**data, "version": "19.0.0-rc.2"})
+        assert registry.get(Package("npm", "react", "next")).version == "19.0.0-rc.2"
+        assert m.call_count == 2
+
+    # the release a dist-tag pointed to is stored
+    assert store.get("npm", "react", "19.0.0-rc.1", base_url).version == "19.0.0-rc.1"
+    assert store.get("npm", "react", "next", base_url) is None
+
+
+@pytest.mark.parametrize("version", ["dev-main", "1.x-dev"])
+def test_registry_skips_store_for_branches(store, version):
+    base_url = "https://repo.packagist.org"
+    registry = ComposerRegistry(requests.Session(), base_url, Options(store=store))
+    data = {"packages": {"org/lib": [{"version": version, "name": "org/lib"}]}}
+
+    with requests_mock.Mocker() as m:
+        m.get(f"{base_url}/p2/org/lib.json", json=data)
+        registry.get(Package("composer", "org/lib", version))
+
+    assert len(store) == 0
@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+from fetcher_py.ttlcache import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_reuses_value_until_ttl():
+    clock, loads = Clock(), []
+    cache = TTLCache(10, clock=clock)
+
+    def load():
+        loads.append(clock.now)
+        return len(loads)
+
+    assert cache.get("key", load) == 1
+    clock.now = 9.9
+    assert cache.get("key", load) == 1
+    clock.now = 10
+    assert cache.get("key", load) == 2
+    assert loads == [0.0, 10]
+
+
+def test_zero_ttl_disables_caching():
+    cache = TTLCache(0)
+    values = iter(range(3))
+    assert [cache.get("key", lambda: next(values)) for _ in range(3)] == [0, 1, 2]
+    assert len(cache) == 0
+
+
+def test_none_ttl_never_expires():
+    clock = Clock()
+    cache = TTLCache(None, clock=clock)
+    cache.get("key", lambda: 1)
+    clock.now = 1e12
+    assert cache.get("key", lambda: 2) == 1
+
+
+def test_evicts_least_recently_used():
+    cache = TTLCache(None, max_entries=2)
+    cache.get("a", lambda: 1)
+    cache.get("b", lambda: 2)
+    cache.get("a", lambda: 0)
+    cache.get("c", lambda: 3)
+
+    assert cache.get("a", lambda: 0) == 1
+    assert cache.get("b", lambda: 0) == 0
+
+
+def test_errors_are_not_cached():
+    cache = TTLCache()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        cache.get("key", fail)
+    assert cache.get("key", lambda: 1) == 1
+
+
+def test_invalidate():
+    cache = TTLCache()
+    cache.get("a", lambda: 1)
+    cache.get("b", lambda: 2)
+
+    cache.invalidate("a")
+    assert cache.get("a", lambda: 3) == 3
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_concurrent_callers_share_one_load():
+    cache, loads = TTLCache(), []
+
+    def load():
+        loads.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get("key", load)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 8
+    assert len(loads) == 1
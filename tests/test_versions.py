@@ -0,0 +1,171 @@
+import pytest
+
+from fetcher_py.versions import (
+    Release,
+    is_pinned,
+    is_release,
+    parse_loose,
+    parse_pep440,
+    parse_range,
+    select,
+)
+
+NPM = ["3.9.0", "4.17.1", "4.18.0", "4.18.2", "4.19.0-beta.1", "5.0.0", "5.0.1-rc.1"]
+PEP440 = ["1.23.5", "1.24.0", "1.24.4", "1.26.4", "2.0.0rc1", "2.0.0", "2.1.0.dev0"]
+CARGO = ["0.9.0", "1.0.0", "1.0.197", "1.1.0", "2.0.0-alpha.1"]
+COMPOSER = ["v1.0.0", "v1.2.3", "1.9.0", "2.0.0", "2.1.0-RC1"]
+RUBYGEMS = ["1.0.0", "1.2.5", "1.3.0.pre1", "1.9.0", "2.0.0"]
+PVP = ["1.2.0", "1.2.5", "1.3.0", "2.0"]
+NUGET = ["1.0.0", "1.5.0", "2.0.0", "2.1.0-beta"]
+
+
+@pytest.mark.parametrize(
+    "scheme, versions, spec, expected",
+    [
+        ("npm", NPM, None, "5.0.0"),
+        ("npm", NPM, "latest", "5.0.0"),
+        ("npm", NPM, "^4.18", "4.18.2"),
+        ("npm", NPM, "~4.18.0", "4.18.2"),
+        ("npm", NPM, "4", "4.18.2"),
+        ("npm", NPM, "4.x", "4.18.2"),
+        ("npm", NPM, "<5", "4.18.2"),
+        ("npm", NPM, ">= 4.17 < 4.18", "4.17.1"),
+        ("npm", NPM, "4.17.1 - 4.18", "4.18.2"),
+        ("npm", NPM, "^3 || ^4", "4.18.2"),
+        ("npm", NPM, ">=4.19.0-beta.0 <5", "4.19.0-beta.1"),
+        ("npm", NPM, ">5", None),
+        ("npm", NPM, "*", "5.0.0"),
+        ("pep440", PEP440, ">=1.24,<2", "1.26.4"),
+        ("pep440", PEP440, "~=1.24.0", "1.24.4"),
+        ("pep440", PEP440, "==1.24.*", "1.24.4"),
+        ("pep440", PEP440, "!=2.0.0,>=1.26", "1.26.4"),
+        ("pep440", PEP440, ">=2.0.0rc1,<2.0.0", "2.0.0rc1"),
+        ("pep440", PEP440, None, "2.0.0"),
+        ("cargo", CARGO, "1", "1.1.0"),
+        ("cargo", CARGO, "1.0", "1.1.0"),
+        ("cargo", CARGO, "~1.0", "1.0.197"),
+        ("cargo", CARGO, "=1.0.0", "1.0.0"),
+        ("cargo", CARGO, ">=1, <1.1", "1.0.197"),
+        ("cargo", CARGO, "0.9", "0.9.0"),
+        ("cargo", CARGO, "1.*", "1.1.0"),
+        ("composer", COMPOSER, "^1.2", "1.9.0"),
+        ("composer", COMPOSER, "~1.2", "1.9.0"),
+        ("composer", COMPOSER, "~1.2.3", "v1.2.3"),
+        ("composer", COMPOSER, "1.2.*", "v1.2.3"),
+        ("composer", COMPOSER, ">=1.0 <2.0", "1.9.0"),
+        ("composer", COMPOSER, "^1 || ^2", "2.0.0"),
+        ("composer", COMPOSER, "1.0 - 1.9", "1.9.0"),
+        ("rubygems", RUBYGEMS, "~> 1.2", "1.9.0"),
+        ("rubygems", RUBYGEMS, "~> 1.2.0", "1.2.5"),
+        ("rubygems", RUBYGEMS, ">= 1.0, < 2", "1.9.0"),
+        ("rubygems", RUBYGEMS, "!= 2.0.0", "1.9.0"),
+        ("pvp", PVP, "^>=1.2", "1.2.5"),
+        ("pvp", PVP, ">=1.2 && <1.3", "1.2.5"),
+        ("pvp", PVP, "==1.2.*", "1.2.5"),
+        ("pvp", PVP, "^>=1.3 || ^>=2.0", "2.0"),
+        ("nuget", NUGET, "[1.0,2.0)", "1.5.0"),
+        ("nuget", NUGET, "(,1.5.0]", "1.5.0"),
+        ("nuget", NUGET, "[1.0.0]", "1.0.0"),
+        ("nuget", NUGET, "1.*", "1.5.0"),
+        ("nuget", NUGET, "[2.0,)", "2.0.0"),
+    ],
+)
+def test_select(scheme, versions, spec, expected):
+    releases = [Release(v) for v in versions]
+    assert select(scheme, releases, spec) == expected
+
+
+def test_select_skips_yanked():
+    releases = [Release("1.0.0"), Release("1.1.0", yanked=True)]
+    assert select("npm", releases) == "1.0.0"
+    assert select("npm", releases, "^1") == "1.0.0"
+
+
+def test_select_latest_of_prereleases_only():
+    releases = [Release("1.0.0-beta.1"), Release("1.0.0-beta.2")]
+    assert select("npm", releases) == "1.0.0-beta.2"
+
+
+def test_select_skips_unparsable_versions():
+    releases = [Release("dev-main"), Release("1.0.0")]
+    assert select("composer", releases) == "1.0.0"
+
+
+@pytest.mark.parametrize(
+    "scheme, version, pinned",
+    [
+        ("npm", None, False),
+        ("npm", "latest", False),
+        ("npm", "4.18.2", True),
+        ("npm", "4.18", False),
+        ("npm", "next", True),
+        ("cargo", "1.0.197", True),
+        ("cargo", "1", False),
+        ("pep440", "1.24", True),
+        ("pep440", ">=1.24", False),
+        ("composer", "v1.2.3", True),
+        ("composer", "dev-main", True),
+        ("composer", "^1.2", False),
+        ("rubygems", "1.3.0.pre1", True),
+        ("rubygems", "~> 1.2", False),
+        ("pvp", "1.2.0.1", True),
+        ("nuget", "1.0.0", True),
+        ("nuget", "[1.0,2.0)", False),
+        (None, "anything", True),
+        (None, None, False),
+    ],
+)
+def test_is_pinned(scheme, version, pinned):
+    assert is_pinned(scheme, version) == pinned
+
+
+def test_parse_range_of_invalid_range():
+    assert parse_range("npm", "^^1") is None
+    assert parse_range("pep440", "~=1") is None
+
+
+def test_loose_ordering():
+    versions = ["1.0.0", "1.0.0-beta.11", "1.0.0-alpha", "1.0.0-beta.2", "0.9", "1.0.1"]
+    ordered = sorted(versions, key=lambda v: parse_loose(v).key)
+    assert ordered == [
+        "0.9",
+        "1.0.0-alpha",
+        "1.0.0-beta.2",
+        "1.0.0-beta.11",
+        "1.0.0",
+        "1.0.1",
+    ]
+    assert parse_loose("1.2") == parse_loose("1.2.0")
+
+
+def test_pep440_ordering():
+    versions = ["1.0.post1", "1.0", "1.0rc1", "1.0a1", "1.0.dev0", "1!0.1", "0.9"]
+    ordered = sorted(versions, key=lambda v: parse_pep440(v).key)
+    assert ordered == [
+        "0.9",
+        "1.0.dev0",
+        "1.0a1",
+        "1.0rc1",
+        "1.0",
+        "1.0.post1",
+        "1!0.1",
+    ]
+    assert parse_pep440("1.0-1") == parse_pep440("1.0.post1")
+    assert parse_pep440("not a version") is None
+
+
+@pytest.mark.parametrize(
+    "scheme, version, release",
+    [
+        ("npm", "4.18.2", True),
+        ("npm", "5.0.1-rc.1", True),
+        ("npm", "next", False),
+        ("npm", None, False),
+        ("composer", "v1.2.3", True),
+        ("composer", "dev-main", False),
+        ("composer", "1.x-dev", False),
+        ("pep440", "2.0.0rc1", True),
+    ],
+)
+def test_is_release(scheme, version, release):
+    assert is_release(scheme, version) == release